@@ -0,0 +1,113 @@
+"""
+Compare the OR-reduction and the address-decoding interconnects.
+
+A Wishbone bus with a number of register-file peripherals is
+converted with both interconnects and synthesized with yosys
+(iCE40), the cell utilization is reported.  If `icetime` is
+available the fmax estimate is reported as well.
+
+    >> python ex_interconnect.py --num_peripherals 32
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import subprocess
+
+import myhdl
+from myhdl import Signal, ResetSignal, intbv, always_comb
+
+from rhea.system import Global, Register, RegisterFile, Wishbone
+
+
+@myhdl.block
+def wishbone_regfiles(clock, reset, cyc, stb, we, adr, dat_i, dat_o, ack,
+                      num_peripherals=32, decoded=False):
+    """ a bus with `num_peripherals` register files (4 registers) """
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=16)
+    if decoded:
+        regbus.set_decoder()
+
+    insts = []
+    for ii in range(num_peripherals):
+        regfile = RegisterFile()
+        regfile.base_address = ii * 0x100
+        for jj in range(4):
+            regfile.add_register(
+                Register('reg{}'.format(jj), 32, 'rw', 0, jj*4))
+        insts.append(regbus.add(regfile, 'per'))
+    insts.append(regbus.interconnect())
+
+    @always_comb
+    def beh_assign():
+        regbus.cyc_i.next = cyc
+        regbus.stb_i.next = stb
+        regbus.we_i.next = we
+        regbus.adr_i.next = adr
+        regbus.dat_i.next = dat_i
+        dat_o.next = regbus.dat_o
+        ack.next = regbus.ack_o
+
+    return insts, beh_assign
+
+
+def convert(num_peripherals, decoded, path='output'):
+    clock, reset = Signal(bool(0)), ResetSignal(0, active=1, async=False)
+    cyc, stb, we, ack = [Signal(bool(0)) for _ in range(4)]
+    adr = Signal(intbv(0)[16:])
+    dat_i, dat_o = [Signal(intbv(0)[32:]) for _ in range(2)]
+    name = 'wb_{}_{}'.format('decoded' if decoded else 'or', num_peripherals)
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    inst = wishbone_regfiles(clock, reset, cyc, stb, we, adr, dat_i, dat_o,
+                             ack, num_peripherals=num_peripherals,
+                             decoded=decoded)
+    inst.convert(hdl='Verilog', directory=path, name=name, testbench=False)
+    return name, os.path.join(path, name+'.v')
+
+
+def synthesize(name, filename):
+    """ synthesize with yosys, returns the number of cells and the
+    icetime fmax (None if not available) """
+    blif = filename.replace('.v', '.blif')
+    cmd = ['yosys', '-q', '-p',
+           'read_verilog {}; synth_ice40 -top {} -blif {}; stat'.format(
+               filename, name, blif)]
+    log = subprocess.check_output(cmd).decode()
+    ncells = int(re.findall(r"Number of cells:\s+(\d+)", log)[-1])
+
+    fmax = None
+    try:
+        asc = blif.replace('.blif', '.asc')
+        subprocess.check_call(['arachne-pnr', '-d', '8k', '-o', asc, blif],
+                              stderr=subprocess.STDOUT)
+        log = subprocess.check_output(['icetime', '-d', 'hx8k', asc]).decode()
+        fmax = float(re.findall(r"\(([\d.]+) MHz\)", log)[-1])
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return ncells, fmax
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_peripherals', type=int, default=32)
+    args = parser.parse_args()
+
+    for decoded in (False, True):
+        name, filename = convert(args.num_peripherals, decoded)
+        try:
+            ncells, fmax = synthesize(name, filename)
+        except OSError:
+            print("{}: converted, yosys is not available".format(name))
+            continue
+        print("{:<16s}: {:6d} cells, fmax {}".format(
+            name, ncells, "n/a" if fmax is None else
+            "{:.1f} MHz".format(fmax)))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,3 +2,4 @@
 from .fpga import FPGA
 from .boards import get_board
 from . import toolflow as flow
+from .parallel import build_boards
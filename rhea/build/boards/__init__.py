@@ -3,4 +3,4 @@ from __future__ import absolute_import
 
 from .get_board import get_board
 from .get_board import get_all_board_names
-
+from .get_board import register_board
@@ -1,51 +1,142 @@
 # Copyright (c) 2014-2015 Christopher Felton
 
+"""
+The board registry.
+
+The board definitions are registered by name with the module path of
+the board class ("module:Class"), the module is only imported when
+the board is retrieved (`get_board`).  Importing all the board
+definitions (and the toolflows they use) is slow and not needed for
+a simulation or to build for a single board.
+
+Out-of-tree boards can be added with `register_board` or with a
+``rhea.boards`` entry point in the package that defines the board:
+
+    setup(...,
+          entry_points={
+              'rhea.boards': ['my_board = my_board_def:MyCustomBoard'],
+          })
+"""
 
 from __future__ import division
 from __future__ import print_function
 
+import importlib
+
+
+# the built-in board definitions, name: "module:Class"
+xbrd = {
+    'anvyl': 'rhea.build.boards.xilinx._anvyl:Anvyl',
+    'atlys': 'rhea.build.boards.xilinx._atlys:Atlys',
+    'mojo': 'rhea.build.boards.xilinx._mojo:Mojo',
+    'nexys': 'rhea.build.boards.xilinx._nexys:Nexys',
+    'nexys_video': 'rhea.build.boards.xilinx.nexys:NexysVideo',
+    'parallella': 'rhea.build.boards.xilinx._parallella:Parallella',
+    'pone': 'rhea.build.boards.xilinx._papilio_one:PapilioOne',
+    'ppro': 'rhea.build.boards.xilinx._papilio_pro:PapilioPro',
+    'sx1': 'rhea.build.boards.xilinx._sx1:SX1',
+    'ufo400': 'rhea.build.boards.xilinx._ufo400:UFO400',
+    'waxwing45': 'rhea.build.boards.xilinx.waxwing:Waxwing45',
+    'waxwing45carrier': 'rhea.build.boards.xilinx.waxwing:Waxwing45carrier',
+    'xula': 'rhea.build.boards.xilinx._xula:Xula',
+    'xula2': 'rhea.build.boards.xilinx._xula:Xula2',
+    'xula2_stickit_mb': 'rhea.build.boards.xilinx._xula:Xula2StickItMB',
+    'xupv2p': 'rhea.build.boards.xilinx._xupv2p:XUPV2P',
+    'zybo': 'rhea.build.boards.xilinx.zybo:Zybo',
+    'cmoda7_15t': 'rhea.build.boards.xilinx.cmoda7:CModA7_15T',
+    'cmoda7_35t': 'rhea.build.boards.xilinx.cmoda7:CModA7_35T',
+    'red_pitaya': 'rhea.build.boards.xilinx.red_pitaya:RedPitaya',
+}
+
+abrd = {
+    'de0nano': 'rhea.build.boards.altera.de0nano:DE0Nano',
+    'de0nano_soc': 'rhea.build.boards.altera.de0nano_soc:DE0NanoSOC',
+    'de0cv': 'rhea.build.boards.altera.de0cv:DE0CV',
+    'de1_soc': 'rhea.build.boards.altera.de1_soc:DE1SOC',
+}
+
+lbrd = {
+    'icestick': 'rhea.build.boards.lattice._icestick:Icestick',
+    'catboard': 'rhea.build.boards.lattice._catboard:CATBoard',
+}
+
+# the entry point group for out-of-tree boards
+entry_point_group = 'rhea.boards'
 
-# import all the board definitions
-from .xilinx import (Anvyl, Atlys, Mojo, Nexys, NexysVideo, Parallella,
-                     PapilioOne, PapilioPro, SX1, UFO400, Waxwing45,
-                     Waxwing45carrier, Xula, Xula2, Xula2StickItMB,
-                     XUPV2P, Zybo, CModA7_15T, CModA7_35T, RedPitaya)
-from .altera import (DE0Nano, DE0NanoSOC, DE0CV, DE1SOC)
-from .lattice import (Icestick, CATBoard)
+_registry = {}
+_registry.update(xbrd)
+_registry.update(abrd)
+_registry.update(lbrd)
+_plugins_loaded = False
 
 
-xbrd = {'anvyl': Anvyl, 'atlys': Atlys, 'mojo': Mojo, 'nexys': Nexys,
-        'nexys_video': NexysVideo, 'parallella': Parallella,
-        'pone': PapilioOne, 'ppro': PapilioPro, 'sx1': SX1,
-        'ufo400': UFO400, 'waxwing45': Waxwing45,
-        'waxwing45carrier': Waxwing45carrier, 'xula': Xula,
-        'xula2': Xula2, 'xula2_stickit_mb': Xula2StickItMB,
-        'xupv2p': XUPV2P, 'zybo': Zybo, 'cmoda7_15t': CModA7_15T,
-        'cmoda7_35t': CModA7_35T, 'red_pitaya': RedPitaya,
-        }
+def _iter_entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            from pkg_resources import iter_entry_points
+        except ImportError:
+            return []
+        return list(iter_entry_points(entry_point_group))
+
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return list(eps.select(group=entry_point_group))
+    return list(eps.get(entry_point_group, []))
+
+
+def _load_plugins():
+    """ Add the boards from the entry points, the board modules are
+    not imported until the board is retrieved.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    for ep in _iter_entry_points():
+        # boards registered with register_board take precedence
+        if ep.name not in _registry:
+            _registry[ep.name] = ep
+
+
+def register_board(name, board):
+    """ Add a board definition to the registry.
+
+    Arguments:
+        name (str): the name used to retrieve the board (`get_board`)
+        board: the board class (derived from FPGA) or the module path
+            of the class, "module:Class", the module is imported when
+            the board is first retrieved.
+    """
+    _registry[name] = board
 
-abrd = {'de0nano': DE0Nano, 'de0nano_soc': DE0NanoSOC, 'de0cv': DE0CV, 
-        'de1_soc': DE1SOC,}
 
-lbrd = {'icestick': Icestick, 'catboard': CATBoard}
+def _load_board(name):
+    board = _registry[name]
+    if isinstance(board, str):
+        modname, _, clsname = board.partition(':')
+        board = getattr(importlib.import_module(modname), clsname)
+    elif not isinstance(board, type):
+        # an entry point
+        board = board.load()
+    _registry[name] = board
+    return board
 
 
 def get_board(name):
     """ retrieve a board definition from the name provided.
     """
-    brd = None
-    if name in xbrd:
-        brd = xbrd[name]()
-    elif name in abrd:
-        brd = abrd[name]()
-    elif name in lbrd:
-        brd = lbrd[name]()
-    else:
+    if name not in _registry:
+        _load_plugins()
+    if name not in _registry:
         # @todo: print out a list of boards and descriptions
         raise ValueError("Invalid board %s"%(name,))
 
+    brd = _load_board(name)()
     return brd
 
 
 def get_all_board_names():
-    return list(xbrd.keys()) + list(abrd.keys()) + list(lbrd.keys())
+    _load_plugins()
+    return list(_registry.keys())
@@ -0,0 +1,294 @@
+#
+# Copyright (c) 2015 Christopher Felton
+#
+
+"""
+Build a top-level design for multiple boards in parallel.
+
+Each board is built in a separate process with its own working
+directory (``<path>/<board name>/``).  The conversion and the vendor
+toolflow for a board only write files to the board's working
+directory, which allows the builds to run at the same time.
+
+Example:
+    >> from rhea.build import build_boards
+    >> results = build_boards(blinky, ['xula*', 'de0nano'], jobs=4)
+    >> print(format_results(results))
+
+Or from the command line:
+    >> python -m rhea.build.parallel --top blink:blinky --boards "xula*"
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+import fnmatch
+import importlib
+import traceback
+import multiprocessing
+from ast import literal_eval
+
+from .boards import get_board
+from .boards import get_all_board_names
+from . import toolflow
+
+
+_flows = {
+    'ise': toolflow.ISE,
+    'vivado': toolflow.Vivado,
+    'quartus': toolflow.Quartus,
+    'iceriver': toolflow.IceRiver,
+    'yosys': toolflow.Yosys,
+}
+
+
+class BuildResult(object):
+    def __init__(self, board, status='not run', path=None, logfn=None,
+                 utilization=None, fmax=None, elapsed=0., error=None):
+        """ The result of building a design for a board.
+
+        Attributes:
+            board (str): name of the board
+            status (str): 'ok', 'failed' (the toolflow failed), or
+                'error' (an exception building the board)
+            path (str): the working directory for the board
+            logfn (str): the toolflow log file
+            utilization (dict): resource utilization, if available
+            fmax: the fmax from the reports, if available
+            elapsed (float): build time in seconds
+            error (str): the exception traceback when status is 'error',
+                or of parsing the reports of an 'ok' build
+        """
+        self.board = board
+        self.status = status
+        self.path = path
+        self.logfn = logfn
+        self.utilization = utilization
+        self.fmax = fmax
+        self.elapsed = elapsed
+        self.error = error
+
+    def __repr__(self):
+        return "BuildResult({}, {}, {})".format(
+            self.board, self.status, self.logfn)
+
+
+def get_board_names(patterns):
+    """ Get the board names that match a list of names or globs """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    all_names = sorted(get_all_board_names())
+    names = []
+    for pat in patterns:
+        matches = fnmatch.filter(all_names, pat)
+        if len(matches) == 0:
+            raise ValueError("No boards match {}".format(pat))
+        names += [nm for nm in matches if nm not in names]
+    return names
+
+
+def _get_flow(brd, flow):
+    if flow is None:
+        return brd.get_flow()
+    if isinstance(flow, str):
+        flow = _flows[flow.lower()]
+    return flow(brd=brd)
+
+
+def _build_board(job):
+    """ Build a single board, this runs in a worker process """
+    bn = job['board']
+    workdir = os.path.abspath(os.path.join(job['path'], bn))
+    result = BuildResult(bn, path=workdir)
+    if not os.path.isdir(workdir):
+        os.makedirs(workdir)
+
+    # the vendor tools write files to the current directory, run
+    # in the board's working directory and restore when done.
+    cwd, stdout = os.getcwd(), sys.stdout
+    start = time.time()
+    try:
+        os.chdir(workdir)
+        for pth in job['sys_path']:
+            if pth not in sys.path:
+                sys.path.append(pth)
+        if job['redirect']:
+            sys.stdout = open('build.log', 'w')
+        brd = get_board(bn)
+        if job['setup'] is not None:
+            job['setup'](brd)
+        brd.set_top(_import_top(job['top']), **job['params'])
+        flow = _get_flow(brd, job['flow'])
+        flow.path = os.path.join(workdir, flow.path)
+        result.logfn = flow.run(use=job['use'])
+        result.status = 'failed' if flow.failed else 'ok'
+        if result.status == 'ok':
+            try:
+                result.utilization = flow.get_utilization()
+                result.fmax = result.utilization.fmax
+            except (NotImplementedError, IOError, OSError):
+                # not all flows have reports
+                pass
+            except Exception:
+                # the build is ok, keep the report error
+                result.error = traceback.format_exc()
+    except Exception:
+        result.status = 'error'
+        result.error = traceback.format_exc()
+    finally:
+        if sys.stdout is not stdout:
+            sys.stdout.close()
+            sys.stdout = stdout
+        os.chdir(cwd)
+
+    result.elapsed = time.time() - start
+    return result
+
+
+def build_boards(top, boards='*', flow=None, path='output', jobs=None,
+                 use='verilog', setup=None, **params):
+    """ Build a top-level design for a set of boards.
+
+    Arguments:
+        top: myhdl top-level block or a "module:function" string, the
+            top-level is imported by name in the worker processes.
+        boards: list of board names, glob patterns are accepted,
+            e.g. ['xula*', 'de0nano']
+        flow: the toolflow to use, a name ('ise', 'vivado', 'quartus',
+            'iceriver', 'yosys') or a ToolFlow class.  If None the
+            board's default flow (``brd.get_flow()``) is used.
+        path (str): the board working directories are created in path
+        jobs (int): number of builds to run at the same time, defaults
+            to the number of CPUs.  With ``jobs=1`` the builds run in
+            this process one at a time.
+        use (str): 'verilog' or 'vhdl'
+        setup: function called with each board before the build, e.g.
+            to add port names, it needs to be picklable (module level).
+        params: top-level parameters
+
+    Returns:
+        a list of BuildResult, in the order of the boards
+    """
+    names = get_board_names(boards)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    jobs = max(1, min(jobs, len(names)))
+
+    if not isinstance(top, str):
+        func = getattr(top, 'func', top)
+        top = "{}:{}".format(func.__module__, func.__name__)
+
+    # the builds run in the board working directories, the top-level
+    # module might only be importable from the current directory
+    sys_path = [os.path.abspath(pth) for pth in sys.path]
+
+    joblist = [dict(board=bn, top=top, flow=flow, path=path, use=use,
+                    setup=setup, params=params, redirect=jobs > 1,
+                    sys_path=sys_path)
+               for bn in names]
+
+    if jobs == 1:
+        results = [_build_board(job) for job in joblist]
+    else:
+        pool = multiprocessing.Pool(processes=jobs)
+        try:
+            results = pool.map(_build_board, joblist, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    return results
+
+
+def _util_summary(info):
+    if not isinstance(info, dict) or 'syn' not in info:
+        return ''
+    util = []
+    for key in ('lut', 'reg', 'dsp'):
+        val = info['syn'].get(key, None)
+        if isinstance(val, tuple) and val[1] is not None:
+            util.append("{} {}/{}".format(key, val[0], val[1]))
+        elif isinstance(val, tuple):
+            util.append("{} {}".format(key, val[0]))
+    return ", ".join(util)
+
+
+def format_results(results):
+    """ Create a table (string) from a list of BuildResult """
+    header = ('board', 'status', 'time', 'fmax', 'utilization', 'log')
+    rows = [header]
+    for res in results:
+        fmax = '' if res.fmax in (None, -1) else str(res.fmax)
+        logfn = '' if res.logfn is None else res.logfn
+        rows.append((res.board, res.status, "{:.1f}s".format(res.elapsed),
+                     fmax, _util_summary(res.utilization), logfn))
+
+    widths = [max(len(row[ii]) for row in rows) for ii in range(len(header))]
+    lines = []
+    for row in rows:
+        lines.append("  ".join(col.ljust(ww)
+                               for col, ww in zip(row, widths)).rstrip())
+    lines.insert(1, "  ".join('-'*ww for ww in widths))
+    return "\n".join(lines)
+
+
+def _import_top(spec):
+    """ import a top-level given "module:function" """
+    modname, _, funcname = spec.partition(':')
+    if funcname == '':
+        raise ValueError("top-level must be module:function, not {}".format(
+            spec))
+    module = importlib.import_module(modname)
+    return getattr(module, funcname)
+
+
+def _parse_params(params):
+    pdict = {}
+    for pp in params:
+        key, _, val = pp.partition('=')
+        try:
+            val = literal_eval(val)
+        except (ValueError, SyntaxError):
+            pass
+        pdict[key] = val
+    return pdict
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="build a top-level for multiple boards in parallel")
+    parser.add_argument('--top', required=True,
+                        help="top-level as module:function")
+    parser.add_argument('--boards', nargs='+', default=['*'],
+                        help="board names or glob patterns")
+    parser.add_argument('--flow', default=None, choices=sorted(_flows),
+                        help="toolflow, default is the board's flow")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="number of builds to run at the same time")
+    parser.add_argument('--path', default='output',
+                        help="directory for the board working directories")
+    parser.add_argument('--use', default='verilog',
+                        choices=('verilog', 'vhdl'))
+    parser.add_argument('--param', action='append', default=[],
+                        help="top-level parameter, name=value")
+    args = parser.parse_args(argv)
+
+    # allow modules in the current directory (e.g. examples)
+    if '' not in sys.path:
+        sys.path.insert(0, '')
+    results = build_boards(args.top, args.boards, flow=args.flow,
+                           path=args.path, jobs=args.jobs, use=args.use,
+                           **_parse_params(args.param))
+    for res in results:
+        if res.error is not None:
+            print("{} build error:\n{}".format(res.board, res.error))
+    print(format_results(results))
+    return 0 if all(res.status == 'ok' for res in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
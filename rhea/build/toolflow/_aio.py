@@ -0,0 +1,111 @@
+#
+# Copyright (c) 2015 Christopher Felton
+#
+
+"""
+asyncio execution of the toolflows (Python 3.5+).
+
+The toolflow `run` methods are not changed, they run in an executor
+thread and `ToolFlow._execute_flow` sends each tool command to the
+event loop.  The event loop runs the tools (subprocesses), writes
+their output to the log, and calls the flow's output and progress
+callbacks.  This allows a single process to run many toolflows at
+the same time.  See `ToolFlow.run_async`.
+"""
+
+import functools
+import asyncio
+import subprocess
+
+
+class _AioState(object):
+    def __init__(self, loop, timeout=None):
+        """ The state of an asyncio run of a toolflow """
+        self.loop = loop
+        self.deadline = None if timeout is None else loop.time() + timeout
+        self.current = None
+        self.cancelled = False
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - self.loop.time())
+
+    def cancel(self):
+        self.cancelled = True
+        if self.current is not None:
+            self.current.cancel()
+
+
+async def _stream_output(flow, proc, logfile):
+    while True:
+        line = await proc.stdout.readline()
+        if len(line) == 0:
+            break
+        line = line.decode('iso-8859-1')
+        logfile.write(line)
+        logfile.flush()
+        flow._output_line(line)
+    return await proc.wait()
+
+
+async def execute_flow(flow, cmd, logfn, logmode='w'):
+    """ Run a tool command, the output is streamed to the log """
+    state = flow._aio
+    with open(logfn, logmode) as logfile:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError as err:
+            flow._flow_error(cmd, err, logfn)
+            return logfn
+
+        try:
+            returncode = await asyncio.wait_for(
+                _stream_output(flow, proc, logfile), state.remaining())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # stop the tool, the flow is not complete
+            flow.failed = True
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+
+    if returncode != 0:
+        err = subprocess.CalledProcessError(returncode, cmd)
+        flow._flow_error(cmd, err, logfn)
+
+    return logfn
+
+
+def execute_flow_threadsafe(flow, cmd, logfn, logmode='w'):
+    """ Run a tool command in the event loop from the run thread """
+    state = flow._aio
+    if state.cancelled:
+        raise asyncio.CancelledError()
+    future = asyncio.run_coroutine_threadsafe(
+        execute_flow(flow, cmd, logfn, logmode), state.loop)
+    state.current = future
+    try:
+        return future.result()
+    finally:
+        state.current = None
+
+
+async def run_async(flow, timeout=None, **kwargs):
+    """ Run a toolflow in the event loop, see `ToolFlow.run_async` """
+    loop = asyncio.get_event_loop()
+    flow._aio = _AioState(loop, timeout)
+    future = loop.run_in_executor(None, functools.partial(flow.run, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError as err:
+        # stop the running tool and wait for the run to end
+        flow._aio.cancel()
+        try:
+            await future
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+        raise err
+    finally:
+        flow._aio = None
@@ -0,0 +1,152 @@
+#
+# Copyright (c) 2014-2015 Christopher Felton
+#
+
+"""
+Common report (and log) parsing for the toolflows.
+
+The vendor reports and logs can be very large, the parsers process
+one line at a time and only keep the parsed results.  A parser can
+be fed lines as a log is being written (see `LogTail`), this is used
+to report the progress of a toolflow while the tool is running.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import io
+import os
+from collections import namedtuple
+
+
+class Resource(namedtuple('Resource', ('used', 'available', 'percent'))):
+    """ The usage of a device resource, e.g. LUTs or registers.
+
+    Attributes:
+        used (int): the number of resources used
+        available (int): the number available in the device, None
+            if not reported
+        percent (int): the percent used, None if not reported
+    """
+    __slots__ = ()
+
+
+def to_int(val):
+    """ convert a report number, e.g. "11,440", to an int """
+    val = val.strip().replace(',', '').replace('<', '').strip()
+    return int(float(val)) if len(val) > 0 else 0
+
+
+class Utilization(dict):
+    def __init__(self):
+        """ The resource utilization and timing from a toolflow.
+
+        The utilization is a dictionary with the same layout the
+        report parsers have always returned:
+            info['syn'][<resource>] = Resource(used, available, percent)
+            info['fmax'] = <fmax in MHz, -1 if not found>
+
+        The common resources are named 'lut', 'reg', 'dsp', and 'mem',
+        other resources use the name from the report.
+        """
+        super(Utilization, self).__init__()
+        self['syn'] = {}
+        self['fmax'] = -1
+
+    @property
+    def resources(self):
+        return self['syn']
+
+    @property
+    def fmax(self):
+        """ The maximum frequency (MHz), None if not available """
+        fmax = self['fmax']
+        return None if fmax is None or fmax < 0 else fmax
+
+    @fmax.setter
+    def fmax(self, fmax):
+        self['fmax'] = -1 if fmax is None else float(fmax)
+
+    def add_resource(self, name, used, available=None, percent=None):
+        self['syn'][name] = Resource(used, available, percent)
+
+
+class ReportParser(object):
+    # map the report resource names to the common names
+    resource_names = {}
+
+    def __init__(self):
+        """ Base class for the report parsers.
+
+        The parsers are fed a line at a time (`feed`), derived
+        parsers implement `parse_line`.  The results are in the
+        `info` attribute (Utilization) and the current stage of the
+        toolflow (from the logs) in the `stage` attribute.
+        """
+        self.info = Utilization()
+        self.stage = None
+        self.lineno = 0
+
+    def feed(self, line):
+        """ process the next line of a report or log """
+        self.lineno += 1
+        self.parse_line(line)
+
+    def parse_line(self, line):
+        raise NotImplementedError()
+
+    def parse(self, fn):
+        """ parse a complete report, one line at a time """
+        with io.open(fn, 'r', encoding='iso-8859-1') as report:
+            for line in report:
+                self.feed(line)
+        return self.info
+
+    def add_resource(self, name, used, available=None, percent=None):
+        name = name.strip()
+        name = self.resource_names.get(name, name)
+        self.info.add_resource(name, used, available, percent)
+
+
+class LogTail(object):
+    def __init__(self, fn, start=None, blocksize=1 << 16):
+        """ Read the lines added to a file (log) while it is written.
+
+        Arguments:
+            fn (str): the log file name
+            start (int): file position to start from, default is the
+                current end of the file
+            blocksize (int): maximum number of bytes read per read
+        """
+        self.fn = fn
+        if start is None:
+            start = os.path.getsize(fn) if os.path.isfile(fn) else 0
+        self.pos = start
+        self.blocksize = blocksize
+        self._partial = b''
+
+    def read(self):
+        """ get the complete lines written since the last read """
+        if not os.path.isfile(self.fn):
+            return []
+        lines = []
+        with open(self.fn, 'rb') as f:
+            f.seek(self.pos)
+            while True:
+                blk = f.read(self.blocksize)
+                if len(blk) == 0:
+                    break
+                self.pos += len(blk)
+                blk = self._partial + blk
+                parts = blk.split(b'\n')
+                self._partial = parts.pop()
+                lines += [ln.decode('iso-8859-1') + '\n' for ln in parts]
+        return lines
+
+    def flush(self):
+        """ get the remaining partial line, if any """
+        lines = self.read()
+        if len(self._partial) > 0:
+            lines.append(self._partial.decode('iso-8859-1'))
+            self._partial = b''
+        return lines
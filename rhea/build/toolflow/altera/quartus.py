@@ -17,6 +17,7 @@ from rhea.build.extintf import Clock
 
 from .quartus_parse_reports import get_utilization
 from .quartus_parse_reports import get_fmax
+from .quartus_parse_reports import QuartusReportParser
 
 
 _default_pin_attr = {
@@ -26,6 +27,14 @@ _default_pin_attr = {
 
 class Quartus(ToolFlow):
     _name = "Altera Quartus"
+    _version_cmds = (('quartus_sh', '--version'),)
+    log_parser = QuartusReportParser
+    _stages = (
+        ('map', ('hdl', 'project',)),
+        ('fit', ('constraints',)),
+        ('asm', ()),
+        ('sta', ()),
+    )
 
     def __init__(self, brd, top=None, path='altera/'):
         """
@@ -33,6 +42,7 @@ class Quartus(ToolFlow):
         create an instance of the Quartus toolchain.
         """
         super(Quartus, self).__init__(brd=brd, top=top, path=path)
+        self.qsf_file = ''
         self.sdc_file = ''
         self._core_file_list = set()
         self._default_project_file = None
@@ -40,6 +50,17 @@ class Quartus(ToolFlow):
     def add_cores(self, filename):
         self._core_file_list.update(set(filename))
 
+    @property
+    def bitfile(self):
+        return os.path.join(self.path, self.name+'.sof')
+
+    def _constraint_files(self):
+        return [self.qsf_file, self.sdc_file]
+
+    def _can_resume(self, stage):
+        # the later stages use the existing project database
+        return os.path.isdir(os.path.join(self.path, 'db'))
+
     def create_project(self, use='verilog', **pattr):
         """ Generate the Quartus .qsf project file
         """
@@ -50,9 +71,9 @@ class Quartus(ToolFlow):
         # File list
         type_file = {'verilog': 'VERILOG_FILE',
                      'vhdl': 'VHDL_FILE'}
-        for f in self._core_file_list:
+        for f in sorted(self._core_file_list):
             qsf += "set_global_assignment -name QIP_FILE %s\n" % (f,)
-        for f in self._hdl_file_list:
+        for f in sorted(self._hdl_file_list):
             qsf += "set_global_assignment -name %s %s\n" % (type_file[use], f,)
         qsf += "set_global_assignment -name FAMILY \"%s\"\n" % (self.brd.family,)
         qsf += "set_global_assignment -name DEVICE %s\n" % (self.brd.device,)
@@ -120,7 +141,15 @@ class Quartus(ToolFlow):
         # print(sdc)
         return
 
-    def create_flow_script(self):
+    def create_flow_script(self, stages=None):
+        """ Create the Quartus flow script
+
+        Arguments:
+            stages: the stages (modules) to run, by default the
+                complete flow (compile) is run.
+        """
+        all_stages = [st for st, _ in self._stages]
+        stages = all_stages if stages is None else stages
         fn = os.path.join(self.path, self.name+'.tcl')
         tcl_script = fn
 
@@ -140,7 +169,11 @@ class Quartus(ToolFlow):
         tcl += "# Extra pin assignments\n"
         tcl += "#set_location_assignment -to clk PIN_BLA\n"
         tcl += "# You can define multiple clocks with a fixed relation, (not here)\n"
-        tcl += "execute_flow -compile\n"
+        if list(stages) == all_stages:
+            tcl += "execute_flow -compile\n"
+        else:
+            for stage in stages:
+                tcl += "execute_module -tool %s\n" % (stage,)
         #tcl += "execute_flow -early_timing_estimate\n"
         tcl += "project_close\n"
 
@@ -150,27 +183,55 @@ class Quartus(ToolFlow):
 
         return tcl_script
 
-    def run(self, use='verilog', name=None):
-        """ Execute the tool-flow """
-
+    def _prepare(self, use='verilog', **options):
         self.pathexist(self.path)
 
         # convert the top-level
         cfiles = convert(self.brd, name=self.name,
-                         use=use, path=self.path)
+                         use=use, path=self.path,
+                         cache=self.convert_cache)
         self.add_files(cfiles)
 
-        # create the ISE files to run the toolflow
+        # create the Quartus files to run the toolflow
         self.create_project(use=use)
         self.create_constraints()
-        tcl_name = self.create_flow_script()
+        return self.get_stage_inputs(**options)
+
+    def _artifact_files(self):
+        return [self.bitfile, os.path.join(self.path, "build_quartus.log")] + \
+               [os.path.join(self.path, self.name+ext)
+                for ext in ('.fit.rpt', '.sta.rpt',)]
+
+    def run(self, use='verilog', name=None):
+        """ Execute the tool-flow """
+
+        inputs = self._prepare(use=use)
+        stages = self.get_stages(inputs)
+        logfn = os.path.join(self.path, "build_quartus.log")
+        if len(stages) == 0:
+            print("   %s is up to date" % (self.bitfile,))
+            self.logfn = logfn
+            return self.logfn
+        if self.get_artifacts(inputs):
+            self.logfn = logfn
+            return self.logfn
+
+        tcl_name = self.create_flow_script(stages)
 
         cmd = ['quartus_sh', '-t', tcl_name, '-project', self.name]
         self.logfn = self._execute_flow(cmd, "build_quartus.log")
+        if not self.failed:
+            self.save_stages(inputs)
+            self.put_artifacts(inputs)
 
         return self.logfn
 
     def program(self):
+        # program from the artifact cache if not built
+        if not self.restore_artifacts():
+            print("No bitstream {}, run the toolflow".format(self.bitfile))
+            return
+
         txt = subprocess.check_output(('quartus_pgm', '-l',),
                                       stderr=subprocess.STDOUT).decode()
         if txt.find('No JTAG hardware') != -1:
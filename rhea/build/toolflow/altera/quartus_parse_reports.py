@@ -5,141 +5,96 @@
 from __future__ import division
 from __future__ import print_function
 
-from myhdl import enum
-import codecs
+import re
+
+from .._report_parser import ReportParser, to_int
+
+
+class QuartusReportParser(ReportParser):
+    """ Parse the Quartus logs and the fitter and timing reports
+
+    The fitter report (.fit.rpt) has a resource usage table:
+        ; Fitter Resource Usage Summary ;
+        ...
+        ; Total logic elements ; 1,234 / 22,320 ( 6 % ) ;
+        ; Total registers      ; 52                     ;
+    and the timing report (.sta.rpt) an fmax table for each model:
+        ; Slow 1200mV 85C Model Fmax Summary ;
+        ...
+        ; 250.5 MHz ; 250.0 MHz ; clock ;  ;
+    the minimum fmax of all the models is used.
+    """
+    resource_names = {
+        'Total logic elements': 'lut',
+        'Logic utilization (in ALMs)': 'lut',
+        'Total registers': 'reg',
+        'Embedded Multiplier 9-bit elements': 'dsp',
+        'Total DSP Blocks': 'dsp',
+        'Total memory bits': 'mem',
+        'Total block memory bits': 'mem',
+    }
+
+    _re_outof = re.compile(
+        r'^;\s*([^;]+?)\s*;\s*([\d,]+)\s*/\s*([\d,]+)\s*\(\s*<?\s*(\d+)\s*%')
+    _re_count = re.compile(r'^;\s*([^;]+?)\s*;\s*([\d,]+)\s*;')
+    _re_fmax = re.compile(r'^;\s*([\d.]+)\s*MHz\s*;')
+    _re_stage = re.compile(r'Running Quartus (?:II |Prime )?(?:64-Bit )?(.+)$')
+    # section titles, the table of contents has a number column first
+    _re_usage = re.compile(r'^;\s*Fitter Resource Usage Summary\s*;')
+    _re_fmax_title = re.compile(r'^;\s*[^;]*Fmax Summary\s*;')
+
+    def __init__(self):
+        super(QuartusReportParser, self).__init__()
+        self._section = None
+        self._fmax = []
+
+    def parse_line(self, line):
+        if self._re_usage.search(line) is not None:
+            self._section = 'usage'
+        elif self._re_fmax_title.search(line) is not None:
+            self._section = 'fmax'
+        elif len(line.strip()) == 0:
+            self._section = None
+
+        elif self._section == 'usage':
+            mm = self._re_outof.search(line)
+            if mm is not None:
+                name, x, y, p = mm.groups()
+                self.add_resource(name, to_int(x), to_int(y), to_int(p))
+                return
+            mm = self._re_count.search(line)
+            if mm is not None:
+                name, x = mm.groups()
+                self.add_resource(name, to_int(x))
+
+        elif self._section == 'fmax':
+            mm = self._re_fmax.search(line)
+            if mm is not None:
+                self._fmax.append(float(mm.group(1)))
+                self.info.fmax = min(self._fmax)
+
+        else:
+            mm = self._re_stage.search(line)
+            if mm is not None:
+                self.stage = mm.group(1).strip()
+
+    def add_resource(self, name, used, available=None, percent=None):
+        name = self.resource_names.get(name.strip(), name.strip())
+        # the first entry is the summary, some resources are broken
+        # down into more detail later in the table.
+        if name not in self.info.resources:
+            self.info.add_resource(name, used, available, percent)
 
-#from .._report_parser import ReportParser
 
 def get_fmax(fn, info):
-    log = open(fn, 'r')
-    fmax = []
-    States = enum('search', 'fmax')
-    state = States.search
-    glncnt,lncnt = 0,0
-
-    for ln in log:
-        if state == States.search:
-            if glncnt > 100 and ln.find('Fmax Summary') != -1:
-                lncnt = 1
-                state = States.fmax
-
-        elif state == States.fmax:
-            if lncnt == 5:
-                fstr = ln.split(';')
-                if len(fstr) < 2:
-                    state = States.search
-                    continue
-                fstr = fstr[1].split()
-                fstr = fstr[0].strip()
-                fmax.append(fstr)
-
-            if lncnt >= 6:
-                state = States.search
-
-        lncnt += 1
-        glncnt += 1
-
-    if len(fmax) > 0:
-        info['fmax'] = min(map(float, fmax))
-    else:
-        info['fmax'] = -1
-    
+    parser = QuartusReportParser()
+    parser.parse(fn)
+    info['fmax'] = parser.info['fmax']
     return info
-    
 
 
 def get_utilization(fn=None):
-    """ parse teh device resource utilization from the logs
-
-    @todo : the following is fairly ugly and not the most 
-       reliable.  There are xml files create (xrp) that would
-       be a better source for the utilization - once the xlm
-       package is understood these reports can be used instead
-       of the log.    
+    """ parse the device resource utilization from the fitter report
     """
-
-    log = codecs.open(fn, 'r','iso-8859-1')
-    info = {}
-    info['syn'] = {}
-    fmax = []
-    States = enum('search', 'le_util', 'io_util', 'ip_util')
-    state = States.search
-    glncnt,lncnt = 0,0
-
-    #  5 "Total logic elements"
-    # 20 "Total registers"
-    # 34 "Embedded Multiplier"
-    # these change in differen revisions
-    usage_lines = [5, 20, 34]
-
-    for ln in log:
-        
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        if state == States.search:
-            if glncnt == 2:
-                version = ln.split('Version ')[1]
-                splitlist = version.split(' ')
-                version = splitlist[0]
-
-            if glncnt > 60 and glncnt < 80 and ln.find('Family') != -1:
-                if ln.find('Cyclone V') != -1:
-                    usage_lines = [5, 34, 79]
-            if glncnt > 64 and ln.find('Fitter Resource Usage Summary') != -1:
-                state = States.le_util
-                lncnt = 1
-
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        elif state == States.le_util:
-            ln = ln.strip()
-            if lncnt in usage_lines:
-                sp1 = ln.split(';')
-                if len(sp1) != 4 and len(sp1) != 5:
-                    state = States.search
-                    continue
-                    
-                sp2 = sp1[2]
-                sp2 = sp2.replace('<', '')
-                sp2 = sp2.replace('(', '')
-                sp2 = sp2.replace(')', '')
-                sp2 = sp2.split()
-                if len(sp2) != 5 and len(sp2) != 3:
-                    state = States.search
-                    continue  # jump to the next line
-
-                usage = ln.split(';')
-                if len(usage) == 4:    
-                    pd,nm,outof,ju = usage
-                elif len(usage) == 5:
-                    pd1,nm,outof,per,pd2 = usage
-                outof = outof.replace('<', '')
-                outof = outof.replace('(', '')
-                outof = outof.replace(')', '')
-                outof = outof.split()
-                if len(outof) == 5:
-                    x,slash,y,p,ps = outof
-                elif len(outof) == 3:
-                    x,slash,y = outof
-                    per = per.strip().split(' ')
-                    p = per[-2]
-                    ps = per[-1]
-                x = x.replace(',', '')
-                y = y.replace(',', '')
-                
-            if lncnt == usage_lines[0]:
-                info['syn']['lut'] = tuple(map(int, (x,y,p,)))
-            elif lncnt == usage_lines[1]:
-                info['syn']['reg'] = tuple(map(int, (x,y,p,)))
-            elif lncnt == usage_lines[2]:
-                info['syn']['dsp'] = tuple(map(int, (x,y,p,)))
-            # @todo: memory bits
-            elif lncnt >= 100:
-                state = States.search
-
-        # keep track which line, reset for sections
-        lncnt += 1
-        glncnt += 1
-
-        # end of parsing state-machine
-        
-    
-    return info
+    parser = QuartusReportParser()
+    return parser.parse(fn)
@@ -0,0 +1,337 @@
+#
+# Copyright (c) 2014-2015 Christopher Felton
+#
+
+"""
+Conversion and artifact caches for the toolflows.
+
+Converting a top-level design is one of the slowest parts of a
+small build.  The converted files only depend on the design sources,
+the ports (port map) and parameters passed to the top-level, the
+HDL target, and the myhdl version.  A hash of these is used as the
+key to a directory with the previously converted files.
+
+The bitstreams (and reports) from the vendor tools are cached the
+same way (`ArtifactCache`), the key is a hash of the toolflow inputs
+(converted HDL, constraints, device) and the tool version.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import re
+import sys
+import shutil
+import hashlib
+import inspect
+import sysconfig
+import tempfile
+import json
+
+import myhdl
+from myhdl import SignalType
+
+_cache_env = 'RHEA_CACHE_DIR'
+
+
+def get_cache_dir(subdir=None):
+    """ Get the rhea build cache directory.
+
+    The cache directory is ``$RHEA_CACHE_DIR`` if set, otherwise
+    ``~/.cache/rhea``.
+
+    Arguments:
+        subdir (str): name of a directory in the cache directory
+    """
+    cdir = os.environ.get(_cache_env, None)
+    if cdir is None:
+        cdir = os.path.join(os.path.expanduser('~'), '.cache', 'rhea')
+    if subdir is not None:
+        cdir = os.path.join(cdir, subdir)
+    return cdir
+
+
+def hash_file(filename, hsh=None, blocksize=1 << 16):
+    """ Add the contents of a file to a hash """
+    hsh = hashlib.sha1() if hsh is None else hsh
+    with open(filename, 'rb') as f:
+        for blk in iter(lambda: f.read(blocksize), b''):
+            hsh.update(blk)
+    return hsh
+
+
+# the file path and date myhdl adds to the header of the converted files
+_hdl_header = re.compile(br'^(//|--) (File|Date): .*$', re.MULTILINE)
+
+
+def hash_hdl_file(filename, hsh=None):
+    """ Add the contents of an HDL file to a hash, the file path and
+    the conversion date in the header of a converted file are ignored
+    so the same conversion has the same hash.
+    """
+    hsh = hashlib.sha1() if hsh is None else hsh
+    with open(filename, 'rb') as f:
+        hsh.update(_hdl_header.sub(b'', f.read(), count=2))
+    return hsh
+
+
+def _library_paths():
+    paths = set()
+    for key in ('stdlib', 'platstdlib', 'purelib', 'platlib'):
+        pth = sysconfig.get_paths().get(key, None)
+        if pth is not None:
+            paths.add(os.path.realpath(pth))
+    return tuple(paths)
+
+
+def _source_file(module):
+    fn = getattr(module, '__file__', None)
+    if fn is None:
+        return None
+    if fn.endswith(('.pyc', '.pyo')):
+        fn = fn[:-1]
+    if not fn.endswith('.py') or not os.path.isfile(fn):
+        return None
+    return os.path.realpath(fn)
+
+
+def source_closure(func):
+    """ Get the source files a top-level function depends on.
+
+    Starting at the module the function is defined in, follow the
+    modules referenced by each module's globals (imported modules,
+    functions, and classes).  Installed libraries (stdlib and
+    site-packages) are not followed, except for rhea itself.  The
+    myhdl version is part of the conversion key instead.
+
+    Returns:
+        a sorted list of source file names
+    """
+    libpaths = _library_paths()
+
+    def follow(module):
+        name = module.__name__
+        if name == 'rhea' or name.startswith('rhea.'):
+            return True
+        if name == 'myhdl' or name.startswith('myhdl.'):
+            return False
+        fn = _source_file(module)
+        if fn is None:
+            return False
+        return not fn.startswith(libpaths)
+
+    start = inspect.getmodule(func)
+    if start is None:
+        return []
+
+    visited, files, todo = set(), set(), [start]
+    while len(todo) > 0:
+        mod = todo.pop()
+        if mod.__name__ in visited or not follow(mod):
+            continue
+        visited.add(mod.__name__)
+        fn = _source_file(mod)
+        if fn is not None:
+            files.add(fn)
+
+        for obj in list(vars(mod).values()):
+            if inspect.ismodule(obj):
+                todo.append(obj)
+            else:
+                # myhdl blocks wrap the function in an object
+                obj = getattr(obj, 'func', obj)
+                mname = getattr(obj, '__module__', None)
+                if (inspect.isfunction(obj) or inspect.isclass(obj)) and \
+                   mname in sys.modules:
+                    todo.append(sys.modules[mname])
+
+    return sorted(files)
+
+
+def _portmap_repr(portmap):
+    """ Create a stable string for the ports and parameters """
+    items = []
+    for name in sorted(portmap.keys()):
+        val = portmap[name]
+        if isinstance(val, SignalType):
+            sval = val.val
+            rr = "Signal({}, {}".format(repr(sval), len(val))
+            # clocks and resets have additional attributes that
+            # are used in the converted HDL
+            for attr in ('frequency', 'active', 'async'):
+                if hasattr(val, attr):
+                    rr += ", {}={}".format(attr, getattr(val, attr))
+            rr += ")"
+        else:
+            rr = repr(val)
+        items.append("{}={}".format(name, rr))
+    return ";".join(items)
+
+
+def conversion_key(brd, portmap, name, use):
+    """ Hash of everything the converted files depend on.
+
+    Arguments:
+        brd (FPGA): board definition with the top-level set
+        portmap (dict): the result of ``brd.get_portmap()``
+        name (str): name of the converted top-level
+        use (str): 'verilog' or 'vhdl'
+    """
+    hsh = hashlib.sha1()
+    for fn in source_closure(brd.top.func):
+        hsh.update(fn.encode('utf-8'))
+        hash_file(fn, hsh)
+
+    top_params = brd.top_params if brd.top_params is not None else {}
+    for txt in (brd.top.func.__name__, _portmap_repr(portmap),
+                _portmap_repr(top_params), str(name), use.lower(),
+                myhdl.__version__):
+        hsh.update(txt.encode('utf-8'))
+
+    return hsh.hexdigest()
+
+
+class ConvertCache(object):
+    def __init__(self, cache_dir=None):
+        """ A directory of previously converted top-level files.
+
+        Each entry is a directory named by the conversion key
+        (see `conversion_key`) that contains the converted files.
+
+        Arguments:
+            cache_dir (str): location of the cache, defaults to
+                the ``convert`` directory in `get_cache_dir`.
+        """
+        if cache_dir is None:
+            cache_dir = get_cache_dir('convert')
+        self.cache_dir = cache_dir
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key, filelist, path):
+        """ Copy the cached files to *path* if they exist.
+
+        Returns:
+            True if all the files in *filelist* were in the cache
+        """
+        entry = self._entry(key)
+        if not all(os.path.isfile(os.path.join(entry, fn))
+                   for fn in filelist):
+            return False
+
+        for fn in filelist:
+            shutil.copy2(os.path.join(entry, fn), os.path.join(path, fn))
+        return True
+
+    def put(self, key, filelist, path):
+        """ Add the converted files in *path* to the cache """
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+        if not all(os.path.isfile(os.path.join(path, fn)) for fn in filelist):
+            return
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        # copy to a temporary directory and rename so a partial
+        # entry is never visible
+        tmpdir = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            for fn in filelist:
+                shutil.copy2(os.path.join(path, fn), os.path.join(tmpdir, fn))
+            os.rename(tmpdir, entry)
+        except (IOError, OSError):
+            # another build added the same entry
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def clear(self):
+        """ Remove all the cached conversions """
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+
+def artifact_key(tool, inputs, version=''):
+    """ Hash of everything the toolflow outputs depend on.
+
+    Arguments:
+        tool (str): the toolflow name
+        inputs (dict): the toolflow stage inputs, see
+            `ToolFlow.get_stage_inputs`
+        version (str): the tool version
+    """
+    txt = json.dumps([tool, inputs, version], sort_keys=True)
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache(ConvertCache):
+    def __init__(self, cache_dir=None, max_size=1 << 30):
+        """ A size-bounded directory of previous toolflow outputs.
+
+        Each entry is a directory named by the artifact key (see
+        `artifact_key`) with the bitstream and reports.  When the
+        cache is larger than *max_size* the least recently used
+        entries are removed.
+
+        Arguments:
+            cache_dir (str): location of the cache, defaults to
+                the ``artifacts`` directory in `get_cache_dir`.
+            max_size (int): maximum size of the cache in bytes
+        """
+        if cache_dir is None:
+            cache_dir = get_cache_dir('artifacts')
+        super(ArtifactCache, self).__init__(cache_dir)
+        self.max_size = max_size
+
+    def get(self, key, filelist, path):
+        """ Copy the cached files to *path* if they exist.
+
+        The first file in *filelist* (the bitstream) is required, the
+        other files (logs, reports) are copied if they were cached.
+        """
+        entry = self._entry(key)
+        filelist = [filelist[0]] + [fn for fn in filelist[1:] if
+                                    os.path.isfile(os.path.join(entry, fn))]
+        hit = super(ArtifactCache, self).get(key, filelist, path)
+        if hit:
+            # the entry modification time is the last use (LRU)
+            os.utime(entry, None)
+        return hit
+
+    def put(self, key, filelist, path):
+        """ Add the files in *path* to the cache and evict the least
+        recently used entries if the cache is too large.
+        """
+        filelist = [filelist[0]] + [fn for fn in filelist[1:] if
+                                    os.path.isfile(os.path.join(path, fn))]
+        super(ArtifactCache, self).put(key, filelist, path)
+        self.evict(keep=key)
+
+    def entries(self):
+        """ Get the (last use, size, key) of the entries, oldest first """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry(key)
+            if not os.path.isdir(entry) or key.startswith('tmp'):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, fn))
+                       for fn in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, key))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        """ Remove the least recently used entries until the cache
+        is smaller than `max_size`, the *keep* entry is not removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
@@ -3,18 +3,28 @@
 #
 
 import os
-import time
-import shutil
+import threading
 
 import myhdl
-from myhdl._block import _Block as Block
-from myhdl import toVerilog
-from myhdl import toVHDL
 
 from .. import FPGA
+from .cache import ConvertCache
+from .cache import conversion_key
 
+# the myhdl conversion is not thread-safe (module state), toolflows
+# run with `run_async` convert in executor threads.
+_convert_lock = threading.Lock()
 
-def convert(brd, top=None, name=None, use='verilog', path='.'):
+
+def _pck_filename():
+    ver = myhdl.__version__
+    # remove special characters from the version
+    for sp in ('.', '-', 'dev'):
+        ver = ver.replace(sp,'')
+    return 'pck_myhdl_%s.vhd'%(ver)
+
+
+def convert(brd, top=None, name=None, use='verilog', path='.', cache=False):
     """ Wrapper around the myhdl conversion functions
     This function will use the _fpga objects get_portmap function
     to map the board definition to the 
@@ -25,60 +35,54 @@ def convert(brd, top=None, name=None, use='verilog', path='.'):
       name : name to use for the generated (converted) file
       use  : User 'verilog' or 'vhdl' for conversion
       path : path of the output files
+      cache: reuse previously converted files if the design sources,
+             ports, and parameters have not changed (True uses the
+             default cache directory, see `get_cache_dir`).  A
+             ConvertCache can be passed to use a specific directory.
     """
     assert isinstance(brd, FPGA)
 
     name = brd.top_name if name is None else name
     pp = brd.get_portmap(top=top)
-    inst = brd.top(**pp)
+    pckfn = _pck_filename()
 
-    # convert with the ports and parameters        
     if use.lower() == 'verilog':
-        if name is not None:
-            myhdl.toVerilog.name = name
-        myhdl.toVerilog.no_testbench = True
-        # myhdl.toVerilog(brd.top, **pp)
-        inst.convert(hdl='Verilog', name=name, testbench=False)
-        brd.name = name
-        brd.vfn = "%s.v"%(name)
+        filelist = ("%s.v"%(name),)
     elif use.lower() == 'vhdl':
-        if name is not None:
-            myhdl.toVHDL.name = name
-        # myhdl.toVHDL(brd.top, **pp)
-        inst.convert(hdl='VHDL', name=name)
-        brd.name = name
-        brd.vfn = "%s.vhd"%(name)
+        filelist = ("%s.vhd"%(name), pckfn,)
     else:
         raise ValueError("Incorrect conversion target %s"%(use))
 
-    # make sure the working directory exists
-    #assert brd.pathexist(brd.path)
-    time.sleep(2)
+    if not os.path.isdir(path):
+        os.makedirs(path)
 
-    # copy files etc to the working directory
-    tbfn = 'tb_' + brd.vfn
-    ver = myhdl.__version__
-    # remove special characters from the version
-    for sp in ('.', '-', 'dev'):
-        ver = ver.replace(sp,'')
-    pckfn = 'pck_myhdl_%s.vhd'%(ver)
-    for src in (brd.vfn,tbfn,pckfn):
-        dst = os.path.join(path, src)
-        #print('   checking %s'%(dst))
-        if os.path.isfile(dst):
-            print('   removing %s'%(dst))
-            os.remove(dst)
-        if os.path.isfile(src):
-            print('   moving %s --> %s'%(src, path))
-            try:
-                shutil.move(src, path)
-            except Exception as err:
-                print("skipping %s because %s" % (src, err,))
+    # the design has been converted before, use the previous files
+    if cache:
+        cache = cache if isinstance(cache, ConvertCache) else ConvertCache()
+        key = conversion_key(brd, pp, name, use)
+        if cache.get(key, filelist, path):
+            print('   using cached conversion %s'%(key,))
+            brd.name = name
+            brd.vfn = filelist[0]
+            return filelist
 
-    if use.lower() == 'verilog':
-        filelist = (brd.vfn,)
-    elif use.lower() == 'vhdl':
-        filelist = (brd.vfn, pckfn,)
+    # convert with the ports and parameters, the converted files are
+    # written directly to the output path (not the current working
+    # directory) and the name is passed to the conversion instead of
+    # setting the global myhdl.toVerilog.name, this allows multiple
+    # builds to run at the same time (separate processes).
+    with _convert_lock:
+        inst = brd.top(**pp)
+        if use.lower() == 'verilog':
+            inst.convert(hdl='Verilog', name=name, directory=path,
+                         testbench=False)
+        elif use.lower() == 'vhdl':
+            inst.convert(hdl='VHDL', name=name, directory=path)
+    brd.name = name
+    brd.vfn = filelist[0]
+
+    if cache:
+        cache.put(key, filelist, path)
 
     return filelist
 
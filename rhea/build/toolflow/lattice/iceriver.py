@@ -14,6 +14,12 @@ from rhea.build.extintf import Clock
 
 class IceRiver(Yosys):
     _name = "Open-source Lattice iCE40"
+    _version_cmds = (('yosys', '-V'), ('arachne-pnr', '--version'),)
+    _stages = (
+        ('synth', ('hdl',)),
+        ('pnr', ('constraints', 'project',)),
+        ('pack', ()),
+    )
 
     def __init__(self, brd, top=None, path='iceriver/'):
         """
@@ -34,6 +40,17 @@ class IceRiver(Yosys):
         self.bin_file = os.path.join(self.path, self.name+'.bin')
         self.shell_script = None
 
+    @property
+    def bitfile(self):
+        return self.bin_file
+
+    def _constraint_files(self):
+        return [self.pcf_file]
+
+    def _can_resume(self, stage):
+        prev = {'pnr': self.blif_file, 'pack': self.txt_file}.get(stage, None)
+        return prev is not None and os.path.isfile(prev)
+
     def create_constraints(self):
         pcf = " \n"
         pcf += "# pin definitions \n"
@@ -56,8 +73,12 @@ class IceRiver(Yosys):
             f.write(pcf)
         return
 
-    def create_flow_script(self):
-        """ Simple shell script to execute the flow """
+    def create_flow_script(self, stages=None):
+        """ Simple shell script to execute the flow
+
+        Arguments:
+            stages: the stages to run, a command per stage
+        """
         sh = ""
         #sh += "yosys -s {} \n".format(self.syn_file)
         # the following only works for signle files
@@ -74,32 +95,64 @@ class IceRiver(Yosys):
         sh += "icepack {} {} \n".format(self.txt_file, self.bin_file)
 
         self.shell_script = sh.strip().split('\n')
+        if stages is not None:
+            self.shell_script = [cmd for (stage, _), cmd in
+                                 zip(self._stages, self.shell_script)
+                                 if stage in stages]
         return
 
-    def run(self, use='verilog', name=None):
+    def _prepare(self, use='verilog', **options):
         self.pathexist(self.path)
         # converted files
         cfiles = convert(self.brd, name=self.name,
-                         use=use, path=self.path)
+                         use=use, path=self.path,
+                         cache=self.convert_cache)
         self.add_files(cfiles)
         # create_project generates the yosys synth script, this
         # isn't really used (generic yosys script)
         self.create_project(use=use, write_blif=True, ice=True)
         self.create_constraints()
-        self.create_flow_script()
+        return self.get_stage_inputs(**options)
 
-        # delete previous log
+    def _artifact_files(self):
+        return [self.bitfile, os.path.join(self.path, "build_iceriver.log")]
+
+    def run(self, use='verilog', name=None):
+        inputs = self._prepare(use=use)
+        stages = self.get_stages(inputs)
         logfn = "build_iceriver.log"
+        if len(stages) == 0:
+            print("   {} is up to date".format(self.bitfile))
+            self.logfn = os.path.join(self.path, logfn)
+            return self.logfn
+        if self.get_artifacts(inputs):
+            self.logfn = os.path.join(self.path, logfn)
+            return self.logfn
+
+        self.create_flow_script(stages)
+
+        # delete previous log
         if os.path.isfile(os.path.join(self.path, logfn)):
             os.remove(os.path.join(self.path, logfn))
             
         for cmd in self.shell_script:
             cmd = shlex.split(cmd)            
             self.logfn = self._execute_flow(cmd, logfn, logmode='a')
+            if self.failed:
+                break
+
+        if not self.failed:
+            self.save_stages(inputs)
+            self.put_artifacts(inputs)
 
         return self.logfn
 
     def program(self):
+        # program from the artifact cache if not built
+        if not self.restore_artifacts():
+            print("No bitstream {}, run the toolflow".format(self.bitfile))
+            return
+
         bitfile = os.path.join(self.path, self.bin_file)
         for cmd in self.brd.program_device_cli:
             ucmd = cmd.substitute(dict(bitfile=bitfile))
@@ -6,9 +6,17 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import re
+import time
+import json
+import hashlib
 from string import Template
 import subprocess
 
+from .cache import hash_hdl_file
+from .cache import ArtifactCache, artifact_key
+from ._report_parser import LogTail
+
 _default_error_msg = Template("""
 ERROR: The $tool flow failed!  
     Error Code: $errcode
@@ -26,6 +34,26 @@ ERROR: The $tool flow failed!
 class ToolFlow(object): 
     _name = "not specified (bug in code)"
 
+    # The stages of the toolflow, in the order they run, and the
+    # inputs each stage depends on.  The inputs are:
+    #   hdl: the HDL files
+    #   constraints: the constraints files (pins, timing)
+    #   project: the device and project settings
+    #   options: options passed to run
+    # A stage is run if its inputs changed or a previous stage ran.
+    _stages = ()
+
+    # The commands that print the tool version, the version is part
+    # of the artifact cache key.  If the command prints more than the
+    # version (e.g. a help text) the first line that matches the
+    # version pattern is used.
+    _version_cmds = ()
+    _version_pattern = None
+
+    # The ReportParser (class) used to follow the log while the tool
+    # is running, None if the toolflow doesn't report progress.
+    log_parser = None
+
     def __init__(self, brd, top=None, name=None, path='.'):
         """
         Provided a myhdl top-level module and board definition
@@ -56,6 +84,37 @@ class ToolFlow(object):
         self.name = brd.top_name if name is None else name
         self._hdl_file_list = set()
         self.logfn = None
+        # set when a step in the flow fails
+        self.failed = False
+
+        # reuse the converted top-level if nothing has changed, set
+        # to True to use the default cache directory (~/.cache/rhea or
+        # $RHEA_CACHE_DIR) or to a ConvertCache instance to use a
+        # specific cache directory.
+        self.convert_cache = False
+
+        # only run the stages of the toolflow whose inputs changed
+        # since the last successful run, set to False to always run
+        # the complete toolflow.
+        self.incremental = True
+
+        # reuse the bitstream (and reports) from a previous build with
+        # the same inputs and tool version, set to True to use the
+        # default artifact cache or to an ArtifactCache instance.
+        self.artifact_cache = False
+        self._tool_version = None
+
+        # functions called with (flow, event, value) when the stage
+        # or fmax in the log changes while the tool is running, the
+        # events are 'stage' and 'fmax'.
+        self.progress_callbacks = []
+        self.poll_interval = .2
+        self.log_info = None
+
+        # functions called with (flow, line) for each line of tool
+        # output when the flow is run with `run_async`.
+        self.output_callbacks = []
+        self._aio = None
         
     @property
     def path(self):
@@ -116,27 +175,283 @@ class ToolFlow(object):
         """
         raise NotImplementedError()
 
+    def run_async(self, timeout=None, **kwargs):
+        """ Execute the tool-flow in an asyncio event loop (Python 3.5+)
+
+        Returns a coroutine that runs the toolflow (`run`), the tool
+        output is streamed to the log and the `output_callbacks` and
+        `progress_callbacks` are called from the event loop.  Many
+        toolflows can be run at the same time, e.g.:
+
+            >> loop.run_until_complete(asyncio.gather(
+            >>     flow1.run_async(), flow2.run_async()))
+
+        Arguments:
+          timeout : the maximum time (seconds) for the complete flow,
+            when it expires the tool is stopped and asyncio.TimeoutError
+            is raised.
+          kwargs  : the `run` arguments
+
+        If the coroutine is cancelled the running tool is stopped.
+        """
+        from ._aio import run_async
+        return run_async(self, timeout=timeout, **kwargs)
+
+    def _prepare(self, use='verilog', **options):
+        """ Convert the top-level and create the toolflow files
+        (constraints, project) the stages depend on.
+
+        Returns:
+          the stage inputs, see `get_stage_inputs`
+        """
+        raise NotImplementedError()
+
     def _execute_flow(self, cmd, logfn=None, logmode='w'):
+        assert logfn is not None, "toolflow failed to set logfn"
+        assert len(cmd) > 0, "invalid toolflow command {}".format(cmd)
         logfn = os.path.join(self.path, logfn)
+        if self._aio is not None:
+            from ._aio import execute_flow_threadsafe
+            return execute_flow_threadsafe(self, cmd, logfn, logmode)
+
         try:
-            assert logfn is not None, "toolflow failed to set logfn"
-            assert len(cmd) > 0, "invalid toolflow command {}".format(cmd)
             with open(logfn, logmode) as logfile:
-                subprocess.check_call(
+                tail = LogTail(logfn)
+                proc = subprocess.Popen(
                     cmd, stderr=subprocess.STDOUT, stdout=logfile)
+                # follow the log while the tool is running
+                while proc.poll() is None:
+                    time.sleep(self.poll_interval)
+                    self._follow_log(tail.read())
+                self._follow_log(tail.flush())
+                if proc.returncode != 0:
+                    raise subprocess.CalledProcessError(proc.returncode, cmd)
         except (subprocess.CalledProcessError, OSError) as err:
-            errmsg = _default_error_msg.substitute(
-                dict(tool=self._name, cmd=" ".join(cmd),
-                     errcode=str(err), logfile=logfn))
-            print(errmsg)
+            self._flow_error(cmd, err, logfn)
 
         return logfn
 
+    def _flow_error(self, cmd, err, logfn):
+        self.failed = True
+        errmsg = _default_error_msg.substitute(
+            dict(tool=self._name, cmd=" ".join(cmd),
+                 errcode=str(err), logfile=logfn))
+        print(errmsg)
+
+    def _output_line(self, line):
+        """ A line of tool output (`run_async`) """
+        for callback in self.output_callbacks:
+            callback(self, line)
+        self._follow_log([line])
+
+    def _follow_log(self, lines):
+        """ Feed new log lines to the log parser and report progress
+        """
+        if self.log_parser is None or len(lines) == 0:
+            return
+        if self.log_info is None:
+            self._parser = self.log_parser()
+            self.log_info = self._parser.info
+        parser = self._parser
+        stage, fmax = parser.stage, parser.info.fmax
+        for line in lines:
+            parser.feed(line)
+        if parser.stage != stage:
+            self.progress('stage', parser.stage)
+        if parser.info.fmax != fmax:
+            self.progress('fmax', parser.info.fmax)
+
+    def progress(self, event, value):
+        """ Report the progress of a running tool """
+        if event == 'fmax':
+            print("   {}: fmax {:.3f} MHz".format(self._name, value))
+        else:
+            print("   {}: {} {}".format(self._name, event, value))
+        for callback in self.progress_callbacks:
+            callback(self, event, value)
+
     def program(self):
         """ Program the board with the bit-stream
         """
         raise NotImplementedError()
 
+    @property
+    def bitfile(self):
+        """ The bitstream file the toolflow generates """
+        return None
+
+    @property
+    def stage_manifest(self):
+        return os.path.join(self.path, self.name+'_stages.json')
+
+    def _constraint_files(self):
+        """ The constraints files created by the toolflow """
+        return []
+
+    def _project_settings(self):
+        """ The settings, other than the files, that affect the build """
+        brd = self.brd
+        return [self.name, brd.vendor, brd.family, brd.device,
+                getattr(brd, 'package', ''), getattr(brd, 'speed', '')]
+
+    def _can_resume(self, stage):
+        """ The outputs of the stages before *stage* exist """
+        return True
+
+    def _hash_files(self, filelist):
+        hsh = hashlib.sha1()
+        for fn in sorted(filelist, key=os.path.basename):
+            # the file name and contents, not the location, so the
+            # same build in another directory has the same hash
+            hsh.update(os.path.basename(fn).encode('utf-8'))
+            # the HDL files are relative to the path
+            pth = os.path.join(self.path, fn)
+            pth = pth if os.path.isfile(pth) else fn
+            if os.path.isfile(pth):
+                hash_hdl_file(pth, hsh)
+        return hsh.hexdigest()
+
+    def get_stage_inputs(self, **options):
+        """ Get a fingerprint (hash) of each input to the stages
+        """
+        hdl_files = set(self._hdl_file_list)
+        hdl_files.update(getattr(self, '_core_file_list', set()))
+        settings = repr(self._project_settings()).encode('utf-8')
+        options = repr(sorted(options.items())).encode('utf-8')
+        inputs = dict(
+            hdl=self._hash_files(hdl_files),
+            constraints=self._hash_files(self._constraint_files()),
+            project=hashlib.sha1(settings).hexdigest(),
+            options=hashlib.sha1(options).hexdigest(),
+        )
+        return inputs
+
+    def _load_manifest(self):
+        try:
+            with open(self.stage_manifest) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def get_stages(self, inputs):
+        """ Get the stages that need to run given the stage inputs.
+
+        The stages that need to be run are the first stage whose
+        inputs changed since the last successful run and all the
+        stages after it.  If nothing changed and the bitstream exists
+        an empty list is returned.
+        """
+        names = [stage for stage, _ in self._stages]
+        manifest = self._load_manifest()
+        if not self.incremental or manifest is None:
+            return names
+
+        first = None
+        for ii, (stage, deps) in enumerate(self._stages):
+            done = manifest.get(stage, None)
+            if done is None or any(done.get(dd, None) != inputs[dd]
+                                   for dd in deps):
+                first = ii
+                break
+
+        if first is None:
+            if self.bitfile is None or os.path.isfile(self.bitfile):
+                return []
+            first = len(names) - 1
+
+        if not self._can_resume(names[first]):
+            first = 0
+
+        return names[first:]
+
+    def save_stages(self, inputs):
+        """ Save the stage inputs after a successful run """
+        manifest = {stage: {dd: inputs[dd] for dd in deps}
+                    for stage, deps in self._stages}
+        with open(self.stage_manifest, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def _artifact_files(self):
+        """ The toolflow outputs saved in the artifact cache, the
+        bitstream and the log and reports (`get_utilization`).
+        """
+        return [self.bitfile]
+
+    def _get_artifact_cache(self):
+        cache = self.artifact_cache
+        if not cache:
+            return None
+        return cache if isinstance(cache, ArtifactCache) else ArtifactCache()
+
+    def get_tool_version(self):
+        """ Get the version (output of the version commands) of the
+        tools, an empty string if the tools are not available.
+        """
+        if self._tool_version is None:
+            version = []
+            for cmd in self._version_cmds:
+                try:
+                    txt = subprocess.check_output(
+                        cmd, stderr=subprocess.STDOUT)
+                except subprocess.CalledProcessError as err:
+                    # some tools exit with an error after the banner
+                    txt = err.output if self._version_pattern else b''
+                except OSError:
+                    txt = b''
+                txt = txt.decode('utf-8', 'replace').strip()
+                if self._version_pattern is not None:
+                    mm = re.search(self._version_pattern, txt, re.MULTILINE)
+                    txt = mm.group(0).strip() if mm is not None else ''
+                version.append(txt)
+            self._tool_version = "\n".join(version)
+        return self._tool_version
+
+    def get_artifacts(self, inputs):
+        """ Copy the outputs of a previous build with the same inputs
+        from the artifact cache.  The stage manifest is saved, the
+        outputs are up to date for the inputs.
+
+        Returns:
+          True if the outputs were in the cache
+        """
+        cache = self._get_artifact_cache()
+        if cache is None:
+            return False
+        key = artifact_key(self._name, inputs, self.get_tool_version())
+        files = [os.path.basename(fn) for fn in self._artifact_files()]
+        if not cache.get(key, files, self.path):
+            return False
+        print("   {} from the artifact cache {}".format(self.bitfile, key))
+        self.save_stages(inputs)
+        return True
+
+    def put_artifacts(self, inputs):
+        """ Add the outputs of a successful build to the artifact cache
+        """
+        cache = self._get_artifact_cache()
+        if cache is None:
+            return
+        key = artifact_key(self._name, inputs, self.get_tool_version())
+        files = [os.path.basename(fn) for fn in self._artifact_files()]
+        cache.put(key, files, self.path)
+
+    def restore_artifacts(self, use='verilog', **options):
+        """ Get the bitstream from the artifact cache without running
+        the tools, e.g. to program a board from a previous build.
+
+        Returns:
+          True if the bitstream exists (built or from the cache)
+        """
+        if self.bitfile is not None and os.path.isfile(self.bitfile):
+            return True
+        inputs = self._prepare(use=use, **options)
+        return self.get_artifacts(inputs)
+
+    def get_utilization(self):
+        """ Get the resource utilization (and fmax) from the reports
+        """
+        raise NotImplementedError()
+
     def escape_path(self, path):
         # Vivado and ISE at least need to have backslashes in their tcl files escaped.
         return path.replace('\\', '\\\\')
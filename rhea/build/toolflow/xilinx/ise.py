@@ -16,6 +16,7 @@ from ..convert import convert
 from rhea.build import FPGA
 from rhea.build.extintf import Clock
 from .ise_parse_reports import get_utilization
+from .ise_parse_reports import ISEReportParser
 
 _default_pin_attr = {
     'NET': None,
@@ -26,8 +27,28 @@ _default_pin_attr = {
 }
 
 
+_ise_processes = {
+    'synthesize': 'Synthesize',
+    'translate': 'Translate',
+    'map': 'Map',
+    'par': 'Place & Route',
+    'bitgen': 'Generate Programming File',
+}
+
+
 class ISE(ToolFlow):
     _name = "Xilinx ISE"
+    log_parser = ISEReportParser
+    # the xst banner, e.g. "Release 14.7 - xst P.20131013 (lin64)"
+    _version_cmds = (('xst', '-help'),)
+    _version_pattern = r'^Release .*$'
+    _stages = (
+        ('synthesize', ('hdl', 'project',)),
+        ('translate', ('constraints',)),
+        ('map', ()),
+        ('par', ()),
+        ('bitgen', ()),
+    )
     def __init__(self, brd, top=None, path='xilinx/'):
         """
         Given a top-level module (function) and a board definition
@@ -37,6 +58,22 @@ class ISE(ToolFlow):
         #self.reports = _ise_parse_reports(self)
         self.ucf_file = ''
 
+    @property
+    def bitfile(self):
+        return os.path.join(self.path, self.name+'.bit')
+
+    def _constraint_files(self):
+        return [self.ucf_file]
+
+    def _project_settings(self):
+        settings = super(ISE, self)._project_settings()
+        settings += [getattr(self.brd, 'no_startup_jtag_clock', False)]
+        return settings
+
+    def _can_resume(self, stage):
+        # the later stages are run from the existing project
+        return os.path.isfile(os.path.join(self.path, self.name+'.xise'))
+
     def create_constraints(self):
         self.ucf_file = self.escape_path(os.path.join(self.path, self.name+'.ucf'))
         ustr = ""
@@ -85,9 +122,14 @@ class ISE(ToolFlow):
         #print(ustr)
 
         
-    def create_flow_script(self):
+    def create_flow_script(self, stages=None):
         """ Create the ISE control script
+
+        Arguments:
+            stages: the stages (processes) to run, if the synthesize
+                stage is not included the existing project is opened.
         """
+        stages = [st for st, _ in self._stages] if stages is None else stages
         # start with the text string for the TCL script
         self.tcl_script = '#\n#\n# ISE implementation script\n'
         date_time = strftime("%a, %d %b %Y %H:%M:%S +0000", gmtime())
@@ -125,14 +167,18 @@ class ISE(ToolFlow):
         print('Project name : %s ' % pj_fn)
         pjfull = os.path.join(self.path, pj_fn)
 
+        # when only the later stages are run the existing project
+        # is opened, the constraints file is part of the project.
+        if 'synthesize' not in stages:
+            self.tcl_script += 'project open %s\n' % self.escape_path(pj_fn)
+            return self._finish_flow_script(fn, stages)
+
         # let the TCL file be the master file, always create
         # a new project.  If a user uses this to "bootstrap"
         # the need to take care to rename the project if modfied
         # else it will be overwritten.
         if os.path.isfile(pjfull):
             os.remove(pjfull)
-            #    self.tcl_script += 'project open %s \n' % (pj_fn)
-        #else:
         self.tcl_script += 'project new %s\n' % self.escape_path(pj_fn)
 
         if self.brd.family:
@@ -174,13 +220,13 @@ class ISE(ToolFlow):
                                "\"JTAG Clock\"" \
                                " -process \"Generate Programming File\" \n"
 
+        return self._finish_flow_script(fn, stages)
+
+    def _finish_flow_script(self, fn, stages):
         # run the implementation
         self.tcl_script += '# run the implementation:\n'
-        self.tcl_script += 'process run "Synthesize" \n'
-        self.tcl_script += 'process run "Translate" \n'
-        self.tcl_script += 'process run "Map" \n'
-        self.tcl_script += 'process run "Place & Route" \n'
-        self.tcl_script += 'process run "Generate Programming File" \n'
+        for stage in stages:
+            self.tcl_script += 'process run "%s" \n' % _ise_processes[stage]
         # close the project
         self.tcl_script += '# close the project:\n'
         self.tcl_script += 'project close\n'
@@ -191,27 +237,81 @@ class ISE(ToolFlow):
             
         return fn
 
-    def run(self, use='verilog', name=None):
-        """ Execute the tool-flow """
-
+    def _prepare(self, use='verilog', **options):
         self.pathexist(self.path)
 
         # convert the top-level
-        cfiles = convert(self.brd, name=self.name, 
-                         use=use, path=self.path)
+        cfiles = convert(self.brd, name=self.name,
+                         use=use, path=self.path,
+                         cache=self.convert_cache)
         self.add_files(cfiles)
 
         # create the ISE files to run the toolflow
         self.create_constraints()
-        tcl_name = self.create_flow_script()
+        return self.get_stage_inputs(**options)
+
+    def _artifact_files(self):
+        return [self.bitfile, os.path.join(self.path, "build_ise.log")] + \
+               [os.path.join(self.path, self.name+ext)
+                for ext in ('_map.mrp', '.twr',)]
+
+    def run(self, use='verilog', name=None):
+        """ Execute the tool-flow """
+
+        inputs = self._prepare(use=use)
+        stages = self.get_stages(inputs)
+        logfn = os.path.join(self.path, "build_ise.log")
+        if len(stages) == 0:
+            print("   %s is up to date" % (self.bitfile,))
+            self.logfn = logfn
+            return self.logfn
+        if self.get_artifacts(inputs):
+            self.logfn = logfn
+            return self.logfn
+
+        tcl_name = self.create_flow_script(stages)
 
         cmd = ['xtclsh', tcl_name]
         self.logfn = self._execute_flow(cmd, "build_ise.log")
+        if not self.failed:
+            self.save_stages(inputs)
+            self.put_artifacts(inputs)
 
         return self.logfn
 
+    def create_program_script(self, position=1):
+        """ Create the iMPACT batch script to program the device
+        at `position` in the JTAG chain.
+        """
+        fn = os.path.join(self.path, self.name+'_program.cmd')
+        cmds = ['setMode -bs',
+                'setCable -port auto',
+                'Identify -inferir',
+                'assignFile -p %d -file "%s"' % (position, self.bitfile),
+                'Program -p %d' % (position,),
+                'quit']
+        with open(fn, 'w') as fid:
+            for line in cmds:
+                fid.write(line + '\n')
+        return fn
+
+    def program(self, position=1):
+        """ Program the board with iMPACT, `position` is the
+        position of the FPGA in the JTAG chain.
+        """
+        # program from the artifact cache if not built
+        if not self.restore_artifacts():
+            print("No bitstream {}, run the toolflow".format(self.bitfile))
+            return
+
+        fn = self.create_program_script(position)
+        cmd = ['impact', '-batch', fn]
+        self._execute_flow(cmd, "program_ise.log")
+        return
 
     def get_utilization(self):
-        info = get_utilization(self.logfn)
+        reports = [os.path.join(self.path, self.name+ext)
+                   for ext in ('_map.mrp', '.twr',)]
+        info = get_utilization(self.logfn, reports)
         return info
 
@@ -16,10 +16,20 @@ from rhea.system import Clock
 from ..toolflow import ToolFlow
 from ..convert import convert
 from .vivado_parse_reports import get_utilization
+from .vivado_parse_reports import VivadoReportParser
 
 
 class Vivado(ToolFlow):
     _name = "Xilinx Vivado"
+    _version_cmds = (('vivado', '-version'),)
+    log_parser = VivadoReportParser
+    # the constraints are read before synthesis and are saved in the
+    # synthesis checkpoint, a constraint change reruns synthesis
+    _stages = (
+        ('synth', ('hdl', 'project', 'constraints',)),
+        ('impl', ()),
+        ('bitgen', ('options',)),
+    )
     def __init__(self, brd, top=None, path='./xilinx/'):
         """
         Given a top-level module (function) and a board definition
@@ -32,8 +42,24 @@ class Vivado(ToolFlow):
         """
         super(Vivado, self).__init__(brd, top=top, path=path)
         self.xdc_file = ''
+        self.generate_binary = False
         self._default_project_file = None
 
+    @property
+    def bitfile(self):
+        return os.path.join(self.path, self.name+'.bit')
+
+    def _checkpoint(self, stage):
+        return os.path.join(self.path, "{}_{}.dcp".format(self.name, stage))
+
+    def _constraint_files(self):
+        return [self.xdc_file]
+
+    def _can_resume(self, stage):
+        # the later stages start from the previous stage's checkpoint
+        prev = {'impl': 'synth', 'bitgen': 'impl'}.get(stage, None)
+        return prev is not None and os.path.isfile(self._checkpoint(prev))
+
     def create_project(self, use='verilog', **pattr):
         """ Geenrate the Vivado project file
         :param use: use verilog of vhdl
@@ -127,7 +153,16 @@ class Vivado(ToolFlow):
             for line in ustr:                
                 fid.write(line + '\n')
 
-    def create_flow_script(self, generate_binary):
+    def create_flow_script(self, generate_binary, stages=None):
+        """ Create the Vivado flow script
+
+        Arguments:
+            generate_binary: also create a .bin file
+            stages: the stages to run, a checkpoint is saved after
+                synthesis and implementation, stages that are not run
+                are loaded from the checkpoints.
+        """
+        stages = [st for st, _ in self._stages] if stages is None else stages
 
         fn = os.path.join(self.path, self.name+'.tcl')
 
@@ -142,39 +177,62 @@ class Vivado(ToolFlow):
         tcl += ["# set compile directory:"]
         tcl += ["set origin_dir \"{}\"".format(self.escape_path(self.path))]
 
-        project_directory = self.escape_path(os.path.join(self.path, self.name))
-        tcl += ["create_project -force {} \"{}\"".format(
-            self.name, project_directory)]
-        tcl += ["set proj_dir [get_property directory [current_project]]"]
-        tcl += ["set obj [get_projects {}]".format(self.name)]
-        brd = self.brd
-        part = "{}{}{}".format(brd.device, brd.package, brd.speed)
-        part = part.lower()
-        tcl += ["set_property PART {} $obj".format(part)]
-        
-        # add HDL files
-        tcl += [""]
-        tcl += ["# add sources"]
-        for hdl_file in self._hdl_file_list:
-            tcl += ["add_files \"{}\"".format(self.escape_path(os.path.join(self.path, hdl_file)))]
-
-        tcl += ["read_xdc \"{}\"".format(self.escape_path(self.xdc_file))]
-
-        tcl += [""]
-        tcl += ["# build design"]
-        synopts = ""
-        tcl += ["synth_design -top {} {}".format(self.name, synopts)]
-        tcl += ["opt_design"]
-        tcl += ["place_design"]
-        tcl += ["route_design"]
-        tcl += ["report_timing_summary -file \"{}\"".format(
-            self.escape_path(os.path.join(self.path, self.name+'_timing.rpt')))]
-        if generate_binary:
-	    tcl += ["write_bitstream -force -bin_file \"{}\"".format(
-                self.escape_path(os.path.join(self.path, self.name+'.bit')))]
-        else:
-            tcl += ["write_bitstream -force \"{}\"".format(
-                self.escape_path(os.path.join(self.path, self.name+'.bit')))]
+        if 'synth' in stages:
+            project_directory = self.escape_path(
+                os.path.join(self.path, self.name))
+            tcl += ["create_project -force {} \"{}\"".format(
+                self.name, project_directory)]
+            tcl += ["set proj_dir [get_property directory [current_project]]"]
+            tcl += ["set obj [get_projects {}]".format(self.name)]
+            brd = self.brd
+            part = "{}{}{}".format(brd.device, brd.package, brd.speed)
+            part = part.lower()
+            tcl += ["set_property PART {} $obj".format(part)]
+
+            # add HDL files
+            tcl += [""]
+            tcl += ["# add sources"]
+            for hdl_file in sorted(self._hdl_file_list):
+                tcl += ["add_files \"{}\"".format(
+                    self.escape_path(os.path.join(self.path, hdl_file)))]
+
+            tcl += ["read_xdc \"{}\"".format(self.escape_path(self.xdc_file))]
+
+            tcl += [""]
+            tcl += ["# build design"]
+            synopts = ""
+            tcl += ["synth_design -top {} {}".format(self.name, synopts)]
+            tcl += ["write_checkpoint -force \"{}\"".format(
+                self.escape_path(self._checkpoint('synth')))]
+
+        if 'impl' in stages:
+            if 'synth' not in stages:
+                tcl += ["# start from the synthesized design"]
+                tcl += ["open_checkpoint \"{}\"".format(
+                    self.escape_path(self._checkpoint('synth')))]
+            tcl += ["opt_design"]
+            tcl += ["place_design"]
+            tcl += ["route_design"]
+            timing_file = os.path.join(self.path, self.name+'_timing.rpt')
+            tcl += ["report_timing_summary -file \"{}\"".format(
+                self.escape_path(timing_file))]
+            util_file = os.path.join(self.path, self.name+'_utilization.rpt')
+            tcl += ["report_utilization -file \"{}\"".format(
+                self.escape_path(util_file))]
+            tcl += ["write_checkpoint -force \"{}\"".format(
+                self.escape_path(self._checkpoint('impl')))]
+
+        if 'bitgen' in stages:
+            if 'impl' not in stages:
+                tcl += ["# start from the routed design"]
+                tcl += ["open_checkpoint \"{}\"".format(
+                    self.escape_path(self._checkpoint('impl')))]
+            if generate_binary:
+                tcl += ["write_bitstream -force -bin_file \"{}\"".format(
+                    self.escape_path(self.bitfile))]
+            else:
+                tcl += ["write_bitstream -force \"{}\"".format(
+                    self.escape_path(self.bitfile))]
 
         tcl += ["quit"]
 
@@ -185,24 +243,77 @@ class Vivado(ToolFlow):
         return fn
 
     def create_program_script(self):
+        """ Create the Vivado script to program the board, the FPGA
+        is the first device in the JTAG chain that matches the board
+        device.
+        """
+        fn = os.path.join(self.path, self.name+'_program.tcl')
+        device = self.brd.device.lower()
         tcl = []
-        # >> open_hw_target [lindex [get_hw_targets -of_objects [get_hw_servers localhost]] 0]
-        # >> set_property PROGRAM.FILE {xilinx/zybo/zybo.runs/impl_1/zybo.bit} [lindex [get_hw_devices] 1]
-        # >> current_hw_device [lindex [get_hw_devices] 1]
-        # >> refresh_hw_device -update_hw_probes false [lindex [get_hw_devices] 1]
-        # >> set_property PROBES.FILE {} [lindex [get_hw_devices] 1]
-        # >> set_property PROGRAM.FILE {xilinx/zybo/zybo.runs/impl_1/zybo.bit} [lindex [get_hw_devices] 1]
-        # >> program_hw_devices [lindex [get_hw_devices] 1]
-        # >> refresh_hw_device [lindex [get_hw_devices] 1]
+        tcl += ["open_hw"]
+        tcl += ["connect_hw_server"]
+        tcl += ["open_hw_target"]
+        tcl += ["set dev [lindex [get_hw_devices {}*] 0]".format(device)]
+        tcl += ["current_hw_device $dev"]
+        tcl += ["refresh_hw_device -update_hw_probes false $dev"]
+        tcl += ["set_property PROGRAM.FILE \"{}\" $dev".format(
+            self.escape_path(self.bitfile))]
+        tcl += ["program_hw_devices $dev"]
+        tcl += ["close_hw_target"]
+        tcl += ["quit"]
 
-    def run(self, use='verilog', name=None, generate_binary=False):
-        """ Execute the toolflow """
+        with open(fn, 'w') as fp:
+            for line in tcl:
+                fp.write(line + "\n")
+        return fn
+
+    def program(self):
+        """ Program the board with the Vivado hardware manager """
+        # program from the artifact cache if not built
+        if not self.restore_artifacts():
+            print("No bitstream {}, run the toolflow".format(self.bitfile))
+            return
+
+        tcl_name = self.create_program_script()
+        binary_name = 'vivado'
+        if platform.system() == 'Windows':
+            binary_name += '.bat'
+        cmd = [binary_name, '-mode', 'batch', '-source', tcl_name]
+        self._execute_flow(cmd, "program_vivado.log")
+        return
+
+    def _prepare(self, use='verilog', generate_binary=False):
         self.pathexist(self.path)
+        self.generate_binary = generate_binary
         cfiles = convert(self.brd, name=self.name,
-                         use=use, path=self.path)
+                         use=use, path=self.path,
+                         cache=self.convert_cache)
         self.add_files(cfiles)
         self.create_constraints()
-        tcl_name = self.create_flow_script(generate_binary)
+        return self.get_stage_inputs(generate_binary=generate_binary)
+
+    def _artifact_files(self):
+        files = [self.bitfile, os.path.join(self.path, "build_vivado.log")] + \
+                [os.path.join(self.path, self.name+ext)
+                 for ext in ('_utilization.rpt', '_timing.rpt',)]
+        if self.generate_binary:
+            files.append(os.path.join(self.path, self.name+'.bin'))
+        return files
+
+    def run(self, use='verilog', name=None, generate_binary=False):
+        """ Execute the toolflow """
+        inputs = self._prepare(use=use, generate_binary=generate_binary)
+        stages = self.get_stages(inputs)
+        logfn = os.path.join(self.path, "build_vivado.log")
+        if len(stages) == 0:
+            print("   {} is up to date".format(self.bitfile))
+            self.logfn = logfn
+            return self.logfn
+        if self.get_artifacts(inputs):
+            self.logfn = logfn
+            return self.logfn
+
+        tcl_name = self.create_flow_script(generate_binary, stages)
         binary_name = 'vivado'
         if platform.system() == 'Windows':
             binary_name += '.bat'
@@ -212,12 +323,20 @@ class Vivado(ToolFlow):
 
         # @todo: refactor into a cleanup function
         for frm in ("vivado.log", "vivado.jou",):
+            if not os.path.isfile(frm):
+                continue
             if os.path.isfile(os.path.join(self.path, frm)):
                 os.remove(os.path.join(self.path, frm))
             shutil.move(frm, self.path)
 
+        if not self.failed:
+            self.save_stages(inputs)
+            self.put_artifacts(inputs)
+
         return self.logfn
 
     def get_utilization(self):
-        info = get_utilization(self.logfn)
+        reports = [os.path.join(self.path, self.name+ext)
+                   for ext in ('_utilization.rpt', '_timing.rpt',)]
+        info = get_utilization(self.logfn, reports)
         return info
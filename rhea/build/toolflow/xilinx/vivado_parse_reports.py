@@ -1,55 +1,130 @@
 from __future__ import division
 from __future__ import print_function
 
-from myhdl import enum
-
-def get_utilization(fn=None):    
-    """ Parse the device resource utilization from the logs.
-        
-        The relevant part looks like this:
-        
-        Report Cell Usage: 
+import os
+import re
+
+from .._report_parser import ReportParser, to_int
+
+
+class VivadoReportParser(ReportParser):
+    """ Parse the Vivado logs and the utilization and timing reports.
+
+    The utilization report (report_utilization) has tables like:
+        +-------------------------+------+-------+-----------+-------+
+        |        Site Type        | Used | Fixed | Available | Util% |
+        +-------------------------+------+-------+-----------+-------+
+        | Slice LUTs              |   28 |     0 |     17600 |  0.16 |
+
+    The timing summary (report_timing_summary) has the worst negative
+    slack (WNS) and the clock periods, the fmax is computed from the
+    smallest clock period and the WNS.
+
+    The log has the synthesis cell usage:
+        Report Cell Usage:
         +------+-------+------+
         |      |Cell   |Count |
         +------+-------+------+
         |1     |BUFG   |     1|
         |2     |CARRY4 |     7|
-        |3     |LUT1   |    28|
-        |4     |LUT3   |     1|
-        |5     |LUT4   |     5|
-        |6     |LUT5   |     3|
-        |7     |FDRE   |    28|
-        |8     |IBUF   |     1|
-        |9     |OBUF   |     8|
-        +------+-------+------+
     """
-    
-    info = {}
-    info['syn'] = {}
-    
-    try:
-        log = open(fn, 'r')
-    except FileNotFoundError:
-        info = 'Could not find the logfile. Something must have gone wrong in the build process'
-        return info
-    
-    found_start = False
-    plus_count = 0
-    for ln in log:
-        if ln.find('Report Cell Usage:') != -1:
-            # Start parsing
-            found_start = True
-            continue
-        elif found_start:
-            # Line with data found
-            if ln.startswith('|'):
-                splitted = ln.split('|')
-                splitted = [elem.strip() for elem in splitted]
-                if splitted[2] != 'Cell':
-                    info['syn'][splitted[2]] = splitted[3]
-            # Count lines without data to identify end of table
-            elif ln.startswith('+'):
-                plus_count = plus_count+1
-                if plus_count >= 3:
-                    found_start = False
-    return info
\ No newline at end of file
+    resource_names = {
+        'Slice LUTs': 'lut',
+        'CLB LUTs': 'lut',
+        'Slice Registers': 'reg',
+        'CLB Registers': 'reg',
+        'DSPs': 'dsp',
+        'Block RAM Tile': 'mem',
+    }
+
+    _re_number = re.compile(r'^-?[\d.]+$')
+    _re_clock = re.compile(
+        r'^\s*(\S+)\s+\{[\d.\s]+\}\s+([\d.]+)\s+([\d.]+)\s*$')
+    _re_stage = re.compile(r'^Command:\s*(\S+)')
+
+    def __init__(self):
+        super(VivadoReportParser, self).__init__()
+        self._section = None
+        self._pluses = 0
+        self.wns = None
+        self.periods = {}
+
+    def parse_line(self, line):
+        if line.find('Report Cell Usage:') != -1:
+            self._section, self._pluses = 'cells', 0
+        elif line.find('WNS(ns)') != -1:
+            self._section = 'wns'
+        elif line.find('Clock Summary') != -1:
+            self._section = 'clocks'
+
+        elif self._section == 'cells':
+            if line.startswith('|'):
+                cells = [cc.strip() for cc in line.split('|')]
+                if cells[2] != 'Cell':
+                    self.add_resource(cells[2], to_int(cells[3]))
+            # three separator lines in the table
+            elif line.startswith('+'):
+                self._pluses += 1
+                if self._pluses >= 3:
+                    self._section = None
+
+        elif self._section == 'wns':
+            fields = line.split()
+            if len(fields) > 0 and self._re_number.match(fields[0]):
+                self.wns = float(fields[0])
+                self._section = None
+                self._update_fmax()
+
+        elif self._section == 'clocks':
+            mm = self._re_clock.match(line)
+            if mm is not None:
+                self.periods[mm.group(1)] = float(mm.group(2))
+                self._update_fmax()
+            elif len(self.periods) > 0 and len(line.strip()) == 0:
+                self._section = None
+
+        elif line.startswith('|'):
+            self._parse_table_row(line)
+
+        else:
+            mm = self._re_stage.match(line)
+            if mm is not None:
+                self.stage = mm.group(1)
+
+    def _parse_table_row(self, line):
+        cells = [cc.strip() for cc in line.strip().strip('|').split('|')]
+        if len(cells) < 4 or cells[0] not in self.resource_names:
+            return
+        try:
+            used, available = to_int(cells[1]), to_int(cells[-2])
+            percent = to_int(cells[-1])
+        except ValueError:
+            return
+        self.add_resource(cells[0], used, available, percent)
+
+    def _update_fmax(self):
+        if self.wns is None or len(self.periods) == 0:
+            return
+        period = min(self.periods.values()) - self.wns
+        if period > 0:
+            self.info.fmax = 1000. / period
+
+
+def get_utilization(fn=None, reports=()):
+    """ Parse the device resource utilization from the log and reports.
+
+    Arguments:
+        fn (str): the Vivado build log
+        reports: the utilization and timing summary reports, the
+            reports that exist are used instead of the log.
+
+    Raises IOError if there are no reports and the log does not
+    exist.
+    """
+    parser = VivadoReportParser()
+    reports = [rpt for rpt in reports if os.path.isfile(rpt)]
+    if len(reports) == 0:
+        parser.parse(fn)
+    for rpt in reports:
+        parser.parse(rpt)
+    return parser.info
@@ -12,6 +12,9 @@ from .convert import convert
 
 class Yosys(ToolFlow):
     _name = "yosys"
+    _stages = (
+        ('synth', ('hdl', 'project',)),
+    )
 
     def __init__(self, brd, top=None, path='yosys/'):
         """ use yosys synthesis (mainly for testing)
@@ -29,6 +32,11 @@ class Yosys(ToolFlow):
     def add_cores(self, filename):
         self._core_file_list.update(set(filename))
 
+    @property
+    def bitfile(self):
+        # the synthesized netlist, yosys doesn't create a bitstream
+        return os.path.join(self.path, self.name+'_synth.v')
+
     def create_project(self, use='verilog', **pattr):
         # yosys only synthesizes verilog
         assert use.lower() == 'verilog'
@@ -38,7 +46,7 @@ class Yosys(ToolFlow):
         syn += "# Autogenerated by rhea.build \n"
         syn += "# -------------------------------------------------------------------------- #\n\n"
 
-        for f in self._hdl_file_list:
+        for f in sorted(self._hdl_file_list):
             syn += "read_verilog {}/{} \n".format(self.path, f)
 
         # create "dummy" pin assignments (testing only)
@@ -75,12 +83,20 @@ class Yosys(ToolFlow):
     def run(self, use='verilog', name=None):
         self.pathexist(self.path)
         cfiles = convert(self.brd, name=self.name,
-                         use=use, path=self.path)
+                         use=use, path=self.path,
+                         cache=self.convert_cache)
         self.add_files(cfiles)
         self.create_project(use=use)
         # @todo: self.create_constraints()
+        inputs = self.get_stage_inputs()
+        if len(self.get_stages(inputs)) == 0:
+            print("   {} is up to date".format(self.bitfile))
+            self.logfn = os.path.join(self.path, "build_yosys.log")
+            return self.logfn
 
         cmd = ['yosys', self.syn_file]
         self.logfn = self._execute_flow(cmd, "build_yosys.log")
+        if not self.failed:
+            self.save_stages(inputs)
 
         return self.logfn
@@ -127,6 +127,6 @@ def adc128s022(glbl, fifobus, spibus, channel):
                     print("FIFO full dropping sample")
                     
     # assign the serial out bit to the msb of the shift-register
-    assign(dout, sregout(15))
+    assign_inst = assign(dout, sregout(15))
     
     return myhdl.instances()
\ No newline at end of file
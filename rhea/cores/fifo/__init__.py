@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from .fifo_async import fifo_async
 from .fifo_sync import fifo_sync
 from .fifo_fast import fifo_fast
+from .fifo_sdram import fifo_sdram
 from .ramp import fifo_ramp
 
 
@@ -14,10 +14,12 @@ from myhdl import (Signal, ResetSignal, intbv, modbv, concat,
 from rhea.system import FIFOBus
 from .fifo_mem import fifo_mem
 from .fifo_syncers import sync_reset, sync_mbits
+from .fifo_width import fifo_width
 
 
 @myhdl.block
-def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
+def fifo_async(clock_write, clock_read, fifobus, reset, size=128,
+               almost_full=None, almost_empty=None, fwft=False):
     """
     The following is a general purpose, platform independent 
     asynchronous FIFO (dual clock domains).
@@ -27,6 +29,28 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
 
     Typically in the "rhea" package the FIFOBus interface is used to
     interface with the FIFOs
+
+    The FIFO count is available in both clock domains, the counts are
+    computed from the synchronized (Gray code) pointers: `fbus.count`
+    in the read domain and `fbus.write_count` in the write domain.
+    A count lags the other domain by the pointer synchronization, the
+    counts are conservative: the write count can include words
+    already read and the read count can miss the latest writes.  The
+    `almost_full` flag (write domain) is active when the write count
+    is `almost_full` or more, the `almost_empty` flag (read domain)
+    is active when the read count is `almost_empty` or less.  The
+    thresholds default to three quarters and a quarter of the FIFO
+    size.
+
+    By default the read data is registered, the data is available
+    with the `read_valid` the clock after the read.  With `fwft`
+    (first-word fall-through) the read data is available before the
+    read, the read acknowledges the data and `read_valid` is active
+    with the read (same as `fifo_sync`).
+
+    When the FIFOBus `read_width` is not the `width` the FIFO holds
+    *size* words of the wider width (see `fifo_width`), narrow reads
+    are only supported with `fwft`.
     """
     # @todo: use the clock_write and clock_read from the FIFOBus
     # @todo: interface, make this interface compliant with the
@@ -36,7 +60,24 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     # two - full address range, ptr (mem indexes) will wrap
     asz = int(ceil(log(size, 2)))
     fbus = fifobus   # alias
-    
+
+    if fbus.read_width != fbus.width:
+        assert fwft or fbus.width < fbus.read_width, \
+            "narrow reads require a first-word fall-through FIFO"
+        inner = FIFOBus(width=max(fbus.width, fbus.read_width))
+        fifo_inst = fifo_async(clock_write, clock_read, inner, reset,
+                               size=size, almost_full=almost_full,
+                               almost_empty=almost_empty, fwft=fwft)
+        width_inst = fifo_width(clock_write, clock_read, reset, fbus, inner)
+        return fifo_inst, width_inst
+
+    nitems = 2**asz
+
+    # the almost full and almost empty thresholds
+    afull = nitems - nitems//4 if almost_full is None else almost_full
+    aempty = nitems//4 if almost_empty is None else almost_empty
+    assert 0 <= aempty < afull <= nitems
+
     # an extra bit is used to determine full vs. empty (see paper)
     waddr = Signal(modbv(0)[asz:])
     raddr = Signal(modbv(0)[asz:])
@@ -70,10 +111,27 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     _we = Signal(bool(0))
     _re = Signal(bool(0))
 
-    @always_comb
-    def beh_wr():
-        _we.next = fbus.write and not fbus.full
-        _re.next = False
+    if fwft:
+        # the memory output register is loaded with the next word
+        # on a read, the read data is the first word
+        @always_comb
+        def beh_wr():
+            _we.next = fbus.write and not fbus.full
+            _re.next = fbus.read and not rempty
+
+        @always_comb
+        def beh_read_valid():
+            fbus.read_valid.next = fbus.read and not rempty
+    else:
+        @always_comb
+        def beh_wr():
+            _we.next = fbus.write and not fbus.full
+            _re.next = False
+
+        # the data is register from the memory, the data is delayed
+        @always_seq(clock_read.posedge, reset=rrst)
+        def beh_read_valid():
+            fbus.read_valid.next = fbus.read and not rempty
 
     # unused but needed for the fifo_mem block
     wad = Signal(waddr.val)
@@ -98,16 +156,14 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     @always_seq(clock_read.posedge, reset=rrst)
     def beh_rptrs():
         # increment when read and not empty 
-        rbn = rbin + (fbus.read and not rempty)
+        rbn = modbv(0)[asz+1:]
+        rbn[:] = rbin + (fbus.read and not rempty)
         rbin.next = rbn
         rpn = (rbn >> 1) ^ rbn  # gray counter
         rptr.next = rpn   
 
         # FIFO empty when the next rptr == sync'd wptr or on reset
         rempty.next = (rpn == rq2_wptr)
-
-        # the data is register from the memory, the data is delayed
-        fbus.read_valid.next = fbus.read and not rempty
         
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # --Text from the paper--
@@ -121,7 +177,8 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     @always_seq(clock_write.posedge, reset=wrst)
     def beh_wptrs():
         # increment when write and not full
-        wbn = wbin + (fbus.write and not wfull)
+        wbn = modbv(0)[asz+1:]
+        wbn[:] = wbin + (fbus.write and not wfull)
         wbin.next = wbn
         wpn = (wbn >> 1) ^ wbn
         wptr.next = wpn
@@ -135,6 +192,41 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
         waddr.next = wbin[asz:0]
         raddr.next = rbin[asz:0]
 
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # The FIFO count in each domain, the difference of the local
+    # binary pointer and the sync'd Gray pointer (converted to binary).
+    wcount = Signal(intbv(0, min=0, max=nitems+1))
+    rcount = Signal(intbv(0, min=0, max=nitems+1))
+
+    @always_comb
+    def beh_wcount():
+        rb = modbv(0)[asz+1:]
+        rb[:] = wq2_rptr
+        for ii in range(1, asz+1):
+            rb[:] = rb ^ (wq2_rptr >> ii)
+        nw = modbv(0)[asz+1:]
+        nw[:] = wbin - rb
+        wcount.next = nw
+
+    @always_comb
+    def beh_rcount():
+        wb = modbv(0)[asz+1:]
+        wb[:] = rq2_wptr
+        for ii in range(1, asz+1):
+            wb[:] = wb ^ (rq2_wptr >> ii)
+        nr = modbv(0)[asz+1:]
+        nr[:] = wb - rbin
+        rcount.next = nr
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = wcount >= afull
+        fbus.almost_empty.next = rcount <= aempty
+
+    # attach the FIFO counts to the FIFOBus
+    fbus.count = rcount
+    fbus.write_count = wcount
+
     return myhdl.instances()
 
 
@@ -3,17 +3,18 @@
 # See the licence file in the top directory
 #
 
-from math import log, ceil
 import myhdl
 from myhdl import (Signal, ResetSignal, intbv, modbv,
                    always, always_comb, always_seq)
 
 from rhea.system import FIFOBus
 from .fifo_srl import fifo_srl
+from .fifo_width import fifo_width
 
 
 @myhdl.block
-def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
+def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False,
+              almost_full=None, almost_empty=None):
     """
     Often small simple, synchronous, FIFOs can be implemented with 
     specialized hardware in an FPGA (e.g. vertically chaining LUTs).
@@ -28,6 +29,11 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
     synchronous FIFOs.  This FIFO is implemented generically, consult the
     synthesis and map reports.
 
+    The read data is available before the read (first-word
+    fall-through), the read acknowledges the data.  When the FIFOBus
+    `read_width` is not the `width` the FIFO holds *size* words of the
+    wider width (see `fifo_width`).
+
     Arguments (ports):
         glbl: global signals, clock and reset
         fbus: FIFOBus FIFO interface
@@ -37,6 +43,10 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
             (inferrable primitive).  If SRL are not inferred from the generic
             description this option can be used.  Note, srl_prim will only
             use a size (FIFO depth) of 16.
+        almost_full: the `almost_full` flag is active when the FIFO
+            holds this many or more items (default 3/4 of the size).
+        almost_empty: the `almost_empty` flag is active when the FIFO
+            holds this many or fewer items (default 1/4 of the size).
     """
     # @todo: this is intended to be used for small fast fifo's but it
     #        can be used for large synchronous fifo as well
@@ -44,6 +54,15 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
     clock, reset = glbl.clock, glbl.reset
     fbus = fifobus  # alias
 
+    if fbus.read_width != fbus.width:
+        inner = FIFOBus(width=max(fbus.width, fbus.read_width))
+        fifo_inst = fifo_fast(glbl, inner, size=size,
+                              use_srl_prim=use_srl_prim,
+                              almost_full=almost_full,
+                              almost_empty=almost_empty)
+        width_inst = fifo_width(clock, clock, reset, fbus, inner)
+        return fifo_inst, width_inst
+
     nitems = 32   # default and max size
     if use_srl_prim:
         nitems = 16
@@ -53,6 +72,11 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
     else:
         nitems = size
 
+    # the almost full and almost empty thresholds
+    afull = nitems - nitems//4 if almost_full is None else almost_full
+    aempty = nitems//4 if almost_empty is None else almost_empty
+    assert 0 <= aempty < afull <= nitems
+
     mem = [Signal(intbv(0)[fbus.width:]) for _ in range(nitems)]
     addr = Signal(intbv(0, min=0, max=nitems))
 
@@ -113,29 +137,34 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
             
     # note: failures occur if write/read when full/empty respectively
 
+    # the FIFO occupancy, the number of empty and filled slots
     if fifo_fast.occupancy_assertions:
-        nvacant = Signal(intbv(nitems, min=0, max=nitems+1))  # # empty slots
-        ntenant = Signal(intbv(0, min=0, max=nitems+1))       # # filled slots
+        nvacant = Signal(intbv(nitems, min=0, max=nitems+1))
+        ntenant = Signal(intbv(0, min=0, max=nitems+1))
     else:
-        nitems = int(2**(ceil(log(nitems, 2))))
-        nvacant = Signal(modbv(nitems, min=0, max=nitems))
-        ntenant = Signal(modbv(0, min=0, max=nitems))
-
-    if fifo_fast.debug:
-        @always_seq(clock.posedge, reset=reset)
-        def beh_occupancy():
-            if fbus.clear:
-                nvacant.next = nitems
-                ntenant.next = 0
-            elif fbus.read and not fbus.write:
-                nvacant.next = nvacant + 1
-                ntenant.next = ntenant - 1
-            elif fbus.write and not fbus.read:
-                nvacant.next = nvacant - 1
-                ntenant.next = ntenant + 1
+        nvacant = Signal(modbv(nitems, min=0, max=2*nitems))
+        ntenant = Signal(modbv(0, min=0, max=2*nitems))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_occupancy():
+        if fbus.clear:
+            nvacant.next = nitems
+            ntenant.next = 0
+        elif fbus.read and not fbus.write and not fbus.empty:
+            nvacant.next = nvacant + 1
+            ntenant.next = ntenant - 1
+        elif fbus.write and not fbus.read:
+            nvacant.next = nvacant - 1
+            ntenant.next = ntenant + 1
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = ntenant >= afull
+        fbus.almost_empty.next = ntenant <= aempty
 
     # attach the FIFO count to the FIFOBus
     fbus.count = ntenant
+    fbus.write_count = ntenant
 
     return myhdl.instances()
 
@@ -146,5 +175,4 @@ fifo_fast.portmap = dict(
     clock=Signal(bool(0)),
     fbus=FIFOBus()
 )
-fifo_fast.debug = True
 fifo_fast.occupancy_assertions = True
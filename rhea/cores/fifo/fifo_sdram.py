@@ -0,0 +1,149 @@
+from __future__ import absolute_import
+
+import myhdl
+from myhdl import Signal, intbv, always_comb, always_seq
+
+from rhea.system import FIFOBus
+from rhea.cores.sdram import sdram_sdr_controller
+from .fifo_fast import fifo_fast
+
+
+@myhdl.block
+def fifo_sdram(glbl, fbus, extram, burst_length=16, size=32,
+               cas_latency=2, almost_full=None, almost_empty=None):
+    """ External memory (SDRAM) FIFO
+    A deep FIFO, the SDRAM is the FIFO memory.  The writes are
+    buffered in an on-chip (`fifo_fast`) front FIFO and moved to the
+    SDRAM in runs of `burst_length` words, the reads are moved from
+    the SDRAM in runs to an on-chip back FIFO.  When the SDRAM is
+    empty a partial run is moved (flushed), at low rates a word is
+    not held in the front FIFO.
+
+    The FIFOBus interface is the same as `fifo_sync`, the read data
+    is available before the read strobe (read acknowledge) and
+    `read_valid` is active with the read.  `empty` and `full` are
+    the back and front FIFO flags, the `count` is the number of
+    words in the FIFO.  `almost_full` is the front FIFO flag, when
+    it is not active at least `size - almost_full` words can be
+    written.  `almost_empty` is the back FIFO flag.
+
+    The FIFO is in the `glbl` clock domain (also the SDRAM clock),
+    use a `fifo_async` before or after to cross clock domains.
+
+    Arguments:
+        glbl (Global): global signals, clock and reset
+        fbus (FIFOBus): FIFO bus interface
+        extram (SDRAMInterface): the SDRAM interface
+
+    Parameters:
+        burst_length (int): the number of words moved to and from the
+            SDRAM at a time.
+        size (int): the size of the on-chip front and back FIFOs.
+        cas_latency (int): the SDRAM CAS latency.
+        almost_full (int): the front FIFO almost full threshold.
+        almost_empty (int): the back FIFO almost empty threshold.
+
+    Example:
+
+        fifobus = FIFOBus(width=16)
+        fifo_inst = fifo_sdram(glbl, fifobus, sdram_intf)
+    """
+    assert isinstance(fbus, FIFOBus)
+    assert burst_length <= size <= 32
+
+    clock, reset = glbl.clock, glbl.reset
+    width = fbus.width
+
+    # the on-chip front and back FIFOs and the SDRAM FIFO
+    front, back, sbus = [FIFOBus(width=width) for _ in range(3)]
+    front_inst = fifo_fast(glbl, front, size=size, almost_full=almost_full)
+    back_inst = fifo_fast(glbl, back, size=size, almost_empty=almost_empty)
+    sdram_inst = sdram_sdr_controller(clock, reset, sbus, extram,
+                                      cas_latency=cas_latency,
+                                      burst_length=burst_length)
+    assign_inst = fbus.assign_read_write_paths(back, front)
+    scount = sbus.count
+    depth = scount.max + 2*size
+
+    # the words in the front FIFO and the words read from the SDRAM
+    # that have not been read from the back FIFO.
+    nfront = Signal(intbv(0, min=0, max=size+1))
+    inflight = Signal(intbv(0, min=0, max=size+1))
+    count = Signal(intbv(0, min=0, max=depth))
+
+    # the write (front to SDRAM) and read (SDRAM to back) runs
+    wr_run, rd_run = Signal(bool(0)), Signal(bool(0))
+    wr_left = Signal(intbv(0, min=0, max=burst_length+1))
+    rd_left = Signal(intbv(0, min=0, max=burst_length+1))
+    wr_go, rd_go = Signal(bool(0)), Signal(bool(0))
+    move_w, move_r = Signal(bool(0)), Signal(bool(0))
+
+    @always_comb
+    def beh_runs():
+        # a run starts with a burst of words or when the SDRAM is
+        # empty (flush), the back FIFO has room for the run.
+        wr_go.next = wr_run or (not front.empty and (
+            nfront >= burst_length or scount == 0))
+        rd_go.next = rd_run or (
+            not sbus.empty and size - inflight >= burst_length and
+            (scount >= burst_length or inflight == 0))
+
+    @always_comb
+    def beh_move():
+        move_w.next = wr_go and not front.empty and not sbus.full
+        move_r.next = rd_go and not sbus.empty and inflight < size
+
+    @always_comb
+    def beh_assign():
+        front.read.next = move_w
+        sbus.write.next = move_w
+        sbus.write_data.next = front.read_data
+        sbus.read.next = move_r
+        back.write.next = sbus.read_valid
+        back.write_data.next = sbus.read_data
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_control():
+        written = front.write and not front.full
+        read = back.read and not back.empty
+
+        # the write run
+        left = int(wr_left)
+        if not wr_run:
+            left = burst_length
+        if wr_go:
+            if move_w:
+                left = left - 1
+            wr_run.next = left != 0 and not front.empty
+            wr_left.next = left
+
+        # the read run
+        left = int(rd_left)
+        if not rd_run:
+            left = burst_length
+        if rd_go:
+            if move_r:
+                left = left - 1
+            rd_run.next = left != 0 and not sbus.empty
+            rd_left.next = left
+
+        if written and not move_w:
+            nfront.next = nfront + 1
+        elif move_w and not written:
+            nfront.next = nfront - 1
+
+        if move_r and not read:
+            inflight.next = inflight + 1
+        elif read and not move_r:
+            inflight.next = inflight - 1
+
+        if written and not read:
+            count.next = count + 1
+        elif read and not written:
+            count.next = count - 1
+
+    # the FIFOBus count references the local signal
+    fbus.count = count
+    fbus.write_count = count
+
+    return myhdl.instances()
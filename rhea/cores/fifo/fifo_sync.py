@@ -8,15 +8,16 @@ from math import log, fmod, ceil
 import pytest
 
 import myhdl
-from myhdl import Signal, intbv, modbv, enum, always_comb, always_seq
+from myhdl import Signal, intbv, modbv, always_comb, always_seq
 
 from rhea import Global
 from rhea.system import FIFOBus
 from .fifo_mem import fifo_mem
+from .fifo_width import fifo_width
 
 
 @myhdl.block
-def fifo_sync(glbl, fbus, size=128):
+def fifo_sync(glbl, fbus, size=128, almost_full=None, almost_empty=None):
     """ Synchronous FIFO
     This block is a basic synchronous FIFO.  In many cases it is
     better to use the `fifo_fast` synchronous FIFO (lower resources).
@@ -24,7 +25,12 @@ def fifo_sync(glbl, fbus, size=128):
     This FIFO uses a "read acknowledge", the read data is available
     on the read data bus before the read strobe is active.  When the
     read signal is set it is acknowledging the data has been read
-    and the next FIFO item will be available on the bus.
+    and the next FIFO item will be available on the bus (first-word
+    fall-through).
+
+    When the FIFOBus `read_width` is not the `width` the FIFO is an
+    asymmetric width FIFO, the FIFO holds *size* words of the wider
+    width (see `fifo_width`).
 
     Arguments:
         glbl (Global): global signals, clock and reset
@@ -33,6 +39,12 @@ def fifo_sync(glbl, fbus, size=128):
     Parameters:
         size (int): the size of the FIFO, the FIFO will have hold
             at maximum *size* elements.
+        almost_full (int): the `fbus.almost_full` flag is active when
+            the FIFO holds this many or more elements, defaults to
+            three quarters of the *size*.
+        almost_empty (int): the `fbus.almost_empty` flag is active
+            when the FIFO holds this many or fewer elements, defaults
+            to a quarter of the *size*.
 
     Examples: 
     
@@ -55,6 +67,14 @@ def fifo_sync(glbl, fbus, size=128):
     assert isinstance(fbus, FIFOBus)
 
     clock, reset = glbl.clock, glbl.reset
+
+    if fbus.read_width != fbus.width:
+        inner = FIFOBus(width=max(fbus.width, fbus.read_width))
+        fifo_inst = fifo_sync(glbl, inner, size=size, almost_full=almost_full,
+                              almost_empty=almost_empty)
+        width_inst = fifo_width(clock, clock, reset, fbus, inner)
+        return fifo_inst, width_inst
+
     fifosize = size
 
     if fmod(log(fifosize, 2), 1) != 0:
@@ -67,106 +87,100 @@ def fifo_sync(glbl, fbus, size=128):
     wptrd = Signal(modbv(0, min=0, max=fifosize))   # aligned write pointer
     rptr = Signal(modbv(0, min=0, max=fifosize))    # address to read from
 
+    # the accepted write and read (acknowledge) strobes
+    write, read = Signal(bool(0)), Signal(bool(0))
+
+    @always_comb
+    def beh_strobes():
+        write.next = fbus.write and not fbus.full
+        read.next = fbus.read and not fbus.empty
+
     # generic memory model, this memory uses two registers on 
     # the input and one on the output, it takes three clock 
     # cycles for write data to appear on the read.
     fifomem_inst = fifo_mem(
-        clock, fbus.write, fbus.write_data, wptr,
-        clock, fbus.read, fbus.read_data, rptr, wptrd
+        clock, write, fbus.write_data, wptr,
+        clock, read, fbus.read_data, rptr, wptrd
     )
 
-    # @todo: almost full and almost empty flags
-    read, write = fbus.read, fbus.write
-    states = enum('init', 'empty', 'active', 'full')
-    state = Signal(states.init)
+    # the almost full and almost empty thresholds
+    afull = fifosize - fifosize//4 if almost_full is None else almost_full
+    aempty = fifosize//4 if almost_empty is None else almost_empty
+    assert 0 <= aempty < afull <= fifosize
+
+    # the writes through the memory pipeline and the number of words
+    # available to read (through the pipeline)
+    write_d1, write_d2 = Signal(bool(0)), Signal(bool(0))
+    navail = Signal(intbv(0, min=0, max=fifosize+1))
 
     @always_seq(clock.posedge, reset=reset)
     def beh_fifo():
-
-        if state == states.init:
+        if fbus.clear:
             wptr.next = 0
             rptr.next = 0
-            fbus.full.next = False
+            write_d1.next = False
+            write_d2.next = False
+            navail.next = 0
             fbus.empty.next = True
-            state.next = states.empty
-
-        elif state == states.empty:
+        else:
             if write:
                 wptr.next = wptr + 1
-            state.next = states.active
-
-        elif state == states.active:
-            # once the data is through the fifo_mem pipeline stages
-            # mark the fifo as not empty.  The empty can be overwritten
-            # below if a read occurs and the FIFO should go empty
-            if wptrd != rptr:
-                fbus.empty.next = False
-
-            if read and not write:
-                fbus.full.next = False
-                if not fbus.empty:
-                    rptr.next = rptr + 1
-                if rptr+1 == wptrd:
-                    fbus.empty.next = True
-                    state.next = states.empty
-
-            elif write and not read:
-                if not fbus.full:
-                    wptr.next = wptr + 1
-                if wptr+1 == rptr:
-                    fbus.full.next = True
-                    state.next = states.full
-
-            elif write and read:
-                wptr.next = wptr + 1
+            if read:
                 rptr.next = rptr + 1
 
-        elif state == states.full:
-            if read and not write:
-                state.next = states.active
-                rptr.next = rptr + 1
-
-        else:
-            state.next = states.init
-
-        if fbus.clear:
-            state.next = states.init
+            # the FIFO is not empty once the data is through the
+            # fifo_mem pipeline stages
+            write_d1.next = write
+            write_d2.next = write_d1
+            a = int(navail)
+            if write_d2:
+                a = a + 1
+            if read:
+                a = a - 1
+            navail.next = a
+            fbus.empty.next = a == 0
 
     @always_comb
     def beh_assign():
-        fbus.read_valid.next = fbus.read and not fbus.empty
-                
-    nitems = fifosize
+        fbus.read_valid.next = read
+
+    # the FIFO occupancy, the number of empty and filled slots
     if fifo_sync.occupancy_assertions:
-        nvacant = Signal(intbv(fifosize, min=0, max=nitems+1))  # # empty slots
-        ntenant = Signal(intbv(0, min=0, max=nitems+1))         # # filled slots
+        nvacant = Signal(intbv(fifosize, min=0, max=fifosize+1))
+        ntenant = Signal(intbv(0, min=0, max=fifosize+1))
     else:
-        nitems = int(2 ** (ceil(log(nitems, 2))))
-        nvacant = Signal(modbv(nitems, min=0, max=nitems))
-        ntenant = Signal(modbv(0, min=0, max=nitems))
-
-    if fifo_sync.debug:
-        @always_seq(clock.posedge, reset=reset)
-        def dbg_occupancy():
-            if fbus.clear:
-                nvacant.next = fifosize   # the number of empty slots
-                ntenant.next = 0          # the number of full slots
-            else:
-                v = int(nvacant)
-                f = int(ntenant)
-
-                if fbus.read_valid:
-                    v = v + 1
-                    f = f - 1
-                if fbus.write:
-                    v = v -1
-                    f = f + 1
-
-                nvacant.next = v
-                ntenant.next = f
+        nvacant = Signal(modbv(fifosize, min=0, max=2*fifosize))
+        ntenant = Signal(modbv(0, min=0, max=2*fifosize))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_occupancy():
+        if fbus.clear:
+            nvacant.next = fifosize   # the number of empty slots
+            ntenant.next = 0          # the number of full slots
+            fbus.full.next = False
+        else:
+            v = int(nvacant)
+            f = int(ntenant)
+
+            if read:
+                v = v + 1
+                f = f - 1
+            if write:
+                v = v -1
+                f = f + 1
+
+            nvacant.next = v
+            ntenant.next = f
+            fbus.full.next = f == fifosize
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = ntenant >= afull
+        fbus.almost_empty.next = ntenant <= aempty
 
     # the FIFOBus count references the local signal
     fbus.count = ntenant
+    fbus.write_count = ntenant
 
     # @todo: will need to replace myhdl.instances with the
     #        conditional collection of inst/gens (see above)
@@ -175,5 +189,4 @@ def fifo_sync(glbl, fbus, size=128):
 
 # attached a generic fifo bus object to the module
 fifo_sync.fbus_intf = FIFOBus
-fifo_sync.debug = True
 fifo_sync.occupancy_assertions = True
@@ -0,0 +1,125 @@
+
+from __future__ import absolute_import, division
+
+import myhdl
+from myhdl import Signal, intbv, concat, always_comb, always_seq
+
+from rhea.system import FIFOBus
+
+
+@myhdl.block
+def fifo_width(clock_write, clock_read, reset, fbus, inner):
+    """ Asymmetric width FIFO adapter
+    Maps an asymmetric width FIFOBus (`fbus`) to the FIFOBus of a
+    FIFO (`inner`) with the wider of the two widths.  The narrow words
+    are packed into or unpacked from the wide words, the first narrow
+    word is the most significant part of the wide word.
+
+    Narrow writes (e.g. 8-in/32-out) are collected and the wide word
+    is written with the last narrow word, a wide word is read when it
+    is complete.  Narrow reads (e.g. 32-in/8-out) acknowledge a part
+    of the wide word, the wide word is read (acknowledged) with the
+    last part, the inner FIFO has to be a first-word-fall-through
+    (read acknowledge) FIFO.  In both cases the FIFO transfers a
+    narrow word each clock.
+
+    The flags and the counts are the inner FIFO flags and counts, the
+    counts are the number of wide words.
+
+    Arguments:
+        clock_write: the write clock, the narrow writes are packed
+        clock_read: the read clock, the narrow reads are unpacked
+        reset: system reset
+        fbus (FIFOBus): the asymmetric width FIFO bus
+        inner (FIFOBus): the FIFO bus of the wide FIFO
+    """
+    assert isinstance(fbus, FIFOBus)
+    assert isinstance(inner, FIFOBus)
+
+    nw, nr = fbus.width, fbus.read_width
+    wide, narrow = max(nw, nr), min(nw, nr)
+    assert wide % narrow == 0, "the widths have to be multiples"
+    assert inner.width == wide and inner.read_width == wide
+    nlanes = wide // narrow
+    lane = Signal(intbv(0, min=0, max=nlanes))
+
+    if nw < nr:
+        # the narrow words are shifted in, the wide word is written
+        # with the last narrow word
+        sreg = Signal(intbv(0)[wide:])
+        accept = Signal(bool(0))
+
+        @always_comb
+        def beh_accept():
+            accept.next = fbus.write and not inner.full
+
+        @always_comb
+        def beh_pack():
+            inner.write.next = accept and lane == nlanes-1
+            inner.write_data.next = concat(sreg[wide-narrow:0],
+                                           fbus.write_data)
+
+        @always_seq(clock_write.posedge, reset=reset)
+        def beh_lanes():
+            if fbus.clear:
+                lane.next = 0
+            elif accept:
+                sreg.next = concat(sreg[wide-narrow:0], fbus.write_data)
+                if lane == nlanes-1:
+                    lane.next = 0
+                else:
+                    lane.next = lane + 1
+
+        @always_comb
+        def beh_assign():
+            fbus.full.next = inner.full
+            fbus.almost_full.next = inner.almost_full
+            inner.read.next = fbus.read
+            fbus.read_data.next = inner.read_data
+            fbus.read_valid.next = inner.read_valid
+            fbus.empty.next = inner.empty
+            fbus.almost_empty.next = inner.almost_empty
+            inner.clear.next = fbus.clear
+
+    else:
+        # the parts of the wide word are selected, the wide word is
+        # acknowledged with the last part
+        ack = Signal(bool(0))
+
+        @always_comb
+        def beh_ack():
+            ack.next = fbus.read and not inner.empty
+
+        @always_comb
+        def beh_unpack():
+            dw = intbv(0)[wide:]
+            dw[:] = inner.read_data >> ((nlanes-1-lane)*narrow)
+            fbus.read_data.next = dw[narrow:0]
+            fbus.read_valid.next = ack
+            inner.read.next = ack and lane == nlanes-1
+
+        @always_seq(clock_read.posedge, reset=reset)
+        def beh_lanes():
+            if fbus.clear:
+                lane.next = 0
+            elif ack:
+                if lane == nlanes-1:
+                    lane.next = 0
+                else:
+                    lane.next = lane + 1
+
+        @always_comb
+        def beh_assign():
+            inner.write.next = fbus.write
+            inner.write_data.next = fbus.write_data
+            fbus.full.next = inner.full
+            fbus.almost_full.next = inner.almost_full
+            fbus.empty.next = inner.empty
+            fbus.almost_empty.next = inner.almost_empty
+            inner.clear.next = fbus.clear
+
+    # the counts are the inner (wide word) counts
+    fbus.count = inner.count
+    fbus.write_count = inner.write_count
+
+    return myhdl.instances()
@@ -1,41 +1,92 @@
-
 from __future__ import absolute_import
 
 import myhdl
-from myhdl import (Signal, intbv, enum, always_seq, always_comb,
-                   ConcatSignal)
+from myhdl import (Signal, intbv, enum, always_seq, always_comb, always,
+                   ConcatSignal, concat)
 
 from rhea.system import MemoryMapped, Barebone, FIFOBus
 from . import controller_basic
 
 
+@myhdl.block
+def crc16_ccitt(glbl, clear, enable, data, crc):
+    """ Byte-wise CRC-16-CCITT (poly 0x1021, init 0xFFFF)
+
+    The CRC is updated with `data` on each clock `enable` is active,
+    `clear` sets the CRC to the initial value.  If the CRC bytes
+    (big-endian) are included the result is zero.
+
+    Ports:
+      glbl: global signals, clock and reset
+      clear: set the CRC to the initial value
+      enable: update the CRC with the data byte
+      data: the data byte
+      crc: the current CRC
+
+    this module is convertible
+    """
+    clock, reset = glbl.clock, glbl.reset
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_crc():
+        cc = intbv(0)[16:]
+        if clear:
+            crc.next = 0xFFFF
+        elif enable:
+            cc[:] = crc ^ concat(data, intbv(0)[8:])
+            for ii in range(8):
+                if cc[15]:
+                    cc[:] = concat(cc[15:0], False) ^ 0x1021
+                else:
+                    cc[:] = concat(cc[15:0], False)
+            crc.next = cc
+
+    return beh_crc
+
+
 @myhdl.block
 def command_bridge(glbl, fifobus, mmbus):
     """ Convert a command packet to a memory-mapped bus transaction
-    
-    This module will decode the incomming packet and start a bus 
+
+    This module will decode the incomming packet and start a bus
     transaction, the memmap_controller_basic is used to generate
-    the bus transactions, it convertes the Barebone interface to 
-    the MemoryMapped interface being used. 
-    
+    the bus transactions, it convertes the Barebone interface to
+    the MemoryMapped interface being used.
+
     The variable length command packet is:
         00: 0xDE
         01: command byte (response msb indicates error)
-        02: address high byte 
-        03: address byte 
-        04: address byte 
-        05: address low byte 
-        06: length of data (max length 256 bytes)
+        02: address high byte
+        03: address byte
+        04: address byte
+        05: address low byte
+        06: length of data in bytes
         07: 0xCA   # sequence number, fixed for now
-        08: data high byte 
+        08: data high byte
         09: data byte
         10: data byte
         11: data low byte
-        Fixed 12 byte packet currently supported, future
-        to support block write/reads up to 256-8-4
-        12 - 253: write / read (big-endian)
-        @todo: last 2 bytes crc
-    The total packet length is 16 + data_length
+        12 - 259: block write / read data (big-endian)
+        last 2 bytes: CRC-16-CCITT (optional)
+
+    The command byte:
+        0x01: read a single word, the request includes 4 (ignored)
+              data bytes, the response is 12 bytes.
+        0x02: write a single word, the word is read back in the
+              12 byte response.
+        0x03: block read, the request is the 8 byte header, the
+              response is the header followed by `length` bytes.
+        0x04: block write, the request is the header followed by
+              `length` bytes, the response is the 8 byte header.
+        0x40: set in the command, a CRC trailer is appended to the
+              request and the response.
+        0x80: set in the response when an error occurred.
+
+    The block length is a multiple of 4 bytes, up to 252 bytes, the
+    address is incremented (by 4) after each word.  A block write is
+    buffered, nothing is written if the CRC does not match.  The
+    response is written a byte per cycle while the FIFO is not
+    `almost_full`.
 
     Ports:
       glbl: global signals and control
@@ -47,20 +98,21 @@ def command_bridge(glbl, fifobus, mmbus):
     assert isinstance(fifobus, FIFOBus)
     assert isinstance(mmbus, MemoryMapped)
 
-    clock, reset = glbl.clock, glbl.reset 
+    clock, reset = glbl.clock, glbl.reset
     bb = Barebone(glbl, data_width=mmbus.data_width,
                   address_width=mmbus.address_width)
-    
+
     states = enum(
         'idle',
         'wait_for_packet',   # receive a command packet
+        'packet_end',        # wait for the CRC of the last byte
         'check_packet',      # basic command check
         'write',             # bus write
         'write_end',         # end of the write cycle
         'read',              # read bus cycles for response
         'read_end',          # end of the read cycle
         'response',          # send response packet
-        'response_full',     # check of RX FIFO full
+        'response_full',     # wait for the FIFO full (and the CRC)
         'error',             # error occurred
         'end'                # end state
     )
@@ -68,7 +120,7 @@ def command_bridge(glbl, fifobus, mmbus):
     state = Signal(states.idle)
     ready = Signal(bool(0))
     error = Signal(bool(0))
-    bytecnt = intbv(0, min=0, max=256)
+    bytecnt = intbv(0, min=0, max=512)
 
     # known knows
     pidx = (0, 7,)
@@ -78,15 +130,39 @@ def command_bridge(glbl, fifobus, mmbus):
 
     bytemon = Signal(intbv(0)[8:])
 
-    # only supporting 12byte packets (single read/write) for now
-    packet_length = 12
-    data_offset = 8
-    packet = [Signal(intbv(0)[8:]) for _ in range(packet_length)]
+    # the packet header, the data is streamed through `word` and
+    # the block writes are buffered in `wmem`.
+    header_length = 8
+    max_length = 252
+    max_words = 64
+    packet = [Signal(intbv(0)[8:]) for _ in range(header_length)]
     command = packet[1]
     address = ConcatSignal(*packet[2:6])
-    data = ConcatSignal(*packet[8:12])
     datalen = packet[6]
 
+    word = Signal(intbv(0)[32:])
+    wmem = [Signal(intbv(0)[32:]) for _ in range(max_words)]
+    wmem_write = Signal(bool(0))
+    wmem_addr = Signal(intbv(0, min=0, max=max_words))
+    wmem_data = Signal(intbv(0)[32:])
+    wordcnt = Signal(intbv(0, min=0, max=max_words+1))
+    numwords = Signal(intbv(0, min=0, max=max_words+1))
+    addr = Signal(intbv(0)[32:])
+    block = Signal(bool(0))
+    have_word = Signal(bool(0))
+
+    # the request and response lengths, the end of the data in the
+    # request (rx) and response (tx) and the total length.
+    rx_data = Signal(intbv(0, min=0, max=512))
+    rx_length = Signal(intbv(0, min=0, max=512))
+    tx_data = Signal(intbv(0, min=0, max=512))
+    tx_length = Signal(intbv(0, min=0, max=512))
+
+    crc_clear, crc_enable = Signal(bool(0)), Signal(bool(0))
+    crc_data = Signal(intbv(0)[8:])
+    crc = Signal(intbv(0xFFFF)[16:])
+    crc_inst = crc16_ccitt(glbl, crc_clear, crc_enable, crc_data, crc)
+
     # convert generic memory-mapped bus to the memory-mapped interface
     # passed to the controller
     mmc_inst = controller_basic(bb, mmbus)
@@ -98,13 +174,53 @@ def command_bridge(glbl, fifobus, mmbus):
         else:
             fifobus.read.next = False
 
+    # the block write buffer (no reset, RAM)
+    @always(clock.posedge)
+    def beh_wmem():
+        if wmem_write:
+            wmem[wmem_addr].next = wmem_data
+
+    @always_comb
+    def beh_data_lengths():
+        if command[6:0] == 3:
+            rx_data.next = header_length
+            tx_data.next = header_length + datalen
+        elif command[6:0] == 4:
+            rx_data.next = header_length + datalen
+            tx_data.next = header_length
+        else:
+            rx_data.next = header_length + 4
+            tx_data.next = header_length + 4
+
+    @always_comb
+    def beh_lengths():
+        if command[6]:
+            rx_length.next = rx_data + 2
+        else:
+            rx_length.next = rx_data
+
+        # an error response is the header only
+        if command[7] and command[6]:
+            tx_length.next = header_length + 2
+        elif command[7]:
+            tx_length.next = header_length
+        elif command[6]:
+            tx_length.next = tx_data + 2
+        else:
+            tx_length.next = tx_data
+
     @always_seq(clock.posedge, reset=reset)
     def beh_state_machine():
+        crc_clear.next = False
+        crc_enable.next = False
+        wmem_write.next = False
 
         if state == states.idle:
             state.next = states.wait_for_packet
             ready.next = True
+            crc_clear.next = True
             bytecnt[:] = 0
+            wordcnt.next = 0
 
         elif state == states.wait_for_packet:
             if fifobus.read_valid:
@@ -118,46 +234,92 @@ def command_bridge(glbl, fifobus, mmbus):
                             error.next = True
                             state.next = states.error
 
-                packet[bytecnt].next = fifobus.read_data
+                if bytecnt < header_length:
+                    packet[bytecnt].next = fifobus.read_data
+                elif bytecnt < rx_data:
+                    # buffer the data words, the last byte of a word
+                    if bytecnt[2:0] == 3 and wordcnt < max_words:
+                        wmem_write.next = True
+                        wmem_addr.next = wordcnt[6:0]
+                        wmem_data.next = concat(word[24:0],
+                                                fifobus.read_data)
+                        wordcnt.next = wordcnt + 1
+                    word.next = concat(word[24:0], fifobus.read_data)
+
+                crc_data.next = fifobus.read_data
+                crc_enable.next = True
                 bytecnt[:] = bytecnt + 1
 
-            # @todo: replace 20 with len(CommandPacket().header)
-            if bytecnt == packet_length:
+            # the header (length) is known before the data is received
+            if bytecnt >= header_length and bytecnt == rx_length:
                 ready.next = False
-                state.next = states.check_packet
+                state.next = states.packet_end
+
+        elif state == states.packet_end:
+            state.next = states.check_packet
 
         elif state == states.check_packet:
-            # @todo: some packet checking
+            # the CRC of the last byte received is available, including
+            # the CRC bytes the CRC is zero.
             # @todo: need to support different address widths, use
             # @todo: `bb` attributes to determine which bits to assign
-            bb.per_addr.next = address[32:28]
-            bb.mem_addr.next = address[28:0]
+            addr.next = address
             assert bb.done
             bytecnt[:] = 0
+            crc_clear.next = True
+            have_word.next = False
+            block.next = command[6:0] == 3 or command[6:0] == 4
+            numwords.next = datalen[8:2]
+            wordcnt.next = 0
 
-            if command == 1:
-                state.next = states.read
-            elif command == 2:
-                bb.write_data.next = data
+            if command[6] and crc != 0:
+                packet[1].next = command | 0x80
+                state.next = states.response
+            elif command[6:0] == 1:
+                state.next = states.response
+            elif command[6:0] == 2:
                 state.next = states.write
+            elif command[6:0] == 3 or command[6:0] == 4:
+                if (datalen == 0 or datalen[2:0] != 0 or
+                        datalen > max_length):
+                    packet[1].next = command | 0x80
+                    state.next = states.response
+                elif command[6:0] == 3:
+                    state.next = states.response
+                else:
+                    state.next = states.write
             else:
-                error.next = True
-                state.next = states.error
+                packet[1].next = command | 0x80
+                state.next = states.response
 
         elif state == states.write:
             # @todo: add timeout
             if bb.done:
+                bb.per_addr.next = addr[32:28]
+                bb.mem_addr.next = addr[28:0]
+                bb.write_data.next = wmem[wordcnt[6:0]]
                 bb.write.next = True
+                wordcnt.next = wordcnt + 1
                 state.next = states.write_end
 
         elif state == states.write_end:
             bb.write.next = False
             if bb.done:
-                state.next = states.read
+                if block:
+                    addr.next = addr + 4
+                    if wordcnt == numwords:
+                        state.next = states.response
+                    else:
+                        state.next = states.write
+                else:
+                    # single write, read back for the response
+                    state.next = states.response
 
         elif state == states.read:
             # @todo: add timeout
             if bb.done:
+                bb.per_addr.next = addr[32:28]
+                bb.mem_addr.next = addr[28:0]
                 bb.read.next = True
                 state.next = states.read_end
 
@@ -165,23 +327,47 @@ def command_bridge(glbl, fifobus, mmbus):
             bb.read.next = False
             if bb.done:
                 # @todo: support different data_width bus
-                packet[data_offset+0].next = bb.read_data[32:24]
-                packet[data_offset+1].next = bb.read_data[24:16]
-                packet[data_offset+2].next = bb.read_data[16:8]
-                packet[data_offset+3].next = bb.read_data[8:0]
+                word.next = bb.read_data
+                have_word.next = True
+                if block:
+                    addr.next = addr + 4
                 state.next = states.response
 
         elif state == states.response:
             fifobus.write.next = False
-            if bytecnt < packet_length:
-                if not fifobus.full:
+            if bytecnt < tx_length:
+                if (bytecnt >= header_length and bytecnt < tx_data and
+                        bytecnt[2:0] == 0 and not have_word and
+                        not command[7]):
+                    # the next word in the response is read
+                    state.next = states.read
+                elif not fifobus.full:
                     fifobus.write.next = True
-                    fifobus.write_data.next = packet[bytecnt]
+                    if bytecnt < header_length:
+                        fifobus.write_data.next = packet[bytecnt]
+                        crc_data.next = packet[bytecnt]
+                        crc_enable.next = True
+                    elif bytecnt < tx_data and not command[7]:
+                        fifobus.write_data.next = word[32:24]
+                        crc_data.next = word[32:24]
+                        crc_enable.next = True
+                        word.next = concat(word[24:0], intbv(0)[8:])
+                        if bytecnt[2:0] == 3:
+                            have_word.next = False
+                    elif bytecnt == tx_length - 2:
+                        # the CRC includes the byte sent two cycles ago
+                        fifobus.write_data.next = crc[16:8]
+                    else:
+                        fifobus.write_data.next = crc[8:0]
                     bytecnt[:] = bytecnt + 1
-                state.next = states.response_full
+                    # the header and data bytes are written each cycle
+                    # until the FIFO is almost full, the CRC bytes
+                    # wait for the CRC of the last byte.
+                    if fifobus.almost_full or bytecnt >= tx_length - 2:
+                        state.next = states.response_full
             else:
                 state.next = states.end
-                
+
         elif state == states.response_full:
             fifobus.write.next = False
             state.next = states.response
@@ -199,6 +385,7 @@ def command_bridge(glbl, fifobus, mmbus):
         else:
             assert False, "Invalid state %s" % (state,)
 
-        bytemon.next = bytecnt
+        bytemon.next = bytecnt[8:0]
 
-    return beh_fifo_read, mmc_inst, beh_state_machine
+    return (beh_fifo_read, mmc_inst, crc_inst, beh_wmem, beh_data_lengths,
+            beh_lengths, beh_state_machine)
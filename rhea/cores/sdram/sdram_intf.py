@@ -23,6 +23,7 @@ class SDRAMInterface(object):
 
     addr_width = 12   # SDRAM address width
     data_width = 16   # SDRAM data width
+    col_width = 9     # SDRAM column address width
 
     def __init__(self, num_banks=4, addr_width=12, data_width=16, ver='sdr'):
 
@@ -127,7 +128,7 @@ class SDRAMInterface(object):
             elif not ras and not cas and we:
                 cmd = self.Commands.REF
             elif not ras and not cas and not we:
-                cmd = self.Commands.LRM
+                cmd = self.Commands.LMR
         return cmd
 
     def _set_cmd(self, cmd):
@@ -148,6 +149,14 @@ class SDRAMInterface(object):
         self.we.next = True
         yield self.clk.posedge
 
+    def _precharge(self, all_banks=False):
+        self.addr.next = 1 << 10 if all_banks else 0
+        self.cs.next = False
+        self.ras.next = False
+        self.cas.next = True
+        self.we.next = False
+        yield self.clk.posedge
+
     def _write(self, addr, val):
         self.addr.next = addr
         self.wdq.next = val     # transaction bus only
@@ -186,6 +195,9 @@ class SDRAMInterface(object):
         yield self._nop()
         yield self._write(col_addr, val)
         yield self._nop()
+        yield self._nop()
+        yield self._precharge()
+        yield self._nop()
         self.cke.next = False
 
     def read(self, row_addr, col_addr, bankid=0, burst=1):
@@ -205,6 +217,9 @@ class SDRAMInterface(object):
         yield self._nop()
         yield self._read(col_addr)
         yield self._nop()
+        yield self._nop()
+        yield self._precharge()
+        yield self._nop()
         self.cke.next = False
         self.read_data = int(self.rdq)
 
@@ -1,84 +1,583 @@
-
+from __future__ import division
 from __future__ import absolute_import
 
+from math import ceil
+
 import myhdl
-from myhdl import intbv, enum, Signal, ResetSignal, always_seq
+from myhdl import (intbv, modbv, enum, Signal, ResetSignal, always,
+                   always_comb, always_seq, concat)
 
 from rhea import Clock
+from rhea.system import MemoryMapped, AvalonMM, FIFOBus
 from .sdram_intf import SDRAMInterface
 
 
+# the SDRAM commands, (cs, ras, cas, we)
+CMD_LMR, CMD_REF, CMD_PRE, CMD_ACT = 0b0000, 0b0001, 0b0010, 0b0011
+CMD_WR, CMD_RD, CMD_NOP = 0b0100, 0b0101, 0b0111
+
+
 @myhdl.block
-def sdram_sdr_controller(clock, reset, ibus, extram, refresh=True):
+def sdram_sdr_controller(clock, reset, ibus, extram, refresh=True,
+                         cas_latency=2, bank_interleave=True,
+                         burst_length=8):
     """ SDRAM controller
     This module is an SDRAM controller to interface and control
-    SDRAM modules.  This module contains a state-machine that 
+    SDRAM modules.  This module contains a state-machine that
     controls the different SDRAM modes including refresh etc.
 
     This module provides the translation from a flat memory-mapped
-    bus (e.g. Wishbone, Avalon, AXI, etc.) to the SDRAM interface.
-    Also intended to support memory-mapped and streaming (FIFO
-    mode).  In streaming / FIFO mode the external memory acts as
-    one large FIFO.  The SDRAM controller type is determine by
-    the internal interface (ibus) passed.
-
-    This SDRAM controller is a port of the Xess SDRAM controller
-    for the Xula boards.
+    bus or a streaming (FIFO) port to the SDRAM interface.  The
+    SDRAM controller type is determined by the internal interface
+    (ibus) passed:
+
+      AvalonMM (pipelined): a command each cycle `waitrequest` is
+        not active, read and write bursts (`burstcount`) and the
+        read data returned with `readdatavalid`.
+      MemoryMapped: any other memory-mapped bus, single transfers
+        through the generic (Barebone) bus.
+      FIFOBus: the external memory acts as one large FIFO, writes
+        are accepted while not `full` and reads while not `empty`,
+        the read data is returned with `read_valid` (variable
+        latency).  The reads and writes are grouped in runs of
+        `burst_length` words.
+
+    The SDRAM is programmed for single word bursts, a burst on the
+    internal bus is a column command each cycle (gapless, and a
+    burst can cross rows and banks).  The open row of each bank is
+    tracked, an access to an open row is a single cycle, a row miss
+    precharges the bank and activates the row.  With the bank
+    interleave the internal (word) address is row | bank | column,
+    sequential accesses move through the banks and the rows of the
+    other banks stay open.
+
+    Refreshes are scheduled on the refresh interval but postponed
+    (up to 8) while there are requests, a refresh is issued when
+    the internal bus is idle or when the postponed limit is
+    reached.
+
+    This SDRAM controller was started as a port of the Xess SDRAM
+    controller for the Xula boards.
     https://github.com/xesscorp/XuLA/blob/master/FPGA/XuLA_lib/SdramCntl.vhd
+
+    Arguments:
+        clock: system clock, also the SDRAM clock
+        reset: system reset
+        ibus (AvalonMM, MemoryMapped, FIFOBus): the internal interface
+        extram (SDRAMInterface): the SDRAM interface
+        refresh (bool): schedule the periodic refreshes
+        cas_latency (int): the CAS latency programmed
+        bank_interleave (bool): the bank bits between the row and
+            column bits of the internal address.
+        burst_length (int): FIFOBus, the number of words read or
+            written before the direction changes.
     """
+    sdram = extram
+    assert isinstance(sdram, SDRAMInterface)
+    assert cas_latency in (1, 2, 3)
 
-    States = enum('INITWAIT', 'INITPCHG', 'INITSETMODE', 'INITRFSH', 
-                  'RW', 'ACTIVATE', 'REFRESHROW', 'SELFREFRESH')
+    # the internal request (word address) and the read response
+    cw, rw = sdram.col_width, sdram.addr_width
+    bw = (sdram.num_banks-1).bit_length()
+    aw, dw = cw + bw + rw, sdram.data_width
+    req_valid, req_write, req_ready = [Signal(bool(0)) for _ in range(3)]
+    req_addr = Signal(intbv(0)[aw:])
+    req_data = Signal(intbv(0)[dw:])
+    rsp_valid = Signal(bool(0))
+    rsp_data = Signal(intbv(0)[dw:])
 
-    # @todo: changed to named constants
-    Commands = enum('nop', 'active', 'read', 'write', 
-                    'pchg', 'mode', 'rfsh',
-                    encoding='binary')
+    if isinstance(ibus, FIFOBus):
+        port_inst = _fifo_port(clock, reset, ibus, req_valid, req_write,
+                               req_addr, req_data, req_ready, rsp_valid,
+                               rsp_data, burst_length)
+    elif isinstance(ibus, AvalonMM) and ibus.pipelined:
+        port_inst = _avalon_port(clock, reset, ibus, req_valid, req_write,
+                                 req_addr, req_data, req_ready, rsp_valid,
+                                 rsp_data)
+    else:
+        assert isinstance(ibus, MemoryMapped)
+        port_inst = _generic_port(clock, reset, ibus, req_valid, req_write,
+                                  req_addr, req_data, req_ready, rsp_valid,
+                                  rsp_data)
 
-    cmdlut = (intbv('011100')[5:], 
-              intbv('001100')[5:],
-              intbv('010100')[5:],
-              intbv('010000')[5:],
-              intbv('001000')[5:],
-              intbv('000000')[5:],
-              intbv('000100')[5:])
+    # the timing parameters in clock cycles, minimum times round up
+    def cycles(key, default=1):
+        if key not in sdram.timing:
+            return default
+        cyc = int(ceil(round(sdram.timing[key]*(clock.frequency/1e9), 6)))
+        return max(cyc, 1)
 
-    sdram = extram
-    sdram.cmd = Signal(intbv(0)[5:])
+    tinit, trp, trcd = cycles('init'), cycles('rp'), cycles('rcd')
+    tras, trfc, twr = cycles('ras'), cycles('rfc'), cycles('wr')
+    tmrd = 2
+    # the refresh interval for each row, a max time round down
+    tref = int(sdram.timing['ref']*(clock.frequency/1e9)) // 2**rw
+    max_postponed = 8
+    mode = cas_latency << 4    # single word bursts, sequential
 
-    timer = Signal(intbv(0, min=0, max=sdram.cyc_init))
-    ras_timer = Signal(intbv(0, min=0, max=sdram.cyc_ras))
-    wr_timer = Signal(intbv(0, min=0, max=sdram.cyc_wr))
-    
+    States = enum('INITWAIT', 'INITPCHG', 'INITRFSH', 'INITSETMODE',
+                  'RW', 'REFRESHROW')
     state = Signal(States.INITWAIT)
 
+    # a general wait timer, the commands in RW are issued when the
+    # timer has expired.
+    timer = Signal(intbv(0, min=0, max=max(tinit, trfc, trp, trcd)+1))
+    init_rfsh = Signal(bool(0))
+
+    # the open row of each bank and the number of cycles before the
+    # bank can be precharged (tRAS and tWR).
+    nbanks = sdram.num_banks
+    row_open = [Signal(bool(0)) for _ in range(nbanks)]
+    open_row = [Signal(intbv(0)[rw:]) for _ in range(nbanks)]
+    pre_cnt = [Signal(intbv(0, min=0, max=max(tras, twr)+1))
+               for _ in range(nbanks)]
+
+    # the refresh interval and the number of refreshes postponed
+    rfsh_timer = Signal(intbv(0, min=0, max=tref+1))
+    rfsh_pending = Signal(intbv(0, min=0, max=max_postponed+1))
+    rfsh_force = Signal(bool(0))
+
+    # the read data in the SDRAM pipeline (CAS latency)
+    rd_pipe = Signal(intbv(0)[cas_latency+1:])
+    rd_busy = Signal(bool(0))
+
+    # the request bank, row, and column
+    req_bank = Signal(intbv(0, min=0, max=nbanks))
+    req_row = Signal(intbv(0)[rw:])
+    req_col = Signal(intbv(0)[cw:])
+    hit = Signal(bool(0))
+
+    # the command to the SDRAM
+    cmd = Signal(intbv(CMD_NOP)[4:])
+    cke = Signal(bool(0))
+    bs = Signal(intbv(0)[len(sdram.bs):])
+    addr = Signal(intbv(0)[len(sdram.addr):])
+
+    @always_comb
+    def beh_request():
+        req_col.next = req_addr[cw:0]
+        if bank_interleave:
+            req_bank.next = req_addr[cw+bw:cw]
+            req_row.next = req_addr[aw:cw+bw]
+        else:
+            req_row.next = req_addr[cw+rw:cw]
+            req_bank.next = req_addr[aw:cw+rw]
+
+    @always_comb
+    def beh_hit():
+        hit.next = row_open[req_bank] and open_row[req_bank] == req_row
+
+    @always_comb
+    def beh_busy():
+        rfsh_force.next = rfsh_pending == max_postponed
+        rd_busy.next = rd_pipe[cas_latency:0] != 0
+
+    @always_comb
+    def beh_ready():
+        # a write waits for the read data in the pipeline
+        if (state == States.RW and timer == 0 and hit and
+                not rfsh_force and not (req_write and rd_busy)):
+            req_ready.next = True
+        else:
+            req_ready.next = False
+
+    @always(clock.posedge)
+    def beh_sdram_controller():
+        if reset == int(reset.active):
+            state.next = States.INITWAIT
+            timer.next = tinit - 1
+            init_rfsh.next = False
+            cmd.next = CMD_NOP
+            cke.next = False
+            for ii in range(nbanks):
+                row_open[ii].next = False
+                pre_cnt[ii].next = 0
+            rfsh_timer.next = tref
+            rfsh_pending.next = 0
+            rd_pipe.next = 0
+            sdram.dqo.next = None
+        else:
+            # defaults
+            cmd.next = CMD_NOP
+            cke.next = True
+            rdcmd = False
+            sdram.dqo.next = None
+
+            if timer != 0:
+                timer.next = timer - 1
+            for ii in range(nbanks):
+                if pre_cnt[ii] != 0:
+                    pre_cnt[ii].next = pre_cnt[ii] - 1
+
+            # the refresh interval, the refreshes are postponed
+            pending = int(rfsh_pending)
+            if refresh and state == States.RW:
+                if rfsh_timer == 0:
+                    rfsh_timer.next = tref
+                    if pending < max_postponed:
+                        pending = pending + 1
+                else:
+                    rfsh_timer.next = rfsh_timer - 1
+
+            # all the banks can be precharged and any row is open
+            pchg_ok = True
+            any_open = False
+            for ii in range(nbanks):
+                if pre_cnt[ii] != 0:
+                    pchg_ok = False
+                if row_open[ii]:
+                    any_open = True
+
+            if state == States.INITWAIT:
+                # the clock is stable and NOPs for the init interval
+                if timer == 0:
+                    cmd.next = CMD_PRE
+                    addr.next = 1 << 10    # all banks
+                    timer.next = trp - 1
+                    state.next = States.INITPCHG
+
+            elif state == States.INITPCHG:
+                if timer == 0:
+                    cmd.next = CMD_REF
+                    timer.next = trfc - 1
+                    init_rfsh.next = False
+                    state.next = States.INITRFSH
+
+            elif state == States.INITRFSH:
+                # two refresh cycles and the mode register
+                if timer == 0:
+                    if not init_rfsh:
+                        cmd.next = CMD_REF
+                        timer.next = trfc - 1
+                        init_rfsh.next = True
+                    else:
+                        cmd.next = CMD_LMR
+                        bs.next = 0
+                        addr.next = mode
+                        timer.next = tmrd - 1
+                        state.next = States.INITSETMODE
+
+            elif state == States.INITSETMODE:
+                if timer == 0:
+                    state.next = States.RW
+
+            elif state == States.RW:
+                if timer != 0:
+                    pass
+
+                elif pending != 0 and (rfsh_force or not req_valid):
+                    # refresh, close all the rows first
+                    if not any_open:
+                        cmd.next = CMD_REF
+                        timer.next = trfc - 1
+                        pending = pending - 1
+                    elif pchg_ok:
+                        cmd.next = CMD_PRE
+                        addr.next = 1 << 10
+                        for ii in range(nbanks):
+                            row_open[ii].next = False
+                        timer.next = trp - 1
+                        state.next = States.REFRESHROW
+
+                elif req_valid and hit:
+                    # a column command to the open row
+                    if req_ready:
+                        bs.next = req_bank
+                        addr.next = req_col
+                        if req_write:
+                            cmd.next = CMD_WR
+                            sdram.dqo.next = req_data
+                            sdram.wdq.next = req_data
+                            if pre_cnt[req_bank] < twr:
+                                pre_cnt[req_bank].next = twr
+                        else:
+                            cmd.next = CMD_RD
+                            rdcmd = True
+
+                elif req_valid and row_open[req_bank]:
+                    # another row is open in the bank, precharge
+                    if pre_cnt[req_bank] == 0:
+                        cmd.next = CMD_PRE
+                        bs.next = req_bank
+                        addr.next = 0
+                        row_open[req_bank].next = False
+                        timer.next = trp - 1
+
+                elif req_valid:
+                    # activate the row
+                    cmd.next = CMD_ACT
+                    bs.next = req_bank
+                    addr.next = req_row
+                    row_open[req_bank].next = True
+                    open_row[req_bank].next = req_row
+                    pre_cnt[req_bank].next = tras - 1
+                    timer.next = trcd - 1
+
+            elif state == States.REFRESHROW:
+                if timer == 0:
+                    cmd.next = CMD_REF
+                    timer.next = trfc - 1
+                    pending = pending - 1
+                    state.next = States.RW
+
+            rfsh_pending.next = pending
+            rd_pipe.next = concat(rd_pipe[cas_latency:0], rdcmd)
+
     @always_seq(clock.posedge, reset=reset)
-    def rtl_sdram_controller():
-        
-        # this is one big state-machine but ...
-        if state == States.INITWAIT:
-            if sdram.lock:
-                timer.next = sdram.cyc_init
-                state.next = States.initpchg
+    def beh_read_data():
+        rsp_valid.next = False
+        if rd_pipe[cas_latency]:
+            rsp_valid.next = True
+            rsp_data.next = sdram.dq
+
+    @always_comb
+    def beh_sdram_outputs():
+        sdram.cke.next = cke
+        sdram.cs.next = cmd[3]
+        sdram.ras.next = cmd[2]
+        sdram.cas.next = cmd[1]
+        sdram.we.next = cmd[0]
+        sdram.bs.next = bs
+        sdram.addr.next = addr
+        sdram.dqm.next = False
+        sdram.dqml.next = False
+        sdram.dqmh.next = False
+
+    return myhdl.instances()
+
+
+@myhdl.block
+def _avalon_port(clock, reset, ibus, req_valid, req_write, req_addr,
+                 req_data, req_ready, rsp_valid, rsp_data):
+    """ Avalon-MM (pipelined) to the controller requests
+
+    Each read and write, and each beat of a burst, is a request.  A
+    read burst is a request each cycle (the bus waits), the read
+    data is returned in order with `readdatavalid`.
+    """
+    av = ibus
+    aw = len(req_addr)
+    nbytes = len(av.byteenable)
+    shift = (nbytes-1).bit_length()
+    assert len(av.writedata) == len(req_data), \
+        "the bus and SDRAM data widths need to match"
+    assert len(av.address) >= aw + shift
+
+    readdata = Signal(intbv(0)[len(av.readdata):])
+    readdatavalid, waitrequest = Signal(bool(0)), Signal(bool(0))
+    av.add_output_bus('sdram', readdata, readdatavalid, waitrequest)
+
+    # the burst in progress, the word address and the beats left
+    bread, bwrite = Signal(bool(0)), Signal(bool(0))
+    baddr = Signal(modbv(0)[aw:])
+    bcnt = Signal(intbv(0, min=0, max=av.max_burst+1))
+
+    @always_comb
+    def beh_request():
+        if bread:
+            req_valid.next = True
+            req_write.next = False
+            req_addr.next = baddr
+        elif bwrite:
+            req_valid.next = av.write
+            req_write.next = True
+            req_addr.next = baddr
+        else:
+            req_valid.next = av.read or av.write
+            req_write.next = av.write
+            req_addr.next = av.address[aw+shift:shift]
+        req_data.next = av.writedata
+
+    @always_comb
+    def beh_outputs():
+        waitrequest.next = bread or (req_valid and not req_ready)
+        readdata.next = rsp_data
+        readdatavalid.next = rsp_valid
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_burst():
+        if req_valid and req_ready:
+            if bread or bwrite:
+                baddr.next = baddr + 1
+                bcnt.next = bcnt - 1
+                if bcnt == 1:
+                    bread.next = False
+                    bwrite.next = False
+            elif av.burstcount > 1:
+                baddr.next = req_addr + 1
+                bcnt.next = av.burstcount - 1
+                bread.next = av.read
+                bwrite.next = av.write
+
+    return beh_request, beh_outputs, beh_burst
+
+
+@myhdl.block
+def _generic_port(clock, reset, ibus, req_valid, req_write, req_addr,
+                  req_data, req_ready, rsp_valid, rsp_data):
+    """ generic (Barebone) bus to the controller requests
+
+    A single transfer at a time, `done` is active when the write is
+    accepted or the read data returned.
+    """
+    generic = ibus.get_generic()
+    conv_inst = ibus.map_to_generic(generic)
+    bb = generic
+    aw = len(req_addr)
+    nbytes = max(1, len(bb.write_data) // 8)
+    shift = (nbytes-1).bit_length()
+    baddr = Signal(intbv(0)[len(bb.per_addr)+len(bb.mem_addr):])
+    assert len(bb.write_data) == len(req_data), \
+        "the bus and SDRAM data widths need to match"
+
+    inprog, pending, pwrite = [Signal(bool(0)) for _ in range(3)]
+    paddr = Signal(intbv(0)[aw:])
+    pdata = Signal(intbv(0)[len(req_data):])
+
+    @always_comb
+    def beh_address():
+        baddr.next = concat(bb.per_addr, bb.mem_addr)
+
+    @always_comb
+    def beh_request():
+        req_valid.next = pending
+        req_write.next = pwrite
+        req_addr.next = paddr
+        req_data.next = pdata
+        bb.done.next = not inprog and not (bb.write or bb.read)
+        bb.read_data.next = rsp_data
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_transfer():
+        if not inprog:
+            if bb.write or bb.read:
+                inprog.next = True
+                pending.next = True
+                pwrite.next = bb.write
+                paddr.next = baddr[aw+shift:shift]
+                pdata.next = bb.write_data
+        else:
+            if pending and req_ready:
+                pending.next = False
+                if pwrite:
+                    inprog.next = False
+            if rsp_valid:
+                inprog.next = False
+
+    return conv_inst, beh_address, beh_request, beh_transfer
+
+
+@myhdl.block
+def _fifo_port(clock, reset, ibus, req_valid, req_write, req_addr,
+               req_data, req_ready, rsp_valid, rsp_data, burst_length):
+    """ FIFOBus streaming port to the controller requests
+
+    The writes are staged in a register and written at the write
+    pointer, the reads (while not `empty`) are queued and read at
+    the read pointer.  The direction is held for `burst_length`
+    words while there are requests in the direction.
+    """
+    fbus = ibus
+    aw = len(req_addr)
+    depth = 2**aw - 1
+    assert fbus.width == len(req_data), \
+        "the FIFOBus and SDRAM data widths need to match"
+
+    wptr, rptr = [Signal(modbv(0)[aw:]) for _ in range(2)]
+    # the number of words in the FIFO and the reads not issued
+    count = Signal(intbv(0, min=0, max=depth+1))
+    rd_pend = Signal(intbv(0, min=0, max=depth+1))
+
+    # the staged write
+    wvalid = Signal(bool(0))
+    wdata = Signal(intbv(0)[len(req_data):])
+
+    # the current direction and the words in the direction
+    dirw = Signal(bool(1))
+    nbeats = Signal(intbv(0, min=0, max=burst_length+1))
+    sel_write, sel_read = Signal(bool(0)), Signal(bool(0))
+
+    @always_comb
+    def beh_select():
+        # only the words written to the memory are read
+        readable = rd_pend != 0 and rptr != wptr
+        wsel = wvalid and (dirw or not readable)
+        sel_write.next = wsel
+        sel_read.next = readable and not wsel
+
+    @always_comb
+    def beh_request():
+        req_valid.next = sel_write or sel_read
+        req_write.next = sel_write
+        if sel_write:
+            req_addr.next = wptr
+        else:
+            req_addr.next = rptr
+        req_data.next = wdata
+        fbus.full.next = count == depth or (
+            wvalid and not (sel_write and req_ready))
+        fbus.empty.next = count == 0
+        fbus.read_data.next = rsp_data
+        fbus.read_valid.next = rsp_valid
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_fifo():
+        accept = req_valid and req_ready
+        written = fbus.write and not fbus.full
+        requested = fbus.read and not fbus.empty
+
+        # the staged write
+        if written:
+            wvalid.next = True
+            wdata.next = fbus.write_data
+        elif accept and sel_write:
+            wvalid.next = False
+
+        # the pointers, the queued reads, and the words in the FIFO
+        if accept and sel_write:
+            wptr.next = wptr + 1
+        if accept and sel_read:
+            rptr.next = rptr + 1
+        if requested and not (accept and sel_read):
+            rd_pend.next = rd_pend + 1
+        elif accept and sel_read and not requested:
+            rd_pend.next = rd_pend - 1
+        if written and not requested:
+            count.next = count + 1
+        elif requested and not written:
+            count.next = count - 1
+
+        # the direction changes after the burst length or when
+        # the other direction is used.
+        if accept:
+            if sel_write != dirw:
+                dirw.next = sel_write
+                nbeats.next = 1
+            elif nbeats == burst_length-1:
+                dirw.next = not dirw
+                nbeats.next = 0
             else:
-                sdram.sd_cke.next = False
-            sdram.status.next = 1
+                nbeats.next = nbeats + 1
+
+        if fbus.clear:
+            wptr.next = 0
+            rptr.next = 0
+            count.next = 0
+            rd_pend.next = 0
+            wvalid.next = False
 
-        elif state == States.INITPCHG:
-            sdram.cmd.next = Commands.PCHG
-            # sdram.addr[CMDBITS] = Commands.ALL_BANKS
-            timer.next = sdram.cycles
+    # the FIFOBus count references the local signal
+    fbus.count = count
+    fbus.write_count = count
 
-    return rtl_sdram_controller
+    return beh_select, beh_request, beh_fifo
 
 
 # default portmap
 clock = Clock(0, frequency=100e6)
 sdram_sdr_controller.portmap = {
-    'clock': clock, 
+    'clock': clock,
     'reset': ResetSignal(0, active=0, async=False),
     'ibus': None,
-    'extmem': SDRAMInterface(clock)
+    'extmem': SDRAMInterface()
 }
-
-
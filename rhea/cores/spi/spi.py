@@ -96,7 +96,6 @@ def spi_controller(
 
     # FIFO for the wishbone data transfer
     if include_fifo:
-        fifo_fast.debug = spi_controller.debug
         fifo_tx_inst = fifo_fast(glbl, fifobus=itx, size=fifosize)
         fifo_rx_inst = fifo_fast(glbl, fifobus=irx, size=fifosize)
 
@@ -250,10 +249,12 @@ def spi_controller(
         else:
             # data comes from external FIFO bus interface
             fifobus.full.next = itx.full
+            fifobus.almost_full.next = itx.almost_full
             itx.write_data.next = fifobus.write_data
             itx.write.next = fifobus.write
 
             fifobus.empty.next = irx.empty
+            fifobus.almost_empty.next = irx.almost_empty
             fifobus.read_data.next = irx.read_data
             fifobus.read_valid.next = irx.read_valid
             irx.read.next = fifobus.read
@@ -66,6 +66,7 @@ def uartlite(glbl, fifobus, serial_in, serial_out, baudrate=115200, fifosize=16)
         # whenever available by checking the queue
         fbusrx.read.next = fifobus.read
         fifobus.empty.next = fbusrx.empty
+        fifobus.almost_empty.next = fbusrx.almost_empty
         fifobus.read_data.next = fbusrx.read_data
         fifobus.read_valid.next = fbusrx.read_valid
 
@@ -80,5 +81,6 @@ def uartlite(glbl, fifobus, serial_in, serial_out, baudrate=115200, fifosize=16)
         fbustx.write.next = fifobus.write & (not fbustx.full)
         fbustx.write_data.next = fifobus.write_data
         fifobus.full.next = fbustx.full
+        fifobus.almost_full.next = fbustx.almost_full
 
     return myhdl.instances()
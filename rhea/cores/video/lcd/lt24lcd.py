@@ -71,8 +71,6 @@ def lt24lcd(glbl, vmem, lcd):
     num_hor_pxl, num_ver_pxl = resolution
     print("resolution {}x{} = {} number of pixes".format(
           num_hor_pxl, num_ver_pxl, number_of_pixels))
-    hcnt = intbv(0, min=0, max=num_hor_pxl)
-    vcnt = intbv(0, min=0, max=num_ver_pxl)
 
     # signals to start a new command transaction to the LCD
     datalen = Signal(intbv(0, min=0, max=number_of_pixels+1))
@@ -156,32 +154,17 @@ def lt24lcd(glbl, vmem, lcd):
             state.next =states.display_update
 
         elif state == states.display_update:
+            # the first pixel, the pixel address is reset at the start
             assert cmd_in_progress
-            if vcnt == num_ver_pxl-1:
-                hcnt[:] = 0
-                vcnt[:] = 0
-            elif hcnt == num_hor_pxl-1:
-                hcnt[:] = 0
-                vcnt[:] = vcnt + 1
-            else:
-                hcnt[:] = hcnt + 1
-
-            # this will be the pixel for the next write cycle
-            vmem.hpxl.next = hcnt
-            vmem.vpxl.next = vcnt
-
-            # this is the pixel for the current write cycle
-            if hcnt == 0 and vcnt == 0:
-                cmd.next = 0
-                state.next = states.display_update_end
-            else:
-                data.next = concat(vmem.red, vmem.green, vmem.blue)
-                state.next = states.display_update_next
+            data.next = concat(vmem.red, vmem.green, vmem.blue)
+            state.next = states.display_update_next
 
         elif state == states.display_update_next:
             if cmd_in_progress:
+                # the driver latches the next pixel the cycle after
+                # it strobes `datasent`
                 if datasent and not datalast:
-                    state.next = states.display_update
+                    data.next = concat(vmem.red, vmem.green, vmem.blue)
             else:
                 cmd.next = 0
                 state.next = states.display_update_end
@@ -191,6 +174,28 @@ def lt24lcd(glbl, vmem, lcd):
             if not cmd_in_progress:
                 state.next = states.display_update_start
 
+    # --------------------------------------------------------
+    # the address of the next pixel, the video memory pixel is
+    # registered and is available the cycle after the address.  The
+    # address advances when a pixel is loaded, the driver takes a
+    # pixel at most every other cycle.
+    @always_seq(clock.posedge, reset=reset)
+    def beh_pixel_address():
+        if state == states.display_update_start:
+            vmem.hpxl.next = 0
+            vmem.vpxl.next = 0
+        elif (state == states.display_update or
+              (state == states.display_update_next and
+               datasent and not datalast)):
+            if vmem.hpxl == num_hor_pxl-1:
+                vmem.hpxl.next = 0
+                if vmem.vpxl == num_ver_pxl-1:
+                    vmem.vpxl.next = 0
+                else:
+                    vmem.vpxl.next = vmem.vpxl + 1
+            else:
+                vmem.hpxl.next = vmem.hpxl + 1
+
     return myhdl.instances()
 
 
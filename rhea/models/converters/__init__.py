@@ -1,4 +1,5 @@
 
 from __future__ import absolute_import
 
-from .adc128s022_model import adc128s022_model
\ No newline at end of file
+from .adc128s022_model import adc128s022_model, ADC128S022
+from .waveform import WaveformSource, sine_snr, enob
@@ -1,94 +1,112 @@
 
+import numpy as np
+
 import myhdl
-from myhdl import (Signal, intbv, enum, instance, always, delay,
-                   concat, now, instances)
+from myhdl import intbv, now, SignalType
+
+from rhea.models.spi import SPISlaveModel
 
 
 def convert(analog, rails=(0, 3.3)):
     sample_max = (2**12)-1
-    sample_min = 0  
+    sample_min = 0
     sample = intbv(0)[12:]
-    smp = (analog - rails[0])/rails[1] * ((2**12)-1)
+    smp = (analog - rails[0])/(rails[1] - rails[0]) * ((2**12)-1)
     smp = min(sample_max, smp)
     smp = max(sample_min, smp)
-    sample[:] = smp 
+    sample[:] = smp
     return sample  # digital
-    
+
+
+class ADC128S022(SPISlaveModel):
+    def __init__(self, analog_channels, vref_pos=3.3, vref_neg=0.,
+                 verbose=False):
+        """ ADC128S022 SPI device
+        Each 16 bit frame shifts out a conversion (four leading zeros
+        and 12 bits) and shifts in the control register, the channel
+        (DIN bits 13-11) selects the next conversion.  The first
+        conversion after the chip select is channel 0.  The DOUT
+        bits change on the SCLK falling edge, the first bit when the
+        chip is selected, and DIN is sampled on the rising edge.
+
+        The analog channels are Signals, numbers, or waveforms (a
+        `WaveformSource` or a callable of the time in seconds), the
+        waveforms are evaluated at the simulation time of the
+        conversion.  The conversions are captured, see `capture`.
+
+        Arguments:
+            analog_channels (list): the eight analog inputs
+            vref_pos (float): the positive reference (volts)
+            vref_neg (float): the negative reference (volts)
+            verbose (bool): print each conversion
+        """
+        assert len(analog_channels) == 8
+        super(ADC128S022, self).__init__(width=16, cpol=0, cpha=0)
+        self.analog_channels = analog_channels
+        self.vref_pos, self.vref_neg = vref_pos, vref_neg
+        self.verbose = verbose
+        self.channel = 0
+        # the conversion times (seconds) and samples per channel
+        self._captures = [([], []) for _ in range(8)]
+
+    def level(self, ch, t):
+        """ the analog level of a channel at the time `t` (seconds) """
+        src = self.analog_channels[ch]
+        # Signals are callable (shadow slices)
+        if callable(src) and not isinstance(src, SignalType):
+            return float(src(t))
+        return float(src)
+
+    def convert(self, ch):
+        # the real converter converts the sample over 12 clock cycles,
+        # convert instantly (is fine)
+        t = now() * 1e-9
+        level = self.level(ch, t)
+        sample = int(convert(level, (self.vref_neg, self.vref_pos)))
+        times, samples = self._captures[ch]
+        times.append(t)
+        samples.append(sample)
+        if self.verbose:
+            print("converted channel {} from {} to {:04X}".format(
+                  int(ch), level, sample))
+        return sample
+
+    def capture(self, ch):
+        """ returns the conversion times (seconds) and the samples
+        of a channel (NumPy arrays).
+        """
+        times, samples = self._captures[ch]
+        return np.array(times), np.array(samples, dtype=np.int32)
+
+    def clear_capture(self):
+        self._captures = [([], []) for _ in range(8)]
+
+    def select(self):
+        self.channel = 0
+        return self.convert(self.channel)
+
+    def transfer(self, word):
+        self.channel = (word >> 11) & 0x07
+        return self.convert(self.channel)
+
+    @myhdl.block
+    def process(self, spibus):
+        """ the device DIN is the bus MOSI and the device DOUT the
+        bus MISO.
+        """
+        return self.engine(spibus.sck, spibus.mosi, spibus.miso, spibus.csn)
+
 
 @myhdl.block
-def adc128s022_model(spibus, analog_channels, vref_pos=3.3, vref_neg=0.):
+def adc128s022_model(spibus, analog_channels, vref_pos=3.3, vref_neg=0.,
+                     verbose=False):
     """
     This is a model of the ADC128S022 A/D converter.  It will emulated
-    the behavior described in the datasheet.
+    the behavior described in the datasheet.  Use the `ADC128S022`
+    device to access the captured conversions.
     """
-    assert isinstance(analog_channels, list) and len(analog_channels) == 8 
-    
-    # use the signals names in the datasheet, names from the device
-    # perspective
-    sclk, dout, din, csn = spibus()
-    
-    states = enum('start', 'track', 'hold')
-    state = Signal(states.start)
-
-    monbits = Signal(intbv(0)[16:])
-    monsmpl = Signal(intbv(0)[16:])
-    monbcnt = Signal(intbv(0)[16:])
-
-    @instance
-    def beh():
-        sample = intbv(0xAA)[16:]
-        bitcnt, bitsin = 0, intbv(0)[16:]
-        nextch = 0
-        dout.next = 0
-
-        while True:
-            if state == states.start:
-                yield delay(10)
-                if not csn:
-                    state.next = states.track
-                    bitcnt = 15
-                    dout.next = 0
-                monbcnt.next = bitcnt
-                    
-            elif state == states.track:
-                yield sclk.posedge
-                bitsin[bitcnt] = int(din)
-                bitcnt -= 1
-                monbcnt.next = bitcnt
-                # @todo: determine a reasonable model of the track/capture
-                levels = [float(val) for val in analog_channels]
-                yield sclk.negedge
-                if bitcnt == 12:
-                    ch = nextch
-                    state.next = states.hold
-                    # the real converter converts the sample over the next
-                    # 12 clock cycles, convert instantly (is fine)
-                    sample = convert(levels[ch], (vref_neg, vref_pos))
-                    monsmpl.next = sample
-                    print("converted channel {} from {} to {:04X}".format(
-                          int(ch), float(levels[ch]), int(sample)))
-
-            elif state == states.hold:
-                yield sclk.posedge
-                bitsin[bitcnt] = int(din)
-                bitcnt -= 1
-                if bitcnt == 10:
-                    nextch = bitsin[14:11]
-                    # print("  captured next channel {} ({:04X})".format(nextch, int(bitsin)))
-                monbcnt.next = bitcnt
-                yield sclk.negedge
-                dout.next = sample[bitcnt]
-                # print("{:8d}: sample[{:2d}] = {:4d}, {}->{}".format(
-                #       now(), bitcnt, int(sample), int(dout.val), int(dout.next)))
-                if bitcnt == 0:
-                    state.next = states.start
-                    yield sclk.posedge  # let the last bit clock in
-
-            # need signals to update before next pass through
-            yield delay(1)
-
-    @always(sclk.posedge)
-    def mon():
-        monbits.next = concat(monbits[15:0], din)
-                    
-    return instances()
+    assert isinstance(analog_channels, list) and len(analog_channels) == 8
+
+    adc = ADC128S022(analog_channels, vref_pos=vref_pos, vref_neg=vref_neg,
+                     verbose=verbose)
+    return adc.process(spibus)
@@ -0,0 +1,132 @@
+
+from __future__ import division
+
+import wave
+
+import numpy as np
+
+
+class WaveformSource(object):
+    def __init__(self, source, sample_rate=None, scale=1., offset=0.,
+                 noise=0., seed=None, repeat=False):
+        """ An analog waveform for the converter models
+        The waveform is evaluated at the simulation time (seconds),
+        the samples are linearly interpolated.
+
+        Arguments:
+            source: the waveform, one of
+                a NumPy array (or list) of samples at `sample_rate`,
+                a callable, `source(t)` with t in seconds (scalar or
+                  array),
+                a WAV filename, the samples are normalized to -1 to 1
+                  and the sample rate is the file's,
+                a CSV filename, one column of samples at `sample_rate`
+                  or two columns, time (seconds) and value
+            sample_rate (float): the sample rate of an array or a
+                single column CSV
+            scale (float): the value is `scale*source + offset`
+            offset (float): see `scale`
+            noise (float): the standard deviation of the added
+                Gaussian noise
+            seed (int): the noise random seed
+            repeat (bool): repeat the samples, otherwise the last
+                sample is held
+        """
+        self.scale, self.offset = scale, offset
+        self.noise = noise
+        self.repeat = repeat
+        self._rng = np.random.RandomState(seed)
+        self._func = None
+
+        if callable(source):
+            self._func = source
+            return
+
+        times = None
+        if isinstance(source, str):
+            if source.lower().endswith('.wav'):
+                values, sample_rate = self._read_wav(source)
+            else:
+                data = np.loadtxt(source, delimiter=',', ndmin=2)
+                if data.shape[1] > 1:
+                    times, values = data[:, 0], data[:, 1]
+                else:
+                    values = data[:, 0]
+        else:
+            values = np.asarray(source, dtype=float)
+
+        if times is None:
+            assert sample_rate is not None, "the sample rate is required"
+            times = np.arange(len(values)) / sample_rate
+        self._times = np.asarray(times, dtype=float)
+        self._values = np.asarray(values, dtype=float)
+        self.duration = self._times[-1] - self._times[0]
+        if repeat and len(self._times) > 1:
+            # the period includes the last sample interval
+            self.duration += self._times[-1] - self._times[-2]
+
+    @staticmethod
+    def _read_wav(filename):
+        wf = wave.open(filename, 'rb')
+        try:
+            nchannels, width = wf.getnchannels(), wf.getsampwidth()
+            sample_rate = wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+        finally:
+            wf.close()
+        assert width in (1, 2, 4), "unsupported WAV sample width"
+        if width == 1:
+            # unsigned, the offset is removed before the scale
+            values = np.frombuffer(frames, dtype=np.uint8)
+            values = (values.astype(np.int16) - 128) / 128.
+        else:
+            dtype = np.int16 if width == 2 else np.int32
+            values = np.frombuffer(frames, dtype=dtype) / 2.**(8*width-1)
+        # the first channel
+        return values[::nchannels], sample_rate
+
+    def values(self, t):
+        """ the waveform at the times `t` (seconds, array) """
+        t = np.asarray(t, dtype=float)
+        if self._func is not None:
+            vals = np.asarray(self._func(t), dtype=float)
+        else:
+            if self.repeat:
+                t = self._times[0] + np.mod(t - self._times[0], self.duration)
+            vals = np.interp(t, self._times, self._values)
+        vals = self.scale*vals + self.offset
+        if self.noise > 0:
+            vals = vals + self._rng.normal(0., self.noise, np.shape(vals))
+        return vals
+
+    def __call__(self, t):
+        """ the waveform at the time `t` (seconds) """
+        return float(self.values(t))
+
+
+def sine_snr(samples, frequency, sample_rate=None, times=None):
+    """ The SNR (dB) of the samples of a sine wave
+    A least squares fit of the sine (and an offset) at `frequency`,
+    the residual is the noise and distortion (SINAD).
+
+    Arguments:
+        samples: the converted samples (array)
+        frequency (float): the sine frequency
+        sample_rate (float): the sample rate, or the sample `times`
+        times: the sample times (seconds)
+    """
+    samples = np.asarray(samples, dtype=float)
+    if times is None:
+        times = np.arange(len(samples)) / sample_rate
+    w = 2*np.pi*frequency*np.asarray(times, dtype=float)
+    basis = np.column_stack((np.sin(w), np.cos(w), np.ones_like(w)))
+    coef = np.linalg.lstsq(basis, samples, rcond=None)[0]
+    fit = basis.dot(coef)
+    signal = np.sum((fit - coef[2])**2)
+    noise = np.sum((samples - fit)**2)
+    return 10*np.log10(signal / max(noise, 1e-20))
+
+
+def enob(snr_db):
+    """ the effective number of bits for the SNR (SINAD) """
+    return (snr_db - 1.76) / 6.02
@@ -25,8 +25,10 @@ def sdram_controller_model(sdram_intf, internal_intf):
     ix, ex = internal_intf, sdram_intf
 
     def translate_address(addr):
-        #@todo: add correct translation
-        row_addr, col_addr = 0, addr
+        # the lower bits are the column and the upper bits the row
+        col_width = ex.col_width
+        row_addr = (addr >> col_width) & ((1 << ex.addr_width)-1)
+        col_addr = addr & ((1 << col_width)-1)
         return row_addr, col_addr
 
     @instance
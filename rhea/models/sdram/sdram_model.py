@@ -1,7 +1,9 @@
-
 from __future__ import print_function, division
 
-from math import ceil, floor
+from math import ceil
+
+import numpy as np
+
 import myhdl
 from myhdl import Signal, intbv, enum, instance, always_comb
 
@@ -10,7 +12,7 @@ from rhea.cores.sdram import SDRAMInterface
 
 
 class SDRAMModel(object):
-    def __init__(self, intf):
+    def __init__(self, intf, col_width=None):
         """ SDRAM Model
         This will model the behavior and cycle accurate interface to
         an SDRAM device.
@@ -24,6 +26,29 @@ class SDRAMModel(object):
         datasheet for a 256Mb device:
         http://www.micron.com/parts/dram/sdram/mt48lc16m16a2b4-6a-it?pc=%7B5144650B-31FA-410A-993E-BADF981C54DD%7D
 
+        The memory is sparse, a row (page) of a bank is allocated when
+        it is first written.  The open row of each bank is tracked and
+        the ACTIVE, READ, WRITE, and PRECHARGE commands are checked
+        against the tRCD, tRP, and tRAS of the interface timing.  The
+        read data is returned after the CAS latency, set with the
+        LOAD MODE REGISTER command (1 until the mode is loaded).  The
+        burst length and type are also set with the mode (1 until the
+        mode is loaded), a READ or WRITE accesses a word each cycle of
+        the burst, the column wraps in the burst (sequential or
+        interleaved).  A READ, WRITE or PRECHARGE (of the bank) ends
+        a burst in progress.  The auto-precharge (A10) of a READ starts
+        at the end of the burst and of a WRITE tWR after the last word
+        of the burst.
+
+        The memory can be accessed directly (backdoor) with `load`
+        and `dump`, the linear (word) address is:
+            bank | row | column
+
+        Arguments:
+            intf (SDRAMInterface): the SDRAM interface
+            col_width (int): number of column address bits, defaults
+                to the interface `col_width`.
+
         Not convertible.
         """
         assert isinstance(intf, SDRAMInterface)
@@ -32,13 +57,119 @@ class SDRAMModel(object):
         # also contains the SDRAM timing parameters.
         self.intf = intf
 
-        # emulate banks in an SDRAM
-        self.banks = [{} for _ in range(intf.num_banks)]
+        # the memory organization
+        self.col_width = intf.col_width if col_width is None else col_width
+        self.row_width = intf.addr_width
+        self.num_cols = 2**self.col_width
+        self.num_rows = 2**self.row_width
+        self.num_banks = intf.num_banks
+        self.size = self.num_banks * self.num_rows * self.num_cols
+        dw = intf.data_width
+        self.dtype = (np.uint8 if dw <= 8 else np.uint16 if dw <= 16 else
+                      np.uint32 if dw <= 32 else np.uint64)
+
+        # emulate banks in an SDRAM, a row (page) is allocated on the
+        # first write, pages[(bank, row)] = array of num_cols words
+        self.pages = {}
+        # the open (active) row of each bank, None if precharged
+        self.open_rows = [None for _ in range(self.num_banks)]
+        self.cas_latency = 1
+        self.burst_length = 1
+        self.burst_interleaved = False
+        self.write_single = False
+
+        # the minimum number of cycles between commands and the
+        # number of clock cycles simulated
+        self.cycles = self._get_min_cycles()
+        self.ncycles = 0
 
         # typically DRAM is defined using states (@todo add reference)
         self.States = enum("IDLE", "ACTIVE")
         self.Commands = intf.Commands
 
+    @property
+    def write_burst(self):
+        """ the write burst length, single writes if the mode
+        write burst mode (A9) is set
+        """
+        return 1 if self.write_single else self.burst_length
+
+    def _get_min_cycles(self):
+        intf = self.intf
+        frequency = getattr(intf.clk, 'frequency', intf.clock_frequency)
+        cycles = {}
+        for key in ('rcd', 'rp', 'ras', 'wr'):
+            # minimum times, round up
+            cycles[key] = int(ceil(round(
+                intf.timing[key] * (frequency / 1e9), 6)))
+        return cycles
+
+    def burst_column(self, col, beat, length):
+        """ the column of a word (beat) of a burst starting at col,
+        the column wraps in the `length` words aligned block
+        """
+        mask = length - 1
+        if self.burst_interleaved:
+            offset = (col & mask) ^ beat
+        else:
+            offset = (col + beat) & mask
+        return (col & ~mask) | offset
+
+    def split_address(self, addr):
+        """ get the (bank, row, column) of a linear (word) address """
+        col = addr & (self.num_cols-1)
+        row = (addr >> self.col_width) & (self.num_rows-1)
+        bank = addr >> (self.col_width + self.row_width)
+        return bank, row, col
+
+    def _page(self, bank, row, create=True):
+        page = self.pages.get((bank, row), None)
+        if page is None and create:
+            page = np.zeros(self.num_cols, dtype=self.dtype)
+            self.pages[(bank, row)] = page
+        return page
+
+    def load(self, addr, data):
+        """ Write data directly to the memory (no simulation)
+
+        Arguments:
+            addr (int): linear word address
+            data: bytes (little-endian words) or a sequence of words
+        """
+        if isinstance(data, (bytes, bytearray)):
+            dtype = np.dtype(self.dtype).newbyteorder('<')
+            data = np.frombuffer(bytes(data), dtype=dtype)
+        data = np.asarray(data).astype(self.dtype)
+        if addr < 0 or addr + len(data) > self.size:
+            raise ValueError("load {} words at {:X} is outside the memory"
+                             .format(len(data), addr))
+        offset = 0
+        while offset < len(data):
+            bank, row, col = self.split_address(addr + offset)
+            num = min(self.num_cols - col, len(data) - offset)
+            self._page(bank, row)[col:col+num] = data[offset:offset+num]
+            offset += num
+
+    def dump(self, addr, n):
+        """ Read n words directly from the memory (no simulation)
+
+        Returns:
+            an array of n words, use ``.tobytes()`` for the bytes
+        """
+        if addr < 0 or addr + n > self.size:
+            raise ValueError("dump {} words at {:X} is outside the memory"
+                             .format(n, addr))
+        data = np.zeros(n, dtype=self.dtype)
+        offset = 0
+        while offset < n:
+            bank, row, col = self.split_address(addr + offset)
+            num = min(self.num_cols - col, n - offset)
+            page = self._page(bank, row, create=False)
+            if page is not None:
+                data[offset:offset+num] = page[col:col+num]
+            offset += num
+        return data
+
     @myhdl.block
     def process(self, skip_init=True):
         """
@@ -50,11 +181,44 @@ class SDRAMModel(object):
         cmdmn = Signal(self.Commands.NOP)
 
         Commands, States = self.Commands, self.States
+        open_rows, cycles = self.open_rows, self.cycles
+        num_banks = self.num_banks
+
+        # the cycle of the last ACTIVE and PRECHARGE of each bank and
+        # the cycle a pending auto-precharge starts
+        t_act = [None for _ in range(num_banks)]
+        t_pre = [None for _ in range(num_banks)]
+        t_auto = [None for _ in range(num_banks)]
+
+        def check(ok, msg, bs):
+            assert ok, "[SDRAM] bank {} {} at cycle {}".format(
+                bs, msg, self.ncycles)
+
+        def precharge(bs):
+            if open_rows[bs] is not None:
+                check(self.ncycles - t_act[bs] >= cycles['ras'],
+                      "PRECHARGE before tRAS", bs)
+            open_rows[bs] = None
+            t_pre[bs] = self.ncycles
+            t_auto[bs] = None
+
+        def access(bs, cmd):
+            name = 'READ' if cmd == Commands.RD else 'WRITE'
+            check(open_rows[bs] is not None, name+" without an open row", bs)
+            check(t_auto[bs] is None, name+" during an auto-precharge", bs)
+            check(self.ncycles - t_act[bs] >= cycles['rcd'],
+                  name+" before tRCD", bs)
+            return open_rows[bs]
 
         @instance
         def mproc():
             cmd = self.Commands.NOP
             refresh_counter = 0
+            # the read data in the CAS latency pipeline [cycles, data]
+            rdpipe = []
+            # the READ or WRITE burst in progress
+            # [command, bank, row, column, beat, length]
+            burst = None
 
             # emulate the initialization sequence / requirement
             if skip_init:
@@ -70,34 +234,109 @@ class SDRAMModel(object):
                 refresh_counter += 1
 
                 intf.dqi.next = None   # release the bi-dir bus (default)
+
+                # the auto-precharges that start this cycle
+                for bb in range(num_banks):
+                    if t_auto[bb] is not None and self.ncycles >= t_auto[bb]:
+                        precharge(bb)
+
                 bs, addr = int(intf.bs), int(intf.addr)
                 if intf.cke:
                     cmd = intf.get_command()
+                    col = addr & (self.num_cols-1)
+                    # A10 selects auto-precharge (RD, WR) and all
+                    # banks (PRE)
+                    a10 = (addr >> 10) & 1
+
+                    # a new READ or WRITE ends the burst in progress
+                    if cmd in (Commands.RD, Commands.WR):
+                        burst = None
 
                     # @todo: need to add the device specific states
                     if cmd == Commands.NOP:
                         pass  # print("[SDRAM] nop commands")
                     elif cmd == Commands.ACT:
-                        pass  # print("[SDRAM] ack commands")
+                        check(open_rows[bs] is None,
+                              "ACTIVE with an open row", bs)
+                        check(t_pre[bs] is None or
+                              self.ncycles - t_pre[bs] >= cycles['rp'],
+                              "ACTIVE before tRP", bs)
+                        open_rows[bs] = addr
+                        t_act[bs] = self.ncycles
                     elif cmd == Commands.WR:
-                        # @todo look at the intf.dq bus and only get if valid
-                        data = 0
-                        if intf.dq is not None:
-                            data = int(intf.dq)
-                        assert intf.dq == intf.wdq
-                        self.banks[bs][addr] = data
+                        row = access(bs, cmd)
+                        burst = [cmd, bs, row, col, 0, self.write_burst]
+                        if a10 and self.col_width <= 10:
+                            # tWR after the last word of the burst
+                            t_auto[bs] = (self.ncycles + self.write_burst - 1 +
+                                          cycles['wr'])
                     elif cmd == Commands.RD:
-                        data = 0
-                        if addr in self.banks[bs]:
-                            data = self.banks[bs][addr]
+                        row = access(bs, cmd)
+                        burst = [cmd, bs, row, col, 0, self.burst_length]
+                        if a10 and self.col_width <= 10:
+                            # at the end of the burst
+                            t_auto[bs] = self.ncycles + self.burst_length
+                    elif cmd == Commands.PRE:
+                        banks = range(num_banks) if a10 else (bs,)
+                        for bb in banks:
+                            precharge(bb)
+                        if burst is not None and burst[1] in banks:
+                            burst = None
+                    elif cmd == Commands.REF:
+                        check(all(rr is None for rr in open_rows),
+                              "REFRESH with an open row", bs)
+                        refresh_counter = 0
+                    elif cmd == Commands.LMR:
+                        check(all(rr is None for rr in open_rows),
+                              "LOAD MODE with an open row", bs)
+                        self.cas_latency = (addr >> 4) & 7
+                        check(self.cas_latency in (1, 2, 3),
+                              "invalid CAS latency", bs)
+                        bl = addr & 7
+                        check(bl in (0, 1, 2, 3, 7),
+                              "invalid burst length", bs)
+                        self.burst_length = (self.num_cols if bl == 7
+                                             else 2**bl)
+                        self.burst_interleaved = bool((addr >> 3) & 1)
+                        check(not (self.burst_interleaved and bl == 7),
+                              "interleaved full page burst", bs)
+                        self.write_single = bool((addr >> 9) & 1)
+
+                    # a word (beat) of the burst each cycle
+                    if burst is not None:
+                        bcmd, bb, row, bcol, beat, length = burst
+                        col = self.burst_column(bcol, beat, length)
+                        if bcmd == Commands.WR:
+                            # @todo look at the intf.dq bus and only
+                            #       get if valid
+                            data = 0
+                            if intf.dq is not None:
+                                data = int(intf.dq)
+                            assert intf.dq == intf.wdq
+                            self._page(bb, row)[col] = data
+                        else:
+                            data = 0
+                            page = self._page(bb, row, create=False)
+                            if page is not None:
+                                data = int(page[col])
+                            rdpipe.append([self.cas_latency-1, data])
+                        burst[4] += 1
+                        if burst[4] == length:
+                            burst = None
+
+                # drive the read data after the CAS latency
+                for cyc, data in rdpipe:
+                    if cyc == 0:
                         intf.rdq.next = data
                         intf.dqi.next = data
+                rdpipe = [[cyc-1, data] for cyc, data in rdpipe if cyc > 0]
 
                 # this command, will always be one clock delayed
                 cmdmn.next = cmd
                 # synchronous RAM :)
                 # @todo: if 'ddr' in intf.ver yield intf.clk.posedge, intf.clk.negedge
                 yield intf.clk.posedge
+                self.ncycles += 1
 
         # in the model the following signals are not used in a generator.
         # The traceSignals will skip over these signals because it doesn't
@@ -1,4 +1,4 @@
-
 from __future__ import absolute_import
 
+from .spi_slave import SPISlaveModel
 from .spi_eeprom import SPIEEPROM
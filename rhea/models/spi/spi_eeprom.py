@@ -1,10 +1,9 @@
 
 from __future__ import division, absolute_import
 
-from random import randint
-
 import myhdl
-from myhdl import Signal, intbv, instance, concat
+
+from .spi_slave import SPISlaveModel
 
 
 def b2int(s):
@@ -13,21 +12,41 @@ def b2int(s):
     return int(s, 2)
 
 
-class SPIEEPROM(object):
-    def __init__(self, addr_width=24, data_width=8, max_size=1024):
-        
+class SPIEEPROM(SPISlaveModel):
+    def __init__(self, addr_width=24, data_width=8, max_size=1024,
+                 page_size=None, fill=0xFF):
+        """ SPI EEPROM (flash) model
+        This is modeled after the AT25 series SPI eeprom, the memory
+        is a `bytearray` so flash sized (e.g. 16 MB with `max_size=0`)
+        memories can be simulated.
+
+        Arguments:
+            addr_width (int): the address bits, the instruction is
+                followed by `addr_width//8` address bytes
+            data_width (int): the data bits, only 8 is supported
+            max_size (int): the memory size in bytes, if 0 the size
+                is 2**addr_width
+            page_size (int): the writes wrap within a page, if None
+                the writes wrap at the end of the memory
+            fill (int): the initial (erased) memory value
+        """
+        assert data_width == 8
+        super(SPIEEPROM, self).__init__(width=8, cpol=0, cpha=0)
+
         if max_size > 0:
             size = max_size
         else:
             size = 2**addr_width
-            
+
         self.size = size
         self.addr_width = addr_width
         self.data_width = data_width
+        self.page_size = page_size
 
-        self.mem = [Signal(intbv(randint(0, 255))[8:]) for _ in range(size)]
+        self.mem = bytearray([fill]) * size
         # status register: WPEN, x,x,x,BP1,BP0,WEN,RDY
-        self.status = Signal(intbv("0000_0000"))
+        self._status = 0
+        self.write_enable = False
 
         # eeprom instructions
         self.instr = {'WREN': b2int("0000_x110"),   # set write enable latch
@@ -36,89 +55,116 @@ class SPIEEPROM(object):
                       'WRSR': b2int("0000_x001"),   # write status register
                       'READ': b2int("0000_x011"),   # read data from memory array
                       'WRITE': b2int("0000_x010"),  # write data to memory array
-                      }         
-        
+                      }
+        self._state = 'instr'
+        self._addr, self._nbytes = 0, 0
+        self._read, self._written = True, False
+
+    @property
+    def status(self):
+        """ the status register, WEN reflects the write enable latch
+        and the writes complete immediately (ready)
+        """
+        return (self._status & 0x8C) | (0x02 if self.write_enable else 0)
+
     def get_init(self):
-        return map(int,self.mem)
+        return list(self.mem)
+
+    def preload(self, data, offset=0):
+        """ load the bytes or the file (`data` is a filename) """
+        if isinstance(data, str):
+            with open(data, 'rb') as f:
+                data = f.read()
+        assert offset + len(data) <= self.size
+        self.mem[offset:offset+len(data)] = data
+
+    def dump(self, filename=None, offset=0, size=None):
+        """ returns the memory contents, optionally saved to a file """
+        size = self.size - offset if size is None else size
+        data = bytes(self.mem[offset:offset+size])
+        if filename is not None:
+            with open(filename, 'wb') as f:
+                f.write(data)
+        return data
+
+    def protected(self, addr):
+        """ the block protect bits, none, the upper quarter, the
+        upper half, or the whole memory.
+        """
+        bp = (self._status >> 2) & 0x03
+        nprotect = (0, self.size//4, self.size//2, self.size)[bp]
+        return addr >= self.size - nprotect
+
+    def _next_addr(self, addr):
+        if self.page_size is None:
+            return (addr + 1) % self.size
+        page = addr - (addr % self.page_size)
+        return page + ((addr + 1) % self.page_size)
+
+    def select(self):
+        self._state = 'instr'
+        self._written = False
+        return 0
+
+    def transfer(self, word):
+        state, out = self._state, 0
+        if state == 'instr':
+            instr = word & 0xF7    # bit 3 is a don't care
+            if instr == self.instr['WREN']:
+                self.write_enable = True
+                self._state = 'done'
+            elif instr == self.instr['WRDI']:
+                self.write_enable = False
+                self._state = 'done'
+            elif instr == self.instr['RDSR']:
+                self._state = 'rdsr'
+                out = self.status
+            elif instr == self.instr['WRSR']:
+                self._state = 'wrsr'
+            elif instr in (self.instr['READ'], self.instr['WRITE']):
+                self._state = 'addr'
+                self._read = instr == self.instr['READ']
+                self._addr, self._nbytes = 0, self.addr_width // 8
+            else:
+                assert False, "Invalid Instruction %04X" % (word,)
+
+        elif state == 'addr':
+            self._addr = ((self._addr << 8) | word) % self.size
+            self._nbytes -= 1
+            if self._nbytes == 0:
+                if self._read:
+                    self._state = 'read'
+                    out = self.mem[self._addr]
+                else:
+                    self._state = 'write'
+
+        elif state == 'read':
+            self._addr = (self._addr + 1) % self.size
+            out = self.mem[self._addr]
+
+        elif state == 'write':
+            if self.write_enable and not self.protected(self._addr):
+                self.mem[self._addr] = word
+                self._written = True
+            self._addr = self._next_addr(self._addr)
+
+        elif state == 'wrsr':
+            if self.write_enable:
+                self._status = word & 0x8C
+                self._written = True
+            self._state = 'done'
+
+        elif state == 'rdsr':
+            out = self.status
+
+        return out
+
+    def deselect(self):
+        # the write enable latch is reset after a write
+        if self._written:
+            self.write_enable = False
 
     @myhdl.block
     def process(self, clock, reset, spibus):
-        """
-        this is modeled after the AT25 series SPI eeprom.
-        """
-
-        # max number of bits to shift in
-        bit_count = self.addr_width + self.data_width + 8        
-        shiftin = Signal(intbv(0)[bit_count:])
-        write_enable = Signal(False)
-        write_protected = Signal(True)
-
-        @instance
-        def model():
-            dowr, dord = False,False
-            while True:
-                yield spibus.ss.negedge
-                count,odata,rnw,dcyc = 0,0,True,False
-                while count < bit_count:
-                    yield spibus.sck.posedge
-                    if spibus.ss: break
-                    
-                    # most-sig-bit first in time
-                    shiftin.next = concat(shiftin[23:0],spibus.mosi)
-                    count += 1
-                    
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # Instruction
-                    if count == 8:
-                        instr = concat(shiftin[7:0],spibus.mosi)
-
-                        # handle WREN, WRDI, RDSR, WRSR here
-                        if instr == self.instr['WREN']:
-                            write_enable.next = True
-                        elif instr == self.instr['WRDI']:
-                            write_enable.next = False
-                        elif instr == self.instr['RDSR']:
-                            odata = self.status
-                            dcyc = True
-                        elif instr == self.instr['WRSR']:
-                            dcyc = True
-                        elif instr == self.instr['READ']:
-                            rnw.next = True
-                        elif instr == self.instr['WRITE']:
-                            rnw.next = False
-                        else:
-                            assert False, "Invalid Instruction %04X"%(instr)
-                            
-                        if (instr != self.instr['WRITE'] and
-                            instr != self.instr['READ']):
-                            break
-                        
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # Address
-                    elif count == 24+8:
-                        addr = concat(shiftin[23:0],spibus.mosi)
-
-                    elif count == 24+8+8:
-                        if instr == self.instr['WRSR']:
-                            data = concat(shiftin[7:0],spibus.mosi)
-                            self.status.next = data
-                            break  # break out of the transaction loop
-                        elif instr == self.instr['RDSR']:
-                            break  # break out of the transaction loop
-                        
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # Data
-                    elif count == 24+8+8:
-                        data = concat(shiftin[7:0],spibus.mosi)
-                        if not rnw and write_enable and not write_protected:
-                            self.mem[addr].next = data
-                        else:
-                            odata = self.mem[addr]
-                        dcyc = True
-
-                    if dcyc:
-                        # msb first in time
-                        spibus.miso.next = (odata >> 8) & 0x01
-                        odata = odata << 1
-
-        return model
+        """ the EEPROM on the SPI bus, selected by `spibus.ss` """
+        return self.engine(spibus.sck, spibus.mosi, spibus.miso, spibus.ss)
@@ -0,0 +1,111 @@
+
+from __future__ import division, absolute_import
+
+import myhdl
+from myhdl import instance
+
+
+class SPISlaveModel(object):
+    def __init__(self, width=8, cpol=0, cpha=0, msb_first=True,
+                 ss_index=0):
+        """ SPI slave device model engine
+        The engine handles the SPI bus: the chip select, the clock
+        polarity (CPOL) and phase (CPHA), and the shift registers.
+        A device model is a subclass that handles the words, the
+        engine calls the device:
+
+            select(): the chip select was asserted, returns the first
+                word to shift out
+            transfer(word): a word was shifted in, returns the next
+                word to shift out
+            deselect(): the chip select was released
+
+        The engine only wakes on the serial clock edges while the
+        device is selected.
+
+        Arguments:
+            width (int): the number of bits in a word
+            cpol (int): the serial clock idle level
+            cpha (int): 0, sample on the leading edge (the first bit
+                is driven when selected), 1, sample on the trailing
+                edge
+            msb_first (bool): the word bit order in time
+            ss_index (int): the select bit when the chip select is
+                a vector (active-low)
+        """
+        assert cpol in (0, 1) and cpha in (0, 1)
+        self.width = width
+        self.cpol = cpol
+        self.cpha = cpha
+        self.msb_first = msb_first
+        self.ss_index = ss_index
+
+    def select(self):
+        return 0
+
+    def transfer(self, word):
+        return 0
+
+    def deselect(self):
+        pass
+
+    def _bit(self, word, index):
+        if self.msb_first:
+            index = self.width - 1 - index
+        return bool((word >> index) & 1)
+
+    @myhdl.block
+    def engine(self, sck, sdi, sdo, csn):
+        """ The SPI slave process
+
+        Arguments (names from the device perspective):
+            sck: the serial clock
+            sdi: the serial data in (the controller's MOSI)
+            sdo: the serial data out (the controller's MISO)
+            csn: the active-low chip select, a bit or a vector
+        """
+        width, cpha = self.width, self.cpha
+
+        if len(csn) > 1:
+            def selected():
+                return not csn[self.ss_index]
+        else:
+            def selected():
+                return not csn
+
+        @instance
+        def spi_engine():
+            while True:
+                while not selected():
+                    yield csn
+                word = self.select()
+                # the number of bits sampled and driven in the word
+                nin, nout, win = 0, 0, 0
+                if cpha == 0:
+                    sdo.next = self._bit(word, 0)
+                    nout = 1
+
+                while True:
+                    yield sck.posedge, sck.negedge, csn
+                    if not selected():
+                        break
+                    leading = bool(sck) == (self.cpol == 0)
+                    if leading == (cpha == 0):
+                        # sample edge
+                        bit = int(bool(sdi))
+                        if self.msb_first:
+                            win = (win << 1) | bit
+                        else:
+                            win = win | (bit << nin)
+                        nin += 1
+                        if nin == width:
+                            word = self.transfer(win)
+                            nin, nout, win = 0, 0, 0
+                    elif nout < width:
+                        # shift edge
+                        sdo.next = self._bit(word, nout)
+                        nout += 1
+
+                self.deselect()
+
+        return spi_engine
@@ -2,3 +2,4 @@
 from __future__ import absolute_import
 
 from .uart_model import UARTModel
+from .uart_fast import FastUARTModel
@@ -0,0 +1,153 @@
+
+from __future__ import division
+
+from collections import deque
+
+import myhdl
+from myhdl import Signal, instance, delay, now
+
+
+class FastUARTModel(object):
+    def __init__(self, baudrate=115200, stopbits=1, parity=None):
+        """ Transaction-level UART model
+        A UART model that waits for the bit edges (`delay`) instead
+        of counting the system clocks, a frame is a few simulation
+        steps independent of the system clock frequency.  The model
+        has the same interface as the `UARTModel` (`write`, `read`,
+        `process`) and can stream bytes and files in and out.
+
+        The simulation ticks are 1 ns (see `rhea.system.Clock`), the
+        bit edges are computed from the start of the frame so the
+        rounding does not accumulate.
+
+        Arguments:
+            baudrate (int): the serial baudrate
+            stopbits (int): the number of stop bits, 1 or 2
+            parity (str): None, 'even', or 'odd'
+        """
+        assert stopbits in (1, 2)
+        assert parity in (None, 'even', 'odd')
+        self.baudrate = baudrate
+        self.stopbits = stopbits
+        self.parity = parity
+
+        self._txq = deque()
+        self._rxq = deque()
+        self._txreq = Signal(bool(0))
+
+        # receive errors, the bytes are kept
+        self.parity_errors = 0
+        self.framing_errors = 0
+
+    @property
+    def bit_ticks(self):
+        """ the simulation ticks (ns) per bit """
+        return 1e9 / self.baudrate
+
+    def _parity_bit(self, byte):
+        ones = bin(byte).count('1')
+        return (ones % 2 == 1) if self.parity == 'even' else (ones % 2 == 0)
+
+    def _notify(self):
+        # wake the transmitter, only changed from the simulation
+        self._txreq.next = not self._txreq
+
+    def write(self, byte):
+        self._txq.append(int(byte) & 0xFF)
+        self._notify()
+
+    def write_bytes(self, data):
+        """ queue the bytes (bytes, bytearray, list) to transmit """
+        self._txq.extend(bytearray(data))
+        self._notify()
+
+    def write_file(self, filename):
+        """ queue the contents of the file to transmit """
+        with open(filename, 'rb') as f:
+            self.write_bytes(f.read())
+
+    def read(self):
+        """ returns the next received byte, None if nothing received """
+        return self._rxq.popleft() if len(self._rxq) > 0 else None
+
+    def read_bytes(self, num=None):
+        """ returns up to `num` (all if None) received bytes """
+        num = len(self._rxq) if num is None else min(num, len(self._rxq))
+        return bytearray([self._rxq.popleft() for _ in range(num)])
+
+    def read_file(self, filename):
+        """ append the received bytes to the file """
+        with open(filename, 'ab') as f:
+            f.write(bytes(self.read_bytes()))
+
+    def rx_available(self):
+        return len(self._rxq)
+
+    def tx_pending(self):
+        return len(self._txq)
+
+    @myhdl.block
+    def process(self, glbl, serin, serout):
+        """ The model processes, a transmitter and a receiver
+
+        Arguments:
+            glbl: the clock and reset, only the reset is used
+            serin: the serial input, the model receives
+            serout: the serial output, the model transmits
+        """
+        reset = glbl.reset
+        txq, rxq = self._txq, self._rxq
+        txreq = self._txreq
+        nbits = 8 + (0 if self.parity is None else 1)
+
+        def wait_until(start, nbit):
+            """ wait until `nbit` bit periods after the frame start """
+            end = start + int(round(nbit * self.bit_ticks))
+            return delay(max(1, end - now()))
+
+        @instance
+        def mdltx():
+            serout.next = True
+            while True:
+                if len(txq) == 0:
+                    yield txreq
+                    continue
+                if reset is not None and reset == reset.active:
+                    yield reset
+                    continue
+                byte = txq.popleft()
+                bits = [False] + [bool((byte >> ii) & 1) for ii in range(8)]
+                if self.parity is not None:
+                    bits.append(self._parity_bit(byte))
+                bits += [True] * self.stopbits
+                start = now()
+                for ii, bit in enumerate(bits):
+                    serout.next = bit
+                    yield wait_until(start, ii+1)
+
+        @instance
+        def mdlrx():
+            while True:
+                yield serin.negedge
+                start = now()
+                # sample the start bit in the middle of the bit
+                yield wait_until(start, 0.5)
+                if serin:
+                    continue
+                byte, parity = 0, False
+                for ii in range(nbits):
+                    yield wait_until(start, ii+1.5)
+                    if ii < 8:
+                        byte |= int(bool(serin)) << ii
+                    else:
+                        parity = bool(serin)
+                if (self.parity is not None and
+                        parity != self._parity_bit(byte)):
+                    self.parity_errors += 1
+                for ii in range(self.stopbits):
+                    yield wait_until(start, nbits+ii+1.5)
+                    if not serin:
+                        self.framing_errors += 1
+                rxq.append(byte)
+
+        return mdltx, mdlrx
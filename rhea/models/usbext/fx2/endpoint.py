@@ -0,0 +1,200 @@
+
+from __future__ import division
+
+import threading
+import time
+
+
+class EndpointBuffer(object):
+    def __init__(self, maxlen=None):
+        """ An endpoint buffer shared by the host and the simulation
+        The host (testbench) thread and the simulation thread access
+        the buffer, the buffer is protected by a condition variable.
+        The host waits on the condition, each change by the simulation
+        wakes the waiting host.  The bytes are kept in a `bytearray`,
+        the read bytes are removed in chunks.
+
+        Arguments:
+            maxlen (int): the maximum number of bytes the simulation
+                can add to the buffer (device to host), None for the
+                host to device buffers (the host queue).
+        """
+        self.maxlen = maxlen
+        self._buf = bytearray()
+        self._rd = 0    # the read offset into the bytearray
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def __len__(self):
+        return len(self._buf) - self._rd
+
+    def __str__(self):
+        return str(list(self._buf[self._rd:]))
+
+    def full(self):
+        return self.maxlen is not None and len(self) >= self.maxlen
+
+    def peek(self):
+        return self._buf[self._rd]
+
+    def _consume(self, num):
+        self._rd += num
+        # remove the read bytes once they are the larger part
+        if self._rd > 4096 and 2*self._rd > len(self._buf):
+            del self._buf[:self._rd]
+            self._rd = 0
+
+    def put(self, values):
+        """ add the values (bytes) to the end of the buffer """
+        with self._cond:
+            self._buf.extend(values)
+            self._cond.notify_all()
+
+    def pop(self):
+        """ remove and return the first value """
+        with self._cond:
+            val = self._buf[self._rd]
+            self._consume(1)
+            self._cond.notify_all()
+        return val
+
+    def get_bytes(self, num):
+        """ remove and return up to `num` bytes (bytearray) """
+        with self._cond:
+            num = min(num, len(self))
+            values = self._buf[self._rd:self._rd+num]
+            self._consume(num)
+            self._cond.notify_all()
+        return values
+
+    def get(self, num):
+        """ remove and return up to `num` values (list) """
+        return list(self.get_bytes(num))
+
+    def pktend(self):
+        """ no packets, the bytes are available when added """
+        pass
+
+    def close(self):
+        """ the simulation ended, wake the waiting host """
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait(self, predicate, timeout=None):
+        """ wait (host) until the `predicate` is true, the buffer is
+        closed, or the `timeout` (seconds) expires.  Returns the
+        predicate.
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not predicate() and not self.closed:
+                if end is None:
+                    self._cond.wait()
+                else:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return predicate()
+
+
+class PacketBuffers(object):
+    def __init__(self, packet_size=512, nbuffers=2):
+        """ The FX2 endpoint packet buffers
+        An endpoint has `nbuffers` (double or quad buffering) packet
+        buffers of `packet_size` bytes, the buffers are a ring in a
+        single `bytearray`.  A packet is committed to the next free
+        buffer, the bytes are available once the packet is committed.
+
+        OUT endpoints (host to device): a USB packet is committed
+        (`commit`), the slave FIFO reads the bytes (`peek`, `pop`).
+        IN endpoints (device to host): the slave FIFO writes the
+        bytes (`put`), the packet is committed when the buffer is
+        full or on a packet end (`pktend`), the USB transfer takes
+        the packet (`take`).
+
+        The packet buffers are only accessed by the simulation.
+        """
+        self.packet_size = packet_size
+        self.nbuffers = nbuffers
+        self._mem = bytearray(packet_size*nbuffers)
+        self._view = memoryview(self._mem)
+        self._len = [0 for _ in range(nbuffers)]
+        self._head = 0     # the first committed buffer
+        self._count = 0    # the number of committed buffers
+        self._offset = 0   # the bytes read from the first buffer
+        self._fill = 0     # the bytes written to the next buffer
+        self._nbytes = 0   # the committed bytes not read
+
+    def __len__(self):
+        return self._nbytes
+
+    def _slot(self, index):
+        return ((self._head + index) % self.nbuffers) * self.packet_size
+
+    def packets(self):
+        """ the number of committed packets """
+        return self._count
+
+    def packet_length(self):
+        """ the length of the first committed packet """
+        return self._len[self._head] if self._count > 0 else 0
+
+    def nfree(self):
+        """ the number of free buffers """
+        return self.nbuffers - self._count - (1 if self._fill else 0)
+
+    def full(self):
+        return self._count == self.nbuffers
+
+    # OUT, the USB transfer commits and the slave FIFO reads
+    def commit(self, packet):
+        assert self.nfree() > 0 and len(packet) <= self.packet_size
+        start = self._slot(self._count)
+        self._view[start:start+len(packet)] = packet
+        self._len[(self._head + self._count) % self.nbuffers] = len(packet)
+        self._count += 1
+        self._nbytes += len(packet)
+
+    def peek(self):
+        return self._mem[self._slot(0) + self._offset]
+
+    def pop(self):
+        val = self.peek()
+        self._offset += 1
+        self._nbytes -= 1
+        if self._offset == self._len[self._head]:
+            self._free_head()
+        return val
+
+    def _free_head(self):
+        self._head = (self._head + 1) % self.nbuffers
+        self._count -= 1
+        self._offset = 0
+
+    # IN, the slave FIFO writes and the USB transfer takes
+    def put(self, values):
+        for val in values:
+            assert not self.full()
+            self._mem[self._slot(self._count) + self._fill] = val
+            self._fill += 1
+            if self._fill == self.packet_size:
+                self.pktend()
+
+    def pktend(self):
+        """ commit the partially filled buffer (short packet) """
+        if self._fill > 0:
+            self._len[(self._head + self._count) % self.nbuffers] = self._fill
+            self._count += 1
+            self._nbytes += self._fill
+            self._fill = 0
+
+    def take(self):
+        """ remove and return the first packet (bytearray) """
+        start = self._slot(0)
+        nbytes = self._len[self._head]
+        packet = bytearray(self._view[start:start+nbytes])
+        self._nbytes -= nbytes
+        self._free_head()
+        return packet
@@ -5,8 +5,6 @@
 from __future__ import print_function, absolute_import
 
 
-import time
-from myhdl import now
 from .fx2_model import Fx2Model
 
     
@@ -28,43 +26,24 @@ class FpgaLinkHost(Fx2Model):
         return True
 
     def _wait_empty(self, ep, timeout=100):
-        ok = False
-        to = timeout * 1e6
-        te = now() + to
-        for ii in range(timeout):
-            if self.isempty(ep):
-                ok = True
-                break
-            time.sleep(1)
-            if now() > te:
-                break
-        return ok
+        return self.host_wait_empty(ep, timeout=timeout)
 
     def _wait_data(self, ep, num=1, timeout=100):
-        ok = False
-        to = timeout * 1e6
-        te = now() + to
-        for ii in range(timeout):
-            if self.isdata(ep, num=num):
-                ok = True
-                break
-            time.sleep(1)
-            if now() > te:
-                break
-        return ok
+        return self.host_wait_data(ep, num=num, timeout=timeout)
     
     def read_channel(self, chan, count=1, timeout=100):
         """ Read one or more values from the specific channel
         Read /count/ bytes from the FPGA channel /chan/ to the data /array/,
-        with the supplied /timeout/ in milleseconds.
+        with the supplied /timeout/ in seconds.
 
           chan : The FPA channel to read
           count : The number of bytes to read
-          timeout : The time to wait (in milliseconds) for the read to
-            complete before giving up.
+          timeout : The time to wait (in seconds, wall clock) for the
+            next data before giving up.
 
-          This is a generator, it needs to be called:
-             yield fl.ReadChannel(...)
+          The host (this thread) blocks until the simulation provides
+          the data, the data is read as it arrives (the endpoint
+          buffer is limited to the FIFO size).
         """
         wbuf = [0 for ii in range(5)]
         # 0 : chan,
@@ -77,17 +56,20 @@ class FpgaLinkHost(Fx2Model):
         self.trace_print(str(wbuf))
         self.write(wbuf, self.commOut)
         self._wait_empty(self.commOut, timeout=timeout)
-        self._wait_data(self.commIn, num=count, timeout=timeout)
-        
-        # write the command
-        # read the number of bytes asked for
-        return self.read(self.commIn, num=count)
+
+        # read the number of bytes asked for, as they arrive
+        rdata = []
+        while len(rdata) < count:
+            if not self._wait_data(self.commIn, timeout=timeout):
+                break
+            rdata += self.read(self.commIn, num=count-len(rdata))
+        return rdata
     
     def write_channel(self, chan, values, timeout=100):
         """ Write one or more bytes to the specified channel
         Write /count/ bytes from the /data/ list/array to the FPGA
-        channel /chan/, with the given /timeout/ in milleseconds.  In
-        the event of a timeout.
+        channel /chan/, with the given /timeout/ in seconds.  Returns
+        False in the event of a timeout.
         """
         assert isinstance(values, (list, tuple))
         dlen = len(values)
@@ -98,9 +80,9 @@ class FpgaLinkHost(Fx2Model):
         wbuf[3] = (dlen >> 8) & 0xFF
         wbuf[4] = (dlen >> 0) & 0xFF
         wbuf[5:] = values
-        print(wbuf)
+        self.trace_print('write channel', chan, dlen)
         self.write(wbuf, self.commOut)
-        self._wait_empty(self.commOut)
+        return self._wait_empty(self.commOut, timeout=timeout)
 
     def append_write_channel_command(chan, count, data):
         """ Append a write command to the end of the write buffer
@@ -13,6 +13,8 @@ import myhdl
 from myhdl import Signal, ResetSignal, intbv, always, always_comb
 from myhdl import instance, delay, StopSimulation, Simulation, now
 
+from .endpoint import EndpointBuffer, PacketBuffers
+
 
 class Bus(object):
     pass
@@ -60,33 +62,54 @@ class Fx2Model(threading.Thread):
     EP2, EP4, EP6, EP8 = (2, 4, 6, 8)
     IFCLK_TICK = 22
 
-    def __init__(self, fifo_size=512, config=0, verbose=False, trace=False):
+    def __init__(self, fifo_size=512, config=0, verbose=False, trace=False,
+                 packet_size=None, nbuffers=2, usb_bandwidth=None):
         """
         This is a model of the FX2 USB processor.
 
-        The FX2 is double buffered, 512 blocks, this model will have
-        3 queues per pipe to simulate the operation.  Two of the queues will
-        emulate the 512 byte double buffer and the third queue will emulate the
-        host queue.
-
-        When reading or writing (host perspective) all data will be transfered
-        in 512 byte blocks.
-
-        @todo Double buffer only implemented for endpoint 8 (Rd48).
+        The FX2 endpoints are double (or quad) buffered, 512 byte
+        packets.  With a `packet_size` each endpoint has `nbuffers`
+        packet buffers (the device) and a host queue.  The USB bus
+        moves complete packets between the host queue and the packet
+        buffers, an IN packet is committed when the buffer is full or
+        on a PKTEND.  The slave FIFO (FPGA) only sees the bytes in
+        the committed packets.  Without a `packet_size` the slave FIFO
+        accesses the host queues directly, the read (IN) queues are
+        limited to `fifo_size` bytes.
+
+        The USB bus transfers a packet in `nbytes/usb_bandwidth`
+        (bytes per second) of simulation time, a tick is 1 ns
+        (`IFCLK_TICK`).  If `usb_bandwidth` is None the packets are
+        transferred without a delay.
 
         Note:  The internal variable names are from the host (testbench)
         perspective, i.e write* will be a write from the testbench.
+
+        Arguments:
+            fifo_size (int): the read queue size (without packets)
+            config (int): the slave FIFO configuration, see `configure`
+            packet_size (int): the endpoint packet size, e.g. 512
+            nbuffers (int): the packet buffers per endpoint, 2 or 4
+            usb_bandwidth (float): the USB bulk bandwidth, bytes/sec
         """
 
         self.fifo_size = fifo_size
+        self.packet_size = packet_size
+        self.nbuffers = nbuffers
+        self.usb_bandwidth = usb_bandwidth
 
         # Setup the FIFOs for this configuration
         self.configure(config=config)
 
         self.wr_toggle = Signal(False)
-        self._stop = Signal(False)
         self.doreset = Signal(False)
 
+        # the host (thread) requests to the simulation
+        self._stop_req = threading.Event()
+        self._reset_req = threading.Event()
+        self._write_req = threading.Event()
+        self._reset_done = threading.Event()
+
         self.verbose = verbose
         self.trace = trace
 
@@ -102,14 +125,14 @@ class Fx2Model(threading.Thread):
         self.ulog = logging.getLogger('Fx2Logger')
         threading.Thread.__init__(self)
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     # simulation framework thread functions
     def setup(self, fx2_bus, g=()):
         self.fx2_bus = fx2_bus
         self.g = g
 
     def stop(self):
-        self._stop.next = True
+        self._stop_req.set()
         
     def run(self):
         """ Start the MyHDL Simulation.
@@ -119,26 +142,35 @@ class Fx2Model(threading.Thread):
         functions.  These functions will send buffers (lists) to be read or
         written to the simulation enviornment.
         """
-        gens = []
-        # use the module/function wrapper for tracing
-        tb_intf = slave_fifo(self, self.fx2_bus)
-
-        @always(self._stop.posedge)
-        def tb_mon():
-            raise StopSimulation
-
-        tb_intf.config_sim(trace=self.trace)
-        gens = [tb_intf, tb_mon, self.g]
-        sim = Simulation(gens)
-        sim.run()
-        sim.quit()
-
-    # ---------------------------------------------------------------------------
+        try:
+            # use the module/function wrapper for tracing
+            tb_intf = slave_fifo(self, self.fx2_bus)
+
+            # the simulation polls the host requests, the signals are
+            # not changed by the host thread
+            @always(self.fx2_bus.IFCLK.posedge)
+            def tb_mon():
+                if self._stop_req.is_set():
+                    raise StopSimulation
+
+            tb_intf.config_sim(trace=self.trace)
+            gens = [tb_intf, tb_mon, self.g]
+            sim = Simulation(gens)
+            sim.run()
+            sim.quit()
+        finally:
+            # wake any host waiting on the simulation
+            for fifo in self._fifos:
+                fifo.close()
+            self._reset_done.set()
+
+    # -------------------------------------------------------------------------
     def get_bus(self):
         dbl = 1 if self.config == 1 else 0
         fx2 = Bus()
         fx2.IFCLK = Signal(bool(1))
-        (fx2.SLWR, fx2.SLRD, fx2.SLOE) = [Signal(bool(dbl)) for _ in range(3)]
+        (fx2.SLWR, fx2.SLRD, fx2.SLOE,
+         fx2.PKTEND) = [Signal(bool(dbl)) for _ in range(4)]
         fx2.RST = ResetSignal(bool(1), active=0, async=True)
         fx2.ADDR = Signal(intbv(0)[2:])
         fx2.FDI, fx2.FDO = [Signal(intbv(0)[8:]) for _ in (1, 2)]
@@ -147,7 +179,7 @@ class Fx2Model(threading.Thread):
 
         return fx2
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def configure(self, config=0):
         """
         The FX2 USB controller has many programmable options for the
@@ -166,27 +198,46 @@ class Fx2Model(threading.Thread):
               FLAGB : gotroom
               FLAGC : gotdata
 
-        @todo: need to implement double buffering
+        With a `packet_size` the endpoints are double (quad) buffered,
+        the `dev_fifo_*` are the packet buffers the slave FIFO accesses.
         """
         self.config = config
 
-        if self.config == 0:
-            self.wr_fifo_ep2 = []  # Write FIFO (this) writes the fifo
-            self.rd_fifo_ep6 = []  # Read FIFO
-            self.wr_fifo_ep4 = []  # Write FIFO
-            self.rd_fifo_ep8 = []
-        elif self.config == 1:
-            self.wr_fifo_ep2 = []
-            self.rd_fifo_ep6 = []
-            self.wr_fifo_ep4 = []
-            self.rd_fifo_ep8 = []
-
-    # ---------------------------------------------------------------------------
-    def trace_print(self, str):
+        # both configurations use the same buffers, the write (host to
+        # device) buffers are the host queue and the read buffers are
+        # limited to the FIFO size (no packets) or by the packet buffers.
+        rdlen = self.fifo_size if self.packet_size is None else None
+        self.wr_fifo_ep2 = EndpointBuffer()
+        self.rd_fifo_ep6 = EndpointBuffer(maxlen=rdlen)
+        self.wr_fifo_ep4 = EndpointBuffer()
+        self.rd_fifo_ep8 = EndpointBuffer(maxlen=rdlen)
+        self._fifos = (self.wr_fifo_ep2, self.rd_fifo_ep6,
+                       self.wr_fifo_ep4, self.rd_fifo_ep8)
+
+        if self.packet_size is None:
+            (self.dev_fifo_ep2, self.dev_fifo_ep6,
+             self.dev_fifo_ep4, self.dev_fifo_ep8) = self._fifos
+        else:
+            (self.dev_fifo_ep2, self.dev_fifo_ep6,
+             self.dev_fifo_ep4, self.dev_fifo_ep8) = [
+                PacketBuffers(self.packet_size, self.nbuffers)
+                for _ in range(4)]
+
+        # the slave FIFO transfers per endpoint: the bytes, the first
+        # and last simulation time, the first and last wall time
+        self._stats = {ep: [0, None, None, None, None]
+                       for ep in (self.EP2, self.EP4, self.EP6, self.EP8)}
+
+    # -------------------------------------------------------------------------
+    def trace_print(self, msg, *args):
+        """ log the message, the `args` are only formatted (str) when
+        verbose, the endpoint buffers can be large.
+        """
         if self.verbose:
-            self.ulog.debug('%d ... ' % (now()) + str,)
+            msg = ' '.join([msg] + [str(arg) for arg in args])
+            self.ulog.debug('%d ... ' % (now()) + msg,)
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     @myhdl.block
     def slave_fifo(self, fx2_bus):
         """
@@ -212,23 +263,34 @@ class Fx2Model(threading.Thread):
         def tb_reset():
             while True:
                 print('%8d ... Wait Reset' % (now()))
-                yield self.doreset.posedge
+                while not self._reset_req.is_set():
+                    yield fx.IFCLK.posedge
+                self._reset_req.clear()
+                self.doreset.next = True
                 print('%8d ... Do Reset' % (now()))
                 fx.RST.next = False
                 yield delay(13*self.IFCLK_TICK)
                 fx.RST.next = True
                 yield delay(13*self.IFCLK_TICK)
                 self.doreset.next = False
+                self._reset_done.set()
                 print('%8d ... End Reset' % (now()))
 
+        # the host writes are signaled (toggle) in the simulation
+        @always(fx.IFCLK.posedge)
+        def tb_write():
+            if self._write_req.is_set():
+                self._write_req.clear()
+                self.wr_toggle.next = not self.wr_toggle
+
         # The different configurations use different "active"
         # levels for the control signals.  Config0 uses active-high
         # Config1 uses active-low.  The model below always assumes
         # active-high signals, invert the signals for the configurations
         # that use active low signals
         # see the "work-around" ...
-        slrd, slwr, sloe = [Signal(bool(0)) for ii in range(3)]
-        _slrd, _slwr, _sloe = fx.SLRD, fx.SLWR, fx.SLOE
+        slrd, slwr, sloe, pktend = [Signal(bool(0)) for ii in range(4)]
+        _slrd, _slwr, _sloe, _pktend = fx.SLRD, fx.SLWR, fx.SLOE, fx.PKTEND
 
         @always_comb
         def hdl_assign():
@@ -236,10 +298,12 @@ class Fx2Model(threading.Thread):
                 slrd.next = not _slrd
                 sloe.next = not _sloe
                 slwr.next = not _slwr
+                pktend.next = not _pktend
             else:
                 slrd.next = _slrd
                 sloe.next = _sloe
                 slwr.next = _slwr
+                pktend.next = _pktend
 
         if self.config == 0:
             ep2_addr, ep4_addr, ep6_addr, ep8_addr = (0, 1, 2, 3)
@@ -281,11 +345,13 @@ class Fx2Model(threading.Thread):
                 # Slave write (data into the controller)
                 if slwr and not sloe:
                     if fx.ADDR == ep6_addr:
-                        if len(self.rd_fifo_ep6) < self.fifo_size:
-                            self.rd_fifo_ep6.append(int(fdi.val))
+                        if not self.dev_fifo_ep6.full():
+                            self.dev_fifo_ep6.put((int(fdi.val),))
+                            self._count_bytes(self.EP6)
                     elif fx.ADDR == ep8_addr:
-                        if len(self.rd_fifo_ep8) < self.fifo_size:
-                            self.rd_fifo_ep8.append(int(fdi.val))
+                        if not self.dev_fifo_ep8.full():
+                            self.dev_fifo_ep8.put((int(fdi.val),))
+                            self._count_bytes(self.EP8)
 
                 # Slave read (data out of the controller)
                 elif sloe and slrd:
@@ -293,31 +359,40 @@ class Fx2Model(threading.Thread):
                     FIFOA_Ok = (self.config == 0 and not fx.FLAGA) or (self.config == 1 and fx.FLAGC)
                     FIFOB_Ok = (self.config == 0 and not fx.FLAGC)
                     if fx.ADDR == ep2_addr and FIFOA_Ok:
-                        if len(self.wr_fifo_ep2) > 0:
-                            self.trace_print("      fifoA %s" % (self.wr_fifo_ep2))
-                            self.wr_fifo_ep2.pop(0)
+                        if len(self.dev_fifo_ep2) > 0:
+                            self.trace_print("      fifoA", self.dev_fifo_ep2)
+                            self.dev_fifo_ep2.pop()
+                            self._count_bytes(self.EP2)
                     elif fx.ADDR == ep4_addr and FIFOB_Ok:
-                        if len(self.wr_fifo_ep4) > 0:
-                            self.trace_print("      fifoB %s" % (self.wr_fifo_ep4))
-                            self.wr_fifo_ep4.pop(0)
+                        if len(self.dev_fifo_ep4) > 0:
+                            self.trace_print("      fifoB", self.dev_fifo_ep4)
+                            self.dev_fifo_ep4.pop()
+                            self._count_bytes(self.EP4)
 
-                if len(self.rd_fifo_ep8) == 128 or len(self.rd_fifo_ep8) == 256 or len(self.rd_fifo_ep8) == 512:
-                    self.trace_print("rd_fifo_ep8 len %d " % (len(self.rd_fifo_ep8,)))
+                # packet end, commit the short IN packet
+                if pktend and self.packet_size is not None:
+                    if fx.ADDR == ep6_addr:
+                        self.dev_fifo_ep6.pktend()
+                    elif fx.ADDR == ep8_addr:
+                        self.dev_fifo_ep8.pktend()
+
+                if len(self.rd_fifo_ep8) in (128, 256, 512):
+                    self.trace_print("rd_fifo_ep8 len", len(self.rd_fifo_ep8))
                     
                 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
                 # FIFOs have been modified, adjust flags
                 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
                 if self.config == 0:
-                    fx.FLAGA.next = False if len(self.wr_fifo_ep2) > 0 else True
-                    fx.FLAGB.next = False if len(self.wr_fifo_ep4) > 0 else True
-                    fx.FLAGC.next = True if len(self.rd_fifo_ep6) >= self.fifo_size else False
-                    fx.FLAGD.next = True if len(self.rd_fifo_ep8) >= self.fifo_size else False
+                    fx.FLAGA.next = len(self.dev_fifo_ep2) == 0
+                    fx.FLAGB.next = len(self.dev_fifo_ep4) == 0
+                    fx.FLAGC.next = self.dev_fifo_ep6.full()
+                    fx.FLAGD.next = self.dev_fifo_ep8.full()
 
                 elif self.config == 1:
                     # FLAGB : gotroom
                     # FLAGC : gotdata
-                    fx.FLAGC.next = True if len(self.wr_fifo_ep2) > 0 else False
-                    fx.FLAGB.next = True if len(self.rd_fifo_ep6) < self.fifo_size else False
+                    fx.FLAGC.next = len(self.dev_fifo_ep2) > 0
+                    fx.FLAGB.next = not self.dev_fifo_ep6.full()
                     fx.FLAGA.next = True
                     fx.FLAGD.next = True
 
@@ -328,75 +403,126 @@ class Fx2Model(threading.Thread):
             FIFOB_Ok = (self.config == 0 and not fx.FLAGC)
             edge = 'p' if fx.IFCLK else 'n'
             if fx.ADDR == ep2_addr:
-                if len(self.wr_fifo_ep2) > 0:
+                if len(self.dev_fifo_ep2) > 0:
                     if slrd and FIFOA_Ok:
-                        self.trace_print('%8d [%s] fdo26 --> %s (%s)' % (
-                            now(), edge, hex(fdo), type(self.wr_fifo_ep2[0])))
-                    fdo.next = self.wr_fifo_ep2[0]
+                        self.trace_print('[%s] fdo26 -->' % (edge,), hex(fdo))
+                    fdo.next = self.dev_fifo_ep2.peek()
                 else:
                     fdo.next = 0
                     
             elif fx.ADDR == ep4_addr:
-                if len(self.wr_fifo_ep4) > 0:
+                if len(self.dev_fifo_ep4) > 0:
                     if slrd and FIFOB_Ok:
-                        self.trace_print('%8d [%s] fdo48 --> %s (%s)' % (
-                            now(), edge, hex(fdo), type(self.wr_fifo_ep4[0])))
-                    fdo.next = self.wr_fifo_ep4[0]
+                        self.trace_print('[%s] fdo48 -->' % (edge,), hex(fdo))
+                    fdo.next = self.dev_fifo_ep4.peek()
                 else:
                     fdo.next = 0
                 
-        return tb_clkgen, tb_reset, hdl_assign, hdl_fifo_rw, hdl_do
-
-    # ---------------------------------------------------------------------------
+        gens = [tb_clkgen, tb_reset, tb_write, hdl_assign, hdl_fifo_rw,
+                hdl_do]
+
+        # the USB bus (host), moves the packets between the host queues
+        # and the packet buffers, one packet at a time
+        if self.packet_size is not None:
+            outs = ((self.wr_fifo_ep2, self.dev_fifo_ep2),
+                    (self.wr_fifo_ep4, self.dev_fifo_ep4))
+            ins = ((self.dev_fifo_ep6, self.rd_fifo_ep6),
+                   (self.dev_fifo_ep8, self.rd_fifo_ep8))
+
+            @instance
+            def tb_usb():
+                while True:
+                    yield fx.IFCLK.posedge
+                    for host, dev in outs:
+                        while len(host) > 0 and dev.nfree() > 0:
+                            nbytes = min(len(host), self.packet_size)
+                            if self.usb_bandwidth is not None:
+                                yield delay(self._usb_ticks(nbytes))
+                            dev.commit(host.get_bytes(nbytes))
+                    for dev, host in ins:
+                        while dev.packets() > 0:
+                            if self.usb_bandwidth is not None:
+                                nbytes = dev.packet_length()
+                                yield delay(self._usb_ticks(nbytes))
+                            host.put(dev.take())
+
+            gens.append(tb_usb)
+
+        return gens
+
+    def _usb_ticks(self, nbytes):
+        """ the simulation ticks (ns) to transfer `nbytes` """
+        return max(1, int(round(1e9 * nbytes / self.usb_bandwidth)))
+
+    def _count_bytes(self, ep, num=1):
+        """ the slave FIFO transferred `num` bytes """
+        stats = self._stats[ep]
+        if stats[1] is None:
+            stats[1], stats[3] = now(), time.time()
+        stats[0] += num
+        stats[2], stats[4] = now(), time.time()
+
+    def throughput(self, ep):
+        """ The slave FIFO (FPGA) throughput of an endpoint
+        Returns the bytes per simulated microsecond and the host
+        visible (wall time) MB/s, between the first and the last byte
+        the slave FIFO transferred.
+        """
+        nbytes, sim0, sim1, wall0, wall1 = self._stats[ep]
+        if nbytes < 2 or sim1 == sim0:
+            return 0., 0.
+        bytes_per_us = nbytes / ((sim1 - sim0) / 1000.)
+        mbps = nbytes / max(wall1 - wall0, 1e-9) / 1e6
+        return bytes_per_us, mbps
+
+    # -------------------------------------------------------------------------
     def reset(self):
-        time.sleep(.1)
-        self.trace_print('[S] RST %d' % (self.fx2_bus.RST,))
-        self.doreset.next = True
-        time.sleep(.1)
-        while self.doreset:
-            self.trace_print('[W2] RST %d' % (self.fx2_bus.RST,))
-            time.sleep(.1)
-        self.trace_print('[E] RST %d' % (self.fx2_bus.RST,))
+        """ Reset the simulation (host), returns when the reset is done
+        """
+        self.trace_print('[S] RST', self.fx2_bus.RST)
+        self._reset_done.clear()
+        self._reset_req.set()
+        self._reset_done.wait()
+        self.trace_print('[E] RST', self.fx2_bus.RST)
             
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def read(self, ep, num=1):
         """ Get values from an endpoint FIFO
         """
         rd = None
         if ep == self.EP6:
             if len(self.rd_fifo_ep6) > 0:
-                rd = [self.rd_fifo_ep6.pop(0) for _ in range(num)]
+                rd = self.rd_fifo_ep6.get(num)
             else:
                 print('FX2: Error Read Fifo26')
         elif ep == self.EP8:
             if len(self.rd_fifo_ep8) > 0:
-                rd = [self.rd_fifo_ep8.pop(0) for _ in range(num)]
+                rd = self.rd_fifo_ep8.get(num)
             else:
                 print('FX2: Error Read Fifo48')
 
         # @todo: toggle write signal (event)
         self.trace_print('FX2: Read EP %s --> %s f26 %d f48 %d' % (
             ep, str(rd), len(self.rd_fifo_ep6), len(self.rd_fifo_ep8)))
-        self.trace_print('  FX2: Read f26 %s' % (self.rd_fifo_ep6,))
-        self.trace_print('  FX2: Read f48 %s' % (self.rd_fifo_ep8,))
+        self.trace_print('  FX2: Read f26', self.rd_fifo_ep6)
+        self.trace_print('  FX2: Read f48', self.rd_fifo_ep8)
 
         return rd
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def write(self, data, ep):
         assert ep in (self.EP2, self.EP4), "Incorrect Endpoint"
         self.trace_print('FX2: Write EP %s' % (ep,))
         fifo = self.wr_fifo_ep2 if ep == self.EP2 else self.wr_fifo_ep4
-        if isinstance(data, list):
-            for d in data:
-                fifo.append(d)
-                self.trace_print("fill fifo %s with %s " % (ep, str(d)))
+        if isinstance(data, (list, tuple, bytes, bytearray, memoryview)):
+            fifo.put(data)
         elif isinstance(data, int):
-            self.fifo.append(data)
+            fifo.put((data,))
         else:
             raise TypeError
-                
-        self.wr_toggle.next = not self.wr_toggle
+
+        # the simulation toggles `wr_toggle`
+        self._write_req.set()
     
     # ~~~~~~~~~~~~~~~~~~~~~~~~~
     # @todo: Need to make the following Is* functions more generic.  The
@@ -404,20 +530,20 @@ class Fx2Model(threading.Thread):
     #        functions that work with the different configurations.
     # ~~~~~~~~~~~~~~~~~~~~~~~~~
     
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def isempty(self, ep):
         self.trace_print('FX2: Wait Empty EP %s' % (ep))
         if ep == self.EP2:
-            if len(self.wr_fifo_ep2) > 0:
+            if len(self.wr_fifo_ep2) > 0 or len(self.dev_fifo_ep2) > 0:
                 return False
         elif ep == self.EP4:
             self.trace_print('FX2: Length WrFifo48 %d' % (len(self.wr_fifo_ep4)))
-            if len(self.wr_fifo_ep4) > 0:
+            if len(self.wr_fifo_ep4) > 0 or len(self.dev_fifo_ep4) > 0:
                 return False
                     
         return True
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def isdata(self, ep, num=1):
         data = True
         if ep == self.EP6:
@@ -431,7 +557,64 @@ class Fx2Model(threading.Thread):
 
         return data
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
+    def _get_fifo(self, ep):
+        fifos = {self.EP2: self.wr_fifo_ep2, self.EP4: self.wr_fifo_ep4,
+                 self.EP6: self.rd_fifo_ep6, self.EP8: self.rd_fifo_ep8}
+        return fifos[ep]
+
+    def host_wait_empty(self, ep, timeout=None):
+        """ Wait for empty (host thread)
+        Block the host until the simulation emptied the endpoint, the
+        host wakes when the simulation reads the last byte.  With
+        packet buffers the endpoint is empty when the last packet was
+        transferred to the device (the bulk transfer is complete).
+        Returns False if the `timeout` (seconds) expires or the
+        simulation ended before the endpoint was empty.
+        """
+        fifo = self._get_fifo(ep)
+        return fifo.wait(lambda: len(fifo) == 0, timeout=timeout)
+
+    def host_wait_data(self, ep, num=1, timeout=None):
+        """ Wait for data (host thread)
+        Block the host until `num` bytes are available in the endpoint,
+        the `num` is limited to the FIFO size.  Returns False if the
+        `timeout` (seconds) expires or the simulation ended first.
+        """
+        fifo = self._get_fifo(ep)
+        if fifo.maxlen is not None:
+            num = min(num, fifo.maxlen)
+        return fifo.wait(lambda: len(fifo) >= num, timeout=timeout)
+
+    # -------------------------------------------------------------------------
+    def write_block(self, ep, data, timeout=None):
+        """ Bulk write (host thread)
+        Queue the `data` (bytes, bytearray) to an OUT endpoint and
+        block until the data was transferred.  Returns False if the
+        `timeout` (seconds) expires or the simulation ended first.
+        """
+        self.write(data, ep)
+        return self.host_wait_empty(ep, timeout=timeout)
+
+    def read_block(self, ep, num, timeout=None):
+        """ Bulk read (host thread)
+        Read `num` bytes from an IN endpoint, the bytes are read as the
+        packets arrive.  Returns a `bytearray`, fewer than `num` bytes
+        if the `timeout` (seconds) expires or the simulation ended.
+        """
+        fifo = self._get_fifo(ep)
+        end = None if timeout is None else time.time() + timeout
+        data = bytearray()
+        while len(data) < num:
+            remaining = None if end is None else end - time.time()
+            if remaining is not None and remaining <= 0:
+                break
+            if not fifo.wait(lambda: len(fifo) > 0, timeout=remaining):
+                break
+            data += fifo.get_bytes(num - len(data))
+        return data
+
+    # -------------------------------------------------------------------------
     def wait_empty(self, ep):
         """ Wait for empty (only if a simulation generator)
         """
@@ -439,7 +622,7 @@ class Fx2Model(threading.Thread):
         while not self.isempty(ep):
             yield delay(2*self.IFCLK_TICK)
 
-    # ---------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
     def wait_data(self, ep, num=1):
         """ Wait for data (only if a simulation generator)
         """
@@ -4,3 +4,5 @@ from __future__ import absolute_import
 from .video_display import VideoDisplay
 from .vga_display import VGADisplay
 from .lt24lcd_display import LT24LCDDisplay
+from .frame_check import FrameChecker, FrameDiff
+from .frame_check import color_bars_frame, load_golden
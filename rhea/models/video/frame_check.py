@@ -0,0 +1,195 @@
+
+from __future__ import print_function, division
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from rhea.cores.video.color_bars import COLOR_BARS
+
+
+def color_bars_frame(resolution, color_depth):
+    """ The expected frame for the `color_bars` pattern
+
+    Arguments:
+        resolution: the number of (columns, rows)
+        color_depth: the number of bits for each color
+
+    Returns:
+        a (rows, columns, 3) array
+    """
+    ncol, nrow = resolution
+    num_colors = len(COLOR_BARS)
+    pw = ncol // num_colors
+    maxval = np.array([(2**w)-1 for w in color_depth])
+    bars = np.array(COLOR_BARS) * maxval
+
+    # the bar for each column, same as the color_bars hardware, a
+    # column is in bar ii if it is greater than ii*pw
+    cols = np.arange(ncol)
+    sel = np.zeros(ncol, dtype=int)
+    for ii in range(num_colors):
+        sel[cols > ii*pw] = ii
+
+    row = bars[sel]
+    return np.tile(row[np.newaxis, :, :], (nrow, 1, 1))
+
+
+def load_golden(filename):
+    """ load a golden image (png) as a (rows, columns, 3) array """
+    im = Image.open(filename)
+    frame = np.asarray(im.convert('RGB'))
+    im.close()
+    return frame
+
+
+class FrameDiff(object):
+    def __init__(self, mismatches=0, max_diff=0, mask=None,
+                 failed_regions=()):
+        """ The result of comparing a frame with the expected frame
+
+        Attributes:
+            mismatches (int): number of pixels outside the tolerance
+            max_diff (int): the largest color difference
+            mask: (rows, columns) boolean array of the mismatched
+                pixels, None if not computed (a region failed)
+            failed_regions: the regions whose mean color was outside
+                the tolerance
+        """
+        self.mismatches = mismatches
+        self.max_diff = max_diff
+        self.mask = mask
+        self.failed_regions = list(failed_regions)
+        self.passed = False
+
+    def __bool__(self):
+        return self.passed
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "FrameDiff(passed={}, mismatches={}, max_diff={})".format(
+            self.passed, self.mismatches, self.max_diff)
+
+
+class FrameChecker(object):
+    def __init__(self, expected, tolerance=0, max_mismatches=0,
+                 edge_margin=0, regions=None, stop=True):
+        """ Compare the frames from a display model with an expected frame
+
+        Arguments:
+            expected: the expected frame, a (rows, columns, 3) array,
+                the file name of a golden image (png), or a function
+                that creates the frame given the resolution and color
+                depth, e.g. `color_bars_frame`.
+            tolerance (int): the allowed difference of each color
+            max_mismatches (int): the number of pixels allowed to be
+                outside the tolerance
+            edge_margin (int): ignore the pixels within this many
+                columns of a vertical edge in the expected frame, the
+                video pipelines can shift the frame by a couple pixels.
+            regions: list of (col0, row0, col1, row1) regions, the mean
+                color of each region is compared first (early exit).
+            stop (bool): stop the simulation when a frame matches
+
+        Example:
+            >> checker = FrameChecker(color_bars_frame, edge_margin=2)
+            >> display.add_checker(checker)
+        """
+        self.expected = expected
+        self.tolerance = tolerance
+        self.max_mismatches = max_mismatches
+        self.edge_margin = edge_margin
+        self.regions = regions
+        self.stop = stop
+
+        # the number (display update count) of the first frame that
+        # matched and the result of the last comparison.
+        self.matched_frame = None
+        self.last_diff = None
+        self._frame = None
+        self._ignore = None
+        # golden images are 8 bit, frames are saturated when saved
+        self._saturate = isinstance(expected, str)
+
+    def get_expected(self, resolution, color_depth):
+        """ get the expected (rows, columns, 3) array """
+        if self._frame is None:
+            expected = self.expected
+            if isinstance(expected, str):
+                if not os.path.isfile(expected):
+                    raise ValueError("golden image {} not found".format(
+                        expected))
+                expected = load_golden(expected)
+            elif callable(expected):
+                expected = expected(resolution, color_depth)
+            expected = np.asarray(expected).astype(np.int32)
+            if expected.shape != (resolution[1], resolution[0], 3):
+                raise ValueError(
+                    "expected frame shape {} does not match the "
+                    "resolution {}".format(expected.shape, resolution))
+            self._frame = expected
+            self._ignore = self._edge_mask(expected)
+        return self._frame
+
+    def _edge_mask(self, expected):
+        """ the columns near a vertical edge in the expected frame """
+        ncol = expected.shape[1]
+        ignore = np.zeros(expected.shape[:2], dtype=bool)
+        if self.edge_margin == 0 or ncol < 2:
+            return ignore
+        edges = np.any(expected[:, 1:] != expected[:, :-1], axis=2)
+        rows, cols = np.nonzero(edges)
+        for dd in range(-self.edge_margin+1, self.edge_margin+1):
+            cc = np.clip(cols + dd, 0, ncol-1)
+            ignore[rows, cc] = True
+        return ignore
+
+    def compare(self, frame, color_depth=None):
+        """ Compare a frame with the expected frame
+
+        Arguments:
+            frame: (rows, columns, 3) array, e.g. `VideoDisplay.frame`
+            color_depth: the color depth of the frame, needed if the
+                expected frame is created by a function.
+
+        Returns:
+            FrameDiff, true if the frame matches
+        """
+        frame = np.asarray(frame).astype(np.int32)
+        if self._saturate:
+            frame = np.clip(frame, 0, 255)
+        resolution = (frame.shape[1], frame.shape[0])
+        expected = self.get_expected(resolution, color_depth)
+        diff = np.abs(frame - expected)
+
+        # compare the mean of the regions, stop at the first failure
+        for region in (self.regions or ()):
+            c0, r0, c1, r1 = region
+            mean_diff = np.abs(frame[r0:r1, c0:c1].mean(axis=(0, 1)) -
+                               expected[r0:r1, c0:c1].mean(axis=(0, 1)))
+            if np.any(mean_diff > self.tolerance):
+                result = FrameDiff(max_diff=int(diff.max()),
+                                   failed_regions=[region])
+                self.last_diff = result
+                return result
+
+        mask = np.any(diff > self.tolerance, axis=2) & ~self._ignore
+        result = FrameDiff(mismatches=int(mask.sum()),
+                           max_diff=int(diff.max()), mask=mask)
+        result.passed = result.mismatches <= self.max_mismatches
+        self.last_diff = result
+        return result
+
+    def check_display(self, display):
+        """ Compare the last complete frame of a display model
+
+        Returns:
+            True if the frame matches
+        """
+        result = self.compare(display.frame, display.color_depth)
+        if result and self.matched_frame is None:
+            self.matched_frame = display.update_cnt
+        print("   frame {} check: {}".format(display.update_cnt, result))
+        return bool(result)
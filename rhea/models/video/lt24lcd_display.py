@@ -9,12 +9,13 @@ from .video_display import VideoDisplay
 
 
 class LT24LCDDisplay(VideoDisplay):
-    def __init__(self):
+    def __init__(self, save_every=1):
         """
         """
         self.resolution = res = (240, 320)
         self.color_depth = cd = (5, 6, 5)
-        super(LT24LCDDisplay, self).__init__(resolution=res, color_depth=cd)
+        super(LT24LCDDisplay, self).__init__(resolution=res, color_depth=cd,
+                                             save_every=save_every)
         self.name = 'lt24lcd'                
 
     @myhdl.block
@@ -2,9 +2,10 @@
 from __future__ import print_function, division
 
 import os
-from copy import deepcopy
 from datetime import datetime
-from myhdl import intbv, now
+
+import numpy as np
+from myhdl import StopSimulation
 from PIL import Image
 
 
@@ -13,9 +14,19 @@ class VideoDisplay(object):
                  resolution=(640,480,), 
                  refresh_rate = 60,
                  line_rate = 31250,
-                 color_depth=(10, 10, 10,)
+                 color_depth=(10, 10, 10,),
+                 save_every=1
              ):
         """
+        The display memory is a (rows, columns, 3) NumPy array, the
+        pixels are written to the update buffer and when a full frame
+        has been written it is copied to the display buffer.
+
+        Arguments:
+            resolution: the number of (columns, rows)
+            color_depth: the number of bits for each color
+            save_every: save an image (png) of every Nth frame, 0
+                to not save any images
         """
         self.resolution = res = resolution
         self.num_hpxl, self.num_vpxl = self.resolution
@@ -23,15 +34,18 @@ class VideoDisplay(object):
         self.update_cnt = 0
         self._col, self._row = 0, 0
         self.color_depth=color_depth
+        self.save_every = save_every
 
         # create a container to emulate the video display
-        # in the process of updating image
-        self._uvmem = [[None for _ in range(res[0])]
-                        for _ in range(res[1])]
-        # static image
-        self._vvmem = [[None for _ in range(res[0])]
-                        for _ in range(res[1])]
+        # in the process of updating image (update buffer) and
+        # the static image (display buffer)
+        dtype = np.uint8 if max(color_depth) <= 8 else np.uint16
+        self._uvmem = np.zeros((res[1], res[0], 3), dtype=dtype)
+        self._vvmem = np.zeros((res[1], res[0], 3), dtype=dtype)
                         
+        # frame checkers (FrameChecker) called for each complete frame
+        self.checkers = []
+
         # emulating video displays takes considerable simulation time, track
         # the simulation real time. 
         self.time_start = datetime.now()
@@ -41,6 +55,18 @@ class VideoDisplay(object):
         s = "{} x {} emulated display with {} colors".format(
              self.resolution[0], self.resolution[1], self.color_depth)
         return s
+
+    @property
+    def frame(self):
+        """ the last complete frame, (rows, columns, 3) array """
+        return self._vvmem
+        
+    def add_checker(self, checker):
+        """ Check each complete frame, see `FrameChecker`.  If the
+        checker stops the simulation, the simulation is stopped when
+        a frame matches.
+        """
+        self.checkers.append(checker)
         
     def get_time(self):
         """ get the amount of real time from creation to now """
@@ -55,18 +81,16 @@ class VideoDisplay(object):
         assert row < self.num_vpxl
 
         if isinstance(val, int):
-            nbits = sum(self.color_depth)
-            val = intbv(val)[nbits:]
-            cd = self.color_depth
-            rgb = (int(val[nbits:nbits-cd[0]]),
-                   int(val[nbits-cd[0]:cd[2]]),
-                   int(val[cd[2]:0]),)
+            r, g, b = self.color_depth
+            rgb = ((val >> (g+b)) & ((1 << r)-1),
+                   (val >> b) & ((1 << g)-1),
+                   val & ((1 << b)-1),)
         elif isinstance(val, tuple):
             rgb = val
         else:
             raise ValueError
 
-        self._uvmem[row][col] = rgb
+        self._uvmem[row, col] = rgb
 
         col += 1
         if col == self.num_hpxl:
@@ -76,13 +100,7 @@ class VideoDisplay(object):
             row = 0
 
         if col == 0 and row == 0:
-            # @todo: remove print add option to create png or not
-            self.update_cnt += 1
-            td = datetime.now() - self.time_last
-            print("{:<10d}: full display update {} ({})".format(now(), self.update_cnt, td))
-            self._vvmem = deepcopy(self._uvmem)
-            self.create_save_image()
-            self.time_last = datetime.now()
+            self._frame_complete()
             
         self._col, self._row = col, row
         return 
@@ -95,40 +113,36 @@ class VideoDisplay(object):
         """
         assert col < self.num_hpxl
         assert row < self.num_vpxl
-        self._uvmem[row][col] = rgb
+        self._uvmem[row, col] = rgb
         if last:
-            self.update_cnt += 1
-            td = datetime.now() - self.time_last
-            print("{:<10d}: full display update {} ({})".format(now(), self.update_cnt, td))
-            self._vvmem = deepcopy(self._uvmem)
-            self.create_save_image()
-            self.time_last = datetime.now()
+            self._frame_complete()
         return
 
-    def _adjust_color_depth(self, rgb):
-        argb = rgb
-        if self.color_depth != (8, 8, 8):
-            argb = [(vv/cc)*256 for vv, cc in zip(rgb, self.color_depth)]
-            argb = list(map(int, argb))
-        return argb
+    def _frame_complete(self):
+        """ a full display update, copy the update buffer to the
+        display buffer, the update buffer keeps the pixels that are
+        not updated in the next frame.
+        """
+        self.update_cnt += 1
+        np.copyto(self._vvmem, self._uvmem)
+        if self.save_every and self.update_cnt % self.save_every == 0:
+            self.create_save_image()
+        self.time_last = datetime.now()
+
+        matched = [checker.check_display(self) for checker in self.checkers]
+        stop = [mm for mm, cc in zip(matched, self.checkers) if cc.stop]
+        if len(stop) > 0 and all(stop):
+            raise StopSimulation("frame {} matches".format(self.update_cnt))
 
     def create_save_image(self):
-        """ 
-        :param framen: frame number
-        :param frame: 2D frame container (list, array)
+        """ Save the last complete frame as a png,
+        output/<name>_frame_<update count>.png
         """
         framen = self.update_cnt   # latest display update
         frame = self._vvmem        # display memory
         print("Creating frame image and saving as png")
-        im = Image.new('RGB', self.resolution, self.color_depth)
-        assert len(frame) <= self.resolution[1]
-        assert len(frame[0]) <= self.resolution[0]
-        print("   ... put pixels")
-        for rr, row in enumerate(frame):
-            for cc, rgb in enumerate(row):
-                #rgb = self._adjust_color_depth(rgb)
-                im.putpixel((cc, rr), tuple(rgb))
-                pass 
+        # the colors are not scaled, values larger than 255 saturate
+        im = Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8), 'RGB')
                 
         if not os.path.isdir("output"):
             os.makedirs("output")
@@ -137,15 +151,6 @@ class VideoDisplay(object):
         print("   ... save image")
         print("     width ........... {}".format(im.width))
         print("     height .......... {}".format(im.height))
-        # debug, should always be a set of colors
-        if im.getcolors() is None:
-            for row in range(2):
-                for col in range(8):
-                    print("{} -> {} ".format(
-                          frame[row][col], im.getpixel((col, row)) ),
-                         end='')
-                print("")
-        im.verify()
         im.save(imgpath)
         im.close()
         print("image written")
@@ -153,5 +158,3 @@ class VideoDisplay(object):
     def process(self, glbl, vga):
         """ emulate the behavior of the display """
         raise NotImplemented
-
-
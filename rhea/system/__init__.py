@@ -25,6 +25,7 @@ from .memmap import Barebone
 from .memmap import Wishbone
 from .memmap import AvalonMM
 from .memmap import AXI4Lite
+from .memmap import AXI4
 
 # streaming interfaces
 from .stream import FIFOBus
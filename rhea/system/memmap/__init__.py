@@ -16,4 +16,5 @@ from .barebone import Barebone
 from .wishbone import Wishbone
 from .avalonmm import AvalonMM
 from .axi4 import AXI4Lite
+from .axi4 import AXI4
 
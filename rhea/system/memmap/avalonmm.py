@@ -5,19 +5,22 @@
 from __future__ import absolute_import
 
 import myhdl
-from myhdl import (Signal, intbv, always_seq, always, always_comb,
+from myhdl import (Signal, intbv, modbv, always_seq, always, always_comb,
                    instances, enum, delay, concat)
 
 from .. import Clock
 from .. import Reset
+from ..glbl import Global
 from . import MemoryMapped
 from . import Barebone
+from .memmap import _register
 
 
 class AvalonMM(MemoryMapped):
     name = 'avalon'
 
-    def __init__(self, glbl=None, data_width=8, address_width=16, name=None):
+    def __init__(self, glbl=None, data_width=8, address_width=16, name=None,
+                 pipelined=False, max_burst=1):
         """ AvalonMM bus object
         Parameters (kwargs):
         --------------------
@@ -25,8 +28,17 @@ class AvalonMM(MemoryMapped):
         :param data_width: data bus width
         :param address_width: address bus width
         :param name: name for the bus
+        :param pipelined: pipelined reads, a master can issue a read
+            or write each cycle `waitrequest` is not active, the read
+            data is returned (in order) with `readdatavalid` after a
+            variable latency.
+        :param max_burst: the max `burstcount`, a burst is a single
+            command (address and burstcount) followed by `burstcount`
+            write beats or read data, the address increments by the
+            data bytes.  Bursts need the pipelined mode.
         """
-        super(AvalonMM, self).__init__(data_width=data_width,
+        assert max_burst == 1 or pipelined, "bursts need the pipelined mode"
+        super(AvalonMM, self).__init__(glbl, data_width=data_width,
                                        address_width=address_width)
         if glbl is None:
             self.clk = Clock(0)
@@ -38,8 +50,10 @@ class AvalonMM(MemoryMapped):
         else:
             self.reset = glbl.reset
 
+        nbytes = max(1, data_width // 8)
         self.address = Signal(intbv(0)[address_width:])
-        self.byteenable = Signal(intbv(0)[2:])
+        self.byteenable = Signal(intbv(2**nbytes-1)[nbytes:])
+        self.burstcount = Signal(intbv(1, min=0, max=max_burst+1))
         self.read = Signal(bool(0))
         self.write = Signal(bool(0))
         self.waitrequest = Signal(bool(0))
@@ -47,6 +61,8 @@ class AvalonMM(MemoryMapped):
         self.readdata = Signal(intbv(0)[data_width:])
         self.writedata = Signal(intbv(0)[data_width:])
         self.response = Signal(intbv(0)[2:])
+        self.pipelined = pipelined
+        self.max_burst = max_burst
 
         self._readdata = []
         self._readdatavalid = []
@@ -61,11 +77,42 @@ class AvalonMM(MemoryMapped):
     @myhdl.block
     def interconnect(self):
         """ combine all the peripheral outputs
+
+        With an address decoder (`set_decoder`) the outputs of the
+        decoded peripheral are multiplexed.
         """
         assert len(self._readdata) == len(self._readdatavalid)
         ndevs = len(self._readdata)
         av = self
 
+        if self.decoder is not None:
+            assert not self.pipelined, \
+                "the decoded interconnect does not support the pipelined mode"
+            return self._interconnect_decoded()
+
+        # in pipelined mode the peripheral outputs are registered and
+        # combined without a register (a read each cycle).
+        if self.pipelined:
+            prddat = self._readdata
+            pvalid = self._readdatavalid
+            pwait = self._waitrequest
+
+            @always_comb
+            def beh_or_combine_pipe():
+                rddats = 0
+                valids = False
+                waits = False
+                for ii in range(ndevs):
+                    rddats = rddats | prddat[ii]
+                    valids = valids or pvalid[ii]
+                    waits = waits or pwait[ii]
+
+                av.readdata.next = rddats
+                av.readdatavalid.next = valids
+                av.waitrequest.next = waits
+
+            return beh_or_combine_pipe
+
         @always_seq(self.clk.posedge, reset=self.reset)
         def beh_or_combine():
             rddats, valids, waits = 0, 0, 0
@@ -81,9 +128,39 @@ class AvalonMM(MemoryMapped):
         return beh_or_combine
 
     @myhdl.block
-    def peripheral_regfile(self, regfile, name='', base_address=0x0):
+    def _interconnect_decoded(self):
+        av = self
+        nsel = len(self._selects)
+        assert len(self._readdata) == nsel, \
+            "all the peripherals need a decoder select"
+        stages = self.decoder['stages']
+        stages = 1 if stages is None else stages
+
+        # the peripherals register the select and the address is
+        # held for the transfer
+        index = Signal(intbv(nsel, min=0, max=nsel+1))
+        decode_inst = self.address_decoder(av.address, index)
+        mux_insts = [
+            self.output_mux(index, self._readdata, av.readdata, stages),
+            self.output_mux(index, self._readdatavalid, av.readdatavalid,
+                            stages),
+            self.output_mux(index, self._waitrequest, av.waitrequest,
+                            stages),
+        ]
+
+        return decode_inst, mux_insts
+
+    @myhdl.block
+    def peripheral_regfile(self, regfile, name='', base_address=None):
         """ memory-mapped avalon peripheral interface
         """
+        if base_address is None:
+            base_address = regfile.base_address
+        if base_address is None:
+            base_address = 0
+
+        if self.pipelined:
+            return self._peripheral_regfile_pipe(regfile, name, base_address)
 
         # local alias
         av = self      # register bus
@@ -94,7 +171,6 @@ class AvalonMM(MemoryMapped):
         addr_list, regs_list = al, rl
         pwr, prd = rf.get_strobelist()
 
-        # @todo: have be base_address be an attribute of the regfile
         nregs = len(regs_list)
         max_address = base_address + max(addr_list)
 
@@ -104,45 +180,191 @@ class AvalonMM(MemoryMapped):
         reset = self.reset
 
         # determine if this register-file is selected, this check
-        # adds an extra clock cycle to the transaction
-        selected = Signal(bool(0))
+        # adds an extra clock cycle to the transaction, with an address
+        # decoder the (registered) select is from the decoder and the
+        # outputs are combined by the interconnect.
+        selected = av.get_select(base_address, max_address)
+        readdata = av.readdata
 
-        @always_seq(clock.posedge, reset=reset)
-        def beh_selected():
-            if av.address >= base_address and av.address < max_address:
-                selected.next = True
-            else:
-                selected.next = False
+        if selected is None:
+            selected = Signal(bool(0))
 
-        # @todo: scan the register list, if it is contiguous remove
-        #        the base and use the offset directly to access the
-        #        register list instead of the for loop
-        # if regfile.contiguous:
-        #     @always_seq(clock.posedge, reset=reset)
-        #     ...
+            @always_seq(clock.posedge, reset=reset)
+            def beh_selected():
+                if av.address >= base_address and av.address <= max_address:
+                    selected.next = True
+                else:
+                    selected.next = False
+        else:
+            readdata = Signal(intbv(0)[self.data_width:])
+            readdatavalid = Signal(bool(0))
+            av.add_output_bus(name, readdata, readdatavalid, Signal(bool(0)))
+
+            @always_seq(clock.posedge, reset=reset)
+            def beh_valid():
+                readdatavalid.next = selected and av.read
+
+        # if the register addresses are regular (contiguous) the
+        # register is indexed by the address offset, otherwise the
+        # address is compared to each register address.
+        indexed = rf.contiguous
+        if indexed:
+            ridx = Signal(intbv(nregs, min=0, max=nregs+1))
+            index_inst = rf.get_index(av.address, ridx, base_address)
+            # the register read (rdidx) and written (wridx) last
+            rdidx = Signal(intbv(0, min=0, max=nregs+1))
+            wridx = Signal(intbv(0, min=0, max=nregs+1))
+            rdp, wrp = Signal(bool(0)), Signal(bool(0))
 
         # read side of the bus transaction
-        @always(clock.posedge)
-        def beh_read():
-            if reset == int(reset.active):
-                for ii in range(nregs):
-                    prd[ii].next = False
-            else:
-                if selected and not av.write:
+        if not indexed:
+            @always(clock.posedge)
+            def beh_read():
+                if reset == int(reset.active):
                     for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
-                        if av.address == aa:
-                            av.readdata.next = regs_list[ii]
-                            prd[ii].next = True
+                        prd[ii].next = False
                 else:
-                    av.readdata.next = 0
+                    if selected and not av.write:
+                        for ii in range(nregs):
+                            aa = addr_list[ii]
+                            aa = aa + base_address
+                            if av.address == aa:
+                                readdata.next = regs_list[ii]
+                                prd[ii].next = True
+                    else:
+                        readdata.next = 0
+                        for ii in range(nregs):
+                            prd[ii].next = False
+        else:
+            # only the last read strobe is cleared
+            @always(clock.posedge)
+            def beh_read():
+                if reset == int(reset.active):
                     for ii in range(nregs):
                         prd[ii].next = False
+                    rdp.next = False
+                else:
+                    if rdp:
+                        prd[rdidx].next = False
+                    rdp.next = False
+                    readdata.next = 0
+                    if selected and not av.write and ridx < nregs:
+                        readdata.next = regs_list[ridx]
+                        prd[ridx].next = True
+                        rdidx.next = ridx
+                        rdp.next = True
 
         # write side of the bus transaction
+        if not indexed:
+            @always(clock.posedge)
+            def beh_write():
+                if reset == int(reset.active):
+                    for ii in range(nregs):
+                        ro = rol[ii]
+                        dd = dl[ii]
+                        if not ro:
+                            regs_list[ii].next = dd
+                        pwr[ii].next = False
+                else:
+                    if selected and av.write:
+                        for ii in range(nregs):
+                            aa = addr_list[ii]
+                            aa = aa + base_address
+                            ro = rol[ii]
+                            if not ro and av.address == aa:
+                                regs_list[ii].next = av.writedata
+                                pwr[ii].next = True
+                            else:
+                                pwr[ii].next = False
+                    else:
+                        for ii in range(nregs):
+                            pwr[ii].next = False
+        else:
+            # the register is written at the indexed location and only
+            # the last write strobe is cleared.
+            @always(clock.posedge)
+            def beh_write():
+                if reset == int(reset.active):
+                    for ii in range(nregs):
+                        ro = rol[ii]
+                        dd = dl[ii]
+                        if not ro:
+                            regs_list[ii].next = dd
+                        pwr[ii].next = False
+                    wrp.next = False
+                else:
+                    if wrp:
+                        pwr[wridx].next = False
+                    wrp.next = False
+                    if selected and av.write and ridx < nregs:
+                        ro = rol[ridx]
+                        if not ro:
+                            regs_list[ridx].next = av.writedata
+                            pwr[ridx].next = True
+                            wridx.next = ridx
+                            wrp.next = True
+
+        # get the generators that assign the named bits
+        assign_insts = regfile.get_assigns()
+
+        return myhdl.instances()
+
+    @myhdl.block
+    def _peripheral_regfile_pipe(self, regfile, name, base_address):
+        """ pipelined mode, a read or write is accepted each cycle, the
+        read data is registered (one cycle latency).  A read burst
+        returns a word each cycle, new commands wait (`waitrequest`)
+        until the burst is complete.
+        """
+        av = self
+        rf = regfile
+        clock, reset = self.clk, self.reset
+
+        al, rl, rol, dl = rf.get_reglist()
+        regs_list = rl
+        pwr, prd = rf.get_strobelist()
+        nregs = len(regs_list)
+        max_address = base_address + max(al)
+
+        aw, dw = self.address_width, self.data_width
+        nbytes = len(self.byteenable)
+        max_burst = self.max_burst
+
+        readdata = Signal(intbv(0)[dw:])
+        readdatavalid, waitrequest = Signal(bool(0)), Signal(bool(0))
+        av.add_output_bus(name, readdata, readdatavalid, waitrequest)
+
+        # the burst in progress, address and the beats left
+        bread, bwrite = Signal(bool(0)), Signal(bool(0))
+        baddr = Signal(modbv(0)[aw:])
+        bcnt = Signal(intbv(0, min=0, max=max_burst+1))
+
+        # the register addressed, the command or burst address
+        selected = Signal(bool(0))
+        addr = Signal(intbv(0)[aw:])
+        ridx = Signal(intbv(nregs, min=0, max=nregs+1))
+        index_inst = rf.get_index(addr, ridx, base_address)
+
+        # the register read (rdidx) and written (wridx) last
+        rdidx = Signal(intbv(0, min=0, max=nregs+1))
+        wridx = Signal(intbv(0, min=0, max=nregs+1))
+        rdp, wrp = Signal(bool(0)), Signal(bool(0))
+
+        @always_comb
+        def beh_selected():
+            if bread or bwrite:
+                addr.next = baddr
+            else:
+                addr.next = av.address
+            if av.address >= base_address and av.address <= max_address:
+                selected.next = True
+            else:
+                selected.next = False
+            waitrequest.next = bread
+
         @always(clock.posedge)
-        def beh_write():
+        def beh_access():
+            val = intbv(0)[dw:]
             if reset == int(reset.active):
                 for ii in range(nregs):
                     ro = rol[ii]
@@ -150,35 +372,178 @@ class AvalonMM(MemoryMapped):
                     if not ro:
                         regs_list[ii].next = dd
                     pwr[ii].next = False
+                    prd[ii].next = False
+                rdp.next = False
+                wrp.next = False
+                bread.next = False
+                bwrite.next = False
+                readdatavalid.next = False
+                readdata.next = 0
             else:
-                if selected and av.write:
-                    for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
-                        ro = rol[ii]
-                        if not ro and av.address == aa:
-                            regs_list[ii].next = av.writedata
-                            pwr[ii].next = True
-                else:
-                    for ii in range(nregs):
-                        pwr[ii].next = False
+                if rdp:
+                    prd[rdidx].next = False
+                if wrp:
+                    pwr[wridx].next = False
+                rdp.next = False
+                wrp.next = False
+                readdatavalid.next = False
+                readdata.next = 0
+
+                # a read, the first word of a burst or the next word,
+                # a new command is accepted when the bus is not waiting
+                if bread or (selected and av.read and not bwrite and
+                             not av.waitrequest):
+                    readdatavalid.next = True
+                    if ridx < nregs:
+                        readdata.next = regs_list[ridx]
+                        prd[ridx].next = True
+                        rdidx.next = ridx
+                        rdp.next = True
+
+                # a write, the first beat of a burst or the next beat
+                if (bwrite and av.write) or (selected and av.write and
+                                             not bwrite and
+                                             not av.waitrequest):
+                    if ridx < nregs:
+                        ro = rol[ridx]
+                        if not ro:
+                            val[:] = regs_list[ridx]
+                            for jj in range(dw):
+                                if av.byteenable[jj//8]:
+                                    val[jj] = av.writedata[jj]
+                            regs_list[ridx].next = val
+                            pwr[ridx].next = True
+                            wridx.next = ridx
+                            wrp.next = True
+
+                # the burst address and count
+                if bread or (bwrite and av.write):
+                    baddr.next = baddr + nbytes
+                    bcnt.next = bcnt - 1
+                    if bcnt == 1:
+                        bread.next = False
+                        bwrite.next = False
+                elif (selected and (av.read or av.write) and not bwrite and
+                        not av.waitrequest and av.burstcount > 1):
+                    baddr.next = av.address + nbytes
+                    bcnt.next = av.burstcount - 1
+                    bread.next = av.read
+                    bwrite.next = av.write
 
         # get the generators that assign the named bits
         assign_insts = regfile.get_assigns()
 
-        return myhdl.instances()
+        return instances()
+
+    def get_generic(self):
+        generic = Barebone(Global(self.clk, self.reset),
+                           data_width=self.data_width,
+                           address_width=self.address_width)
+        return generic
+
+    @myhdl.block
+    def map_to_generic(self, generic):
+        """ Avalon-MM (pipelined) peripheral to the generic bus
+
+        Each read, write, and beat of a burst is a generic transfer,
+        `waitrequest` is active until the generic bus is done.  All
+        the addresses are accepted (a single peripheral).
+        """
+        assert self.pipelined, "the generic bridge needs the pipelined mode"
+        av, bb = self, generic
+        clock, reset = self.clk, self.reset
+        aw, pw = self.address_width, len(bb.per_addr)
+        nbytes = len(self.byteenable)
+
+        readdata = Signal(intbv(0)[self.data_width:])
+        readdatavalid, waitrequest = Signal(bool(0)), Signal(bool(0))
+        av.add_output_bus('generic', readdata, readdatavalid, waitrequest)
+
+        states = enum('idle', 'write_wait', 'write_beat', 'read_wait')
+        state = Signal(states.idle)
+        addr = Signal(modbv(0)[aw:])
+        cnt = Signal(intbv(0, min=0, max=self.max_burst+1))
+        rdata = Signal(intbv(0)[self.data_width:])
+
+        @always_comb
+        def beh_assign():
+            waitrequest.next = not (state == states.idle or
+                                    state == states.write_beat)
+            bb.per_addr.next = addr[aw:aw-pw]
+            bb.mem_addr.next = addr[aw-pw:0]
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_sm():
+            readdatavalid.next = False
+            readdata.next = 0
+
+            if state == states.idle:
+                cnt.next = 0
+                if av.burstcount > 1:
+                    cnt.next = av.burstcount - 1
+                if av.write:
+                    addr.next = av.address
+                    bb.write.next = True
+                    bb.write_data.next = av.writedata
+                    state.next = states.write_wait
+                elif av.read:
+                    addr.next = av.address
+                    bb.read.next = True
+                    state.next = states.read_wait
+
+            elif state == states.write_wait:
+                bb.write.next = False
+                if bb.done and not bb.write:
+                    if cnt == 0:
+                        state.next = states.idle
+                    else:
+                        state.next = states.write_beat
+
+            elif state == states.write_beat:
+                if av.write:
+                    addr.next = addr + nbytes
+                    cnt.next = cnt - 1
+                    bb.write.next = True
+                    bb.write_data.next = av.writedata
+                    state.next = states.write_wait
+
+            elif state == states.read_wait:
+                bb.read.next = False
+                # the read data is valid while the transaction is active
+                if not bb.done:
+                    rdata.next = bb.read_data
+                elif not bb.read:
+                    readdatavalid.next = True
+                    readdata.next = rdata
+                    if cnt == 0:
+                        state.next = states.idle
+                    else:
+                        addr.next = addr + nbytes
+                        cnt.next = cnt - 1
+                        bb.read.next = True
+
+        return beh_assign, beh_sm
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    # @todo: map_to_generic(self)
     # @todo: map_from_generic(self, generic)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def writetrans(self, addr, val):
         """ write accessor for testbenches
-        :param addr: address to write
-        :param val: value to write to the address
+        :param addr: address to write, in pipelined mode a list of
+            addresses is written back-to-back
+        :param val: value to write to the address, in pipelined mode
+            a list of values (single address) is a burst write
+            (split into `max_burst` bursts).
         :return: yields
         """
+        if self.pipelined:
+            cmds, vals = self._get_commands(addr, val)
+            self._start_transaction(write=True, address=addr, data=val)
+            yield self._pipetrans(cmds, vals=vals)
+            self._end_transaction()
+            return
+
         self._start_transaction(write=True, address=addr, data=val)
         self.address.next = addr
         self.writedata.next = val
@@ -192,20 +557,83 @@ class AvalonMM(MemoryMapped):
         self.writedata.next = 0
         self._end_transaction(self.writedata)
                       
-    def readtrans(self, addr):
+    def readtrans(self, addr, burstcount=1):
         """ read accessor for testbenches
-        :param addr:
+        :param addr: address to read, in pipelined mode a list of
+            addresses is read back-to-back (the read data is a list)
+        :param burstcount: pipelined mode, the number of words to
+            read from the address (the read data is a list).
         :return:
         """
+        if self.pipelined:
+            if isinstance(addr, (list, tuple)):
+                cmds, _ = self._get_commands(addr, [0 for _ in addr])
+            else:
+                cmds, _ = self._get_commands(addr, [0]*burstcount)
+            rdata = []
+            self._start_transaction(write=False, address=addr)
+            yield self._pipetrans(cmds, rdata=rdata)
+            self._end_transaction()
+            single = not isinstance(addr, (list, tuple)) and burstcount == 1
+            self._read_data = rdata[0] if single else rdata
+            return
+
         self._start_transaction(write=False, address=addr)
         self.address.next = addr
         self.read.next = True
         to = 0
         while self.waitrequest and to < self.timeout:
             yield self.clock.posedge
+            to += 1
         self.read.next = False
         self._end_transaction(self.readdata)
 
+    def _get_commands(self, addr, val):
+        """ the (address, burstcount) commands and the beats """
+        nbytes = len(self.byteenable)
+        if isinstance(addr, (list, tuple)):
+            return [(aa, 1) for aa in addr], list(val)
+        vals = list(val) if isinstance(val, (list, tuple)) else [val]
+        cmds = [(addr + ii*nbytes, min(self.max_burst, len(vals)-ii))
+                for ii in range(0, len(vals), self.max_burst)]
+        return cmds, vals
+
+    def _pipetrans(self, cmds, vals=None, rdata=None):
+        """ pipelined transfers, a command (and the write beats of a
+        burst) is issued each cycle `waitrequest` is not active, the
+        read data is collected when `readdatavalid` is active.
+        """
+        beats = [(aa, bc) for aa, bc in cmds for ii in range(bc)]
+        if rdata is not None:
+            # a read command for each burst
+            beats = cmds
+        num = sum([bc for aa, bc in cmds])
+        ii, nvalid, to = 0, 0, 0
+        while (ii < len(beats) or (rdata is not None and nvalid < num)) \
+                and to < self.timeout:
+            if ii < len(beats):
+                aa, bc = beats[ii]
+                self.address.next = aa
+                self.burstcount.next = bc
+                if vals is not None:
+                    self.write.next = True
+                    self.writedata.next = vals[ii]
+                else:
+                    self.read.next = True
+            else:
+                self.write.next = False
+                self.read.next = False
+            yield self.clock.posedge
+            to += 1
+            if (self.write or self.read) and not self.waitrequest:
+                ii, to = ii + 1, 0
+            if self.readdatavalid and rdata is not None:
+                rdata.append(int(self.readdata))
+                nvalid, to = nvalid + 1, 0
+        self.write.next = False
+        self.read.next = False
+        self.burstcount.next = 1
+
     def acktrans(self, data=None):
         self.readdatavalid.next = True
         if data is not None:
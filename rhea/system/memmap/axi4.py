@@ -4,8 +4,12 @@ from __future__ import absolute_import
 from math import log, ceil
 
 import myhdl
-from myhdl import Signal, intbv, always_seq
+from myhdl import (Signal, intbv, modbv, enum, always, always_seq,
+                   always_comb, concat, instances)
+
+from ..glbl import Global
 from . import MemoryMapped
+from . import Barebone
 
 
 class AXI4Lite(MemoryMapped):
@@ -105,8 +109,784 @@ class AXI4Lite(MemoryMapped):
         pass
     
     def peripheral(self, generic):
-        pass 
-    
-    
+        pass
+
+
+class AXI4(AXI4Lite):
+    name = 'axi4'
+
+    # the burst types (`awburst`, `arburst`)
+    FIXED, INCR, WRAP = 0, 1, 2
+    # the responses (`bresp`, `rresp`)
+    OKAY, EXOKAY, SLVERR, DECERR = 0, 1, 2, 3
+
+    # the peripheral outputs combined by the interconnect
+    _output_names = ('awready', 'wready', 'bvalid', 'bid', 'bresp',
+                     'arready', 'rvalid', 'rid', 'rdata', 'rresp', 'rlast')
+
+    def __init__(self, glbl, data_width=32, address_width=32, id_width=4,
+                 max_outstanding=4):
+        """ AXI4 memory-mapped interface, bursts
+
+        In addition to the AXI4-Lite signals the address channels
+        have a transaction id, the burst length (number of beats - 1),
+        size (log2 of the bytes per beat) and burst type (FIXED, INCR,
+        or WRAP), the last beat of a burst is marked with `wlast` and
+        `rlast` and the responses return the id.
+
+        The peripherals queue up to `max_outstanding` address
+        transfers for each channel, the bursts are completed in order.
+        The interconnect combines (OR) the peripheral outputs, a master
+        should only have bursts outstanding to one peripheral.
+
+        Arguments:
+            glbl: system clock and reset
+            data_width: data bus width, a multiple of 8
+            address_width: address bus width (byte address)
+            id_width: the transaction id width
+            max_outstanding: the number of address transfers queued,
+                a power of 2
+        """
+        assert data_width % 8 == 0
+        assert max_outstanding >= 2
+        assert max_outstanding & (max_outstanding-1) == 0
+        super(AXI4, self).__init__(glbl, data_width=data_width,
+                                   address_width=address_width)
+        self.id_width = id_width
+        self.max_outstanding = max_outstanding
+
+        self.awid = Signal(intbv(0)[id_width:])
+        self.awlen = Signal(intbv(0)[8:])
+        self.awsize = Signal(intbv(0)[3:])
+        self.awburst = Signal(intbv(0)[2:])
+        self.wlast = Signal(bool(0))
+        self.bid = Signal(intbv(0)[id_width:])
+
+        self.arid = Signal(intbv(0)[id_width:])
+        self.arlen = Signal(intbv(0)[8:])
+        self.arsize = Signal(intbv(0)[3:])
+        self.arburst = Signal(intbv(0)[2:])
+        self.rid = Signal(intbv(0)[id_width:])
+        self.rlast = Signal(bool(0))
+
+        # the size of a full width beat
+        self.size = int(log(data_width // 8, 2))
+
+        # peripheral outputs, a dict of signals for each peripheral
+        self._poutputs = []
+
+        # the responses of the last transaction (simulation only)
+        self._responses = []
+        self.timeout = 1111
+
+    @staticmethod
+    def burst_addresses(address, length, size, burst=1):
+        """ the address of each beat in a burst
+
+        Arguments:
+            address (int): the start address
+            length (int): the number of beats
+            size (int): log2 of the bytes per beat
+            burst (int): the burst type, FIXED, INCR, or WRAP
+        """
+        incr = 1 << size
+        if burst == AXI4.FIXED:
+            return [address for _ in range(length)]
+        elif burst == AXI4.INCR:
+            return [address + ii*incr for ii in range(length)]
+        elif burst == AXI4.WRAP:
+            assert length in (2, 4, 8, 16)
+            mask = length*incr - 1
+            return [(address & ~mask) | ((address + ii*incr) & mask)
+                    for ii in range(length)]
+        else:
+            raise ValueError("invalid burst type {}".format(burst))
+
+    def get_responses(self):
+        return self._responses
+
+    def add_output_bus(self, outputs):
+        assert set(outputs.keys()) == set(self._output_names)
+        self._poutputs.append(outputs)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Transactors
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def writetrans(self, addr, val, burst=1, tid=0, strb=None):
+        """ write burst(s) transactor
+
+        The write address and data channels are driven independently,
+        if `addr` is a list the bursts are issued back-to-back (the
+        transaction ids are `tid`, `tid+1`, ...) before the responses.
+
+        Arguments:
+            addr: the start address or a list of start addresses
+            val: the value (single beat), a list of values (one
+                burst), or a list of lists (a burst for each address)
+            burst: the burst type, FIXED, INCR, or WRAP
+            tid: the (first) transaction id
+            strb: the write strobes for all the beats, default all
+                the bytes
+        """
+        if isinstance(addr, (list, tuple)):
+            addrs, bursts = list(addr), [list(vv) for vv in val]
+        else:
+            addrs = [addr]
+            bursts = [list(val) if isinstance(val, (list, tuple)) else [val]]
+        assert len(addrs) == len(bursts)
+        if strb is None:
+            strb = 2**len(self.wstrb) - 1
+        nbursts = len(addrs)
+        idmax = 2**self.id_width
+
+        self._start_transaction(write=True, address=addr, data=val)
+        aw, wb, beat = 0, 0, 0    # the next address, burst, and beat
+        resp, to = [], 0
+        self.bready.next = True
+        while len(resp) < nbursts and to < self.timeout:
+            if aw < nbursts:
+                self.awvalid.next = True
+                self.awaddr.next = addrs[aw]
+                self.awid.next = (tid + aw) % idmax
+                self.awlen.next = len(bursts[aw]) - 1
+                self.awsize.next = self.size
+                self.awburst.next = burst
+            else:
+                self.awvalid.next = False
+
+            if wb < nbursts:
+                self.wvalid.next = True
+                self.wdata.next = bursts[wb][beat]
+                self.wstrb.next = strb
+                self.wlast.next = beat == len(bursts[wb]) - 1
+            else:
+                self.wvalid.next = False
+                self.wlast.next = False
+
+            yield self.aclk.posedge
+            to += 1
+            if self.awvalid and self.awready:
+                aw, to = aw + 1, 0
+            if self.wvalid and self.wready:
+                beat, to = beat + 1, 0
+                if beat == len(bursts[wb]):
+                    wb, beat = wb + 1, 0
+            if self.bvalid and self.bready:
+                resp.append((int(self.bid), int(self.bresp)))
+                to = 0
+
+        self.awvalid.next = False
+        self.wvalid.next = False
+        self.wlast.next = False
+        self.bready.next = False
+        self._responses = resp
+        self._end_transaction()
+
+    def readtrans(self, addr, length=1, burst=1, tid=0):
+        """ read burst(s) transactor
+
+        If `addr` is a list the bursts are issued back-to-back (the
+        transaction ids are `tid`, `tid+1`, ...), the read data is a
+        list for each burst.  A single beat read is the value, a
+        single burst is the list of values.
+
+        Arguments:
+            addr: the start address or a list of start addresses
+            length: the number of beats in each burst
+            burst: the burst type, FIXED, INCR, or WRAP
+            tid: the (first) transaction id
+        """
+        addrs = list(addr) if isinstance(addr, (list, tuple)) else [addr]
+        nbursts = len(addrs)
+        idmax = 2**self.id_width
+
+        self._start_transaction(write=False, address=addr)
+        ar, done = 0, 0
+        rdata = [[] for _ in addrs]
+        resp, to = [], 0
+        self.rready.next = True
+        while done < nbursts and to < self.timeout:
+            if ar < nbursts:
+                self.arvalid.next = True
+                self.araddr.next = addrs[ar]
+                self.arid.next = (tid + ar) % idmax
+                self.arlen.next = length - 1
+                self.arsize.next = self.size
+                self.arburst.next = burst
+            else:
+                self.arvalid.next = False
+
+            yield self.aclk.posedge
+            to += 1
+            if self.arvalid and self.arready:
+                ar, to = ar + 1, 0
+            if self.rvalid and self.rready:
+                bidx = (int(self.rid) - tid) % idmax
+                rdata[bidx].append(int(self.rdata))
+                resp.append((int(self.rid), int(self.rresp)))
+                if self.rlast:
+                    done += 1
+                to = 0
+
+        self.arvalid.next = False
+        self.rready.next = False
+        self._responses = resp
+        self._end_transaction()
+        if isinstance(addr, (list, tuple)):
+            self._read_data = rdata
+        elif length == 1:
+            self._read_data = rdata[0][0] if len(rdata[0]) > 0 else None
+        else:
+            self._read_data = rdata[0]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Modules
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @myhdl.block
+    def interconnect(self):
+        """ combine (OR) all the peripheral outputs """
+        insts = []
+        for name in self._output_names:
+            inputs = [po[name] for po in self._poutputs]
+            insts.append(_or_combine(inputs, getattr(self, name)))
+        return insts
+
+    def _get_local_outputs(self):
+        """ the local peripheral outputs, added to the output bus """
+        idw, dw = self.id_width, self.data_width
+        outputs = dict(
+            awready=Signal(bool(0)), wready=Signal(bool(0)),
+            bvalid=Signal(bool(0)), bid=Signal(intbv(0)[idw:]),
+            bresp=Signal(intbv(0)[2:]), arready=Signal(bool(0)),
+            rvalid=Signal(bool(0)), rid=Signal(intbv(0)[idw:]),
+            rdata=Signal(intbv(0)[dw:]), rresp=Signal(intbv(0)[2:]),
+            rlast=Signal(bool(0)),
+        )
+        self.add_output_bus(outputs)
+        return [outputs[name] for name in self._output_names]
+
+    @myhdl.block
+    def peripheral_regfile(self, regfile, name=''):
+        """ memory-mapped AXI4 peripheral interface
+
+        The address transfers in the register file range are queued
+        and the bursts are completed in order, a data beat each cycle.
+        The write byte strobes are applied, a beat to an address
+        without a register has a SLVERR response.
+        """
+        axi = self
+        clock, reset = self.clock, self.reset
+        base_address = regfile.base_address
+        if base_address is None:
+            base_address = 0
+
+        # get the address list (al), register list (rl), read-only list (rol),
+        # and the default list (dl).
+        al, rl, rol, dl = regfile.get_reglist()
+        regs_list = rl
+        pwr, prd = regfile.get_strobelist()
+        nregs = len(regs_list)
+        max_address = base_address + max(al)
+
+        aw, dw = self.address_width, self.data_width
+        nbytes = dw // 8
+        depth = self.max_outstanding
+        okay, slverr, wrap = self.OKAY, self.SLVERR, self.WRAP
+
+        (lawready, lwready, lbvalid, lbid, lbresp, larready,
+         lrvalid, lrid, lrdata, lrresp, lrlast) = self._get_local_outputs()
+
+        # the queued address transfers: id, len, size, burst, address
+        rw = self.id_width + 13 + aw
+        awq_push, awq_pop = Signal(bool(0)), Signal(bool(0))
+        awq_in, awq_out = Signal(intbv(0)[rw:]), Signal(intbv(0)[rw:])
+        awq_count = Signal(intbv(0, min=0, max=depth+1))
+        awq_inst = _request_queue(clock, reset, awq_push, awq_in,
+                                  awq_pop, awq_out, awq_count)
+
+        arq_push, arq_pop = Signal(bool(0)), Signal(bool(0))
+        arq_in, arq_out = Signal(intbv(0)[rw:]), Signal(intbv(0)[rw:])
+        arq_count = Signal(intbv(0, min=0, max=depth+1))
+        arq_inst = _request_queue(clock, reset, arq_push, arq_in,
+                                  arq_pop, arq_out, arq_count)
+
+        # the current burst, address, beats left, address increment,
+        # the wrap mask, and id.
+        wactive, ractive = Signal(bool(0)), Signal(bool(0))
+        waddr, raddr = Signal(modbv(0)[aw:]), Signal(modbv(0)[aw:])
+        wcnt, rcnt = [Signal(intbv(0)[8:]) for _ in range(2)]
+        wincr, rincr = [Signal(intbv(0)[8:]) for _ in range(2)]
+        wburst, rburst = [Signal(intbv(0)[2:]) for _ in range(2)]
+        wmask, rmask = [Signal(intbv(0)[12:]) for _ in range(2)]
+        wid, rid = [Signal(intbv(0)[self.id_width:]) for _ in range(2)]
+        werr = Signal(bool(0))
+
+        # the register index of the (aligned) burst address
+        ashift = int(log(nbytes, 2))
+        wreg_addr, rreg_addr = Signal(intbv(0)[aw:]), Signal(intbv(0)[aw:])
+        widx = Signal(intbv(nregs, min=0, max=nregs+1))
+        ridx = Signal(intbv(nregs, min=0, max=nregs+1))
+        windex_inst = regfile.get_index(wreg_addr, widx, base_address)
+        rindex_inst = regfile.get_index(rreg_addr, ridx, base_address)
+
+        # the register read (rdidx) and written (wridx) last
+        rdidx = Signal(intbv(0, min=0, max=nregs+1))
+        wridx = Signal(intbv(0, min=0, max=nregs+1))
+        rdp, wrp = Signal(bool(0)), Signal(bool(0))
+
+        if ashift > 0:
+            @always_comb
+            def beh_align():
+                wreg_addr.next = concat(waddr[aw:ashift], intbv(0)[ashift:])
+                rreg_addr.next = concat(raddr[aw:ashift], intbv(0)[ashift:])
+        else:
+            @always_comb
+            def beh_align():
+                wreg_addr.next = waddr
+                rreg_addr.next = raddr
+
+        @always_comb
+        def beh_address_ready():
+            awq_in.next = concat(axi.awid, axi.awlen, axi.awsize,
+                                 axi.awburst, axi.awaddr)
+            arq_in.next = concat(axi.arid, axi.arlen, axi.arsize,
+                                 axi.arburst, axi.araddr)
+            if (axi.awvalid and awq_count < depth and
+                    axi.awaddr >= base_address and
+                    axi.awaddr <= max_address):
+                lawready.next = True
+            else:
+                lawready.next = False
+            if (axi.arvalid and arq_count < depth and
+                    axi.araddr >= base_address and
+                    axi.araddr <= max_address):
+                larready.next = True
+            else:
+                larready.next = False
+
+        @always_comb
+        def beh_queue():
+            awq_push.next = axi.awvalid and lawready
+            arq_push.next = axi.arvalid and larready
+            # start the next burst, a write waits for the response
+            awq_pop.next = not wactive and not lbvalid and awq_count != 0
+            arq_pop.next = not ractive and arq_count != 0
+
+        @always_comb
+        def beh_outputs():
+            lwready.next = wactive
+            lrvalid.next = ractive
+            if ractive:
+                lrid.next = rid
+                lrlast.next = rcnt == 0
+                if ridx < nregs:
+                    lrdata.next = regs_list[ridx]
+                    lrresp.next = okay
+                else:
+                    lrdata.next = 0
+                    lrresp.next = slverr
+            else:
+                lrid.next = 0
+                lrlast.next = False
+                lrdata.next = 0
+                lrresp.next = okay
+
+        # Handle the write bursts, the registers are written with the
+        # byte strobes and a write pulse is generated (let the
+        # peripheral know the register has been written).
+        @always(clock.posedge)
+        def beh_write():
+            val = intbv(0)[dw:]
+            na = modbv(0)[aw:]
+            nx = modbv(0)[aw:]
+            if reset == int(reset.active):
+                for ii in range(nregs):
+                    ro = rol[ii]
+                    dd = dl[ii]
+                    if not ro:
+                        regs_list[ii].next = dd
+                    pwr[ii].next = False
+                wrp.next = False
+                wactive.next = False
+                werr.next = False
+                lbvalid.next = False
+                lbid.next = 0
+                lbresp.next = okay
+            else:
+                if wrp:
+                    pwr[wridx].next = False
+                wrp.next = False
+                if lbvalid and axi.bready:
+                    lbvalid.next = False
+
+                if awq_pop:
+                    waddr.next = awq_out[aw:0]
+                    wburst.next = awq_out[aw+2:aw]
+                    wincr.next = 1 << awq_out[aw+5:aw+2]
+                    wcnt.next = awq_out[aw+13:aw+5]
+                    wid.next = awq_out[rw:aw+13]
+                    if awq_out[aw+2:aw] == wrap:
+                        wmask.next = ((awq_out[aw+13:aw+5] + 1) <<
+                                      awq_out[aw+5:aw+2]) - 1
+                    else:
+                        wmask.next = 0
+                    wactive.next = True
+
+                elif wactive and axi.wvalid:
+                    if widx < nregs:
+                        ro = rol[widx]
+                        if not ro:
+                            val[:] = regs_list[widx]
+                            for jj in range(dw):
+                                if axi.wstrb[jj//8]:
+                                    val[jj] = axi.wdata[jj]
+                            regs_list[widx].next = val
+                            pwr[widx].next = True
+                            wridx.next = widx
+                            wrp.next = True
+
+                    # the next beat address, FIXED, INCR or WRAP
+                    na[:] = waddr
+                    nx[:] = waddr + wincr
+                    if wburst == 1:
+                        na[:] = nx
+                    elif wburst == wrap:
+                        for jj in range(12):
+                            if wmask[jj]:
+                                na[jj] = nx[jj]
+                    waddr.next = na
+
+                    if wcnt == 0:
+                        wactive.next = False
+                        werr.next = False
+                        lbvalid.next = True
+                        lbid.next = wid
+                        if werr or widx == nregs:
+                            lbresp.next = slverr
+                        else:
+                            lbresp.next = okay
+                    else:
+                        wcnt.next = wcnt - 1
+                        if widx == nregs:
+                            werr.next = True
+
+        # Handle the read bursts, generate the register read pulse (let
+        # the peripheral know the register has been read).
+        @always_seq(clock.posedge, reset=reset)
+        def beh_read():
+            na = modbv(0)[aw:]
+            nx = modbv(0)[aw:]
+            if rdp:
+                prd[rdidx].next = False
+            rdp.next = False
+
+            if arq_pop:
+                raddr.next = arq_out[aw:0]
+                rburst.next = arq_out[aw+2:aw]
+                rincr.next = 1 << arq_out[aw+5:aw+2]
+                rcnt.next = arq_out[aw+13:aw+5]
+                rid.next = arq_out[rw:aw+13]
+                if arq_out[aw+2:aw] == wrap:
+                    rmask.next = ((arq_out[aw+13:aw+5] + 1) <<
+                                  arq_out[aw+5:aw+2]) - 1
+                else:
+                    rmask.next = 0
+                ractive.next = True
+
+            elif ractive and axi.rready:
+                if ridx < nregs:
+                    prd[ridx].next = True
+                    rdidx.next = ridx
+                    rdp.next = True
+
+                na[:] = raddr
+                nx[:] = raddr + rincr
+                if rburst == 1:
+                    na[:] = nx
+                elif rburst == wrap:
+                    for jj in range(12):
+                        if rmask[jj]:
+                            na[jj] = nx[jj]
+                raddr.next = na
+
+                if rcnt == 0:
+                    ractive.next = False
+                else:
+                    rcnt.next = rcnt - 1
+
+        # get the generators that assign the named bits
+        assign_inst = regfile.get_assigns()
+
+        return instances()
+
+    def get_generic(self):
+        generic = Barebone(Global(self.clock, self.reset),
+                           data_width=self.data_width,
+                           address_width=self.address_width)
+        return generic
+
+    @myhdl.block
+    def map_to_generic(self, generic):
+        """ AXI4 peripheral to the generic bus
+
+        Each beat of a burst is a generic bus write or read, the next
+        beat waits for `done`, one burst is completed at a time.  All
+        addresses are accepted (a single peripheral).
+        """
+        axi, bb = self, generic
+        clock, reset = self.clock, self.reset
+        aw, pw = self.address_width, len(bb.per_addr)
+        okay, wrap = self.OKAY, self.WRAP
+
+        (lawready, lwready, lbvalid, lbid, lbresp, larready,
+         lrvalid, lrid, lrdata, lrresp, lrlast) = self._get_local_outputs()
+
+        states = enum('idle', 'write', 'write_wait', 'write_resp',
+                      'read', 'read_wait', 'read_data')
+        state = Signal(states.idle)
+
+        addr = Signal(modbv(0)[aw:])
+        cnt, incr = [Signal(intbv(0)[8:]) for _ in range(2)]
+        burst = Signal(intbv(0)[2:])
+        mask = Signal(intbv(0)[12:])
+        tid = Signal(intbv(0)[self.id_width:])
+        rdata = Signal(intbv(0)[self.data_width:])
+
+        @always_comb
+        def beh_outputs():
+            lawready.next = state == states.idle and axi.awvalid
+            larready.next = (state == states.idle and axi.arvalid and
+                             not axi.awvalid)
+            lwready.next = state == states.write
+            lbvalid.next = state == states.write_resp
+            lrvalid.next = state == states.read_data
+            lbresp.next = okay
+            lrresp.next = okay
+            if state == states.write_resp:
+                lbid.next = tid
+            else:
+                lbid.next = 0
+            if state == states.read_data:
+                lrid.next = tid
+                lrdata.next = rdata
+                lrlast.next = cnt == 0
+            else:
+                lrid.next = 0
+                lrdata.next = 0
+                lrlast.next = False
+
+        @always_comb
+        def beh_address():
+            bb.per_addr.next = addr[aw:aw-pw]
+            bb.mem_addr.next = addr[aw-pw:0]
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_sm():
+            na = modbv(0)[aw:]
+            nx = modbv(0)[aw:]
+
+            # the next beat address, FIXED, INCR or WRAP
+            na[:] = addr
+            nx[:] = addr + incr
+            if burst == 1:
+                na[:] = nx
+            elif burst == wrap:
+                for jj in range(12):
+                    if mask[jj]:
+                        na[jj] = nx[jj]
+
+            if state == states.idle:
+                if axi.awvalid:
+                    addr.next = axi.awaddr
+                    cnt.next = axi.awlen
+                    incr.next = 1 << axi.awsize
+                    burst.next = axi.awburst
+                    mask.next = 0
+                    if axi.awburst == wrap:
+                        mask.next = ((axi.awlen + 1) << axi.awsize) - 1
+                    tid.next = axi.awid
+                    state.next = states.write
+                elif axi.arvalid:
+                    addr.next = axi.araddr
+                    cnt.next = axi.arlen
+                    incr.next = 1 << axi.arsize
+                    burst.next = axi.arburst
+                    mask.next = 0
+                    if axi.arburst == wrap:
+                        mask.next = ((axi.arlen + 1) << axi.arsize) - 1
+                    tid.next = axi.arid
+                    state.next = states.read
+
+            elif state == states.write:
+                if axi.wvalid:
+                    bb.write.next = True
+                    bb.write_data.next = axi.wdata
+                    state.next = states.write_wait
+
+            elif state == states.write_wait:
+                bb.write.next = False
+                if bb.done and not bb.write:
+                    addr.next = na
+                    if cnt == 0:
+                        state.next = states.write_resp
+                    else:
+                        cnt.next = cnt - 1
+                        state.next = states.write
+
+            elif state == states.write_resp:
+                if axi.bready:
+                    state.next = states.idle
+
+            elif state == states.read:
+                bb.read.next = True
+                state.next = states.read_wait
+
+            elif state == states.read_wait:
+                bb.read.next = False
+                # the read data is valid while the transaction is active
+                if not bb.done:
+                    rdata.next = bb.read_data
+                elif not bb.read:
+                    state.next = states.read_data
+
+            elif state == states.read_data:
+                if axi.rready:
+                    addr.next = na
+                    if cnt == 0:
+                        state.next = states.idle
+                    else:
+                        cnt.next = cnt - 1
+                        state.next = states.read
+
+        return beh_outputs, beh_address, beh_sm
+
+    @myhdl.block
+    def map_from_generic(self, generic):
+        """ the generic bus to AXI4, single beat transfers """
+        axi, bb = self, generic
+        clock, reset = self.clock, self.reset
+        size, okay = self.size, self.OKAY
+        strb = 2**len(self.wstrb) - 1
+
+        states = enum('idle', 'write', 'write_resp', 'read', 'read_data')
+        state = Signal(states.idle)
+        aw_done, w_done = Signal(bool(0)), Signal(bool(0))
+        read_data = Signal(intbv(0)[len(bb.read_data):])
+
+        @always_comb
+        def beh_assign():
+            axi.awvalid.next = state == states.write and not aw_done
+            axi.wvalid.next = state == states.write and not w_done
+            axi.wlast.next = state == states.write and not w_done
+            axi.bready.next = state == states.write_resp
+            axi.arvalid.next = state == states.read
+            axi.rready.next = state == states.read_data
+            bb.done.next = state == states.idle and not (bb.write or
+                                                         bb.read)
+            # the read data is valid with the last beat and held after
+            if axi.rvalid and state == states.read_data:
+                bb.read_data.next = axi.rdata
+            else:
+                bb.read_data.next = read_data
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_sm():
+            if state == states.idle:
+                aw_done.next = False
+                w_done.next = False
+                axi.awaddr.next = concat(bb.per_addr, bb.mem_addr)
+                axi.araddr.next = concat(bb.per_addr, bb.mem_addr)
+                axi.wdata.next = bb.write_data
+                axi.wstrb.next = strb
+                axi.awlen.next = 0
+                axi.arlen.next = 0
+                axi.awsize.next = size
+                axi.arsize.next = size
+                axi.awburst.next = 1
+                axi.arburst.next = 1
+                if bb.write:
+                    state.next = states.write
+                elif bb.read:
+                    state.next = states.read
+
+            elif state == states.write:
+                if axi.awready:
+                    aw_done.next = True
+                if axi.wready:
+                    w_done.next = True
+                if ((aw_done or axi.awready) and (w_done or axi.wready)):
+                    state.next = states.write_resp
+
+            elif state == states.write_resp:
+                if axi.bvalid:
+                    state.next = states.idle
+
+            elif state == states.read:
+                if axi.arready:
+                    state.next = states.read_data
+
+            elif state == states.read_data:
+                if axi.rvalid:
+                    read_data.next = axi.rdata
+                    if axi.rlast:
+                        state.next = states.idle
+
+        return beh_assign, beh_sm
+
+
+@myhdl.block
+def _or_combine(inputs, output):
+    """ combine (OR) the peripheral outputs """
+    num = len(inputs)
+
+    if isinstance(output.val, bool):
+        @always_comb
+        def beh_or():
+            val = False
+            for ii in range(num):
+                val = val or inputs[ii]
+            output.next = val
+    else:
+        @always_comb
+        def beh_or():
+            val = 0
+            for ii in range(num):
+                val = val | inputs[ii]
+            output.next = val
+
+    return beh_or
+
+
+@myhdl.block
+def _request_queue(clock, reset, push, data_in, pop, data_out, count):
+    """ a queue of address channel requests
+
+    The head of the queue is `data_out`, valid when `count` is not
+    zero, the queue depth is the `count` max minus one.
+    """
+    depth = count.max - 1
+    mem = [Signal(intbv(0)[len(data_in):]) for _ in range(depth)]
+    wptr = Signal(modbv(0, min=0, max=depth))
+    rptr = Signal(modbv(0, min=0, max=depth))
+
+    @always(clock.posedge)
+    def beh_mem():
+        if push:
+            mem[wptr].next = data_in
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_pointers():
+        if push:
+            wptr.next = wptr + 1
+        if pop:
+            rptr.next = rptr + 1
+        if push and not pop:
+            count.next = count + 1
+        elif pop and not push:
+            count.next = count - 1
 
+    @always_comb
+    def beh_head():
+        data_out.next = mem[rptr]
 
+    return beh_mem, beh_pointers, beh_head
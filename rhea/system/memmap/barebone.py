@@ -6,7 +6,7 @@ from __future__ import print_function, absolute_import
 
 from math import log, ceil
 import myhdl
-from myhdl import Signal, intbv
+from myhdl import Signal, intbv, always
 from .memmap import MemoryMapped
 
 
@@ -163,19 +163,90 @@ class Barebone(MemoryMapped):
         self.done = generic.done
         self.per_addr = generic.per_addr
         self.mem_addr = generic.mem_addr
+        self.address = self.mem_addr
 
         return []
 
-    def peripheral_regfile(self, glbl, regfile, name, base_address=0):
-        """
+    @myhdl.block
+    def peripheral_regfile(self, regfile, name='', base_address=None):
+        """ memory-mapped Barebone peripheral interface
+
+        The bus is point-to-point, the register file drives the
+        `read_data` and `done` and the register is selected with the
+        memory address (`mem_addr`).  A read or write takes a cycle,
+        `done` is low the cycle after the strobe and the read data
+        is registered.  The register index is computed from the
+        address (`get_index`).
+
         (arguments == ports)
         Arguments:
-            glbl: global signals, clock, reset, enable, etc.
             regfile: register file
-            name:
-            base_address:
+            name: name of the register file
+            base_address: the address of the register file in the
+                memory address space, defaults to the register file
+                base address.
         """
-        return []
+        if base_address is None:
+            base_address = regfile.base_address
+        if base_address is None:
+            base_address = 0
+
+        bb = self      # register bus
+        rf = regfile   # register file definition
+        clock, reset = self.clock, self.reset
+
+        # get the list-of-signals that represent the regfile
+        al, rl, rol, dl = rf.get_reglist()
+        regs_list = rl
+        pwr, prd = rf.get_strobelist()
+        nregs = len(regs_list)
+        assert base_address + max(al) < 2**len(bb.mem_addr), \
+            "register file {} is outside the memory address space".format(
+                name)
+
+        # the addressed register, the register accessed last
+        ridx = Signal(intbv(nregs, min=0, max=nregs+1))
+        index_inst = rf.get_index(bb.mem_addr, ridx, base_address)
+        lidx = Signal(intbv(0, min=0, max=nregs+1))
+        strobe = Signal(bool(0))
+
+        # only the strobe of the last access is cleared
+        @always(clock.posedge)
+        def beh_access():
+            if reset == int(reset.active):
+                for ii in range(nregs):
+                    ro = rol[ii]
+                    dd = dl[ii]
+                    if not ro:
+                        regs_list[ii].next = dd
+                    pwr[ii].next = False
+                    prd[ii].next = False
+                strobe.next = False
+                bb.done.next = True
+                bb.read_data.next = 0
+            else:
+                if strobe:
+                    pwr[lidx].next = False
+                    prd[lidx].next = False
+                strobe.next = False
+                bb.done.next = True
+                if (bb.write or bb.read) and ridx < nregs:
+                    bb.done.next = False
+                    lidx.next = ridx
+                    strobe.next = True
+                    if bb.write:
+                        ro = rol[ridx]
+                        if not ro:
+                            regs_list[ridx].next = bb.write_data
+                            pwr[ridx].next = True
+                    else:
+                        bb.read_data.next = regs_list[ridx]
+                        prd[ridx].next = True
+
+        # get the generators that assign the named bits
+        assign_insts = regfile.get_assigns()
+
+        return myhdl.instances()
 
     def interconnect(self):
         """
@@ -2,7 +2,11 @@
 from __future__ import print_function, absolute_import
 
 from copy import deepcopy
+from math import ceil, log
+
 import myhdl
+from myhdl import Signal, intbv, always_seq, always_comb
+
 from ..clock import Clock
 from ..reset import Reset
 from ..cso import ControlStatusBase
@@ -64,6 +68,11 @@ class MemoryMapped(MemorySpace):
         # _debug is used to enable bus tracing prints etc.
         self._debug = False
 
+        # address-decoding interconnect (see `set_decoder`), the
+        # (base address, max address, select) of each peripheral
+        self.decoder = None
+        self._selects = []
+
     @property
     def is_write(self):
         return self._write
@@ -260,4 +269,155 @@ class MemoryMapped(MemorySpace):
         """
         raise NotImplementedError
 
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # address-decoding interconnect
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def set_decoder(self, stages=None, granularity=None):
+        """ Use an address-decoding interconnect
+
+        The peripheral select is decoded once from the bus address
+        and the peripheral outputs are multiplexed with the decoded
+        index, instead of each peripheral comparing the address range
+        and OR-ing all the peripheral outputs.  The decoder needs to
+        be set before the peripherals are added to the bus.
+
+        Arguments:
+            stages (int): the number of register stages after the
+                output multiplexer, defaults to the bus default.
+            granularity (int): the number of low address bits that
+                are not decoded, each peripheral is in an aligned
+                2**granularity window.  Defaults to the smallest
+                window that fits the largest peripheral.
+        """
+        assert len(self._selects) == 0, \
+            "the decoder needs to be set before the peripherals are added"
+        self.decoder = dict(stages=stages, granularity=granularity)
+
+    def get_select(self, base_address, max_address):
+        """ Get the decoder select of a peripheral
+
+        Arguments:
+            base_address (int): the first address of the peripheral
+            max_address (int): the last address of the peripheral
+
+        Returns:
+            the select Signal, None if the bus is not decoded
+        """
+        if self.decoder is None:
+            return None
+        select = Signal(bool(0))
+        self._selects.append((base_address, max_address, select))
+        return select
+
+    def get_decode_map(self):
+        """ Get the decode granularity and the window of each select
+
+        Returns:
+            (granularity, windows), the peripheral select `ii` is
+            active when `address >> granularity == windows[ii]`
+        """
+        assert self.decoder is not None
+        granularity = self.decoder['granularity']
+        if granularity is None:
+            span = max([mx - base + 1 for base, mx, _ in self._selects] + [1])
+            granularity = int(ceil(log(span, 2)))
+
+        windows = []
+        for base, mx, _ in self._selects:
+            if base % 2**granularity != 0 or (mx >> granularity) != (
+                    base >> granularity):
+                raise ValueError(
+                    "peripheral {:X}-{:X} is not in an aligned {} byte "
+                    "window".format(base, mx, 2**granularity))
+            if (base >> granularity) in windows:
+                raise ValueError(
+                    "peripheral {:X}-{:X} overlaps another peripheral"
+                    .format(base, mx))
+            windows.append(base >> granularity)
+
+        return granularity, tuple(windows)
+
+    @myhdl.block
+    def address_decoder(self, address, index, registered=True):
+        """ Decode the bus address to the peripheral selects
+
+        Arguments:
+            address: the bus address
+            index: the decoded peripheral, the number of peripherals
+                if no peripheral is addressed
+            registered: register the decoded index
+        """
+        granularity, windows = self.get_decode_map()
+        nsel = len(windows)
+        selects = [sel for _, _, sel in self._selects]
+        aw = len(address)
+        assert nsel > 0 and index.max > nsel
+        clock, reset = self.clock, self.reset
+
+        index_c = Signal(intbv(nsel, min=0, max=nsel+1))
+
+        @always_comb
+        def beh_decode():
+            idx = nsel
+            for ii in range(nsel):
+                win = windows[ii]
+                if address[aw:granularity] == win:
+                    idx = ii
+            index_c.next = idx
+
+        if registered:
+            @always_seq(clock.posedge, reset=reset)
+            def beh_index():
+                index.next = index_c
+        else:
+            @always_comb
+            def beh_index():
+                index.next = index_c
+
+        @always_comb
+        def beh_selects():
+            for ii in range(nsel):
+                if index == ii:
+                    selects[ii].next = True
+                else:
+                    selects[ii].next = False
+
+        return beh_decode, beh_index, beh_selects
+
+    @myhdl.block
+    def output_mux(self, index, inputs, output, stages=0):
+        """ Select the output of the indexed peripheral
+
+        Arguments:
+            index: the peripheral index (see `address_decoder`)
+            inputs: list of the peripheral outputs
+            output: the bus output
+            stages: the number of register stages after the mux
+        """
+        nin = len(inputs)
+        clock, reset = self.clock, self.reset
+        regs = [Signal(output.val) for _ in range(stages)] + [output]
+        mout = regs[0]
+
+        @always_comb
+        def beh_mux():
+            if index < nin:
+                mout.next = inputs[index]
+            else:
+                mout.next = 0
+
+        insts = [beh_mux]
+        for ii in range(stages):
+            insts.append(_register(clock, reset, regs[ii], regs[ii+1]))
+
+        return insts
+
+
+@myhdl.block
+def _register(clock, reset, d, q):
+    @always_seq(clock.posedge, reset=reset)
+    def beh_register():
+        q.next = d
+    return beh_register
+
 
@@ -163,8 +163,12 @@ class RegisterFile(MemorySpace):
                     self.registers[k] = v
             
         self._allregs = None
-        
-        #@todo: sort the regdef by lowest address to highest address.
+
+        # set by `get_reglist`, if the register addresses are evenly
+        # spaced (by `stride`, a power of two) the register index is
+        # computed from the address, see `get_index`.
+        self.contiguous = False
+        self.stride = None
         
         # The registers can be defined in two methods, a dict defintion
         # that conforms to a particular structure or using the Register
@@ -227,19 +231,35 @@ class RegisterFile(MemorySpace):
         self._append_register(reg.name, reg)
 
     def get_reglist(self):
-        """ return a list of addresses and a list of registers.        
+        """ return a list of addresses and a list of registers.
+
+        The lists are ordered from the low address to the high address,
+        the read-only list (rol) and default list (dl) are in the same
+        order.  If the addresses are evenly spaced the `contiguous`
+        flag is set and `stride` is the address step.
         """
-        rwa = [aa for aa, rr in self._rwregs]       # rw address
-        rwr = [rr for aa, rr in self._rwregs]       # rw register
-        _rrw = [False for aa, rr in self._rwregs]
-        roa = [aa for aa, rr in self._roregs]       # ro address
-        ror = [rr for aa, rr in self._roregs]       # ro register
-        _rro = [True for aa, rr in self._rwregs]
-        self._allregs = rwr+ror
-        dl = [rr.default for aa,rr in self._rwregs+self._roregs]
-        # @todo: order the list from low address to high address
-        # @todo: set flag if addresses are contiguous
-        return tuple(rwa+roa), rwr+ror, tuple(_rrw+_rro), tuple(dl)
+        regs = sorted(self._rwregs + self._roregs, key=lambda ar: ar[0])
+        al = [aa for aa, rr in regs]                  # address list
+        rl = [rr for aa, rr in regs]                  # register list
+        rol = [rr.access == 'ro' for aa, rr in regs]  # read-only list
+        dl = [rr.default for aa, rr in regs]          # default list
+        self._allregs = rl
+
+        # the address step between the registers, a power of two
+        # (including a single register) can be indexed with a shift.
+        steps = set([al[ii+1] - al[ii] for ii in range(len(al)-1)])
+        if len(steps) == 0:
+            self.stride = 4
+        elif len(steps) == 1:
+            self.stride = steps.pop()
+        else:
+            self.stride = None
+        if self.stride is not None and (
+                self.stride <= 0 or self.stride & (self.stride-1) != 0):
+            self.stride = None
+        self.contiguous = self.stride is not None
+
+        return tuple(al), rl, tuple(rol), tuple(dl)
 
     def get_strobelist(self):
         assert self._allregs is not None
@@ -247,6 +267,55 @@ class RegisterFile(MemorySpace):
         rd = [rr.rd for rr in self._allregs]
         return wr, rd
 
+    @myhdl.block
+    def get_index(self, address, index, base_address=0):
+        """ the index of the addressed register
+
+        For a contiguous register file the index in the `get_reglist`
+        lists is computed from the address offset (a subtract and
+        shift), otherwise the address is compared to each register
+        address.  If the address is not a register the index is the
+        number of registers.
+
+        Ports:
+          address: the bus address
+          index: the register index, max must be the number of
+            registers plus one
+          base_address: the address of the register file
+        """
+        al, rl, rol, dl = self.get_reglist()
+        nregs = len(rl)
+        assert index.max >= nregs+1
+
+        if not self.contiguous:
+            @always_comb
+            def beh_compare():
+                idx = nregs
+                for ii in range(nregs):
+                    aa = al[ii]
+                    aa = aa + base_address
+                    if address == aa:
+                        idx = ii
+                index.next = idx
+
+            return beh_compare
+
+        first = base_address + al[0]
+        last = base_address + al[-1]
+        shift = self.stride.bit_length() - 1
+        mask = self.stride - 1
+        align = first & mask
+
+        @always_comb
+        def beh_index():
+            if (address >= first and address <= last and
+                    (address & mask) == align):
+                index.next = (address - first) >> shift
+            else:
+                index.next = nregs
+
+        return beh_index
+
     @myhdl.block
     def get_assigns(self):
         assign_inst = []
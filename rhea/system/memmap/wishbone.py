@@ -11,12 +11,14 @@ from myhdl import (Signal, intbv, always, always_seq, always_comb,
 from ..glbl import Global
 from . import MemoryMapped
 from . import Barebone
+from .memmap import _register
 
 
 class Wishbone(MemoryMapped):
     name = 'wishbone'
 
-    def __init__(self, glbl=None, data_width=8, address_width=16, name=None):
+    def __init__(self, glbl=None, data_width=8, address_width=16, name=None,
+                 pipelined=False):
         """ Wishbose bus object
         Parameters (kwargs):
         --------------------
@@ -24,6 +26,10 @@ class Wishbone(MemoryMapped):
           :param data_width: data bus width
           :param address_width: address bus width
           :param name: name for the bus
+          :param pipelined: Wishbone B4 pipelined mode, a master can
+            assert `stb_i` on consecutive cycles (one transfer per
+            cycle) while `stall_o` is not active, the `ack_o` for
+            each transfer follows in order.
         """
         # @todo: ?? not sure if this how the arguments should
         #        should be handled.  Passing args is simple but a
@@ -54,38 +60,120 @@ class Wishbone(MemoryMapped):
         # outputs from the peripherals
         self.dat_o = Signal(intbv(0)[data_width:])
         self.ack_o = Signal(bool(0))
+        self.stall_o = Signal(bool(0))
+        self.pipelined = pipelined
 
         # peripheral outputs
         self._pdat_o = []
         self._pack_o = []
+        self._pstall_o = []
 
         self.timeout = 1111
 
         self._add_bus(name)
         
-    def add_output_bus(self, dat, ack):
+    def add_output_bus(self, dat, ack, stall=None):
         self._pdat_o.append(dat)
         self._pack_o.append(ack)
+        if stall is not None:
+            self._pstall_o.append(stall)
 
     @myhdl.block
     def interconnect(self):
         """ combine all the peripheral outputs
+
+        In pipelined mode the outputs are combined without a register,
+        the peripheral outputs are registered, this keeps a transfer
+        per cycle with a single cycle latency.
+
+        With an address decoder (`set_decoder`) the outputs of the
+        decoded peripheral are multiplexed.
         """
         assert len(self._pdat_o) == len(self._pack_o)
         ndevs = len(self._pdat_o)
+        nstalls = len(self._pstall_o)
         wb = self
-        
-        @always_seq(self.clk_i.posedge, reset=self.rst_i)
-        def beh_or_combine():
+
+        if self.decoder is not None:
+            return self._interconnect_decoded()
+
+        if not self.pipelined:
+            @always_seq(self.clk_i.posedge, reset=self.rst_i)
+            def beh_or_combine():
+                dats = 0
+                acks = 0
+                for ii in range(ndevs):
+                    dats = dats | wb._pdat_o[ii]
+                    acks = acks | wb._pack_o[ii]
+                wb.dat_o.next = dats
+                wb.ack_o.next = acks
+
+            return beh_or_combine
+
+        pdat, pack, pstall = self._pdat_o, self._pack_o, self._pstall_o
+
+        @always_comb
+        def beh_or_combine_pipe():
             dats = 0
-            acks = 0
+            acks = False
             for ii in range(ndevs):
-                dats = dats | wb._pdat_o[ii]
-                acks = acks | wb._pack_o[ii]
+                dats = dats | pdat[ii]
+                acks = acks or pack[ii]
             wb.dat_o.next = dats
             wb.ack_o.next = acks
-            
-        return beh_or_combine
+
+        if nstalls == 0:
+            return beh_or_combine_pipe
+
+        @always_comb
+        def beh_stall_combine():
+            stalls = False
+            for ii in range(nstalls):
+                stalls = stalls or pstall[ii]
+            wb.stall_o.next = stalls
+
+        return beh_or_combine_pipe, beh_stall_combine
+
+    @myhdl.block
+    def _interconnect_decoded(self):
+        wb = self
+        nsel = len(self._selects)
+        assert len(self._pdat_o) == nsel, \
+            "all the peripherals need a decoder select"
+        stages = self.decoder['stages']
+        if stages is None:
+            stages = 0 if self.pipelined else 1
+
+        # the classic peripherals register the select and the address
+        # is held, in pipelined mode the peripheral response is a
+        # cycle after the address (the decoded index is delayed).
+        index = Signal(intbv(nsel, min=0, max=nsel+1))
+        decode_inst = self.address_decoder(wb.adr_i, index,
+                                           registered=not self.pipelined)
+        if self.pipelined:
+            rindex = Signal(intbv(nsel, min=0, max=nsel+1))
+            index_inst = _register(wb.clock, wb.reset, index, rindex)
+        else:
+            rindex = index
+            index_inst = []
+
+        dat_inst = self.output_mux(rindex, self._pdat_o, wb.dat_o, stages)
+        ack_inst = self.output_mux(rindex, self._pack_o, wb.ack_o, stages)
+
+        pstall = self._pstall_o
+        nstalls = len(pstall)
+        if nstalls == 0:
+            return decode_inst, index_inst, dat_inst, ack_inst
+
+        @always_comb
+        def beh_stall_combine():
+            stalls = False
+            for ii in range(nstalls):
+                stalls = stalls or pstall[ii]
+            wb.stall_o.next = stalls
+
+        return (decode_inst, index_inst, dat_inst, ack_inst,
+                beh_stall_combine)
 
     @myhdl.block
     def peripheral_regfile(self, regfile, name=''):
@@ -117,10 +205,28 @@ class Wishbone(MemoryMapped):
          lwb_wrd, lwb_ack,) = [Signal(bool(0)) for _ in range(5)]
         wb.add_output_bus(lwb_do, lwb_ack)
 
+        # the peripheral select from the address decoder, registered
+        # the same as the classic range compare (`beh_selected`)
+        select = wb.get_select(base_address, max_address)
+        if select is not None and not self.pipelined:
+            lwb_sel = select
+
         num_ackcyc = 1  # the number of cycle delays after cyc_i
         ackcnt = Signal(intbv(num_ackcyc, min=0, max=num_ackcyc+1))
         newcyc = Signal(bool(0))
 
+        # if the register addresses are regular (contiguous) the
+        # register is indexed by the address offset, otherwise the
+        # address is compared to each register address.
+        indexed = rf.contiguous
+        if indexed:
+            ridx = Signal(intbv(nregs, min=0, max=nregs+1))
+            index_inst = rf.get_index(wb.adr_i, ridx, base_address)
+            # the register read (rdidx) and written (wridx) last
+            rdidx = Signal(intbv(0, min=0, max=nregs+1))
+            wridx = Signal(intbv(0, min=0, max=nregs+1))
+            lwb_rd, lwb_wrp = Signal(bool(0)), Signal(bool(0))
+
         if self._debug:
             @instance 
             def debug_check():
@@ -143,82 +249,177 @@ class Wishbone(MemoryMapped):
             lwb_acc.next = wb.cyc_i and wb.stb_i
             lwb_wr.next = wb.cyc_i and wb.stb_i and wb.we_i
 
-        @always_seq(clock.posedge, reset=reset)
-        def beh_selected():
-            if (wb.cyc_i and wb.adr_i >= base_address and wb.adr_i < max_address):
-                lwb_sel.next = True
+        if not self.pipelined:
+            if select is None:
+                @always_seq(clock.posedge, reset=reset)
+                def beh_selected():
+                    if (wb.cyc_i and wb.adr_i >= base_address and
+                            wb.adr_i <= max_address):
+                        lwb_sel.next = True
+                    else:
+                        lwb_sel.next = False
+
+            @always_seq(clock.posedge, reset=reset)
+            def beh_bus_cycle():
+                # set default, only active one cycle 
+                newcyc.next = False     
+                if wb.cyc_i:
+                    if ackcnt > 0:
+                        ackcnt.next = ackcnt - 1
+                        if ackcnt == 1:
+                            newcyc.next = True
+                else:
+                    ackcnt.next = num_ackcyc
+
+            @always_comb
+            def beh_ack():
+                if wb.cyc_i and newcyc:
+                    lwb_ack.next = True
+                else:
+                    lwb_ack.next = False
+
+            # Handle a bus read (transfer the addressed register to the
+            # data bus) and generate the register read pulse (let the
+            # peripheral know the register has been read).
+            if not indexed:
+                @always_comb
+                def beh_read():
+                    if lwb_sel and not lwb_wr and newcyc:
+                        for ii in range(nregs):
+                            aa = addr_list[ii]
+                            aa = aa + base_address
+                            if wb.adr_i == aa:
+                                lwb_do.next = regs_list[ii]
+                                prd[ii].next = True
+                    else:
+                        lwb_do.next = 0
+                        for ii in range(nregs):
+                            prd[ii].next = False
             else:
-                lwb_sel.next = False
-                
-        @always_seq(clock.posedge, reset=reset)
-        def beh_bus_cycle():
-            # set default, only active one cycle 
-            newcyc.next = False     
-            if wb.cyc_i:
-                if ackcnt > 0:
-                    ackcnt.next = ackcnt - 1
-                    if ackcnt == 1:
-                        newcyc.next = True
+                @always_comb
+                def beh_read_strobe():
+                    lwb_rd.next = lwb_sel and not lwb_wr and newcyc
+
+                @always_comb
+                def beh_read():
+                    if lwb_rd and ridx < nregs:
+                        lwb_do.next = regs_list[ridx]
+                    else:
+                        lwb_do.next = 0
+
+                # only evaluated when the strobe or address changes
+                @always_comb
+                def beh_read_pulse():
+                    for ii in range(nregs):
+                        prd[ii].next = lwb_rd and ridx == ii
+
+            @always_comb
+            def beh_write_strobe():
+                lwb_wrd.next = lwb_wr and lwb_sel and newcyc
+
+        else:
+            # pipelined, a transfer is accepted each cycle `stb_i` is
+            # active (never stalls), the ack and read data are
+            # registered, the interconnect does not add a cycle.
+            if select is None:
+                @always_comb
+                def beh_selected_pipe():
+                    if (lwb_acc and wb.adr_i >= base_address and
+                            wb.adr_i <= max_address):
+                        lwb_sel.next = True
+                    else:
+                        lwb_sel.next = False
             else:
-                ackcnt.next = num_ackcyc
-
-        @always_comb
-        def beh_ack():
-            if wb.cyc_i and newcyc:
-                lwb_ack.next = True
+                @always_comb
+                def beh_selected_pipe():
+                    lwb_sel.next = lwb_acc and select
+
+            @always_comb
+            def beh_write_strobe_pipe():
+                lwb_wrd.next = lwb_sel and wb.we_i
+
+            @always_seq(clock.posedge, reset=reset)
+            def beh_ack_pipe():
+                lwb_ack.next = lwb_sel
+
+            if not indexed:
+                @always_seq(clock.posedge, reset=reset)
+                def beh_read_pipe():
+                    lwb_do.next = 0
+                    for ii in range(nregs):
+                        prd[ii].next = False
+                    if lwb_sel and not wb.we_i:
+                        for ii in range(nregs):
+                            aa = addr_list[ii]
+                            aa = aa + base_address
+                            if wb.adr_i == aa:
+                                lwb_do.next = regs_list[ii]
+                                prd[ii].next = True
             else:
-                lwb_ack.next = False
+                # only the last read strobe is cleared
+                @always_seq(clock.posedge, reset=reset)
+                def beh_read_pipe():
+                    lwb_do.next = 0
+                    if lwb_rd:
+                        prd[rdidx].next = False
+                    lwb_rd.next = False
+                    if lwb_sel and not wb.we_i and ridx < nregs:
+                        lwb_do.next = regs_list[ridx]
+                        prd[ridx].next = True
+                        rdidx.next = ridx
+                        lwb_rd.next = True
 
-        # @todo: scan the register list, if it is contiguous remove
-        #        the base and use the offset directly to access the
-        #        register list instead of the for loop
-        # if rf.contiguous:
-        #     @always_seq(rb.clk_i.posedge, reset=rb.rst_i)
-        #     def rtl_read():
-        # else:
-
-        # Handle a bus read (transfer the addressed register to the
-        # data bus) and generate the register read pulse (let the
-        # peripheral know the register has been read).
-        # @always_seq(clock.posedge, reset=reset)
-        @always_comb
-        def beh_read():
-            if lwb_sel and not lwb_wr and newcyc:
-                for ii in range(nregs):
-                    aa = addr_list[ii]
-                    aa = aa + base_address
-                    if wb.adr_i == aa:
-                        lwb_do.next = regs_list[ii]
-                        prd[ii].next = True
-            else:
-                lwb_do.next = 0
-                for ii in range(nregs):
-                    prd[ii].next = False
-                        
         # Handle a bus write (transfer the data bus to the addressed
         # register) and generate a register write pulse (let the 
         # peripheral know the register has been written).
-        @always(clock.posedge)
-        def beh_write():
-            if reset == int(reset.active):
-                for ii in range(nregs):
-                    ro = rol[ii]
-                    dd = dl[ii]
-                    if not ro:
-                        regs_list[ii].next = dd
-                    pwr[ii].next = False
-            else:
-                if lwb_wr and lwb_sel and newcyc:
+        if not indexed:
+            @always(clock.posedge)
+            def beh_write():
+                if reset == int(reset.active):
                     for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
                         ro = rol[ii]
-                        if not ro and wb.adr_i == aa:
-                            regs_list[ii].next = wb.dat_i
-                            pwr[ii].next = True
+                        dd = dl[ii]
+                        if not ro:
+                            regs_list[ii].next = dd
+                        pwr[ii].next = False
                 else:
+                    if lwb_wrd:
+                        for ii in range(nregs):
+                            aa = addr_list[ii]
+                            aa = aa + base_address
+                            ro = rol[ii]
+                            if not ro and wb.adr_i == aa:
+                                regs_list[ii].next = wb.dat_i
+                                pwr[ii].next = True
+                            else:
+                                pwr[ii].next = False
+                    else:
+                        for ii in range(nregs):
+                            pwr[ii].next = False
+        else:
+            # the register is written at the indexed location and only
+            # the last write strobe is cleared.
+            @always(clock.posedge)
+            def beh_write():
+                if reset == int(reset.active):
                     for ii in range(nregs):
+                        ro = rol[ii]
+                        dd = dl[ii]
+                        if not ro:
+                            regs_list[ii].next = dd
                         pwr[ii].next = False
+                    lwb_wrp.next = False
+                else:
+                    if lwb_wrp:
+                        pwr[wridx].next = False
+                    lwb_wrp.next = False
+                    if lwb_wrd and ridx < nregs:
+                        ro = rol[ridx]
+                        if not ro:
+                            regs_list[ridx].next = wb.dat_i
+                            pwr[ridx].next = True
+                            wridx.next = ridx
+                            lwb_wrp.next = True
 
         # get the generators that assign the named bits
         assign_inst = regfile.get_assigns()
@@ -267,6 +468,9 @@ class Wishbone(MemoryMapped):
 
     @myhdl.block
     def map_from_generic(self, generic):
+        if self.pipelined:
+            return self._map_from_generic_pipe(generic)
+
         clock = self.clock
         wb, bb = self, generic
         inprog = Signal(bool(0))
@@ -303,11 +507,87 @@ class Wishbone(MemoryMapped):
 
         return myhdl.instances()
 
+    @myhdl.block
+    def _map_from_generic_pipe(self, generic):
+        """ pipelined mode, each generic read or write is a single
+        `stb_i` (held while stalled), `cyc_i` is held until all the
+        transfers are acknowledged.
+        """
+        clock, reset = self.clock, self.reset
+        wb, bb = self, generic
+
+        # a transfer is pending while the bus is stalled
+        pending = Signal(bool(0))
+        pwrite = Signal(bool(0))
+        paddr = Signal(intbv(0)[len(wb.adr_i):])
+        pdata = Signal(intbv(0)[len(wb.dat_i):])
+        outstanding = Signal(intbv(0, min=0, max=bb.max_burst+1))
+        read_data = Signal(intbv(0)[len(bb.read_data):])
+
+        @always_comb
+        def beh_assign():
+            if pending:
+                wb.stb_i.next = True
+                wb.we_i.next = pwrite
+                wb.adr_i.next = paddr
+                wb.dat_i.next = pdata
+            else:
+                wb.stb_i.next = bb.write or bb.read
+                wb.we_i.next = bb.write
+                wb.adr_i.next = concat(bb.per_addr, bb.mem_addr)
+                wb.dat_i.next = bb.write_data
+
+        @always_comb
+        def beh_cycle():
+            wb.cyc_i.next = wb.stb_i or outstanding != 0
+            bb.done.next = not (bb.write or bb.read or pending or
+                                outstanding != 0)
+            # the read data is valid with the ack and held after
+            if wb.ack_o:
+                bb.read_data.next = wb.dat_o
+            else:
+                bb.read_data.next = read_data
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_pipe():
+            if wb.stb_i and wb.stall_o and not pending:
+                pending.next = True
+                pwrite.next = wb.we_i
+                paddr.next = wb.adr_i
+                pdata.next = wb.dat_i
+            elif pending and not wb.stall_o:
+                pending.next = False
+
+            if wb.stb_i and not wb.stall_o and not wb.ack_o:
+                outstanding.next = outstanding + 1
+            elif wb.ack_o and not (wb.stb_i and not wb.stall_o):
+                outstanding.next = outstanding - 1
+
+            if wb.ack_o:
+                read_data.next = wb.dat_o
+
+        return beh_assign, beh_cycle, beh_pipe
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def writetrans(self, addr, val):
         """ write accessor for testbenches
+
+        A list of addresses and values are written back-to-back, in
+        pipelined mode a transfer per cycle.
         Not convertible.
         """
+        if isinstance(addr, (list, tuple)) and not self.pipelined:
+            for aa, vv in zip(addr, val):
+                yield self.writetrans(aa, vv)
+            return
+        elif self.pipelined:
+            addr = addr if isinstance(addr, (list, tuple)) else [addr]
+            val = val if isinstance(val, (list, tuple)) else [val]
+            self._start_transaction(write=True, address=addr, data=val)
+            yield self._pipetrans(addr, val)
+            self._end_transaction()
+            return
+
         self._start_transaction(write=True, address=addr, data=val)
         # toggle the signals for the bus transaction
         yield self.clk_i.posedge
@@ -329,7 +609,24 @@ class Wishbone(MemoryMapped):
 
     def readtrans(self, addr):
         """ read accessor for testbenches
+
+        A list of addresses are read back-to-back, in pipelined mode
+        a transfer per cycle, the read data is a list.
         """
+        if isinstance(addr, (list, tuple)) or self.pipelined:
+            addrs = addr if isinstance(addr, (list, tuple)) else [addr]
+            rdata = []
+            self._start_transaction(write=False, address=addr)
+            if self.pipelined:
+                yield self._pipetrans(addrs, rdata=rdata)
+            else:
+                for aa in addrs:
+                    yield self.readtrans(aa)
+                    rdata.append(self.get_read_data())
+            self._end_transaction()
+            self._read_data = rdata if addrs is addr else rdata[0]
+            return
+
         self._start_transaction(write=False, address=addr)
         yield self.clk_i.posedge
         self.adr_i.next = addr
@@ -343,6 +640,41 @@ class Wishbone(MemoryMapped):
         self.stb_i.next = False
         self._end_transaction(self.dat_o)
 
+    def _pipetrans(self, addrs, vals=None, rdata=None):
+        """ pipelined transfers, `stb_i` is asserted each cycle until
+        all the transfers are accepted (not stalled) and `cyc_i` is
+        held until all the transfers are acknowledged.  The timeout
+        is the number of cycles without an accepted transfer or an
+        acknowledge.
+        """
+        num = len(addrs)
+        yield self.clk_i.posedge
+        self.cyc_i.next = True
+        self.we_i.next = vals is not None
+        ii, nacks, to = 0, 0, 0
+        while nacks < num and to < self.timeout:
+            if ii < num:
+                self.stb_i.next = True
+                self.adr_i.next = addrs[ii]
+                if vals is not None:
+                    self.dat_i.next = vals[ii]
+            else:
+                self.stb_i.next = False
+            yield self.clk_i.posedge
+            to += 1
+            if self.stb_i and not self.stall_o:
+                ii, to = ii + 1, 0
+            if self.ack_o:
+                nacks, to = nacks + 1, 0
+                if rdata is not None:
+                    rdata.append(int(self.dat_o))
+        self.cyc_i.next = False
+        self.stb_i.next = False
+        self.we_i.next = False
+        assert nacks == num, \
+            "Wishbone transfer timeout, {} of {} acknowledged".format(
+                nacks, num)
+
     def acktrans(self, data=None):
         """ acknowledge accessor for testbenches
         :param data:
@@ -21,7 +21,7 @@ def _add_bus(fb, name=''):
 
 
 class FIFOBus(Streamers):
-    def __init__(self, width=8):
+    def __init__(self, width=8, read_width=None):
         """ A FIFO interface
         This interface encapsulates the signals required to interface
         to a FIFO.  This object also contains the configuration
@@ -32,7 +32,14 @@ class FIFOBus(Streamers):
                 elements a FIFO can hold.
 
             width (int): The width of the elements in the FIFO.
+
+            read_width (int): The width of the read data, defaults to
+                the `width`.  When the widths differ the FIFO is an
+                asymmetric width FIFO, one width is a multiple of the
+                other.
         """
+        if read_width is None:
+            read_width = width
         self.name = "fifobus{0}".format(_fb_num)
 
         # @todo: add write clock and read clock to the interface!
@@ -47,15 +54,25 @@ class FIFOBus(Streamers):
         self.write_data = Signal(intbv(0)[width:])  # fifo data in
 
         self.read = Signal(bool(0))                 # fifo read strobe
-        self.read_data = Signal(intbv(0)[width:])   # fifo data out
+        self.read_data = Signal(intbv(0)[read_width:])  # fifo data out
         self.read_valid = Signal(bool(0))
         self.empty = Signal(bool(1))                # fifo empty
         self.full = Signal(bool(0))                 # fifo full
 
-        # The FIFO instance will attached the FIFO count
+        # the almost full and almost empty flags, the thresholds are
+        # FIFO instance parameters
+        self.almost_full = Signal(bool(0))
+        self.almost_empty = Signal(bool(1))
+
+        # The FIFO instance will attached the FIFO count (the number
+        # of words in the FIFO).  The dual clock FIFOs attach a count
+        # for each clock domain, the `count` is in the read clock
+        # domain and the `write_count` in the write clock domain.
         self.count = None
+        self.write_count = None
 
         self.width = width
+        self.read_width = read_width
 
         # keep track of all the FIFOBus used.
         _add_bus(self, self.name)
@@ -128,11 +145,13 @@ class FIFOBus(Streamers):
             writepath.write.next = self.write
             writepath.write_data.next = self.write_data
             self.full.next = writepath.full
+            self.almost_full.next = writepath.almost_full
 
             # read, from self perspective, self will be reading
             readpath.read.next = self.read
             self.read_data.next = readpath.read_data
             self.read_valid.next = readpath.read_valid
             self.empty.next = readpath.empty
+            self.almost_empty.next = readpath.almost_empty
 
         return beh_assign
@@ -3,28 +3,107 @@ import struct
 from myhdl import now, delay
 
 # packet definition constants
-PACKET_LENGTH = 12
+PACKET_LENGTH = 12         # single read / write packet
+HEADER_LENGTH = 8
 DATA_OFFSET = 8
+CRC_LENGTH = 2
+MAX_BLOCK_LENGTH = 252     # max number of data bytes in a block
+
+# the command byte
+CMD_READ = 1
+CMD_WRITE = 2
+CMD_BLOCK_READ = 3
+CMD_BLOCK_WRITE = 4
+CMD_CRC = 0x40             # a CRC trailer is appended to the packets
+CMD_ERROR = 0x80           # set in the response on an error
+
+
+def crc16(data, crc=0xFFFF):
+    """ CRC-16-CCITT (poly 0x1021, init 0xFFFF) of the bytes
+
+    The CRC of a packet including its (big-endian) CRC is zero.
+    """
+    for byte in bytearray(data):
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
 
 
 class CommandPacket(object):
-    def __init__(self, rnw=True, address=0, vals=None):
-        """ """
+    def __init__(self, rnw=True, address=0, vals=None, block=False,
+                 num_words=None, crc=False):
+        """ A command packet for the `command_bridge`
+
+        Arguments:
+            rnw (bool): read (True) or write (False)
+            address (int): the (first) address
+            vals (list): the word(s) to write
+            block (bool): a block read / write, the address is
+                incremented by 4 for each word.
+            num_words (int): the number of words of a block read,
+                defaults to the length of `vals`.
+            crc (bool): append a CRC to the request and response
+
+        Example:
+            >> pkt = CommandPacket.block_write(0x20, [1, 2, 3], crc=True)
+            >> serial.write(pkt.rawbytes)
+            >> pkt.check_response(serial.read(pkt.response_length))
+        """
         assert isinstance(vals, (type(None), list))
-        self.rawbytes = bytearray([0 for _ in range(PACKET_LENGTH)])
+        self.crc = crc
+        if not block:
+            command, length = (CMD_READ if rnw else CMD_WRITE), 4
+        else:
+            command = CMD_BLOCK_READ if rnw else CMD_BLOCK_WRITE
+            if num_words is None:
+                assert vals is not None, "a block read needs num_words"
+                num_words = len(vals)
+            length = 4 * num_words
+            if length == 0 or length > MAX_BLOCK_LENGTH:
+                raise ValueError("invalid block length {} bytes, max {}"
+                                 .format(length, MAX_BLOCK_LENGTH))
+        if crc:
+            command |= CMD_CRC
+        self.command, self.length = command, length
+
+        self.rawbytes = bytearray([0 for _ in range(HEADER_LENGTH)])
         self.rawbytes[0] = 0xDE
-        self.rawbytes[1] = 1 if rnw else 2
+        self.rawbytes[1] = command
         self.rawbytes[2:6] = struct.pack(">L", address)
-        self.rawbytes[6] = 4   # only support single read/write
+        self.rawbytes[6] = length
         self.rawbytes[7] = 0xCA
 
-        # @todo: support variable packets, block read/writes
-        if vals is not None:
-            self.rawbytes[8:12] = struct.pack(">L", vals[0])
+        if not block:
+            # the single read / write always includes a data word
+            val = vals[0] if vals is not None else 0xFEEDFACE
+            self.rawbytes += struct.pack(">L", val)
+        elif not rnw:
+            assert len(vals) == num_words
+            for val in vals:
+                self.rawbytes += struct.pack(">L", val)
+
+        if crc:
+            self.rawbytes += struct.pack(">H", crc16(self.rawbytes))
+
+        # the number of bytes in the response
+        if block and not rnw:
+            self.response_length = HEADER_LENGTH
         else:
-            self.rawbytes[8:12] = struct.pack(">L", 0xFEEDFACE)
+            self.response_length = HEADER_LENGTH + length
+        if crc:
+            self.response_length += CRC_LENGTH
+
+    @classmethod
+    def block_read(cls, address, num_words, crc=False):
+        return cls(True, address, block=True, num_words=num_words, crc=crc)
 
-        # @todo: added checksum / CRC
+    @classmethod
+    def block_write(cls, address, vals, crc=False):
+        return cls(False, address, vals=list(vals), block=True, crc=crc)
 
     @staticmethod
     def pkt2str(pkt):
@@ -41,14 +120,27 @@ class CommandPacket(object):
             print("rsp: {}".format(self.pkt2str(pkt)))
         return msg
 
+    def get_values(self, pkt):
+        """ get the data words in a response packet """
+        num_words = (len(pkt) - HEADER_LENGTH) // 4
+        if self.crc:
+            num_words = (len(pkt) - HEADER_LENGTH - CRC_LENGTH) // 4
+        return [struct.unpack(">L", pkt[8+(ii*4):12+(ii*4)])[0]
+                for ii in range(num_words)]
+
     def check_response(self, pkt, rvals=None, evals=None):
+        pkt = bytearray(pkt)
         assert pkt[0] == 0xDE, self.dump("invalid start byte", pkt)
+        assert not pkt[1] & CMD_ERROR, self.dump("error response", pkt)
         assert pkt[1] == self.rawbytes[1], self.dump("invalid command", pkt)
         assert pkt[2:6] == self.rawbytes[2:6], self.dump("invalid address", pkt)
         assert pkt[7] == 0xCA, self.dump("invalid byte 7", pkt)
+        assert len(pkt) == self.response_length, \
+            self.dump("invalid length", pkt)
+        if self.crc:
+            assert crc16(pkt) == 0, self.dump("invalid CRC", pkt)
         if rvals is not None and evals is not None:
-            for ii, ev in enumerate(evals):
-                rval, = struct.unpack(">L", pkt[8+(ii*4):12+(ii*4)])
+            for rval, ev in zip(self.get_values(pkt), evals):
                 assert rval == ev, "{:08X} != {:08X}".format(rval, ev)
                 rvals.append(rval)
 
@@ -62,9 +154,9 @@ class CommandPacket(object):
 
     def get(self, fifobus, rvals=None, evals=None, timeout=4000):
         timeout_value = timeout
-        response_bytes = bytearray([0 for _ in range(PACKET_LENGTH)])
+        response_bytes = bytearray([0 for _ in range(self.response_length)])
         rpkt = response_bytes
-        bytestoget, ii = PACKET_LENGTH, 0
+        bytestoget, ii = self.response_length, 0
 
         while fifobus.empty and timeout > 0:
             timeout -= 1
@@ -75,16 +167,18 @@ class CommandPacket(object):
 
         timeout = timeout_value
         while bytestoget > 0 and timeout > 0:
-            if not fifobus.empty and bytestoget > 1:
-                fifobus.read.next = True
-            else:
-                fifobus.read.next = False
-
+            # the byte of the last read, then read if more bytes
+            # are needed (the response can stall between bytes)
             if fifobus.read_valid:
                 bb = int(fifobus.read_data)
                 rpkt[ii] = bb
                 bytestoget -= 1
                 ii += 1
+
+            if not fifobus.empty and bytestoget > 0:
+                fifobus.read.next = True
+            else:
+                fifobus.read.next = False
             timeout -= 1
 
             yield delay(1)
@@ -0,0 +1,83 @@
+
+import os
+import stat
+
+import pytest
+
+import myhdl
+from myhdl import Signal, intbv, always
+
+# stand-in scripts for the open-source iCE40 tools, each logs its
+# name, prints a few lines, sleeps ($RHEA_FAKE_TOOL_DELAY) and
+# creates the output file.
+_tools = {
+    'yosys': 'touch "$(echo "$2" | sed "s/.*-blif //")"',
+    'arachne-pnr': 'eval touch \\"\\${$#}\\"',
+    'icepack': 'touch "$2"; echo bitstream > "$2"',
+}
+
+
+@myhdl.block
+def counter_top(led, clock):
+    cnt = Signal(intbv(0)[24:])
+
+    @always(clock.posedge)
+    def beh():
+        cnt.next = cnt + 1
+        led.next = cnt[24:24-len(led)]
+
+    return beh
+
+
+class FakeTools(object):
+    def __init__(self, path):
+        """ The stand-in tools in `path`/bin, the tools called are
+        logged in `path`/calls.txt.
+        """
+        self.path = path
+        self.bindir = os.path.join(path, 'bin')
+        self.callfn = os.path.join(path, 'calls.txt')
+        os.makedirs(self.bindir)
+        for name, cmd in _tools.items():
+            fn = os.path.join(self.bindir, name)
+            with open(fn, 'w') as f:
+                f.write("#!/bin/sh\n"
+                        "case $1 in -V|--version)\n"
+                        "    echo {0} 1.0; exit 0;;\n"
+                        "esac\n"
+                        "echo {0} >> {1}\n"
+                        "echo {0} start\n"
+                        "sleep ${{RHEA_FAKE_TOOL_DELAY:-0}}\n"
+                        "{2}\n"
+                        "echo {0} done\n".format(name, self.callfn, cmd))
+            os.chmod(fn, os.stat(fn).st_mode | stat.S_IEXEC)
+
+    def calls(self):
+        """ the tools called since the last `calls` """
+        if not os.path.isfile(self.callfn):
+            return []
+        with open(self.callfn) as f:
+            calls = f.read().split()
+        os.remove(self.callfn)
+        return calls
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    """ the default (artifact, conversion) cache is in the tmpdir """
+    path = str(tmpdir.join('cache'))
+    monkeypatch.setenv('RHEA_CACHE_DIR', path)
+    return path
+
+
+@pytest.fixture
+def fake_tools(tmpdir, monkeypatch):
+    """ the stand-in tools are first in the PATH """
+    tools = FakeTools(str(tmpdir.join('tools')))
+    monkeypatch.setenv('PATH', tools.bindir + os.pathsep + os.environ['PATH'])
+    return tools
+
+
+@pytest.fixture
+def top():
+    return counter_top
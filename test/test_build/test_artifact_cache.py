@@ -0,0 +1,78 @@
+
+import os
+
+from rhea.build.boards import get_board
+from rhea.build.toolflow import IceRiver, Vivado
+from rhea.build.toolflow.cache import ArtifactCache
+
+
+def _flow(path, name, top, cache):
+    flow = IceRiver(brd=get_board('icestick'), top=top,
+                    path=os.path.join(path, name))
+    flow.artifact_cache = cache
+    return flow
+
+
+def test_artifact_cache(tmpdir, fake_tools, top):
+    path = str(tmpdir)
+    cache = ArtifactCache(os.path.join(path, 'cache'))
+
+    # first build runs the tools and populates the cache
+    flow = _flow(path, 'build1', top, cache)
+    flow.run()
+    assert not flow.failed
+    assert fake_tools.calls() == ['yosys', 'arachne-pnr', 'icepack']
+    assert len(cache.entries()) == 1
+
+    # same inputs in a new directory, the bitstream is from the cache
+    flow = _flow(path, 'build2', top, cache)
+    flow.run()
+    assert fake_tools.calls() == []
+    with open(flow.bitfile) as f:
+        assert f.read().strip() == 'bitstream'
+    # the stages are up to date after the cache hit
+    assert os.path.isfile(flow.stage_manifest)
+    flow = _flow(path, 'build2', top, cache)
+    flow.artifact_cache = False
+    flow.run()
+    assert fake_tools.calls() == []
+
+    # restore without building (program)
+    flow = _flow(path, 'program', top, cache)
+    assert flow.restore_artifacts()
+    assert os.path.isfile(flow.bitfile)
+    assert fake_tools.calls() == []
+
+    # different constraints, the tools run
+    flow = _flow(path, 'build3', top, cache)
+    flow.brd.ports['led'].pins = (95, 96, 97, 98, 99,)
+    flow.run()
+    assert fake_tools.calls() == ['yosys', 'arachne-pnr', 'icepack']
+    assert len(cache.entries()) == 2
+
+
+def test_artifact_cache_lru(tmpdir):
+    path = str(tmpdir)
+    src = os.path.join(path, 'src')
+    os.makedirs(src)
+    with open(os.path.join(src, 'top.bit'), 'wb') as f:
+        f.write(b'\x00' * 100)
+
+    cache = ArtifactCache(os.path.join(path, 'cache'), max_size=250)
+    cache.put('a', ['top.bit'], src)
+    cache.put('b', ['top.bit'], src)
+    # make 'a' the most recently used, 'b' is evicted
+    os.utime(cache._entry('b'), (1, 1))
+    assert cache.get('a', ['top.bit', 'top.log'], src)
+    cache.put('c', ['top.bit'], src)
+    assert [key for _, _, key in cache.entries()] == ['a', 'c']
+    assert not cache.get('b', ['top.bit'], src)
+
+
+def test_vivado_artifacts(tmpdir, top):
+    flow = Vivado(brd=get_board('zybo'), top=top, path=str(tmpdir))
+    files = [os.path.basename(fn) for fn in flow._artifact_files()]
+    assert 'zybo.bit' in files and 'zybo.bin' not in files
+    flow.generate_binary = True
+    files = [os.path.basename(fn) for fn in flow._artifact_files()]
+    assert 'zybo.bin' in files
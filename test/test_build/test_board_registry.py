@@ -0,0 +1,129 @@
+
+import os
+import sys
+import json
+import shutil
+import importlib
+import subprocess
+
+import pytest
+
+from rhea.build import FPGA
+from rhea.build.boards import get_board, get_all_board_names, register_board
+
+
+def _run_python(script, path=()):
+    """ run a script in a new interpreter, returns the JSON it prints """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(list(path) + sys.path)
+    out = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def test_lazy_board_import():
+    """ the board modules are imported when a board is retrieved """
+    script = "\n".join([
+        "import sys, json",
+        "import rhea",
+        "import rhea.build.boards as boards",
+        "before = [m for m in sys.modules if m.startswith(",
+        "          'rhea.build.boards.')]",
+        "boards.get_board('de0nano')",
+        "after = [m for m in sys.modules if m.startswith(",
+        "         'rhea.build.boards.')]",
+        "print(json.dumps([before, after]))",
+    ])
+    before, after = _run_python(script)
+    assert before == ['rhea.build.boards.get_board']
+    assert 'rhea.build.boards.altera.de0nano' in after
+    assert not any(m.startswith(('rhea.build.boards.xilinx',
+                                 'rhea.build.boards.lattice'))
+                   for m in after)
+
+
+def test_import_time():
+    """ import rhea does not pay for the build (boards and toolflows) """
+    script = "\n".join([
+        "import sys, json, time",
+        "import myhdl",
+        "start = time.time()",
+        "import rhea",
+        "elapsed = time.time() - start",
+        "build = [m for m in sys.modules if m.startswith('rhea.build')]",
+        "print(json.dumps([elapsed, build]))",
+    ])
+    elapsed, build = _run_python(script)
+    print("import rhea: {:.3f} s".format(elapsed))
+    assert build == []
+
+
+class RegistryBoard(FPGA):
+    vendor = 'lattice'
+    family = 'ice40'
+    device = 'HX1K'
+    _name = 'registry_board'
+    default_clocks = {'clock': dict(frequency=12e6, pins=(21,))}
+    default_ports = {'led': dict(pins=(99, 98, 97, 96, 95,))}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """ the boards registered in a test are removed after the test """
+    # the module, the package `get_board` attribute is the function
+    mod = importlib.import_module('rhea.build.boards.get_board')
+    monkeypatch.setattr(mod, '_registry', dict(mod._registry))
+    monkeypatch.setattr(mod, '_plugins_loaded', mod._plugins_loaded)
+    return mod._registry
+
+
+def test_register_board(registry):
+    register_board('registry_board', RegistryBoard)
+    register_board('registry_xula2', 'rhea.build.boards.xilinx._xula:Xula2')
+    names = get_all_board_names()
+    assert 'registry_board' in names and 'registry_xula2' in names
+    assert isinstance(get_board('registry_board'), RegistryBoard)
+    assert get_board('registry_xula2').device == 'XC6SLX25'
+
+    with pytest.raises(ValueError):
+        get_board('not_a_board')
+
+
+def test_register_board_restored():
+    """ the registry fixture removed the boards """
+    names = get_all_board_names()
+    assert 'registry_board' not in names and 'registry_xula2' not in names
+
+
+def test_entry_point_board():
+    """ boards from other packages are registered with entry points """
+    path = os.path.abspath(os.path.join('output', 'board_plugin'))
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    distinfo = os.path.join(path, 'rhea_plugin_boards-0.1.dist-info')
+    os.makedirs(distinfo)
+    with open(os.path.join(path, 'plugin_boards.py'), 'w') as f:
+        f.write("from rhea.build.boards.xilinx import Xula2\n\n"
+                "class MyCustomBoard(Xula2):\n"
+                "    default_ports = {\n"
+                "        'leds': dict(pins=('R7', 'R15', 'R16', 'M15',)),\n"
+                "    }\n")
+    with open(os.path.join(distinfo, 'METADATA'), 'w') as f:
+        f.write("Metadata-Version: 2.1\nName: rhea-plugin-boards\n"
+                "Version: 0.1\n")
+    with open(os.path.join(distinfo, 'entry_points.txt'), 'w') as f:
+        f.write("[rhea.boards]\nmy_board = plugin_boards:MyCustomBoard\n")
+
+    script = "\n".join([
+        "import sys, json",
+        "from rhea.build.boards import get_board, get_all_board_names",
+        "names = get_all_board_names()",
+        "loaded = 'plugin_boards' in sys.modules",
+        "brd = get_board('my_board')",
+        "print(json.dumps(['my_board' in names, loaded,",
+        "                  type(brd).__name__, sorted(brd.ports)]))",
+    ])
+    listed, loaded, clsname, ports = _run_python(script, path=[path])
+    assert listed
+    assert not loaded
+    assert clsname == 'MyCustomBoard'
+    assert 'leds' in ports
@@ -0,0 +1,52 @@
+
+import os
+
+import myhdl
+from myhdl import Signal, intbv, always_seq
+
+from rhea.build.boards import get_board
+from rhea.build.toolflow import convert
+from rhea.build.toolflow.cache import ConvertCache, conversion_key
+
+
+@myhdl.block
+def cache_top(led, clock, reset, maxcnt=1000):
+    cnt = Signal(intbv(0, min=0, max=maxcnt))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh():
+        if cnt == maxcnt-1:
+            cnt.next = 0
+            led.next = ~led
+        else:
+            cnt.next = cnt + 1
+
+    return beh
+
+
+def test_convert_cache(tmpdir):
+    path = str(tmpdir)
+    cache = ConvertCache(os.path.join(path, 'cache'))
+
+    brd = get_board('de0nano')
+    brd.set_top(cache_top)
+    key = conversion_key(brd, brd.get_portmap(), brd.top_name, 'verilog')
+    filelist = convert(brd, path=path, cache=cache)
+    vfn = os.path.join(path, filelist[0])
+    assert os.path.isfile(vfn)
+    assert os.path.isdir(os.path.join(cache.cache_dir, key))
+    with open(vfn) as f:
+        hdl = f.read()
+
+    # a second conversion uses the cached file
+    os.remove(vfn)
+    assert convert(brd, path=path, cache=cache) == filelist
+    with open(vfn) as f:
+        assert f.read() == hdl
+
+    # a parameter change is a different conversion
+    brd.set_top(cache_top, maxcnt=2000)
+    assert conversion_key(brd, brd.get_portmap(), brd.top_name,
+                          'verilog') != key
+    assert conversion_key(brd, brd.get_portmap(), brd.top_name,
+                          'vhdl') != key
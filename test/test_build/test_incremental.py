@@ -0,0 +1,35 @@
+
+import os
+
+from rhea.build.boards import get_board
+from rhea.build.toolflow import IceRiver
+
+
+def _run(path, top, fake_tools, pins=None):
+    brd = get_board('icestick')
+    if pins is not None:
+        brd.ports['led'].pins = pins
+    flow = IceRiver(brd=brd, top=top, path=os.path.join(path, 'iceriver'))
+    flow.run()
+    assert not flow.failed
+    assert os.path.isfile(flow.bitfile)
+    return fake_tools.calls()
+
+
+def test_incremental_stages(tmpdir, fake_tools, top):
+    path = str(tmpdir)
+
+    # first run, all the stages
+    assert _run(path, top, fake_tools) == ['yosys', 'arachne-pnr', 'icepack']
+
+    # nothing changed, nothing to run
+    assert _run(path, top, fake_tools) == []
+
+    # constraints changed, the place-n-route and later run
+    pins = (95, 96, 97, 98, 99,)
+    assert _run(path, top, fake_tools, pins) == ['arachne-pnr', 'icepack']
+    assert _run(path, top, fake_tools, pins) == []
+
+    # the bitstream is missing, only the last stage runs
+    os.remove(os.path.join(path, 'iceriver', 'icestick.bin'))
+    assert _run(path, top, fake_tools, pins) == ['icepack']
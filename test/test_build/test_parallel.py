@@ -0,0 +1,77 @@
+
+import os
+import shutil
+
+import myhdl
+from myhdl import Signal, intbv, always_seq
+
+from rhea.build import build_boards
+from rhea.build.parallel import get_board_names, format_results
+
+
+@myhdl.block
+def parallel_top(led, clock, reset):
+    cnt = Signal(intbv(0)[24:])
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh():
+        cnt.next = cnt + 1
+        led.next = cnt[24:24-len(led)]
+
+    return beh
+
+
+def test_board_names():
+    names = get_board_names(['de0nano*', 'icestick', 'de0nano'])
+    assert names == ['de0nano', 'de0nano_soc', 'icestick']
+
+
+def test_build_boards():
+    path = os.path.join('output', 'parallel')
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    boards = ['de0nano', 'de0nano_soc']
+    results = build_boards(parallel_top, boards, flow='yosys',
+                           path=path, jobs=2)
+    print(format_results(results))
+
+    assert [res.board for res in results] == boards
+    for res in results:
+        # the toolflow fails if yosys is not installed
+        assert res.status in ('ok', 'failed'), res.error
+        vfn = os.path.join(res.path, 'yosys', res.board + '.v')
+        assert os.path.isfile(vfn)
+        with open(vfn) as f:
+            assert 'module {}'.format(res.board) in f.read()
+
+
+class _ReportFlow(object):
+    """ a toolflow that builds and fails to parse the reports """
+    report_error = ValueError
+
+    def __init__(self, brd):
+        self.path = 'fake'
+        self.failed = False
+
+    def run(self, use='verilog'):
+        return None
+
+    def get_utilization(self):
+        raise self.report_error("bad report")
+
+
+class _NoReportFlow(_ReportFlow):
+    report_error = IOError
+
+
+def test_build_report_errors(tmpdir):
+    # the missing reports are expected, other errors are kept
+    res, = build_boards(parallel_top, ['icestick'], flow=_NoReportFlow,
+                        path=str(tmpdir), jobs=1)
+    assert res.status == 'ok' and res.error is None
+
+    res, = build_boards(parallel_top, ['icestick'], flow=_ReportFlow,
+                        path=str(tmpdir), jobs=1)
+    assert res.status == 'ok'
+    assert 'bad report' in res.error
@@ -0,0 +1,165 @@
+
+import os
+import sys
+import shutil
+
+import pytest
+
+from rhea.build.boards import get_board
+from rhea.build.toolflow import ISE
+from rhea.build.toolflow._report_parser import LogTail
+from rhea.build.toolflow.xilinx.ise_parse_reports import ISEReportParser
+from rhea.build.toolflow.xilinx.vivado_parse_reports import VivadoReportParser
+from rhea.build.toolflow.xilinx.vivado_parse_reports import get_utilization
+from rhea.build.toolflow.altera.quartus_parse_reports import (
+    QuartusReportParser)
+
+
+ise_log = """
+Started : "Synthesize - XST".
+Slice Logic Utilization:
+ Number of Slice Registers:              29  out of  11,440     0%
+ Number of Slice LUTs:                   38  out of   5,720     1%
+   Minimum period: 4.994ns (Maximum Frequency: 200.240MHz)
+Started : "Map".
+  Number of DSP48A1s:                     2 out of      16   12%
+"""
+
+quartus_rpt = """
+; 10 ; Fitter Resource Usage Summary           ;
+; 20 ; Slow 1200mV 85C Model Fmax Summary      ;
+
++---------------------------------------------------------+
+; Fitter Resource Usage Summary                           ;
++---------------------------------------------+-----------+
+; Resource                                    ; Usage     ;
++---------------------------------------------+-----------+
+; Total logic elements                        ; 1,234 / 22,320 ( 6 % ) ;
+;     -- Combinational with no register       ; 21        ;
+; Total registers                             ; 52        ;
+; Embedded Multiplier 9-bit elements          ; 0 / 132 ( 0 % ) ;
++---------------------------------------------+-----------+
+
++--------------------------------------------------+
+; Slow 1200mV 85C Model Fmax Summary               ;
++------------+-----------------+------------+------+
+; Fmax       ; Restricted Fmax ; Clock Name ; Note ;
++------------+-----------------+------------+------+
+; 250.5 MHz  ; 250.0 MHz       ; clock      ;      ;
++------------+-----------------+------------+------+
+
++--------------------------------------------------+
+; Slow 1200mV 0C Model Fmax Summary                ;
++------------+-----------------+------------+------+
+; 230.1 MHz  ; 230.1 MHz       ; clock      ;      ;
++------------+-----------------+------------+------+
+"""
+
+vivado_rpt = """
+Report Cell Usage:
++------+-------+------+
+|      |Cell   |Count |
++------+-------+------+
+|1     |BUFG   |     1|
+|2     |CARRY4 |     7|
++------+-------+------+
+
++-------------------------+------+-------+-----------+-------+
+|        Site Type        | Used | Fixed | Available | Util% |
++-------------------------+------+-------+-----------+-------+
+| Slice LUTs              |   28 |     0 |     17600 |  0.16 |
+| Slice Registers         |   30 |     0 |     35200 |  0.09 |
++-------------------------+------+-------+-----------+-------+
+
+Clock Summary
+-------------
+
+Clock        Waveform(ns)         Period(ns)      Frequency(MHz)
+-----        ------------         ----------      --------------
+sys_clk_pin  {0.000 4.000}        8.000           125.000
+
+    WNS(ns)      TNS(ns)  TNS Failing Endpoints
+    -------      -------  ---------------------
+      3.000        0.000                      0
+"""
+
+
+def _feed(parser, txt):
+    for line in txt.splitlines(True):
+        parser.feed(line)
+    return parser
+
+
+def test_ise_parser():
+    parser = _feed(ISEReportParser(), ise_log)
+    info = parser.info
+    assert info['syn']['reg'] == (29, 11440, 0)
+    assert info['syn']['lut'].available == 5720
+    assert info['syn']['dsp'].percent == 12
+    assert info.fmax == 200.24
+    assert parser.stage == 'Map'
+
+
+def test_quartus_parser():
+    info = _feed(QuartusReportParser(), quartus_rpt).info
+    assert info['syn']['lut'] == (1234, 22320, 6)
+    assert info['syn']['reg'] == (52, None, None)
+    assert info['syn']['dsp'] == (0, 132, 0)
+    assert info.fmax == 230.1
+
+
+def test_vivado_parser():
+    info = _feed(VivadoReportParser(), vivado_rpt).info
+    assert info['syn']['lut'] == (28, 17600, 0)
+    assert info['syn']['reg'].used == 30
+    assert info['syn']['CARRY4'] == (7, None, None)
+    assert abs(info.fmax - 200.) < 1e-6
+
+
+def test_vivado_missing_log(tmpdir):
+    with pytest.raises(IOError):
+        get_utilization(str(tmpdir.join('build_vivado.log')))
+
+
+def test_log_tail():
+    path = os.path.join('output', 'report_parsers')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    fn = os.path.join(path, 'tail.log')
+    with open(fn, 'w') as f:
+        f.write('first\n')
+    tail = LogTail(fn)
+    assert tail.read() == []
+    with open(fn, 'a') as f:
+        f.write('second\nthi')
+    assert tail.read() == ['second\n']
+    with open(fn, 'a') as f:
+        f.write('rd\nfour')
+    assert tail.read() == ['third\n']
+    assert tail.flush() == ['four']
+
+
+def test_flow_progress():
+    """ the log is parsed while the tool runs """
+    path = os.path.join('output', 'report_parsers')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    script = os.path.join(path, 'fake_ise.py')
+    with open(script, 'w') as f:
+        f.write("import sys, time\n")
+        for line in ise_log.splitlines():
+            f.write("print({!r}); sys.stdout.flush(); time.sleep(.01)\n"
+                    .format(line))
+
+    flow = ISE(brd=get_board('xula'), path=path)
+    flow.poll_interval = .01
+    events = []
+    flow.progress_callbacks.append(
+        lambda fl, event, value: events.append((event, value)))
+    flow._execute_flow([sys.executable, script], 'build_ise.log')
+
+    assert not flow.failed
+    assert ('stage', 'Synthesize - XST') in events
+    assert ('fmax', 200.24) in events
+    assert events[-1] == ('stage', 'Map')
+    assert flow.log_info['syn']['dsp'].used == 2
@@ -0,0 +1,75 @@
+
+import os
+import time
+
+import pytest
+
+from rhea.build.boards import get_board
+from rhea.build.toolflow import IceRiver
+
+# run_async requires Python 3.5+
+asyncio = pytest.importorskip('asyncio')
+
+
+@pytest.fixture
+def tools(tmpdir, fake_tools, monkeypatch):
+    monkeypatch.setenv('RHEA_FAKE_TOOL_DELAY', '.3')
+    return str(tmpdir)
+
+
+def _flow(path, name, top):
+    flow = IceRiver(brd=get_board('icestick'), top=top,
+                    path=os.path.join(path, name))
+    flow.incremental = False
+    return flow
+
+
+def test_run_async_concurrent(tools, top):
+    flows = [_flow(tools, 'flow{}'.format(ii), top) for ii in range(3)]
+    lines = []
+    for flow in flows:
+        flow.output_callbacks.append(
+            lambda fl, line: lines.append((fl.path, line.strip())))
+
+    loop = asyncio.get_event_loop()
+    start = time.time()
+    logs = loop.run_until_complete(
+        asyncio.gather(*[flow.run_async() for flow in flows]))
+    elapsed = time.time() - start
+
+    for flow, logfn in zip(flows, logs):
+        assert not flow.failed
+        assert os.path.isfile(flow.bitfile)
+        with open(logfn) as f:
+            log = f.read().split('\n')
+        assert log[:2] == ['yosys start', 'yosys done']
+        out = [line for pth, line in lines if pth == flow.path]
+        assert out == [ln for ln in log if len(ln) > 0]
+
+    # three tools per flow, the flows run at the same time
+    assert elapsed < 3 * 3 * .3
+
+
+def test_run_async_timeout(tools, top, monkeypatch):
+    monkeypatch.setenv('RHEA_FAKE_TOOL_DELAY', '10')
+    flow = _flow(tools, 'timeout', top)
+    loop = asyncio.get_event_loop()
+    start = time.time()
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(flow.run_async(timeout=.5))
+    assert time.time() - start < 5
+    assert flow.failed
+    assert not os.path.isfile(flow.bitfile)
+
+
+def test_run_async_cancel(tools, top, monkeypatch):
+    monkeypatch.setenv('RHEA_FAKE_TOOL_DELAY', '10')
+    flow = _flow(tools, 'cancel', top)
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(flow.run_async())
+    loop.call_later(.5, task.cancel)
+    start = time.time()
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(task)
+    assert time.time() - start < 5
+    assert flow.failed
@@ -1,6 +1,13 @@
 
+from __future__ import division
+
+import wave
+
+import numpy as np
+
 import myhdl
-from myhdl import (Signal, intbv, instance, delay, StopSimulation)
+from myhdl import (Signal, intbv, instance, always, delay,
+                   StopSimulation)
 
 from rhea.cores.converters import adc128s022
 from rhea.cores.spi import SPIBus
@@ -8,7 +15,9 @@ from rhea.system import FIFOBus
 from rhea.system import Clock
 from rhea.system import Reset
 from rhea.system import Global
-from rhea.models.converters import adc128s022_model
+from rhea.models.converters import adc128s022_model, ADC128S022
+from rhea.models.converters import WaveformSource, sine_snr, enob
+from rhea.models.converters.adc128s022_model import convert
 from rhea.utils.test import run_testbench
 
 
@@ -59,8 +68,11 @@ def test_adc128s022():
                     print("sample {:1X}:{:4d}, fifobus {} \n".format(
                         int(sample[16:12]), int(sample[12:0]), str(fifobus)))
                     assert fifobus.empty 
+                    # the channel selected in the previous frame
+                    expected = convert(float(analog_channels[ch]), (0., 3.3))
+                    assert sample[12:0] == expected
                 else:
-                    print("No sample!")
+                    raise AssertionError("No sample!")
                 
             yield delay(100)
             raise StopSimulation
@@ -69,7 +81,99 @@ def test_adc128s022():
 
     run_testbench(bench_adc128s022)
         
-        
+
+
+def test_adc128s022_waveform():
+    """ convert a noisy sine, the FIFO samples are the captured
+    conversions and the ENOB of the conversions.
+    """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=0, async=False)
+    glbl = Global(clock, reset)
+    fifobus = FIFOBus(width=16)
+    spibus = SPIBus()
+    channel = Signal(intbv(0, min=0, max=8))
+    frequency, nsamples = 5e3, 300
+
+    # a sine sampled at 1 MHz, interpolated at the conversion times
+    t = np.arange(1000) / 1e6
+    sine = WaveformSource(np.sin(2*np.pi*frequency*t), sample_rate=1e6,
+                          scale=1.5, offset=1.65, noise=0.5e-3, seed=7,
+                          repeat=True)
+    analog_channels = [sine] + [0.]*7
+    adc = ADC128S022(analog_channels, vref_pos=3.3, vref_neg=0.)
+    fifo_samples = []
+
+    @myhdl.block
+    def bench_adc128s022_waveform():
+        tbdut = adc128s022(glbl, fifobus, spibus, channel)
+        tbmdl = adc.process(spibus)
+        tbclk = clock.gen()
+
+        @always(clock.posedge)
+        def tbrd():
+            fifobus.read.next = not fifobus.empty
+            if fifobus.read_valid:
+                fifo_samples.append(int(fifobus.read_data))
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            while len(fifo_samples) < nsamples:
+                yield delay(10000)
+            raise StopSimulation
+
+        return tbdut, tbmdl, tbclk, tbrd, tbstim
+
+    run_testbench(bench_adc128s022_waveform)
+
+    times, samples = adc.capture(0)
+    assert fifo_samples == list(samples[:len(fifo_samples)])
+    snr = sine_snr(samples, frequency, times=times)
+    print("SNR {:.1f} dB, ENOB {:.2f}".format(snr, enob(snr)))
+    assert enob(snr) > 9
+
+
+def test_waveform_sources(tmpdir):
+    t = np.linspace(0, 1e-3, 11)
+    # callable
+    src = WaveformSource(lambda tt: 2*tt, offset=0.5)
+    assert np.allclose(src.values(t), 2*t + 0.5)
+
+    # two column CSV, time and value
+    fn = str(tmpdir.join('wave.csv'))
+    np.savetxt(fn, np.column_stack(([0, 1e-3], [0., 1.])), delimiter=',')
+    src = WaveformSource(fn)
+    assert np.allclose(src.values(t), t/1e-3)
+    assert src(2e-3) == 1.  # the last sample is held
+
+    # 16 bit WAV, normalized
+    fn = str(tmpdir.join('wave.wav'))
+    vals = np.array([0, 16384, -16384, 32767], dtype=np.int16)
+    wf = wave.open(fn, 'wb')
+    wf.setnchannels(1)
+    wf.setsampwidth(2)
+    wf.setframerate(8000)
+    wf.writeframes(vals.tobytes())
+    wf.close()
+    src = WaveformSource(fn, repeat=True)
+    assert np.isclose(src(1/8000), 0.5)
+    assert np.isclose(src(1.5/8000), 0.)
+    assert np.isclose(src(4/8000), 0.)   # repeated
+
+    # 8 bit WAV, unsigned (offset 128)
+    fn = str(tmpdir.join('wave8.wav'))
+    vals = np.array([128, 192, 64, 0], dtype=np.uint8)
+    wf = wave.open(fn, 'wb')
+    wf.setnchannels(1)
+    wf.setsampwidth(1)
+    wf.setframerate(8000)
+    wf.writeframes(vals.tobytes())
+    wf.close()
+    src = WaveformSource(fn)
+    assert np.allclose(src.values(np.arange(4)/8000), [0., .5, -.5, -1.])
+
+
 if __name__ == '__main__':
     test_adc128s022()
     
@@ -0,0 +1,137 @@
+
+from __future__ import print_function, division
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea.system import Global, Clock, Reset, FIFOBus
+from rhea.cores.fifo import fifo_sync, fifo_fast, fifo_async
+
+from rhea.utils.test import run_testbench
+
+
+def check_flags(fbus, count, afull, aempty):
+    assert fbus.count == count
+    assert fbus.write_count == count
+    assert fbus.almost_full == (count >= afull)
+    assert fbus.almost_empty == (count <= aempty)
+
+
+def bench_sync_occupancy(fifo, size, afull=None, aempty=None):
+    """ fill and drain a single clock FIFO, check the count and the
+    almost full and empty flags after each write and read.
+    """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=8)
+    # the default thresholds
+    afull = size - size//4 if afull is None else afull
+    aempty = size//4 if aempty is None else aempty
+
+    @myhdl.block
+    def bench_occupancy():
+        tbdut = fifo(glbl, fbus, size=size, almost_full=afull,
+                     almost_empty=aempty)
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            for ii in range(size):
+                check_flags(fbus, ii, afull, aempty)
+                fbus.write.next = True
+                fbus.write_data.next = ii
+                yield clock.posedge
+                fbus.write.next = False
+                yield clock.negedge
+            for _ in range(4):
+                yield clock.posedge
+            check_flags(fbus, size, afull, aempty)
+            assert fbus.full
+
+            for ii in range(size):
+                fbus.read.next = True
+                yield clock.posedge
+                fbus.read.next = False
+                yield clock.negedge
+                check_flags(fbus, size-ii-1, afull, aempty)
+            assert fbus.empty
+
+            raise StopSimulation
+
+        return tbdut, tbclk, tbstim
+
+    run_testbench(bench_occupancy)
+
+
+def test_fifo_sync_occupancy():
+    bench_sync_occupancy(fifo_sync, 16)
+    bench_sync_occupancy(fifo_sync, 32, afull=30, aempty=2)
+
+
+def test_fifo_fast_occupancy():
+    bench_sync_occupancy(fifo_fast, 16)
+    bench_sync_occupancy(fifo_fast, 8, afull=7, aempty=0)
+
+
+def test_fifo_async_occupancy():
+    """ the counts in both clock domains after the pointers are
+    synchronized.
+    """
+    clock_write = Clock(0, frequency=50e6)
+    clock_read = Clock(0, frequency=35e6)
+    reset = Reset(0, active=1, async=False)
+    fbus = FIFOBus(width=8)
+    size, afull, aempty = 32, 28, 3
+
+    @myhdl.block
+    def bench_async_occupancy():
+        tbdut = fifo_async(clock_write, clock_read, fbus, reset,
+                           size=size, almost_full=afull, almost_empty=aempty)
+        tbclkw = clock_write.gen(hticks=10)
+        tbclkr = clock_read.gen(hticks=14)
+
+        def settle():
+            for _ in range(8):
+                yield clock_write.posedge, clock_read.posedge
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield settle()
+            assert fbus.count == 0 and fbus.write_count == 0
+            assert fbus.almost_empty and not fbus.almost_full
+
+            for nwords in (3, 4, 24, 28, 32):
+                while fbus.write_count < nwords:
+                    fbus.write.next = True
+                    fbus.write_data.next = int(fbus.write_count)
+                    yield clock_write.posedge
+                    fbus.write.next = False
+                    yield clock_write.negedge
+                yield settle()
+                assert fbus.count == nwords and fbus.write_count == nwords
+                assert fbus.almost_full == (nwords >= afull)
+                assert fbus.almost_empty == (nwords <= aempty)
+            assert fbus.full
+
+            for nwords in (28, 27, 4, 3, 0):
+                while fbus.count > nwords:
+                    fbus.read.next = True
+                    yield clock_read.posedge
+                    fbus.read.next = False
+                    yield clock_read.negedge
+                yield settle()
+                assert fbus.count == nwords and fbus.write_count == nwords
+                assert fbus.almost_full == (nwords >= afull)
+                assert fbus.almost_empty == (nwords <= aempty)
+            assert fbus.empty
+
+            raise StopSimulation
+
+        return tbdut, tbclkw, tbclkr, tbstim
+
+    run_testbench(bench_async_occupancy)
@@ -0,0 +1,113 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import myhdl
+from myhdl import instance, always, now, StopSimulation
+
+from rhea.system import FIFOBus, Global, Clock, Reset
+from rhea.cores.fifo import fifo_sdram
+from rhea.cores.sdram import SDRAMInterface
+from rhea.models.sdram import SDRAMModel
+
+from rhea.utils.test import run_testbench
+
+
+def bench_fifo_sdram(nwords, write_rate=1., read_rate=1., delay=0):
+    """ write `nwords` and read them back, the writer and reader are
+    active `write_rate` and `read_rate` of the cycles, the reader
+    starts `delay` cycles after the writer.  Returns the number of
+    cycles and the max latency (cycles) from the write to the read.
+    """
+    clock = Clock(0, frequency=100e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=16)
+    exbus = SDRAMInterface()
+    exbus.clk = clock
+    exbus.timing = dict(exbus.timing, init=1000.0)
+    sdram = SDRAMModel(exbus)
+    period = 10
+
+    vals = [randint(0, 2**16-1) for _ in range(nwords)]
+    wtimes, rtimes, rdata = [], [], []
+    result = {}
+
+    @myhdl.block
+    def bench_fifo_sdram():
+        tbdut = fifo_sdram(glbl, fbus, exbus)
+        tbmdl = sdram.process()
+        tbclk = clock.gen(hticks=period//2)
+
+        @always(clock.posedge)
+        def tbmon():
+            if fbus.write and not fbus.full:
+                wtimes.append(now())
+            if fbus.read_valid:
+                rdata.append(int(fbus.read_data))
+                rtimes.append(now())
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            # the SDRAM initialization
+            for _ in range(200):
+                yield clock.posedge
+
+            start, ii, ncyc = now(), 0, 0
+            while len(rdata) < nwords:
+                fbus.write.next = False
+                fbus.read.next = False
+                if (ii < nwords and not fbus.full and
+                        randint(0, 99) < 100*write_rate):
+                    fbus.write.next = True
+                    fbus.write_data.next = vals[ii]
+                    ii += 1
+                if (not fbus.empty and ncyc >= delay and
+                        randint(0, 99) < 100*read_rate):
+                    fbus.read.next = True
+                yield clock.posedge
+                ncyc += 1
+                fbus.write.next = False
+                fbus.read.next = False
+                yield clock.negedge
+
+            result['cycles'] = (now() - start) // period
+            assert rdata == vals
+            assert fbus.empty and fbus.count == 0
+
+            raise StopSimulation
+
+        return tbdut, tbmdl, tbclk, tbmon, tbstim
+
+    run_testbench(bench_fifo_sdram)
+    latency = max([rt - wt for wt, rt in zip(wtimes, rtimes)]) // period
+    return result['cycles'], latency
+
+
+def test_fifo_sdram_throughput():
+    """ the writer and reader at the full rate """
+    nwords = 1024
+    ncyc, latency = bench_fifo_sdram(nwords)
+    print("{} words in {} cycles, {:.2f} words/clock, max latency {}"
+          .format(nwords, ncyc, nwords/ncyc, latency))
+    # each word is written and read, the SDRAM peak is 0.5 words/clock
+    assert nwords / ncyc > 0.4
+
+
+def test_fifo_sdram_deep():
+    """ more words than the on-chip FIFOs, the reader waits """
+    nwords = 1500
+    ncyc, latency = bench_fifo_sdram(nwords, read_rate=.7, delay=1200)
+    print("{} words in {} cycles, max latency {}".format(
+        nwords, ncyc, latency))
+
+
+def test_fifo_sdram_latency():
+    """ at a low rate the words are flushed through the SDRAM """
+    nwords = 64
+    ncyc, latency = bench_fifo_sdram(nwords, write_rate=.1)
+    print("{} words in {} cycles, max latency {}".format(
+        nwords, ncyc, latency))
+    assert latency < 24
@@ -0,0 +1,131 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import myhdl
+from myhdl import instance, always, now, StopSimulation
+
+from rhea.system import Global, Clock, Reset, FIFOBus
+from rhea.cores.fifo import fifo_sync, fifo_fast, fifo_async
+
+from rhea.utils.test import run_testbench
+
+
+def pack(words, width, wide):
+    """ the expected wide words, the first word is most significant """
+    nlanes = wide // width
+    packed = []
+    for ii in range(0, len(words), nlanes):
+        val = 0
+        for w in words[ii:ii+nlanes]:
+            val = (val << width) | w
+        packed.append(val)
+    return packed
+
+
+def unpack(words, wide, width):
+    """ the expected narrow words """
+    nlanes = wide // width
+    mask = 2**width - 1
+    return [(w >> (nlanes-1-ii)*width) & mask
+            for w in words for ii in range(nlanes)]
+
+
+def bench_fifo_width(fifo, width, read_width, nwords=64, clock_read=None,
+                     **kwargs):
+    """ stream `nwords` (write width) through a FIFO with a writer and
+    reader active each clock, returns the reads per read clock.
+    """
+    clock_write = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock_write, reset)
+    fbus = FIFOBus(width=width, read_width=read_width)
+    dual = clock_read is not None
+    period = 14 if dual else 20
+    if not dual:
+        clock_read = clock_write
+
+    vals = [randint(0, 2**width-1) for _ in range(nwords)]
+    if read_width > width:
+        expected = pack(vals, width, read_width)
+    else:
+        expected = unpack(vals, width, read_width)
+    rdata, result = [], {}
+
+    @myhdl.block
+    def bench_width():
+        if dual:
+            tbdut = fifo_async(clock_write, clock_read, fbus, reset,
+                               size=16, **kwargs)
+            tbclk = [clock_write.gen(hticks=10), clock_read.gen(hticks=7)]
+        else:
+            tbdut = fifo(glbl, fbus, size=16, **kwargs)
+            tbclk = clock_write.gen(hticks=10)
+
+        @always(clock_read.posedge)
+        def tbmon():
+            if fbus.read_valid:
+                rdata.append(int(fbus.read_data))
+
+        @instance
+        def tbwr():
+            yield reset.pulse(33)
+            # the fifo_async resets are synchronized
+            for _ in range(4):
+                yield clock_write.posedge
+            ii = 0
+            while ii < nwords:
+                fbus.write.next = False
+                if not fbus.full:
+                    fbus.write.next = True
+                    fbus.write_data.next = vals[ii]
+                    ii += 1
+                yield clock_write.posedge
+                fbus.write.next = False
+                yield clock_write.negedge
+
+        @instance
+        def tbrd():
+            yield reset.pulse(33)
+            while fbus.empty:
+                yield clock_read.posedge
+            start = now()
+            while len(rdata) < len(expected):
+                fbus.read.next = not fbus.empty
+                yield clock_read.posedge
+                fbus.read.next = False
+                yield clock_read.negedge
+
+            assert rdata == expected
+            assert fbus.empty
+            nclk = (now() - start) // period
+            result['rate'] = len(expected) / nclk
+            raise StopSimulation
+
+        return tbdut, tbclk, tbmon, tbwr, tbrd
+
+    run_testbench(bench_width)
+    return result['rate']
+
+
+def test_fifo_sync_width():
+    bench_fifo_width(fifo_sync, 8, 32)
+    # a narrow word each clock
+    rate = bench_fifo_width(fifo_sync, 32, 8)
+    assert rate > 0.9
+
+
+def test_fifo_fast_width():
+    bench_fifo_width(fifo_fast, 8, 32)
+    bench_fifo_width(fifo_fast, 8, 16)
+    rate = bench_fifo_width(fifo_fast, 32, 8)
+    assert rate > 0.9
+
+
+def test_fifo_async_fwft():
+    clock_read = Clock(0, frequency=70e6)
+    rate = bench_fifo_width(None, 8, 8, clock_read=clock_read, fwft=True)
+    print("fwft reads per clock {:.2f}".format(rate))
+    bench_fifo_width(None, 8, 32, clock_read=clock_read)
+    bench_fifo_width(None, 32, 8, clock_read=clock_read, fwft=True)
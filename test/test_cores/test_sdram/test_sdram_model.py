@@ -0,0 +1,177 @@
+
+from __future__ import print_function, division
+
+import os
+
+import pytest
+
+import myhdl
+from myhdl import instance, always, StopSimulation
+
+from rhea import Clock
+from rhea.cores.sdram import SDRAMInterface
+from rhea.models.sdram import SDRAMModel
+
+from rhea.utils.test import run_testbench
+
+
+def test_sdram_model_backdoor():
+    """ bulk load and dump without simulating """
+    sdram = SDRAMModel(SDRAMInterface())
+    data = os.urandom(2**20)   # 1MB, 512K words
+    addr = sdram.num_cols * 3 + 100
+    sdram.load(addr, data)
+    assert sdram.dump(addr, len(data)//2).tobytes() == data
+
+    # only the touched pages are allocated
+    assert len(sdram.pages) == (len(data)//2 + 100) // sdram.num_cols + 1
+    assert sdram.dump(0, 4).tolist() == [0, 0, 0, 0]
+
+    # the page of a linear address
+    bank, row, col = sdram.split_address(addr)
+    assert (bank, row, col) == (0, 3, 100)
+    sdram.load(sdram.num_cols*sdram.num_rows, [0xCAFE])
+    assert (1, 0) in sdram.pages
+
+    with pytest.raises(ValueError):
+        sdram.load(sdram.size - 1, [1, 2])
+
+
+def _run_commands(commands, sdram=None, rdq=None):
+    """ drive a list of (command, bank, addr) to the model, a command
+    per clock cycle.  The 'dat' command drives the addr on the data
+    bus (a write burst word), the read data bus of each cycle is
+    added to the rdq list.
+    """
+    clock = Clock(0, frequency=100e6)
+    intf = SDRAMInterface() if sdram is None else sdram.intf
+    intf.clk = clock
+    sdram = SDRAMModel(intf) if sdram is None else sdram
+    rdq = [] if rdq is None else rdq
+
+    @myhdl.block
+    def bench_sdram_model():
+        tbclk = clock.gen(hticks=5*1000)
+        tbmdl = sdram.process()
+
+        @always(clock.posedge)
+        def tbmon():
+            rdq.append(int(intf.rdq))
+
+        @instance
+        def tbstim():
+            yield clock.posedge
+            intf.cke.next = True
+            for cmd, bank, addr in commands:
+                intf.bs.next = bank
+                if cmd == 'act':
+                    yield intf._activate(addr)
+                elif cmd == 'wr':
+                    yield intf._write(addr, 0x5A5A)
+                elif cmd == 'rd':
+                    yield intf._read(addr)
+                elif cmd == 'pre':
+                    yield intf._precharge()
+                elif cmd == 'lmr':
+                    intf.addr.next = addr
+                    intf.cs.next, intf.ras.next = False, False
+                    intf.cas.next, intf.we.next = False, False
+                    yield clock.posedge
+                elif cmd == 'dat':
+                    intf.wdq.next = addr
+                    intf.dqo.next = addr
+                    yield intf._nop()
+                    intf.dqo.next = None
+                else:
+                    yield intf._nop()
+            yield intf._nop()
+            raise StopSimulation
+
+        return tbclk, tbmdl, tbmon, tbstim
+
+    run_testbench(bench_sdram_model, timescale='1ps')
+    return sdram
+
+
+def test_sdram_model_timing():
+    # tRCD = 2, tRAS = 5, tRP = 2 cycles at 100 MHz
+    sdram = _run_commands([
+        ('act', 1, 7), ('nop', 1, 0), ('wr', 1, 3), ('nop', 1, 0),
+        ('nop', 1, 0), ('pre', 1, 0), ('nop', 1, 0), ('act', 1, 8),
+    ])
+    # bank 1, row 7, column 3
+    assert sdram.dump((1 << 21) + (7 << 9) + 3, 1).tolist() == [0x5A5A]
+    assert sdram.open_rows == [None, 8, None, None]
+
+    # READ before tRCD
+    with pytest.raises(AssertionError, match="tRCD"):
+        _run_commands([('act', 0, 1), ('rd', 0, 0)])
+
+    # PRECHARGE before tRAS
+    with pytest.raises(AssertionError, match="tRAS"):
+        _run_commands([('act', 0, 1), ('nop', 0, 0), ('pre', 0, 0)])
+
+    # ACTIVE before tRP and without a PRECHARGE
+    with pytest.raises(AssertionError, match="tRP"):
+        _run_commands([('act', 0, 1), ('nop', 0, 0), ('nop', 0, 0),
+                       ('nop', 0, 0), ('nop', 0, 0), ('pre', 0, 0),
+                       ('act', 0, 2)])
+    with pytest.raises(AssertionError, match="open row"):
+        _run_commands([('act', 0, 1), ('nop', 0, 0), ('act', 0, 2)])
+
+
+def test_sdram_model_auto_precharge():
+    # A10 set, the auto-precharge of a WRITE starts tWR (6 cycles)
+    # after the write, of a READ at the end of the burst (1 word)
+    wrap, rdap = (1 << 10) | 3, (1 << 10) | 4
+    nops = [('nop', 1, 0)] * 7
+    sdram = _run_commands([('act', 1, 7), ('nop', 1, 0), ('wr', 1, wrap)] +
+                          nops + [('act', 1, 8)])
+    assert sdram.dump((1 << 21) + (7 << 9) + 3, 1).tolist() == [0x5A5A]
+    assert sdram.open_rows == [None, 8, None, None]
+
+    # the row is open until the precharge starts, then tRP
+    with pytest.raises(AssertionError, match="open row"):
+        _run_commands([('act', 1, 7), ('nop', 1, 0), ('wr', 1, wrap)] +
+                      nops[:4] + [('act', 1, 8)])
+    with pytest.raises(AssertionError, match="tRP"):
+        _run_commands([('act', 1, 7), ('nop', 1, 0), ('wr', 1, wrap)] +
+                      nops[:6] + [('act', 1, 8)])
+
+    # the tRAS is checked when the precharge starts
+    sdram = _run_commands([('act', 0, 1)] + nops[:3] + [('rd', 0, rdap)] +
+                          nops[:2] + [('act', 0, 2)])
+    assert sdram.open_rows == [2, None, None, None]
+    with pytest.raises(AssertionError, match="tRAS"):
+        _run_commands([('act', 0, 1), ('nop', 0, 0), ('rd', 0, rdap),
+                       ('nop', 0, 0)])
+    with pytest.raises(AssertionError, match="auto-precharge"):
+        _run_commands([('act', 1, 7), ('nop', 1, 0), ('wr', 1, wrap),
+                       ('rd', 1, 3)])
+
+
+def test_sdram_model_burst():
+    # burst length 4, CAS latency 2, the column wraps in the 4 words
+    nops = [('nop', 0, 0)] * 5
+    rdq = []
+    sdram = _run_commands([('lmr', 0, 0x22), ('act', 0, 1), ('nop', 0, 0),
+                           ('wr', 0, 6), ('dat', 0, 0x11), ('dat', 0, 0x12),
+                           ('dat', 0, 0x13), ('rd', 0, 5)] + nops, rdq=rdq)
+    assert sdram.burst_length == 4
+    assert sdram.dump((1 << 9) + 4, 4).tolist() == [0x12, 0x13, 0x5A5A, 0x11]
+    assert rdq[-5:-1] == [0x13, 0x5A5A, 0x11, 0x12]
+
+    # interleaved, a new READ ends the burst
+    rdq = []
+    sdram = SDRAMModel(SDRAMInterface())
+    sdram.load((1 << 9) + 8, list(range(8)))
+    _run_commands([('lmr', 0, 0x2A), ('act', 0, 1), ('nop', 0, 0),
+                   ('rd', 0, 9), ('nop', 0, 0), ('rd', 0, 14)] + nops,
+                  sdram=sdram, rdq=rdq)
+    assert rdq[-7:-1] == [1, 0, 6, 7, 4, 5]
+
+    # single writes (A9), the write ends after a word
+    sdram = _run_commands([('lmr', 0, 0x222), ('act', 0, 1), ('nop', 0, 0),
+                           ('wr', 0, 0), ('dat', 0, 0x11)] + nops)
+    assert sdram.write_burst == 1
+    assert sdram.dump(1 << 9, 2).tolist() == [0x5A5A, 0]
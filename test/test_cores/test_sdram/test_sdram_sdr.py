@@ -0,0 +1,205 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import myhdl
+from myhdl import instance, always, now, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import AvalonMM, AXI4, FIFOBus
+
+from rhea.cores.sdram import SDRAMInterface
+from rhea.cores.sdram import sdram_sdr_controller
+from rhea.models.sdram import SDRAMModel
+
+from rhea.utils.test import run_testbench
+
+
+def get_sdram(clock):
+    """ the SDRAM interface and model, short init interval """
+    exbus = SDRAMInterface()
+    exbus.clk = clock
+    exbus.timing = dict(exbus.timing, init=1000.0)
+    return exbus, SDRAMModel(exbus)
+
+
+def model_address(sdram, addr):
+    """ the model (bank | row | column) address of an interleaved
+    (row | bank | column) word address.
+    """
+    cw, bw = sdram.col_width, (sdram.num_banks-1).bit_length()
+    col = addr & (sdram.num_cols-1)
+    bank = (addr >> cw) & (sdram.num_banks-1)
+    row = addr >> (cw + bw)
+    return (((bank << sdram.row_width) | row) << cw) | col
+
+
+def test_sdram_avalon():
+    clock = Clock(0, frequency=100e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    ixbus = AvalonMM(glbl, data_width=16, address_width=24,
+                     pipelined=True, max_burst=64)
+    exbus, sdram = get_sdram(clock)
+    period = 10
+    commands = {}
+
+    @myhdl.block
+    def bench_sdram_avalon():
+        tbdut = sdram_sdr_controller(clock, reset, ixbus, exbus)
+        tbitx = ixbus.interconnect()
+        tbmdl = sdram.process()
+        tbclk = clock.gen(hticks=period//2)
+
+        @always(clock.posedge)
+        def tbmon():
+            if exbus.cke:
+                cmd = exbus.get_command()
+                commands[cmd] = commands.get(cmd, 0) + 1
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            while exbus.Commands.LMR not in commands:
+                yield clock.posedge
+
+            # random single transfers
+            saved = {}
+            for _ in range(32):
+                addr = randint(0, 2**22-1) * 2
+                saved[addr] = randint(0, 2**16-1)
+                yield ixbus.writetrans(addr, saved[addr])
+            for addr, val in saved.items():
+                yield ixbus.readtrans(addr)
+                assert ixbus.get_read_data() == val
+            for addr, val in saved.items():
+                assert sdram.dump(model_address(sdram, addr//2), 1)[0] == val
+
+            # bursts across the rows of the banks
+            base = 0x3F0 * 2
+            vals = [randint(0, 2**16-1) for _ in range(256)]
+            start = now()
+            yield ixbus.writetrans(base, vals)
+            wcycles = (now() - start) // period
+            start = now()
+            yield ixbus.readtrans(base, burstcount=64)
+            rdata = ixbus.get_read_data()
+            for ii in range(1, 4):
+                yield ixbus.readtrans(base + ii*128, burstcount=64)
+                rdata += ixbus.get_read_data()
+            rcycles = (now() - start) // period
+            assert rdata == vals
+
+            # the bandwidth efficiency, achieved vs. peak bytes/clock
+            peak = exbus.data_width // 8
+            for name, ncyc in (('write', wcycles), ('read', rcycles)):
+                print("{} {} words in {} cycles, {:.2f} of {} bytes/clock"
+                      .format(name, len(vals), ncyc, 2*len(vals)/ncyc, peak))
+                assert len(vals) / ncyc > 0.85
+
+            # idle for a couple refresh intervals
+            nref = commands[exbus.Commands.REF]
+            for _ in range(4000):
+                yield clock.posedge
+            assert commands[exbus.Commands.REF] >= nref + 2
+            yield ixbus.readtrans(base, burstcount=4)
+            assert ixbus.get_read_data() == vals[:4]
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbmdl, tbclk, tbmon, tbstim
+
+    run_testbench(bench_sdram_avalon)
+
+
+def test_sdram_generic():
+    """ single transfers through the generic bus (AXI4) """
+    clock = Clock(0, frequency=100e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    ixbus = AXI4(glbl, data_width=16, address_width=24)
+    exbus, sdram = get_sdram(clock)
+
+    @myhdl.block
+    def bench_sdram_generic():
+        tbdut = sdram_sdr_controller(clock, reset, ixbus, exbus)
+        tbitx = ixbus.interconnect()
+        tbmdl = sdram.process()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            for _ in range(200):
+                yield clock.posedge
+
+            for addr in (0, 0x1000, 0x7FFFFE):
+                val = randint(0, 2**16-1)
+                yield ixbus.writetrans(addr, val)
+                yield ixbus.readtrans(addr)
+                assert ixbus.get_read_data() == val
+
+            vals = [randint(0, 2**16-1) for _ in range(8)]
+            yield ixbus.writetrans(0x400, vals)
+            yield ixbus.readtrans(0x400, length=8)
+            assert ixbus.get_read_data() == vals
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbmdl, tbclk, tbstim
+
+    run_testbench(bench_sdram_generic)
+
+
+def test_sdram_fifo():
+    """ the SDRAM as a large FIFO """
+    clock = Clock(0, frequency=100e6)
+    reset = Reset(0, active=1, async=False)
+    fbus = FIFOBus(width=16)
+    exbus, sdram = get_sdram(clock)
+    vals = [randint(0, 2**16-1) for _ in range(600)]
+    rdata = []
+
+    @myhdl.block
+    def bench_sdram_fifo():
+        tbdut = sdram_sdr_controller(clock, reset, fbus, exbus,
+                                     burst_length=16)
+        tbmdl = sdram.process()
+        tbclk = clock.gen()
+
+        @always(clock.posedge)
+        def tbrd():
+            if fbus.read_valid:
+                rdata.append(int(fbus.read_data))
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+
+            # write and read at the same time, the reads follow
+            # the writes
+            ii = 0
+            while len(rdata) < len(vals):
+                fbus.write.next = False
+                fbus.read.next = False
+                if ii < len(vals) and not fbus.full:
+                    fbus.write.next = True
+                    fbus.write_data.next = vals[ii]
+                    ii += 1
+                if not fbus.empty and ii > 300:
+                    fbus.read.next = True
+                yield clock.posedge
+                fbus.write.next = False
+                fbus.read.next = False
+                # the flags are updated after the edge
+                yield clock.negedge
+
+            assert rdata == vals
+            assert fbus.empty and fbus.count == 0
+
+            raise StopSimulation
+
+        return tbdut, tbmdl, tbclk, tbrd, tbstim
+
+    run_testbench(bench_sdram_fifo)
@@ -1,5 +1,10 @@
 
+import os
 from random import randint
+
+import numpy as np
+from PIL import Image
+
 from rhea.models.video import VideoDisplay
 
 
@@ -20,7 +25,29 @@ def test_create_save():
                 if last:
                     print("End of frame {}, {}, {}".format(row, col, rgb))
                 disp.set_pixel(col, row, rgb, last)
-                
-                
+
+
+def test_save_every():
+    """ the frame is saved as a png for every Nth frame """
+    res = (40, 30)
+    disp = VideoDisplay(resolution=res, color_depth=(5, 6, 5), save_every=2)
+    disp.name = 'save_every'
+    for fn in ('save_every_frame_1.png', 'save_every_frame_2.png'):
+        if os.path.isfile(os.path.join('output', fn)):
+            os.remove(os.path.join('output', fn))
+
+    for ii in range(2):
+        for row in range(res[1]):
+            for col in range(res[0]):
+                # pack the color as (5, 6, 5) bits
+                disp.update_next_pixel((row << 11) | (col << 5) | ii)
+        assert disp.update_cnt == ii+1
+        assert disp.frame[7, 3].tolist() == [7, 3, ii]
+
+    assert not os.path.isfile(os.path.join('output', 'save_every_frame_1.png'))
+    im = Image.open(os.path.join('output', 'save_every_frame_2.png'))
+    assert np.array_equal(np.asarray(im), disp.frame)
+
+
 if __name__ == '__main__':
     test_create_save()
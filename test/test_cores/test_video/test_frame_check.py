@@ -0,0 +1,84 @@
+
+import os
+
+import numpy as np
+import pytest
+
+from myhdl import StopSimulation
+
+from rhea.models.video import VideoDisplay
+from rhea.models.video import FrameChecker, color_bars_frame
+
+
+def _write_frame(disp, frame):
+    rows, cols, _ = frame.shape
+    for row in range(rows):
+        for col in range(cols):
+            last = row == rows-1 and col == cols-1
+            disp.set_pixel(col, row, tuple(frame[row, col]), last)
+
+
+def test_color_bars_frame():
+    frame = color_bars_frame((80, 4), (5, 6, 5))
+    assert frame.shape == (4, 80, 3)
+    # white, yellow, ... black, each bar is 10 columns (+1 offset)
+    assert frame[0, 0].tolist() == [31, 63, 31]
+    assert frame[0, 10].tolist() == [31, 63, 31]
+    assert frame[0, 11].tolist() == [31, 63, 0]
+    assert frame[3, 79].tolist() == [0, 0, 0]
+
+
+def test_frame_compare():
+    res, cd = (64, 8), (8, 8, 8)
+    expected = color_bars_frame(res, cd)
+    checker = FrameChecker(color_bars_frame)
+    assert checker.compare(expected, cd)
+
+    # shifted one pixel, the columns at the bar edges differ
+    shifted = expected.copy()
+    shifted[:, 1:] = expected[:, :-1]
+    result = checker.compare(shifted, cd)
+    assert not result
+    assert result.mismatches == 7 * 8
+    assert FrameChecker(color_bars_frame, edge_margin=1).compare(shifted, cd)
+
+    # a small difference within the tolerance
+    noisy = expected.copy()
+    noisy[2, 3, 2] -= 2
+    assert not checker.compare(noisy, cd)
+    assert FrameChecker(color_bars_frame, tolerance=2).compare(noisy, cd)
+    assert FrameChecker(color_bars_frame, max_mismatches=1).compare(noisy, cd)
+
+    # the region check fails first, the pixels are not compared
+    result = FrameChecker(color_bars_frame, regions=[(0, 0, 8, 8)]).compare(
+        np.zeros_like(expected), cd)
+    assert not result
+    assert result.mask is None and result.failed_regions == [(0, 0, 8, 8)]
+
+
+def test_display_stops_on_match():
+    res, cd = (32, 4), (8, 8, 8)
+    disp = VideoDisplay(resolution=res, color_depth=cd, save_every=0)
+    checker = FrameChecker(color_bars_frame)
+    disp.add_checker(checker)
+
+    # the first frame doesn't match, the second does
+    _write_frame(disp, np.zeros((4, 32, 3), dtype=int))
+    assert checker.matched_frame is None
+    with pytest.raises(StopSimulation):
+        _write_frame(disp, color_bars_frame(res, cd))
+    assert checker.matched_frame == 2
+
+
+def test_golden_image():
+    res, cd = (32, 4), (10, 10, 10)
+    disp = VideoDisplay(resolution=res, color_depth=cd)
+    disp.name = 'golden'
+    _write_frame(disp, color_bars_frame(res, cd))
+    golden = os.path.join('output', 'golden_frame_1.png')
+    assert os.path.isfile(golden)
+
+    # the golden image is saturated (8 bits), so is the frame
+    checker = FrameChecker(golden)
+    assert checker.compare(disp.frame)
+    assert not checker.compare(np.zeros_like(disp.frame))
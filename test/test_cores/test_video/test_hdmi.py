@@ -22,6 +22,10 @@ from rhea.utils.test import run_testbench
 
 def test_hdmi():
     """ simple test to demonstrate test framework
+
+    The hdmi_xcvr is a placeholder, there are no HDMI (TMDS) outputs
+    and no HDMI display model yet, the frames are not checked (see
+    FrameChecker in the VGA and LT24 tests).
     """
 
     @myhdl.block
@@ -9,6 +9,7 @@ from myhdl import Signal, intbv, instance, delay, StopSimulation, now
 from rhea.system import Clock, Reset, Global
 from rhea.cores.video.lcd import LT24Interface
 from rhea.models.video import LT24LCDDisplay
+from rhea.models.video import FrameChecker, color_bars_frame
 from rhea.utils.test import run_testbench, tb_args, tb_default_args
 from rhea.utils.test import skip_long_sim_test
 
@@ -39,6 +40,9 @@ def test_lt24lcd(args=None):
     lcd.assign(lcd_on, lcd_resetn, lcd_csn, lcd_rs, lcd_wrn,
                lcd_rdn, lcd_data)
     mvd = LT24LCDDisplay()
+    # stop the simulation when a frame matches the color bars
+    checker = FrameChecker(color_bars_frame)
+    mvd.add_checker(checker)
 
     @myhdl.block
     def bench_lt24lcdsys():
@@ -65,6 +69,7 @@ def test_lt24lcd(args=None):
         return tbdut, tbvd, tbclk, tbstim
 
     run_testbench(bench_lt24lcdsys)
+    assert checker.matched_frame is not None
 
 
 def test_conversion():
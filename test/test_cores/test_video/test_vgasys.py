@@ -2,7 +2,6 @@
 from __future__ import print_function, division
 
 from argparse import Namespace
-import time 
 
 import myhdl
 from myhdl import Signal, instance, delay, StopSimulation
@@ -12,6 +11,7 @@ from rhea.cores.video import VGA
 
 # a video display model to check the timings
 from rhea.models.video import VGADisplay
+from rhea.models.video import FrameChecker, color_bars_frame
 
 from rhea.utils.test import skip_long_sim_test
 from rhea.utils.test import run_testbench, tb_default_args
@@ -41,6 +41,7 @@ def test_vgasys(args=None):
 
     # interface to the VGA driver and emulated display
     vga = VGA(color_depth=color_depth)
+    checker = FrameChecker(color_bars_frame, max_mismatches=2*resolution[1])
 
     @myhdl.block
     def bench_vgasys():
@@ -65,6 +66,9 @@ def test_vgasys(args=None):
             line_rate=line_rate,
             color_depth=color_depth
         )
+        # compare the frames with the color bars, the last two
+        # columns of each line are the first bar (pipeline delay)
+        mvd.add_checker(checker)
 
         # connect VideoDisplay model to the VGA signals
         tbvd = mvd.process(glbl, vga)
@@ -77,22 +81,19 @@ def test_vgasys(args=None):
             yield delay(18)
             reset.next = not reset.active
             
-            # Wait till a full screen has been updated
+            # the display model stops the simulation when a frame
+            # matches the color bars, wait for a few full screens
             while mvd.update_cnt < 3:
-                 yield delay(1000)
-
-            print("display updates complete")
-            time.sleep(1)
-            # @todo: verify video system memory is correct!
-            # @todo: (self checking!).  Read one of the frame
-            # @todo: png's and verify a couple bars are expected
+                yield delay(1000)
 
+            print("display updates complete, no frame matched")
             raise StopSimulation
 
         return tbclk, tbvd, tbstim, tbdut
 
     # run the verification simulation
     run_testbench(bench_vgasys, args=args)
+    assert checker.matched_frame is not None
 
 
 def test_vgasys_conversion():
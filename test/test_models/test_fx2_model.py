@@ -218,6 +218,136 @@ def test_config1_host_read():
     run_testbench(bench_host_read)
 
 
+@myhdl.block
+def fpga_loopback(fb):
+    """ read the bytes from EP2 and write them to EP6 (config1,
+    active-low controls).
+    """
+
+    @instance
+    def tbloop():
+        fb.SLRD.next, fb.SLOE.next, fb.SLWR.next = True, True, True
+        while True:
+            yield fb.IFCLK.posedge
+            if not fb.FLAGC:  # gotdata
+                continue
+            fb.ADDR.next = 0
+            fb.SLRD.next, fb.SLOE.next = False, False
+            yield fb.IFCLK.posedge
+            val = int(fb.FDO)
+            fb.SLRD.next, fb.SLOE.next = True, True
+            fb.ADDR.next = 2
+            yield fb.IFCLK.posedge
+            while not fb.FLAGB:  # gotroom
+                yield fb.IFCLK.posedge
+            fb.FDI.next = val
+            fb.SLWR.next = False
+            yield fb.IFCLK.posedge
+            fb.SLWR.next = True
+
+    return tbloop
+
+
+def test_host_thread():
+    """ the host (this thread) and the simulation (model thread),
+    more data than the endpoint buffers.
+    """
+    fm = Fx2Model(fifo_size=512, config=1)
+    fb = fm.get_bus()
+    fm.setup(fb, g=fpga_loopback(fb))
+    fm.start()
+
+    try:
+        fm.reset()
+        data = [randint(0, 0xFF) for _ in range(2000)]
+        fm.write(data, fm.EP2)
+        rdata = []
+        while len(rdata) < len(data):
+            assert fm.host_wait_data(fm.EP6, timeout=60)
+            rdata += fm.read(fm.EP6, num=len(data)-len(rdata))
+        assert fm.host_wait_empty(fm.EP2, timeout=1)
+        assert rdata == data
+        # the simulation toggled the write signal
+        assert fm.wr_toggle
+    finally:
+        fm.stop()
+        fm.join()
+
+    # the simulation ended, a host wait does not block
+    assert not fm.host_wait_data(fm.EP6)
+
+
+@myhdl.block
+def fpga_packet_loopback(fb):
+    """ read the bytes from EP2 and write them to EP6 (config1), commit
+    a short packet (PKTEND) when there is no data to loop back.
+    """
+
+    @instance
+    def tbloop():
+        fb.SLRD.next, fb.SLOE.next, fb.SLWR.next = True, True, True
+        fb.PKTEND.next = True
+        pending = False
+        while True:
+            yield fb.IFCLK.posedge
+            if not fb.FLAGC:  # gotdata
+                if pending:
+                    fb.ADDR.next = 2
+                    fb.PKTEND.next = False
+                    yield fb.IFCLK.posedge
+                    fb.PKTEND.next = True
+                    pending = False
+                continue
+            fb.ADDR.next = 0
+            fb.SLRD.next, fb.SLOE.next = False, False
+            yield fb.IFCLK.posedge
+            val = int(fb.FDO)
+            fb.SLRD.next, fb.SLOE.next = True, True
+            fb.ADDR.next = 2
+            yield fb.IFCLK.posedge
+            while not fb.FLAGB:  # gotroom
+                yield fb.IFCLK.posedge
+            fb.FDI.next = val
+            fb.SLWR.next = False
+            yield fb.IFCLK.posedge
+            fb.SLWR.next = True
+            pending = True
+
+    return tbloop
+
+
+def test_host_block():
+    """ bulk transfers through the double buffered endpoints, the
+    USB bandwidth limits the throughput.
+    """
+    bandwidth = 8e6
+    fm = Fx2Model(config=1, packet_size=512, nbuffers=2,
+                  usb_bandwidth=bandwidth)
+    fb = fm.get_bus()
+    fm.setup(fb, g=fpga_packet_loopback(fb))
+    fm.start()
+
+    try:
+        fm.reset()
+        # not a multiple of the packet size, the last packet is short
+        data = bytearray([randint(0, 0xFF) for _ in range(1800)])
+        assert fm.write_block(fm.EP2, data, timeout=60)
+        rdata = fm.read_block(fm.EP6, len(data), timeout=60)
+        assert rdata == data
+    finally:
+        fm.stop()
+        fm.join()
+
+    # the OUT and IN packets share the USB bandwidth
+    for ep in (fm.EP2, fm.EP6):
+        bytes_per_us, mbps = fm.throughput(ep)
+        assert 0 < bytes_per_us <= 1.05 * bandwidth / 1e6
+        assert mbps > 0
+
+    # the simulation ended, a read returns the bytes available
+    assert fm.read_block(fm.EP6, 1) == bytearray()
+
+
 if __name__ == '__main__':
     test_config1_host_write()
     test_config1_host_read()
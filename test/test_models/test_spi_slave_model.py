@@ -0,0 +1,164 @@
+
+from __future__ import print_function, division
+
+import os
+
+import myhdl
+from myhdl import Signal, instance, delay, StopSimulation
+
+from rhea import Clock, Reset
+from rhea.cores.spi import SPIBus
+from rhea.models.spi import SPISlaveModel, SPIEEPROM
+from rhea.utils.test import run_testbench
+
+
+def spi_transaction(spibus, data, rdata, cpol=0, cpha=0, htck=50):
+    """ select the device, exchange the bytes (msb first), the read
+    bytes are appended to `rdata`.
+    """
+    sck, mosi, miso, ss = spibus.sck, spibus.mosi, spibus.miso, spibus.ss
+    sck.next = bool(cpol)
+    yield delay(htck)
+    ss.next = 0xFE
+    yield delay(htck)
+    for byte in data:
+        val = 0
+        for ii in range(7, -1, -1):
+            if cpha == 0:
+                mosi.next = bool((byte >> ii) & 1)
+                yield delay(htck)
+                sck.next = not cpol
+                yield delay(1)
+                val = (val << 1) | int(miso)
+                yield delay(htck-1)
+                sck.next = bool(cpol)
+            else:
+                sck.next = not cpol
+                mosi.next = bool((byte >> ii) & 1)
+                yield delay(htck)
+                sck.next = bool(cpol)
+                yield delay(1)
+                val = (val << 1) | int(miso)
+                yield delay(htck-1)
+        rdata.append(val)
+    yield delay(htck)
+    ss.next = 0xFF
+    yield delay(htck)
+
+
+class EchoDevice(SPISlaveModel):
+    """ shift out the previous byte shifted in """
+    def __init__(self, **kwargs):
+        super(EchoDevice, self).__init__(**kwargs)
+        self.selects = 0
+
+    def select(self):
+        self.selects += 1
+        return 0xA5
+
+    def transfer(self, word):
+        return word
+
+
+def test_spi_slave_modes():
+    for cpol in (0, 1):
+        for cpha in (0, 1):
+            spibus = SPIBus()
+            spibus.sck = Signal(bool(cpol))
+            dev = EchoDevice(cpol=cpol, cpha=cpha)
+            data = [0x01, 0x80, 0x3C, 0xFF, 0x00]
+            rdata = []
+
+            @myhdl.block
+            def bench_spi_modes():
+                tbdev = dev.engine(spibus.sck, spibus.mosi,
+                                   spibus.miso, spibus.ss)
+
+                @instance
+                def tbstim():
+                    yield spi_transaction(spibus, data, rdata,
+                                          cpol=cpol, cpha=cpha)
+                    raise StopSimulation
+
+                return tbdev, tbstim
+
+            run_testbench(bench_spi_modes)
+            assert rdata == [0xA5] + data[:-1], "mode {}{}".format(cpol, cpha)
+            assert dev.selects == 1
+
+
+def test_spi_eeprom(tmpdir):
+    # a flash sized memory
+    size = 4*2**20
+    image = bytearray(os.urandom(4096))
+    spiee = SPIEEPROM(addr_width=24, max_size=size)
+    spiee.preload(image, offset=size-len(image))
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    spibus = SPIBus()
+    spibus.sck = Signal(bool(0))
+    ins = spiee.instr
+    rdata = []
+
+    def read(addr, num):
+        del rdata[:]
+        cmd = [ins['READ'], (addr >> 16) & 0xFF, (addr >> 8) & 0xFF,
+               addr & 0xFF]
+        yield spi_transaction(spibus, cmd + [0]*num, rdata)
+        del rdata[:4]
+
+    def write(addr, data):
+        cmd = [ins['WRITE'], (addr >> 16) & 0xFF, (addr >> 8) & 0xFF,
+               addr & 0xFF]
+        yield spi_transaction(spibus, cmd + list(data), [])
+
+    def command(*cmd):
+        yield spi_transaction(spibus, list(cmd), rdata)
+
+    @myhdl.block
+    def bench_spi_eeprom():
+        tbdut = spiee.process(clock, reset, spibus)
+
+        @instance
+        def tbstim():
+            # the preloaded image
+            yield read(size-len(image), 32)
+            assert bytearray(rdata) == image[:32]
+
+            # a write without the write enable is ignored
+            yield write(0x100, [1, 2, 3, 4])
+            yield read(0x100, 4)
+            assert rdata == [0xFF]*4
+
+            yield command(ins['WREN'])
+            del rdata[:]
+            yield command(ins['RDSR'], 0)
+            assert rdata[1] & 0x02
+            yield write(0x100, [1, 2, 3, 4])
+            yield read(0x100, 4)
+            assert rdata == [1, 2, 3, 4]
+            # the write enable is reset after the write
+            del rdata[:]
+            yield command(ins['RDSR'], 0)
+            assert not rdata[1] & 0x02
+
+            # protect the whole memory
+            yield command(ins['WREN'])
+            yield command(ins['WRSR'], 0x0C)
+            yield command(ins['WREN'])
+            yield write(0x100, [5, 6, 7, 8])
+            yield read(0x100, 4)
+            assert rdata == [1, 2, 3, 4]
+
+            raise StopSimulation
+
+        return tbdut, tbstim
+
+    run_testbench(bench_spi_eeprom)
+
+    fn = str(tmpdir.join('eeprom.bin'))
+    data = spiee.dump(fn)
+    assert len(data) == size
+    assert data[0x100:0x104] == bytes(bytearray([1, 2, 3, 4]))
+    with open(fn, 'rb') as f:
+        assert f.read()[-len(image):] == bytes(image)
@@ -0,0 +1,183 @@
+
+from __future__ import print_function, division
+
+import os
+from random import randint
+import time
+
+import myhdl
+from myhdl import Signal, always_comb, instance, delay, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.cores.uart import uartlite
+from rhea.models.uart import UARTModel, FastUARTModel
+from rhea.system import FIFOBus
+from rhea.utils.test import run_testbench
+
+
+def bench_loopback(uartmdl, data, clock_gen=False):
+    """ loop the model serial out to the serial in, returns the
+    received bytes.
+    """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=0, async=True)
+    glbl = Global(clock, reset)
+    si, so = Signal(bool(1)), Signal(bool(1))
+    rdata = bytearray()
+
+    @myhdl.block
+    def bench_uart_loopback():
+        tbmdl = uartmdl.process(glbl, si, so)
+        # the UARTModel counts the system clocks
+        tbclk = clock.gen() if clock_gen else []
+
+        @always_comb
+        def tblpbk():
+            si.next = so
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield delay(1000)
+            for bb in data:
+                uartmdl.write(bb)
+            while len(rdata) < len(data):
+                yield delay(1000)
+                rb = uartmdl.read()
+                while rb is not None:
+                    rdata.append(rb)
+                    rb = uartmdl.read()
+            raise StopSimulation
+
+        return tbmdl, tbclk, tblpbk, tbstim
+
+    run_testbench(bench_uart_loopback)
+    return rdata
+
+
+def test_fast_uart_loopback():
+    data = bytearray([randint(0, 255) for _ in range(64)])
+    for stopbits, parity in ((1, None), (2, 'even'), (1, 'odd')):
+        uartmdl = FastUARTModel(stopbits=stopbits, parity=parity)
+        rdata = bench_loopback(uartmdl, data)
+        assert rdata == data
+        assert uartmdl.parity_errors == 0
+        assert uartmdl.framing_errors == 0
+
+
+def test_fast_uart_parity_error():
+    """ a receiver expecting odd parity from an even parity sender """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=0, async=True)
+    glbl = Global(clock, reset)
+    line = Signal(bool(1))
+    sender = FastUARTModel(parity='even')
+    receiver = FastUARTModel(parity='odd')
+    unused = Signal(bool(1))
+
+    @myhdl.block
+    def bench_parity():
+        tbtx = sender.process(glbl, unused, line)
+        tbrx = receiver.process(glbl, line, Signal(bool(1)))
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            sender.write_bytes([0x00, 0x01, 0x7F])
+            while receiver.rx_available() < 3:
+                yield delay(10000)
+            raise StopSimulation
+
+        return tbtx, tbrx, tbstim
+
+    run_testbench(bench_parity)
+    assert receiver.read_bytes() == bytearray([0x00, 0x01, 0x7F])
+    assert receiver.parity_errors == 3
+
+
+def test_fast_uart_file(tmpdir):
+    data = os.urandom(300)
+    txfn, rxfn = str(tmpdir.join('tx.bin')), str(tmpdir.join('rx.bin'))
+    with open(txfn, 'wb') as f:
+        f.write(data)
+
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=0, async=True)
+    glbl = Global(clock, reset)
+    si, so = Signal(bool(1)), Signal(bool(1))
+    uartmdl = FastUARTModel(baudrate=1000000)
+
+    @myhdl.block
+    def bench_uart_file():
+        tbmdl = uartmdl.process(glbl, si, so)
+
+        @always_comb
+        def tblpbk():
+            si.next = so
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            uartmdl.write_file(txfn)
+            while uartmdl.rx_available() < len(data):
+                yield delay(10000)
+            uartmdl.read_file(rxfn)
+            raise StopSimulation
+
+        return tbmdl, tblpbk, tbstim
+
+    run_testbench(bench_uart_file)
+    with open(rxfn, 'rb') as f:
+        assert f.read() == data
+
+
+def test_fast_uart_uartlite():
+    """ the fast model against the uartlite loopback """
+    numbytes = 32
+    clock = Clock(0, frequency=12e6)
+    reset = Reset(0, active=0, async=True)
+    glbl = Global(clock, reset)
+    mdlsi, mdlso = Signal(bool(1)), Signal(bool(1))
+    uartmdl = FastUARTModel()
+    fifobus = FIFOBus()
+    data = bytearray([randint(0, 255) for _ in range(numbytes)])
+
+    @myhdl.block
+    def bench_uart():
+        tbmdl = uartmdl.process(glbl, mdlsi, mdlso)
+        tbdut = uartlite(glbl, fifobus, mdlso, mdlsi)
+        tbclk = clock.gen()
+
+        @always_comb
+        def tblpbk():
+            fifobus.read.next = not fifobus.empty
+            fifobus.write.next = fifobus.read_valid
+            fifobus.write_data.next = fifobus.read_data
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield delay(1000)
+            yield clock.posedge
+            uartmdl.write_bytes(data)
+            while uartmdl.rx_available() < numbytes:
+                yield delay(10000)
+            assert uartmdl.read_bytes() == data
+            raise StopSimulation
+
+        return tbdut, tbmdl, tbclk, tblpbk, tbstim
+
+    run_testbench(bench_uart)
+    assert uartmdl.framing_errors == 0
+
+
+def test_uart_model_benchmark():
+    """ the simulation time of the clocked and the fast model """
+    data = bytearray([randint(0, 255) for _ in range(8)])
+    for model, clock_gen in ((UARTModel(), True), (FastUARTModel(), False)):
+        start = time.time()
+        rdata = bench_loopback(model, data, clock_gen=clock_gen)
+        elapsed = time.time() - start
+        assert rdata == data
+        print("{:16s} {} bytes {:.3f} s".format(
+              type(model).__name__, len(data), elapsed))
@@ -0,0 +1,128 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import myhdl
+from myhdl import instance, now, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile
+from rhea.system import AvalonMM
+from rhea.cores.memmap import peripheral_memory
+from rhea.utils.test import run_testbench
+
+
+def create_regfile(base_address, nregs=16):
+    regfile = RegisterFile()
+    regfile.base_address = base_address
+    for ii in range(nregs-1):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, ii*4)
+        regfile.add_register(reg)
+    status = Register('status', 32, 'ro', 0, (nregs-1)*4)
+    status.add_namedbits('version', slice(8, 0))
+    regfile.add_register(status)
+    return regfile
+
+
+def test_avalon_pipelined_regfile():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = AvalonMM(glbl, data_width=32, address_width=16,
+                      pipelined=True, max_burst=8)
+    regfiles = [create_regfile(0x000), create_regfile(0x100)]
+    period = 10
+
+    @myhdl.block
+    def bench_avalon_burst():
+        tbdut = [regbus.add(rf, 'per') for rf in regfiles]
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen(hticks=period//2)
+
+        @instance
+        def tbstim():
+            rf0, rf1 = regfiles
+            yield reset.pulse(33)
+            rf0.version.next = 0x5A
+            yield clock.posedge
+
+            # pipelined single transfers to both peripherals
+            addrs = [0x000, 0x104, 0x008, 0x10C]
+            vals = [randint(0, 2**32-1) for _ in addrs]
+            start = now()
+            yield regbus.writetrans(addrs, vals)
+            yield regbus.readtrans(addrs)
+            # a transfer each cycle and the read latency
+            assert (now() - start) // period <= 2*len(addrs) + 3
+            assert regbus.get_read_data() == vals
+            assert rf1.reg3 == vals[3]
+
+            # a burst write (two bursts) and burst read of all the
+            # registers, the read-only register is not written
+            vals = [randint(0, 2**32-1) for _ in range(16)]
+            yield regbus.writetrans(0x100, vals)
+            yield regbus.readtrans(0x100, burstcount=8)
+            assert regbus.get_read_data() == vals[:8]
+            yield regbus.readtrans(0x120, burstcount=8)
+            assert regbus.get_read_data() == vals[8:15] + [0]
+            assert rf1.reg14 == vals[14]
+
+            # the next command waits for the read burst
+            yield regbus.readtrans([0x038, 0x108, 0x03C])
+            assert regbus.get_read_data() == [rf0.reg14, vals[2], 0x5A]
+            yield regbus.writetrans(0x010, 0x1234)
+            yield regbus.readtrans(0x00C, burstcount=3)
+            assert regbus.get_read_data()[1] == 0x1234
+
+            # byte enables
+            regbus.byteenable.next = 0b0101
+            yield regbus.writetrans(0x014, 0x12345678)
+            regbus.byteenable.next = 0b1111
+            yield regbus.readtrans(0x014)
+            assert regbus.get_read_data() == 0x00340078
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    run_testbench(bench_avalon_burst)
+
+
+def test_avalon_burst_memory():
+    """ bursts to the generic (Barebone) memory peripheral """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    membus = AvalonMM(glbl, data_width=32, address_width=16,
+                      pipelined=True, max_burst=4)
+
+    @myhdl.block
+    def bench_avalon_memory():
+        tbmem = peripheral_memory(membus, depth=32)
+        tbitx = membus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            base = 1 << 12
+            yield membus.writetrans(base + 8, 0xCAFE)
+            yield membus.readtrans(base + 8)
+            assert membus.get_read_data() == 0xCAFE
+
+            # a burst of two commands (max_burst) each way
+            vals = [randint(0, 2**32-1) for _ in range(8)]
+            yield membus.writetrans(base, vals)
+            yield membus.readtrans(base, burstcount=4)
+            assert membus.get_read_data() == vals[:4]
+            yield membus.readtrans([base + 16, base + 28])
+            assert membus.get_read_data() == [vals[4], vals[7]]
+
+            raise StopSimulation
+
+        return tbmem, tbitx, tbclk, tbstim
+
+    run_testbench(bench_avalon_memory)
@@ -0,0 +1,157 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile
+from rhea.system import Barebone, AXI4
+from rhea.cores.memmap import controller_basic, peripheral_memory
+from rhea.utils.test import run_testbench
+
+
+def create_regfile(base_address, nregs=16, gap=0):
+    """ `nregs` registers, the last is a read-only register `gap`
+    bytes past the regular spacing.
+    """
+    regfile = RegisterFile()
+    regfile.base_address = base_address
+    for ii in range(nregs-1):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, ii*4)
+        regfile.add_register(reg)
+    status = Register('status', 32, 'ro', 0, (nregs-1)*4 + gap)
+    status.add_namedbits('version', slice(8, 0))
+    regfile.add_register(status)
+    return regfile
+
+
+def test_burst_addresses():
+    assert AXI4.burst_addresses(0x10, 4, 2, AXI4.INCR) == [
+        0x10, 0x14, 0x18, 0x1C]
+    assert AXI4.burst_addresses(0x18, 4, 2, AXI4.WRAP) == [
+        0x18, 0x1C, 0x10, 0x14]
+    assert AXI4.burst_addresses(0x10, 3, 2, AXI4.FIXED) == [0x10]*3
+
+
+def test_axi4_regfile():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = AXI4(glbl, data_width=32, address_width=16)
+    regfiles = [create_regfile(0x000), create_regfile(0x100, gap=8)]
+
+    @myhdl.block
+    def bench_axi4_regfile():
+        tbdut = [regbus.add(rf, 'axi') for rf in regfiles]
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            rf0, rf1 = regfiles
+            yield reset.pulse(33)
+            rf0.version.next = 0x5A
+            yield clock.posedge
+
+            # INCR burst write and read of all the rw registers
+            vals = [randint(0, 2**32-1) for _ in range(15)]
+            yield regbus.writetrans(0, vals)
+            assert regbus.get_responses() == [(0, AXI4.OKAY)]
+            yield regbus.readtrans(0, length=16)
+            assert regbus.get_read_data() == vals + [0x5A]
+            assert rf0.reg14 == vals[14]
+
+            # WRAP burst, starts in the middle of the 4 registers
+            wvals = [randint(0, 2**32-1) for _ in range(4)]
+            yield regbus.writetrans(0x18, wvals, burst=AXI4.WRAP, tid=3)
+            assert regbus.get_responses() == [(3, AXI4.OKAY)]
+            yield regbus.readtrans(0x10, length=4)
+            assert regbus.get_read_data() == wvals[2:] + wvals[:2]
+
+            # FIXED burst, the last value is in the register
+            yield regbus.writetrans(0x20, [1, 2, 3], burst=AXI4.FIXED)
+            yield regbus.readtrans(0x20)
+            assert regbus.get_read_data() == 3
+
+            # byte strobes
+            yield regbus.writetrans(0x24, 0xFFFFFFFF)
+            yield regbus.writetrans(0x24, 0x12345678, strb=0b0101)
+            yield regbus.readtrans(0x24)
+            assert regbus.get_read_data() == 0xFF34FF78
+
+            # outstanding bursts, the responses are in order
+            yield regbus.readtrans([0x00, 0x20, 0x30], length=4, tid=4)
+            rdata = regbus.get_read_data()
+            assert rdata[0] == vals[:4]
+            assert rdata[1][0] == 3 and rdata[1][1] == 0xFF34FF78
+            ids = [tid for tid, resp in regbus.get_responses()]
+            assert ids == [4]*4 + [5]*4 + [6]*4
+
+            avals = [[randint(0, 2**32-1) for _ in range(2)]
+                     for _ in range(3)]
+            yield regbus.writetrans([0x100, 0x108, 0x110], avals)
+            assert regbus.get_responses() == [
+                (0, AXI4.OKAY), (1, AXI4.OKAY), (2, AXI4.OKAY)]
+            assert rf1.reg5 == avals[2][1]
+
+            # the gap in the second register file is not a register
+            yield regbus.readtrans(0x138, length=3)
+            resps = [resp for tid, resp in regbus.get_responses()]
+            assert resps == [AXI4.OKAY, AXI4.SLVERR, AXI4.SLVERR]
+            yield regbus.writetrans(0x13C, [1, 2])
+            assert regbus.get_responses() == [(0, AXI4.SLVERR)]
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    run_testbench(bench_axi4_regfile)
+
+
+def test_axi4_generic():
+    """ the generic (Barebone) bus to and from AXI4 """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = AXI4(glbl, data_width=32, address_width=16)
+    membus = AXI4(glbl, data_width=32, address_width=16)
+    generic = Barebone(glbl, data_width=32, address_width=16)
+    regfile = create_regfile(0)
+
+    @myhdl.block
+    def bench_axi4_generic():
+        tbdut = regbus.add(regfile, 'axi')
+        tbitx = regbus.interconnect()
+        tbctl = controller_basic(generic, regbus)
+        tbmem = peripheral_memory(membus, depth=32)
+        tbmitx = membus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            for addr in (0, 4, 0x38):
+                val = randint(0, 2**32-1)
+                yield generic.writetrans(addr, val)
+                yield generic.readtrans(addr)
+                assert generic.get_read_data() == val
+            assert regfile.reg14 == val
+
+            # a burst to the memory, each beat is a generic transfer
+            base = 1 << 12
+            vals = [randint(0, 2**32-1) for _ in range(4)]
+            yield membus.writetrans(base, vals)
+            assert membus.get_responses() == [(0, AXI4.OKAY)]
+            yield membus.readtrans(base, length=4)
+            assert membus.get_read_data() == vals
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbctl, tbmem, tbmitx, tbclk, tbstim
+
+    run_testbench(bench_axi4_generic)
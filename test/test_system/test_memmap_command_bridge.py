@@ -21,6 +21,7 @@ from rhea.system import Barebone, FIFOBus
 from rhea.cores.memmap import command_bridge
 from rhea.cores.fifo import fifo_fast
 from rhea.utils import CommandPacket
+from rhea.utils.command_packet import CMD_ERROR, crc16
 from rhea.utils.test import run_testbench, tb_args, tb_default_args
 
 
@@ -130,5 +131,76 @@ def test_memmap_command_bridge(args=None):
     run_testbench(bench_command_bridge, args=args)
 
 
+def test_memmap_command_bridge_block(args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    fifobus = FIFOBus()
+    memmap = Barebone(glbl, data_width=32, address_width=28)
+    fifobus.clock = clock
+    responses = []
+
+    @myhdl.block
+    def bench_command_bridge_block():
+        tbclk = clock.gen()
+        tbdut = command_bridge(glbl, fifobus, memmap)
+
+        readpath, writepath = FIFOBus(), FIFOBus()
+        readpath.clock = writepath.clock = clock
+        tbmap = fifobus.assign_read_write_paths(readpath, writepath)
+        tbftx = fifo_fast(glbl, writepath)   # user write path
+        tbfrx = fifo_fast(glbl, readpath)    # user read path
+        tbmem = memmap_peripheral_bb(clock, reset, memmap)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(32)
+            fifobus.read.next = False
+            fifobus.write.next = False
+
+            for crc in (False, True):
+                vals = [randint(0, (2**32)-1) for _ in range(13)]
+                pkt = CommandPacket.block_write(0x100, vals, crc=crc)
+                assert len(pkt.rawbytes) == 8 + 13*4 + (2 if crc else 0)
+                yield pkt.put(readpath)
+                yield pkt.get(writepath)
+
+                read_value = []
+                pkt = CommandPacket.block_read(0x100, 13, crc=crc)
+                yield pkt.put(readpath)
+                yield pkt.get(writepath, read_value, vals)
+                assert read_value == vals
+
+                # the address is incremented by 4 for each word
+                pkt = CommandPacket(True, 0x100 + 4*7, crc=crc)
+                yield pkt.put(readpath)
+                yield pkt.get(writepath, read_value, [vals[7]])
+
+            # a corrupted packet is not written, the response is the
+            # header with the error bit set.
+            pkt = CommandPacket.block_write(0x100, [0, 1, 2], crc=True)
+            pkt.rawbytes[9] ^= 0x10
+            pkt.response_length = 10
+            pkt.check_response = lambda rsp, *args: responses.append(rsp)
+            yield pkt.put(readpath)
+            yield pkt.get(writepath)
+
+            read_value = []
+            pkt = CommandPacket.block_read(0x100, 3, crc=True)
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, read_value, vals[:3])
+
+            raise StopSimulation
+
+        return tbclk, tbdut, tbmap, tbftx, tbfrx, tbmem, tbstim
+
+    run_testbench(bench_command_bridge_block, args=args)
+    rsp, = responses
+    assert rsp[1] == CMD_ERROR | 0x44
+    assert crc16(rsp) == 0
+
+
 if __name__ == '__main__':
     test_memmap_command_bridge(tb_args())
+    test_memmap_command_bridge_block(tb_args())
@@ -0,0 +1,156 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import pytest
+
+import myhdl
+from myhdl import instance, now, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile
+from rhea.system import Wishbone, AvalonMM
+from rhea.utils.test import run_testbench
+
+
+def create_regfile(base_address, nregs=8):
+    regfile = RegisterFile()
+    regfile.base_address = base_address
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, ii*4)
+        regfile.add_register(reg)
+    return regfile
+
+
+def test_decode_map():
+    glbl = Global(Clock(0), Reset(0, active=1, async=False))
+    regbus = Wishbone(glbl, data_width=32, address_width=16)
+    regbus.set_decoder()
+    for base in (0x000, 0x100, 0x300):
+        regbus.get_select(base, base + 7*4)
+    assert regbus.get_decode_map() == (5, (0, 8, 24))
+
+    regbus.decoder['granularity'] = 8
+    assert regbus.get_decode_map() == (8, (0, 1, 3))
+
+    # the peripherals need to be aligned to the window
+    regbus.get_select(0x410, 0x420)
+    with pytest.raises(ValueError):
+        regbus.get_decode_map()
+
+    regbus = Wishbone(glbl, data_width=32, address_width=16)
+    regbus.set_decoder(granularity=8)
+    regbus.get_select(0x100, 0x104)
+    regbus.get_select(0x180, 0x184)
+    with pytest.raises(ValueError):
+        regbus.get_decode_map()
+
+
+def bench_decoded(pipelined, decoded, nper=3):
+    """ write and read the registers of a couple peripherals,
+    returns the number of cycles.
+    """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=pipelined)
+    if decoded:
+        regbus.set_decoder()
+    regfiles = [create_regfile(ii*0x100) for ii in range(nper)]
+    period = 10
+    cycles = []
+
+    @myhdl.block
+    def bench_memmap_decoder():
+        tbdut = [regbus.add(rf, 'per') for rf in regfiles]
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen(hticks=period//2)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            addrs = [rf.base_address + ii*4
+                     for rf in regfiles for ii in range(8)]
+            vals = [randint(0, 2**32-1) for _ in addrs]
+
+            start = now()
+            yield regbus.writetrans(addrs, vals)
+            yield regbus.readtrans(addrs)
+            cycles.append((now() - start) // period)
+            assert regbus.get_read_data() == vals
+            assert regfiles[0].reg7 == vals[7]
+            assert regfiles[-1].reg7 == vals[-1]
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    run_testbench(bench_memmap_decoder)
+    return cycles[0]
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_wishbone_decoded(pipelined):
+    ncycles = bench_decoded(pipelined, decoded=True)
+    # the decoded interconnect has the same latency as the OR
+    assert ncycles == bench_decoded(pipelined, decoded=False)
+
+
+def test_avalon_decoded():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = AvalonMM(glbl, data_width=32, address_width=16)
+    regbus.set_decoder(granularity=8)
+    regfiles = [create_regfile(ii*0x100) for ii in range(3)]
+
+    @myhdl.block
+    def bench_avalon_decoder():
+        tbdut = [regbus.add(rf, 'per') for rf in regfiles]
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            vals = {}
+            for rf in regfiles:
+                for ii in (0, 7):
+                    addr = rf.base_address + ii*4
+                    vals[addr] = randint(0, 2**32-1)
+                    regbus.address.next = addr
+                    regbus.writedata.next = vals[addr]
+                    # the select is registered, hold the write
+                    regbus.write.next = True
+                    yield clock.posedge
+                    yield clock.posedge
+                    regbus.write.next = False
+                    yield clock.posedge
+
+            for addr, val in vals.items():
+                regbus.address.next = addr
+                regbus.read.next = True
+                yield clock.posedge
+                for _ in range(8):
+                    if regbus.readdatavalid:
+                        break
+                    yield clock.posedge
+                assert regbus.readdatavalid
+                assert regbus.readdata == val
+                regbus.read.next = False
+                while regbus.readdatavalid:
+                    yield clock.posedge
+
+            assert regfiles[2].reg7 == vals[0x200 + 7*4]
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    run_testbench(bench_avalon_decoder)
@@ -0,0 +1,235 @@
+
+from __future__ import print_function, division
+
+from random import randint
+import time
+
+import pytest
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile
+from rhea.system import Barebone, Wishbone, AvalonMM
+from rhea.utils.test import run_testbench
+
+
+def create_regfile(nregs=16, gap=0):
+    """ `nregs` registers, the last is a read-only register `gap`
+    bytes past the regular spacing.
+    """
+    regfile = RegisterFile()
+    regfile.base_address = 0x100
+    status = Register('status', 32, 'ro', 0, (nregs-1)*4 + gap)
+    status.add_namedbits('count', slice(16, 0))
+    regfile.add_register(status)
+    for ii in range(nregs-1):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, ii*4)
+        regfile.add_register(reg)
+    return regfile
+
+
+def test_reglist_order():
+    regfile = create_regfile(8)
+    al, rl, rol, dl = regfile.get_reglist()
+    assert al == tuple(ii*4 for ii in range(8))
+    assert rl[0] is regfile.reg0 and rl[-1] is regfile.status
+    assert rol == (False,)*7 + (True,)
+    assert regfile.contiguous and regfile.stride == 4
+    wr, rd = regfile.get_strobelist()
+    assert wr[-1] is regfile.status.wr
+
+    regfile = create_regfile(8, gap=4)
+    regfile.get_reglist()
+    assert not regfile.contiguous and regfile.stride is None
+
+    regfile = RegisterFile()
+    for ii in range(4):
+        regfile.add_register(Register('reg{}'.format(ii), 8, 'rw', 0, ii*8))
+    regfile.get_reglist()
+    assert regfile.contiguous and regfile.stride == 8
+
+
+def bench_regfile(regbus, regfile, naccess=2):
+    """ write and read all the registers `naccess` times, the
+    write strobes are counted, the writes to the read-only
+    register are ignored.
+    """
+    clock, reset = regbus.clock, regbus.reset
+    al, rl, rol, dl = regfile.get_reglist()
+    nregs = len(rl)
+    addrs = [regfile.base_address + aa for aa in al]
+    wrcnt = [0 for _ in range(nregs)]
+
+    @myhdl.block
+    def bench_regfile_indexed():
+        tbdut = regbus.add(regfile, 'idx')
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbmon():
+            strobes = [rr.wr.posedge for rr in rl]
+            while True:
+                yield strobes
+                for ii, rr in enumerate(rl):
+                    if rr.wr:
+                        wrcnt[ii] += 1
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            regfile.count.next = 0x1234
+            yield clock.posedge
+
+            for _ in range(naccess):
+                vals = [randint(0, 2**32-1) for _ in addrs]
+                yield regbus.writetrans(addrs, vals)
+                yield regbus.readtrans(addrs)
+                rvals = regbus.get_read_data()
+                assert rvals[:-1] == vals[:-1]
+                assert rvals[-1] == 0x1234
+            for _ in range(4):
+                yield clock.posedge
+            assert wrcnt == [naccess]*(nregs-1) + [0]
+            assert regfile.reg3 == vals[3]
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbmon, tbstim
+
+    run_testbench(bench_regfile_indexed)
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+@pytest.mark.parametrize('gap', [0, 8])
+def test_wishbone_regfile(pipelined, gap):
+    glbl = Global(Clock(0, frequency=50e6), Reset(0, active=1, async=False))
+    regbus = Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=pipelined)
+    bench_regfile(regbus, create_regfile(16, gap))
+
+
+@pytest.mark.parametrize('gap', [0, 8])
+def test_avalon_regfile(gap):
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = AvalonMM(glbl, data_width=32, address_width=16)
+    regfile = create_regfile(8, gap)
+
+    @myhdl.block
+    def bench_avalon_regfile():
+        tbdut = regbus.add(regfile, 'idx')
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            al, rl, rol, dl = regfile.get_reglist()
+            vals = {}
+            for aa in al:
+                addr = regfile.base_address + aa
+                vals[addr] = randint(0, 2**32-1)
+                regbus.address.next = addr
+                regbus.writedata.next = vals[addr]
+                # the select is registered, hold the write
+                regbus.write.next = True
+                yield clock.posedge
+                yield clock.posedge
+                regbus.write.next = False
+                yield clock.posedge
+
+            for addr, val in vals.items():
+                regbus.address.next = addr
+                regbus.read.next = True
+                yield clock.posedge
+                yield clock.posedge
+                yield clock.posedge
+                if addr - regfile.base_address == al[-1]:
+                    assert regbus.readdata == 0
+                else:
+                    assert regbus.readdata == val
+                regbus.read.next = False
+                yield clock.posedge
+
+            raise StopSimulation
+
+        return tbdut, tbclk, tbstim
+
+    run_testbench(bench_avalon_regfile)
+
+
+@pytest.mark.parametrize('gap', [0, 8])
+def test_barebone_regfile(gap):
+    glbl = Global(Clock(0, frequency=50e6), Reset(0, active=1, async=False))
+    clock, reset = glbl.clock, glbl.reset
+    regbus = Barebone(glbl, data_width=32, address_width=16)
+    regfile = create_regfile(8, gap)
+
+    @myhdl.block
+    def bench_barebone_regfile():
+        tbdut = regbus.add(regfile, 'idx')
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            regfile.count.next = 0x1234
+            yield clock.posedge
+
+            al, rl, rol, dl = regfile.get_reglist()
+            addrs = [regfile.base_address + aa for aa in al]
+            vals = [randint(0, 2**32-1) for _ in addrs]
+            for addr, val in zip(addrs, vals):
+                regbus.mem_addr.next = addr
+                regbus.write_data.next = val
+                regbus.write.next = True
+                yield clock.posedge
+                regbus.write.next = False
+                yield clock.posedge
+                assert not regbus.done
+                yield clock.posedge
+                assert regbus.done
+
+            for addr, val in zip(addrs, vals):
+                regbus.mem_addr.next = addr
+                regbus.read.next = True
+                yield clock.posedge
+                regbus.read.next = False
+                yield clock.posedge
+                if addr == addrs[-1]:
+                    assert regbus.read_data == 0x1234
+                else:
+                    assert regbus.read_data == val
+            assert regfile.reg3 == vals[3]
+
+            raise StopSimulation
+
+        return tbdut, tbclk, tbstim
+
+    run_testbench(bench_barebone_regfile)
+
+
+def test_indexed_benchmark():
+    """ the simulation time of a large register file, indexed
+    (contiguous) versus compared (irregular) addresses.
+    """
+    nregs = 128
+    elapsed = {}
+    for gap in (0, 8):
+        glbl = Global(Clock(0, frequency=50e6),
+                      Reset(0, active=1, async=False))
+        regbus = Wishbone(glbl, data_width=32, address_width=16,
+                          pipelined=True)
+        regfile = create_regfile(nregs, gap)
+        start = time.time()
+        bench_regfile(regbus, regfile, naccess=8)
+        elapsed[gap] = time.time() - start
+
+    # the wall time depends on the machine, only report it
+    print("{} registers, indexed {:.2f}s, compared {:.2f}s".format(
+        nregs, elapsed[0], elapsed[8]))
@@ -0,0 +1,159 @@
+
+from __future__ import print_function, division
+
+from random import randint
+
+import pytest
+
+import myhdl
+from myhdl import instance, delay, now, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile
+from rhea.system import Barebone, Wishbone
+from rhea.cores.memmap import controller_basic
+from rhea.utils.test import run_testbench, tb_default_args
+
+
+def create_regfile(nregs=16):
+    regfile = RegisterFile()
+    regfile.base_address = 0
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, ii*4)
+        regfile.add_register(reg)
+    return regfile
+
+
+def bench_throughput(pipelined, nregs=16, timeout=None):
+    """ write and read all the registers back-to-back, return the
+    number of cycles for the writes and reads.
+    """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=pipelined)
+    if timeout is not None:
+        regbus.timeout = timeout
+    regfile = create_regfile(nregs)
+    period = 10
+    cycles = []
+
+    @myhdl.block
+    def bench_wishbone_pipelined():
+        tbdut = regbus.add(regfile, 'pipe')
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen(hticks=period//2)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            addrs = [ii*4 for ii in range(nregs)]
+            vals = [randint(0, 2**32-1) for _ in range(nregs)]
+            start = now()
+            yield regbus.writetrans(addrs, vals)
+            cycles.append((now() - start) // period)
+
+            start = now()
+            yield regbus.readtrans(addrs)
+            cycles.append((now() - start) // period)
+            assert regbus.get_read_data() == vals
+
+            # single accesses
+            yield regbus.writetrans(8, 0xCAFE)
+            yield regbus.readtrans(8)
+            assert regbus.get_read_data() == 0xCAFE
+            assert regfile.reg2 == 0xCAFE
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    run_testbench(bench_wishbone_pipelined)
+    return cycles
+
+
+def test_pipelined_throughput():
+    nregs = 16
+    wcycles, rcycles = bench_throughput(True, nregs)
+    print("pipelined: {} writes in {} cycles, {} reads in {} cycles".format(
+        nregs, wcycles, nregs, rcycles))
+    # a transfer per cycle, plus the start and the last ack
+    assert wcycles <= nregs + 3
+    assert rcycles <= nregs + 3
+
+    cwcycles, crcycles = bench_throughput(False, nregs)
+    print("classic: {} writes in {} cycles, {} reads in {} cycles".format(
+        nregs, cwcycles, nregs, crcycles))
+    assert crcycles > 2 * rcycles
+
+    # the timeout is per transfer, not for all the transfers
+    wcycles, rcycles = bench_throughput(True, nregs, timeout=8)
+    assert wcycles <= nregs + 3
+
+
+def test_pipelined_timeout():
+    """ nothing at the address, no acknowledge """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=True)
+    regfile = create_regfile()
+
+    @myhdl.block
+    def bench_wishbone_timeout():
+        tbdut = regbus.add(regfile, 'tmo')
+        tbitx = regbus.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+            yield regbus.readtrans([0, 0x1000])
+            raise StopSimulation
+
+        return tbdut, tbitx, tbclk, tbstim
+
+    with pytest.raises(AssertionError, match="1 of 2 acknowledged"):
+        run_testbench(bench_wishbone_timeout)
+
+
+def test_pipelined_controller(args=None):
+    """ the Barebone to Wishbone (pipelined) adapter """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, async=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=True)
+    generic = Barebone(glbl, data_width=32, address_width=16)
+    regfile = create_regfile()
+
+    @myhdl.block
+    def bench_wishbone_controller():
+        tbdut = regbus.add(regfile, 'ctl')
+        tbitx = regbus.interconnect()
+        tbctl = controller_basic(generic, regbus)
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            yield clock.posedge
+
+            for addr in (0, 4, 0x3C):
+                val = randint(0, 2**32-1)
+                yield generic.writetrans(addr, val)
+                yield generic.readtrans(addr)
+                assert generic.get_read_data() == val
+            assert regfile.reg15 == val
+
+            raise StopSimulation
+
+        return tbdut, tbitx, tbctl, tbclk, tbstim
+
+    run_testbench(bench_wishbone_controller, args=args)